@@ -80,6 +80,15 @@ export interface GetRecentTasksResponseData {
         used: number
         total: number
       }
+      /** 按租户的排队情况 */
+      tenant_queues: {
+        tenant_id: number
+        tenant_name: string | null
+        queue_weight: number
+        queued_count: number
+        oldest_wait_seconds: number
+        avg_wait_seconds: number
+      }[]
     }
     message: string
   }
@@ -18,6 +18,8 @@ export interface TenantData {
   storage_quota: number
   total_storage: number
   max_users: number
+  /** 翻译队列调度权重 */
+  queue_weight: number
   created_at: string
   updated_at: string
 }
@@ -35,6 +37,7 @@ export interface CreateTenantRequestData {
   status?: string
   storage_quota?: number
   max_users?: number
+  queue_weight?: number
 }
 
 export interface UpdateTenantRequestData {
@@ -45,6 +48,7 @@ export interface UpdateTenantRequestData {
   status?: string
   storage_quota?: number
   max_users?: number
+  queue_weight?: number
 }
 
 export interface AssignCustomerRequestData {
@@ -8,7 +8,15 @@ from .utils.response import APIResponse
 from jwt.exceptions import ExpiredSignatureError, InvalidTokenError, DecodeError
 
 
-def create_app(config_class=None):
+def create_app(config_class=None, start_background=True):
+    """
+    创建应用
+
+    Args:
+        config_class: 配置类，默认按 FLASK_ENV 选择
+        start_background: 是否启动后台调度（队列管理器、统计汇总、定期清理等），
+                          独立翻译worker及其任务子进程传 False
+    """
     app = Flask(__name__)
 
     # 加载配置
@@ -30,11 +38,16 @@ def create_app(config_class=None):
     # 设置内存监控器
     from app.utils.memory_manager import setup_memory_monitor, setup_periodic_cleanup
     setup_memory_monitor(app)
-    setup_periodic_cleanup(app)  # 启动定期内存清理任务
-    
-    # 启动图片合并PDF文件自动清理调度器
-    from app.utils.images_to_pdf_cleanup_scheduler import init_cleanup_scheduler
-    init_cleanup_scheduler(app, cleanup_interval_hours=6, expire_hours=24)
+    if start_background:
+        setup_periodic_cleanup(app)  # 启动定期内存清理任务
+        
+        # 启动图片合并PDF文件自动清理调度器
+        from app.utils.images_to_pdf_cleanup_scheduler import init_cleanup_scheduler
+        init_cleanup_scheduler(app, cleanup_interval_hours=6, expire_hours=24)
+        
+        # 启动看板统计汇总调度器
+        from app.utils.statistics_rollup import init_statistics_rollup
+        init_statistics_rollup(app)
     
 
     # 首先注册JWT相关异常处理器（优先级最高）
@@ -119,13 +132,19 @@ def create_app(config_class=None):
     # 启动时清理未完成的翻译任务（已禁用）
     # cleanup_incomplete_tasks(app)
     
-    # 初始化队列管理器
+    if not start_background:
+        return app
+    
+    # 初始化队列管理器（external模式下由独立worker调度，这里只设置应用实例供入队使用）
     with app.app_context():
         try:
             from app.utils.queue_manager import queue_manager
             queue_manager.set_app(app)  # 设置应用实例
-            queue_manager.start_monitor()
-            app.logger.info("文件翻译队列管理器已启动")
+            if app.config.get('TRANSLATE_WORKER_MODE') == 'external':
+                app.logger.info("文件翻译任务由独立worker执行，跳过启动队列管理器")
+            else:
+                queue_manager.start_monitor()
+                app.logger.info("文件翻译队列管理器已启动")
         except Exception as e:
             app.logger.error(f"启动文件翻译队列管理器失败: {e}")
     
@@ -56,6 +56,15 @@ class Config:
 
     # 时区
     TIMEZONE = 'Asia/Shanghai'#'UTC' #'Asia/Shanghai'
+
+    # 翻译任务执行方式
+    # inline: 在gunicorn进程内以线程执行（默认）
+    # external: 由独立worker进程执行（python -m app.worker），API只负责入队
+    TRANSLATE_WORKER_MODE = os.getenv('TRANSLATE_WORKER_MODE', 'inline')
+    TRANSLATE_WORKER_CONCURRENCY = int(os.getenv('TRANSLATE_WORKER_CONCURRENCY', 12))  # 单个worker同时执行的任务数
+    TRANSLATE_WORKER_MEMORY_MB = int(os.getenv('TRANSLATE_WORKER_MEMORY_MB', 4096))  # 单个任务子进程的内存上限(MB)
+    # 翻译队列公平调度：是否启用小任务优先通道（见 utils/fair_queue.py）
+    FAIR_QUEUE_SMALL_LANE = os.getenv('FAIR_QUEUE_SMALL_LANE', 'true').lower() == 'true'
     
     # 内存管理配置（硬编码，始终启用）
     MEMORY_CLEANUP_THRESHOLD = 1073741824  # 1GB (单位：字节)
@@ -17,11 +17,14 @@ from .tenant_customer import TenantCustomer
 from .tenant_user import TenantUser
 from .image_translate import ImageTranslate
 from .token_usage import TokenUsage
+from .statistics import TranslateStatistics, TenantStatistics
+from .translate_checkpoint import TranslateCheckpoint
 
 __all__ = [
     'User', 'Customer', 'Setting', 'Translate', 'SendCode',
     'Prompt', 'PromptFav', 'Comparison', 'ComparisonSub', 'ComparisonFav',
     'Cache', 'CacheLock', 'Migration', 'Session', 'Message', 
     'PasswordResetToken', 'Job', 'FailedJob', 'JobBatch',
-    'Tenant', 'TenantCustomer', 'TenantUser', 'ImageTranslate', 'TokenUsage'
+    'Tenant', 'TenantCustomer', 'TenantUser', 'ImageTranslate', 'TokenUsage',
+    'TranslateStatistics', 'TenantStatistics', 'TranslateCheckpoint'
 ]
\ No newline at end of file
@@ -0,0 +1,75 @@
+from datetime import datetime
+from app.extensions import db
+
+
+class TranslateStatistics(db.Model):
+    """ 翻译任务小时级统计汇总表（按租户、按创建时间所在小时汇总，供看板读取）"""
+    __tablename__ = 'translate_statistics'
+
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    tenant_id = db.Column(db.Integer, nullable=False, default=0, comment='租户ID（0表示未分配租户的用户）')
+    bucket_start = db.Column(db.DateTime, nullable=False, comment='统计小时的起始时间（与translate.created_at同一时区）')
+    stat_date = db.Column(db.Date, nullable=False, comment='统计日期（冗余字段，方便按天汇总）')
+
+    # 任务数（按任务当前状态统计，只统计未删除的任务）
+    total_count = db.Column(db.Integer, nullable=False, default=0, comment='任务总数')
+    none_count = db.Column(db.Integer, nullable=False, default=0, comment='未开始任务数')
+    queued_count = db.Column(db.Integer, nullable=False, default=0, comment='排队中任务数')
+    changing_count = db.Column(db.Integer, nullable=False, default=0, comment='转换中任务数')
+    process_count = db.Column(db.Integer, nullable=False, default=0, comment='翻译中任务数')
+    done_count = db.Column(db.Integer, nullable=False, default=0, comment='已完成任务数')
+    failed_count = db.Column(db.Integer, nullable=False, default=0, comment='失败任务数')
+
+    # Token 和存储
+    input_tokens = db.Column(db.BigInteger, nullable=False, default=0, comment='输入token总数')
+    output_tokens = db.Column(db.BigInteger, nullable=False, default=0, comment='输出token总数')
+    total_tokens = db.Column(db.BigInteger, nullable=False, default=0, comment='总token数')
+    origin_filesize = db.Column(db.BigInteger, nullable=False, default=0, comment='原始文件大小总和（字节）')
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, comment='最近一次汇总时间')
+
+    __table_args__ = (
+        db.UniqueConstraint('tenant_id', 'bucket_start', name='unique_tenant_bucket'),
+        db.Index('idx_translate_statistics_bucket', 'bucket_start'),
+        db.Index('idx_translate_statistics_date', 'stat_date'),
+    )
+
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'tenant_id': self.tenant_id,
+            'bucket_start': self.bucket_start.isoformat() if self.bucket_start else None,
+            'stat_date': self.stat_date.isoformat() if self.stat_date else None,
+            'total_count': self.total_count,
+            'none_count': self.none_count,
+            'queued_count': self.queued_count,
+            'changing_count': self.changing_count,
+            'process_count': self.process_count,
+            'done_count': self.done_count,
+            'failed_count': self.failed_count,
+            'input_tokens': self.input_tokens,
+            'output_tokens': self.output_tokens,
+            'total_tokens': self.total_tokens,
+            'origin_filesize': self.origin_filesize,
+        }
+
+
+class TenantStatistics(db.Model):
+    """ 租户存储统计快照表（定期汇总customer表的存储使用情况）"""
+    __tablename__ = 'tenant_statistics'
+
+    tenant_id = db.Column(db.Integer, primary_key=True, autoincrement=False, comment='租户ID（0表示未分配租户的用户）')
+    customer_count = db.Column(db.Integer, nullable=False, default=0, comment='未删除用户数')
+    used_storage = db.Column(db.BigInteger, nullable=False, default=0, comment='已使用存储空间（字节）')
+    total_storage = db.Column(db.BigInteger, nullable=False, default=0, comment='总存储空间（字节）')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, comment='最近一次汇总时间')
+
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'tenant_id': self.tenant_id,
+            'customer_count': self.customer_count,
+            'used_storage': int(self.used_storage or 0),
+            'total_storage': int(self.total_storage or 0),
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+        }
@@ -22,6 +22,7 @@ class Tenant(db.Model):
     total_storage = db.Column(db.BigInteger, default=0)  # 租户已使用存储空间（字节）
     max_users = db.Column(db.Integer, default=10)  # 最大用户数
     config = db.Column(db.JSON)  # 租户配置（JSON格式）
+    queue_weight = db.Column(db.Integer, default=1)  # 翻译队列调度权重（越大分到的执行份额越多）
     deleted_flag = db.Column(db.Enum('N', 'Y'), default='N')  # 删除标记
     created_at = db.Column(db.DateTime, default=datetime.utcnow)  # 创建时间
     updated_at = db.Column(db.DateTime, onupdate=datetime.utcnow)  # 更新时间
@@ -48,6 +49,7 @@ class Tenant(db.Model):
             'total_storage': int(allocated_storage),  # 返回已分配的存储配额
             'max_users': self.max_users,
             'config': self.config,
+            'queue_weight': self.queue_weight or 1,
             'deleted_flag': self.deleted_flag,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
@@ -44,11 +44,29 @@ class Translate(db.Model):
     doc2x_flag = db.Column(db.Enum('N', 'Y'), default='N')          # 文档转换标记
     doc2x_secret_key = db.Column(db.String(32))                     # 转换密钥
     pdf_translate_method = db.Column(db.String(32), default='direct')  # PDF翻译方法：direct(直接翻译) 或 doc2x(转换后翻译)
+    pdf_segment_mode = db.Column(db.String(16), default='span')     # 直接PDF翻译的分段粒度：span / line / block
     prompt_id = db.Column(db.BigInteger, default=0)                 # 提示词ID
     comparison_id = db.Column(db.BigInteger, default=0)             # 对照表ID
     use_streaming = db.Column(db.Boolean, default=False)            # 是否启用流式翻译
     streaming_chunk_size = db.Column(db.Integer, default=10)        # 流式翻译块大小
     size = db.Column(db.BigInteger, default=0) # 文件大小 字节
+    # 上传时探测的文档元数据（探测失败为NULL，见 utils/document_probe.py）
+    page_count = db.Column(db.Integer, nullable=True)               # PDF页数
+    slide_count = db.Column(db.Integer, nullable=True)              # PPT幻灯片数
+    sheet_count = db.Column(db.Integer, nullable=True)              # Excel工作表数
+    paragraph_count = db.Column(db.Integer, nullable=True)          # 段落数
+    segment_count = db.Column(db.Integer, nullable=True)            # 预估待翻译段数
+    estimated_tokens = db.Column(db.BigInteger, nullable=True)      # 预估token数
+    is_scanned = db.Column(db.Boolean, nullable=True)               # 是否扫描版PDF
+    # 任务租约（多节点调度，见 utils/task_lease.py）
+    lease_owner = db.Column(db.String(128), nullable=True)          # 执行节点:进程号
+    lease_expires_at = db.Column(db.DateTime, nullable=True)        # 租约过期时间（数据库时间）
+    lease_reclaims = db.Column(db.Integer, default=0)               # 租约过期被回收的次数（不计入failed_count）
+    queued_at = db.Column(db.DateTime, nullable=True)               # 最近一次入队时间（UTC，公平调度和排队统计）
+    # 任务内存归因（见 utils/task_memory.py）
+    memory_mb = db.Column(db.Float, nullable=True)                  # 运行中任务当前占用内存(MB)
+    peak_memory_mb = db.Column(db.Float, nullable=True)             # 峰值内存(MB)
+    memory_phases = db.Column(db.Text, nullable=True)               # 各阶段内存明细（JSON）
     server= db.Column(db.String(32), default='openai')
     app_id = db.Column(db.String(64), default='')
     app_key = db.Column(db.String(64), default='')
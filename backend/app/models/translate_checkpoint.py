@@ -0,0 +1,19 @@
+from datetime import datetime
+from app.extensions import db
+
+
+class TranslateCheckpoint(db.Model):
+    """ 翻译断点续译日志（每段译文一行，见 translate/checkpoint.py）"""
+    __tablename__ = 'translate_checkpoint'
+
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    translate_id = db.Column(db.Integer, nullable=False, comment='翻译任务ID')
+    segment_index = db.Column(db.Integer, nullable=False, comment='段落序号（-1表示调用方没有序号）')
+    source_hash = db.Column(db.CHAR(32), nullable=False, comment='原文哈希（含目标语言、提示词、术语库）')
+    target_text = db.Column(db.Text(16777215), nullable=False, comment='译文')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, comment='记录时间（UTC）')
+
+    __table_args__ = (
+        db.UniqueConstraint('translate_id', 'segment_index', 'source_hash', name='unique_translate_segment'),
+        db.Index('idx_translate_checkpoint_created', 'created_at'),
+    )
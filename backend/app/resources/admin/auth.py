@@ -9,6 +9,7 @@ from app.models.tenant import Tenant
 from app.models.tenant_user import TenantUser
 from app.utils.response import APIResponse
 from app.utils.admin_tenant_helper import is_super_admin, get_admin_tenant_id
+from app.utils.auth_cache import invalidate_auth_entry
 
 
 
@@ -77,6 +78,7 @@ class AdminLoginResource(Resource):
             # 更新管理员表中的当前 token ID（实现单点登录：新登录会使旧 token 失效）
             admin.current_token_id = token_jti
             db.session.commit()
+            invalidate_auth_entry(admin.id, 'admin')
             
             # 记录登录日志（单点登录相关信息已移除）
             current_app.logger.info(f"✅ 管理员登录成功: admin_id={admin.id}, email={admin.email}")
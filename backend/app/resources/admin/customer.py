@@ -12,6 +12,8 @@ from app.models.tenant_customer import TenantCustomer
 from app.utils.auth_tools import hash_password
 from app.utils.response import APIResponse
 from app.utils.admin_tenant_helper import get_admin_tenant_id, is_super_admin, check_tenant_storage_quota
+from app.utils.auth_cache import invalidate_auth_entry
+from app.utils.pagination import keyset_paginate, invalidate_cached_count
 
 
 # 获取用户列表
@@ -22,6 +24,7 @@ class AdminCustomerListResource(Resource):
         parser.add_argument('page', type=int, required=False, location='args')  # 可选，默认值为 1
         parser.add_argument('limit', type=int, required=False, location='args')  # 可选，默认值为 10
         parser.add_argument('keyword', type=str, required=False, location='args')  # 可选，无默认值
+        parser.add_argument('cursor', type=str, required=False, location='args')  # 游标分页，可选（首页传空字符串）
         args = parser.parse_args()
         
         # 根据管理员角色过滤用户
@@ -39,7 +42,16 @@ class AdminCustomerListResource(Resource):
         if args['keyword']:
             query = query.filter(Customer.email.ilike(f"%{args['keyword']}%"))
 
-        pagination = query.paginate(page=args['page'], per_page=args['limit'], error_out=False)
+        # 分页查询（支持游标分页，总数按租户缓存）
+        try:
+            pagination = keyset_paginate(
+                query, Customer.created_at, Customer.id,
+                cursor=args['cursor'], page=args['page'], per_page=args['limit'] or 20,
+                count_scope=f"admin_customer_list:{'all' if is_super_admin() else tenant_id}",
+                count_signature=args['keyword']
+            )
+        except ValueError as e:
+            return APIResponse.error(str(e), 400)
         
         # 获取所有租户信息（用于显示）
         from app.models.tenant import Tenant
@@ -56,7 +68,8 @@ class AdminCustomerListResource(Resource):
         
         return APIResponse.success({
             'data': customers,
-            'total': pagination.total
+            'total': pagination.total,
+            'next_cursor': pagination.next_cursor
         })
 
 
@@ -99,6 +112,7 @@ class CustomerStatusResource(Resource):
         print(f"更新前的状态: {customer.status}")  # 调试
         db.session.commit()
         print(f"更新后的状态: {customer.status}")  # 调试
+        invalidate_auth_entry(customer.id, 'customer')
 
         # 返回更新后的用户信息
         return APIResponse.success(data=customer.to_dict())
@@ -155,6 +169,9 @@ class AdminCreateCustomerResource(Resource):
         )
         db.session.add(tenant_customer)
         db.session.commit()
+        invalidate_auth_entry(customer.id, 'customer')
+        invalidate_cached_count('admin_customer_list:all')
+        invalidate_cached_count(f'admin_customer_list:{tenant_id}')
         
         return APIResponse.success({
             'customer_id': customer.id,
@@ -275,4 +292,7 @@ class AdminDeleteCustomerResource(Resource):
         
         customer.deleted_flag = 'Y'
         db.session.commit()
+        invalidate_auth_entry(customer.id, 'customer')
+        invalidate_cached_count('admin_customer_list:all')
+        invalidate_cached_count(f'admin_customer_list:{tenant_id}')
         return APIResponse.success(message='用户删除成功')
@@ -12,6 +12,8 @@ from app.models.customer import Customer
 from app.models.tenant_customer import TenantCustomer
 from app.utils.response import APIResponse
 from app.utils.admin_tenant_helper import get_admin_tenant_id, is_super_admin
+from app.utils.statistics_rollup import get_task_totals, get_daily_task_counts, get_storage_totals
+from app.utils.fair_queue import get_tenant_queue_stats
 
 
 def decimal_to_float(value):
@@ -23,41 +25,38 @@ def decimal_to_float(value):
     return float(value)
 
 
+def get_statistics_tenant_id():
+    """看板汇总表使用的租户过滤条件，超级管理员返回None（统计全部租户）"""
+    tenant_id = get_admin_tenant_id()
+    if tenant_id is not None and not is_super_admin():
+        return tenant_id
+    return None
+
+
 class DashboardStatisticsResource(Resource):
     """看板统计数据"""
     @jwt_required()
     def get(self):
-        """获取看板统计数据"""
+        """获取看板统计数据（任务计数和存储读取预汇总表）"""
         try:
-            tenant_id = get_admin_tenant_id()
-            
-            # 构建基础查询
-            base_query = Translate.query.filter(Translate.deleted_flag == 'N')
-            customer_query = Customer.query.filter(Customer.deleted_flag == 'N')
-            
-            # 租户过滤
-            if tenant_id is not None and not is_super_admin():
-                # 翻译任务需要通过租户客户关联表过滤
-                base_query = base_query.join(
-                    TenantCustomer, Translate.customer_id == TenantCustomer.customer_id
-                ).filter(TenantCustomer.tenant_id == tenant_id)
-                
-                # 用户也需要过滤
-                customer_ids = db.session.query(TenantCustomer.customer_id).filter(
-                    TenantCustomer.tenant_id == tenant_id
-                ).subquery()
-                customer_query = customer_query.filter(Customer.id.in_(customer_ids))
+            stats_tenant_id = get_statistics_tenant_id()
             
             # 1. 今日翻译任务数
             today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-            today_tasks = base_query.filter(Translate.created_at >= today_start).count()
+            today_tasks = get_task_totals(stats_tenant_id, start=today_start)['total_count']
             
             # 2. 翻译成功率
-            total_tasks = base_query.count()
-            completed_tasks = base_query.filter(Translate.status == 'done').count()
+            totals = get_task_totals(stats_tenant_id)
+            total_tasks = totals['total_count']
+            completed_tasks = totals['done_count']
             success_rate = round((completed_tasks / total_tasks * 100), 2) if total_tasks > 0 else 0
             
-            # 3. 今日活跃用户数（今天有翻译任务的用户数）- 使用正确的去重统计
+            # 3. 今日活跃用户数（今天有翻译任务的用户数）- 去重计数无法预汇总，只扫描今天的任务
+            base_query = Translate.query.filter(Translate.deleted_flag == 'N')
+            if stats_tenant_id is not None:
+                base_query = base_query.join(
+                    TenantCustomer, Translate.customer_id == TenantCustomer.customer_id
+                ).filter(TenantCustomer.tenant_id == stats_tenant_id)
             active_users = base_query.filter(
                 Translate.created_at >= today_start
             ).with_entities(
@@ -65,16 +64,9 @@ class DashboardStatisticsResource(Resource):
             ).scalar() or 0
             
             # 4. 存储使用率
-            total_storage = decimal_to_float(
-                customer_query.with_entities(
-                    func.sum(Customer.total_storage)
-                ).scalar()
-            )
-            used_storage = decimal_to_float(
-                customer_query.with_entities(
-                    func.sum(Customer.storage)
-                ).scalar()
-            )
+            storage = get_storage_totals(stats_tenant_id)
+            total_storage = decimal_to_float(storage['total_storage'])
+            used_storage = decimal_to_float(storage['used_storage'])
             storage_usage = round((used_storage / total_storage * 100), 2) if total_storage > 0 else 0
             
             return APIResponse.success({
@@ -97,29 +89,15 @@ class DashboardTrendResource(Resource):
             parser.add_argument('days', type=int, default=7, location='args')
             args = parser.parse_args()
             
-            tenant_id = get_admin_tenant_id()
+            stats_tenant_id = get_statistics_tenant_id()
             days = args['days']
             
-            # 构建查询
-            base_query = Translate.query.filter(Translate.deleted_flag == 'N')
-            
-            if tenant_id is not None and not is_super_admin():
-                base_query = base_query.join(
-                    TenantCustomer, Translate.customer_id == TenantCustomer.customer_id
-                ).filter(TenantCustomer.tenant_id == tenant_id) 
-            
             # 获取日期范围
             end_date = datetime.now().replace(hour=23, minute=59, second=59, microsecond=999999)
             start_date = (end_date - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
             
-            # 按天统计
-            results = base_query.filter(
-                Translate.created_at >= start_date,
-                Translate.created_at <= end_date
-            ).with_entities(
-                func.date(Translate.created_at).label('date'),
-                func.count(Translate.id).label('count')
-            ).group_by(func.date(Translate.created_at)).all()
+            # 按天统计（读取预汇总表）
+            daily_counts = get_daily_task_counts(start_date.date(), end_date.date(), stats_tenant_id)
             
             # 格式化日期并构建完整日期列表
             dates = []
@@ -127,14 +105,7 @@ class DashboardTrendResource(Resource):
             for i in range(days):
                 date = (start_date + timedelta(days=i)).date()
                 dates.append(date.strftime('%Y-%m-%d'))
-                counts.append(0)  # 默认值
-            
-            # 填充实际数据
-            for result in results:
-                date_str = result.date.strftime('%Y-%m-%d')
-                if date_str in dates:
-                    idx = dates.index(date_str)
-                    counts[idx] = result.count
+                counts.append(daily_counts.get(date, 0))
             
             return APIResponse.success({
                 'dates': dates,
@@ -150,37 +121,17 @@ class DashboardStatusDistributionResource(Resource):
     def get(self):
         """获取任务状态分布"""
         try:
-            tenant_id = get_admin_tenant_id()
-            
-            # 构建查询
-            base_query = Translate.query.filter(Translate.deleted_flag == 'N')
-            
-            if tenant_id is not None and not is_super_admin():
-                base_query = base_query.join(
-                    TenantCustomer, Translate.customer_id == TenantCustomer.customer_id
-                ).filter(TenantCustomer.tenant_id == tenant_id)
-            
-            # 按状态分组统计
-            results = base_query.with_entities(
-                Translate.status,
-                func.count(Translate.id).label('count')
-            ).group_by(Translate.status).all()
+            totals = get_task_totals(get_statistics_tenant_id())
             
             # 格式化数据
             distribution = {
-                'done': 0,
-                'process': 0,
-                'failed': 0,
-                'queued': 0,
-                'none': 0
+                'done': totals['done_count'],
+                'process': totals['process_count'],
+                'failed': totals['failed_count'],
+                'queued': totals['queued_count'],
+                'none': totals['none_count']
             }
             
-            for result in results:
-                status = result.status
-                count = result.count
-                if status in distribution:
-                    distribution[status] = count
-            
             return APIResponse.success(distribution)
         except Exception as e:
             return APIResponse.error(f'获取状态分布失败: {str(e)}', 500)
@@ -311,8 +262,12 @@ class DashboardSystemStatusResource(Resource):
             )
             user_storage_percentage = round((used_storage / total_storage * 100), 2) if total_storage > 0 else 0
             
+            # 4. 按租户的排队情况（超级管理员查看全部租户）
+            tenant_queues = get_tenant_queue_stats(get_statistics_tenant_id())
+            
             return APIResponse.success({
                 'queue_count': queue_count,
+                'tenant_queues': tenant_queues,
                 'server_info': {
                     'cpu_percent': round(cpu_percent, 1),
                     'memory_percent': round(memory_percent, 1),
@@ -10,6 +10,19 @@ from app.models.tenant_user import TenantUser
 from app.models import Customer, User
 from app.utils.response import APIResponse
 from app.utils.admin_tenant_helper import require_super_admin, get_tenant_allocated_storage
+from app.utils.auth_cache import invalidate_auth_entry
+from app.utils.fair_queue import MAX_WEIGHT
+
+
+def _parse_queue_weight(value):
+    """校验翻译队列调度权重，返回 (权重, 错误信息)"""
+    try:
+        weight = int(value)
+    except (TypeError, ValueError):
+        return None, '调度权重必须为整数'
+    if weight < 1 or weight > MAX_WEIGHT:
+        return None, f'调度权重范围为 1-{MAX_WEIGHT}'
+    return weight, None
 
 
 # 租户列表
@@ -72,6 +85,10 @@ class AdminCreateTenantResource(Resource):
         import uuid
         tenant_no = f"TENANT_{uuid.uuid4().hex[:8].upper()}"
         
+        queue_weight, error = _parse_queue_weight(data.get('queue_weight', 1))
+        if error:
+            return APIResponse.error(error, 400)
+        
         tenant = Tenant(
             tenant_no=tenant_no,
             tenant_code=data['tenant_code'],
@@ -80,7 +97,8 @@ class AdminCreateTenantResource(Resource):
             contact_person=data.get('contact_person'),
             status=data.get('status', 'active'),
             storage_quota=data.get('storage_quota', 10737418240),  # 默认10GB
-            max_users=data.get('max_users', 100)
+            max_users=data.get('max_users', 100),
+            queue_weight=queue_weight
         )
         db.session.add(tenant)
         db.session.commit()
@@ -120,8 +138,16 @@ class AdminUpdateTenantResource(Resource):
             tenant.storage_quota = data['storage_quota']
         if 'max_users' in data:
             tenant.max_users = data['max_users']
+        if 'queue_weight' in data:
+            queue_weight, error = _parse_queue_weight(data['queue_weight'])
+            if error:
+                return APIResponse.error(error, 400)
+            tenant.queue_weight = queue_weight
 
         db.session.commit()
+        if 'queue_weight' in data:
+            from app.utils.queue_manager import queue_manager
+            queue_manager.fair_queue.invalidate_weights()
         return APIResponse.success(message='租户信息更新成功')
 
 
@@ -187,6 +213,7 @@ class AdminAssignCustomerToTenantResource(Resource):
         )
         db.session.add(tenant_customer)
         db.session.commit()
+        invalidate_auth_entry(customer_id, 'customer')
         
         return APIResponse.success(message='用户分配成功')
 
@@ -234,6 +261,7 @@ class AdminAssignUserToTenantResource(Resource):
         )
         db.session.add(tenant_user)
         db.session.commit()
+        invalidate_auth_entry(user_id, 'admin')
         
         return APIResponse.success(message='管理员分配成功')
 
@@ -4,12 +4,13 @@ import zipfile
 from datetime import datetime
 from io import BytesIO
 
-from flask import request, make_response, send_file
+from flask import request, make_response, send_file, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from flask_restful import Resource, reqparse
 from app import db
 from app.models import Customer
 from app.models.translate import Translate
+from app.models.translate_checkpoint import TranslateCheckpoint
 from app.models.tenant_customer import TenantCustomer
 from app.models.tenant import Tenant
 from app.utils.response import APIResponse
@@ -17,6 +18,9 @@ from app.utils.validators import (
     validate_id_list
 )
 from app.utils.admin_tenant_helper import get_admin_tenant_id, filter_by_admin_tenant, is_super_admin
+from app.utils.statistics_rollup import get_task_totals, mark_statistics_dirty
+from app.utils.pagination import keyset_paginate
+from app.utils.task_cost import cost_model
 
 
 # 获取翻译记录列表
@@ -28,6 +32,7 @@ class AdminTranslateListResource(Resource):
         parser = reqparse.RequestParser()
         parser.add_argument('page', type=int, default=1, location='args')  # 页码，默认为 1
         parser.add_argument('limit', type=int, default=100, location='args')  # 每页数量，默认为 100
+        parser.add_argument('cursor', type=str, location='args')  # 游标分页，可选（首页传空字符串）
         parser.add_argument('status', type=str, location='args')  # 状态，可选
         parser.add_argument('keyword', type=str, location='args')  # 搜索关键字，可选
         args = parser.parse_args()
@@ -64,8 +69,16 @@ class AdminTranslateListResource(Resource):
                 (Translate.origin_filename.ilike(f"%{args['keyword']}%")) |
                 (Customer.email.ilike(f"%{args['keyword']}%"))
             )
-        # 执行分页查询
-        pagination = query.paginate(page=args['page'], per_page=args['limit'], error_out=False)
+        # 执行分页查询（支持游标分页，总数按租户缓存）
+        try:
+            pagination = keyset_paginate(
+                query, Translate.created_at, Translate.id,
+                cursor=args['cursor'], page=args['page'], per_page=args['limit'],
+                count_scope=f"admin_translate_list:{tenant_id if not is_super_admin() else 'all'}",
+                count_signature=(args['status'], args['keyword'])
+            )
+        except ValueError as e:
+            return APIResponse.error(str(e), 400)
 
         # 处理每条记录
         data = []
@@ -116,7 +129,8 @@ class AdminTranslateListResource(Resource):
         return APIResponse.success({
             'data': data,
             'total': pagination.total,
-            'current_page': pagination.page
+            'current_page': pagination.page,
+            'next_cursor': pagination.next_cursor
         })
 
 
@@ -236,8 +250,10 @@ class AdminTranslateDeteleResource(Resource):
                 )
             
             record = query.first_or_404()
+            created_at = record.created_at
             db.session.delete(record)
             db.session.commit()
+            mark_statistics_dirty(created_at)
             return APIResponse.success(message='记录删除成功')
         except Exception as e:
             db.session.rollback()
@@ -265,9 +281,13 @@ class AdminTranslateBatchDeleteResource(Resource):
                 )
             
             # 对于批量删除，需要先获取 ids 再删除
-            record_ids = [record.id for record in query.all()]
+            records = query.all()
+            record_ids = [record.id for record in records]
+            created_ats = [record.created_at for record in records]
             Translate.query.filter(Translate.id.in_(record_ids)).delete(synchronize_session=False)
             db.session.commit()
+            for created_at in created_ats:
+                mark_statistics_dirty(created_at)
             return APIResponse.success(message=f'成功删除{len(record_ids)}条记录')
         except APIResponse as e:
             return e
@@ -304,31 +324,78 @@ class AdminTranslateRestartResource(Resource):
             record.process = 0  # 重置进度为0
             record.failed_count = 0  # 重置失败次数
             db.session.commit()
+            mark_statistics_dirty(record.created_at)
+            
+            # 失败任务保留了断点续译日志，重新启动后跳过已翻译的段落
+            resumable = TranslateCheckpoint.query.filter_by(translate_id=record.id).count()
+            if resumable:
+                return APIResponse.success({'resumable_segments': resumable},
+                                           message=f'任务已重启，将从断点继续（已翻译 {resumable} 段）')
             return APIResponse.success(message='任务已重启')
         except Exception as e:
             db.session.rollback()
             return APIResponse.error('重启失败', 500)
 
 
-class AdminTranslateStatisticsResource(Resource):
+class AdminTranslateMemoryResource(Resource):
+    @jwt_required()
     def get(self):
-        """获取翻译统计信息[^5]"""
+        """运行中任务的内存占用排行（各执行进程采样写入，见 utils/task_memory.py）"""
+        parser = reqparse.RequestParser()
+        parser.add_argument('limit', type=int, default=20, location='args')
+        args = parser.parse_args()
+        limit = min(max(args['limit'] or 20, 1), 100)
         try:
+            query = Translate.query.filter(
+                Translate.status.in_(['process', 'changing']),
+                Translate.deleted_flag == 'N'
+            )
             tenant_id = get_admin_tenant_id()
-            
-            # 构建基础查询
-            base_query = Translate.query
             if tenant_id is not None and not is_super_admin():
-                base_query = base_query.join(
+                query = query.join(
                     TenantCustomer, Translate.customer_id == TenantCustomer.customer_id
                 ).filter(
                     TenantCustomer.tenant_id == tenant_id
                 )
+            # 还没有采样数据的任务排在最后
+            tasks = query.order_by(
+                Translate.memory_mb.is_(None), Translate.memory_mb.desc()
+            ).limit(limit).all()
+
+            data = [{
+                'id': task.id,
+                'origin_filename': task.origin_filename,
+                'customer_id': task.customer_id,
+                'status': task.status,
+                'process': float(task.process) if task.process is not None else None,
+                'memory_mb': task.memory_mb,
+                'peak_memory_mb': task.peak_memory_mb,
+                'estimated_memory_mb': round(cost_model.estimate_task(task).memory_mb, 1),
+                'lease_owner': task.lease_owner,
+            } for task in tasks]
+            return APIResponse.success({
+                'data': data,
+                'total_memory_mb': round(sum(item['memory_mb'] or 0 for item in data), 1),
+            })
+        except Exception as e:
+            current_app.logger.error(f"获取任务内存占用失败：{str(e)}")
+            return APIResponse.error('获取任务内存占用失败', 500)
+
+
+class AdminTranslateStatisticsResource(Resource):
+    def get(self):
+        """获取翻译统计信息[^5]"""
+        try:
+            tenant_id = get_admin_tenant_id()
+            
+            stats_tenant_id = tenant_id if tenant_id is not None and not is_super_admin() else None
             
-            total = base_query.count()
-            done_count = base_query.filter(Translate.status == 'done').count()
-            processing_count = base_query.filter(Translate.status == 'process').count()
-            failed_count = base_query.filter(Translate.status == 'failed').count()
+            # 读取预汇总表（只统计未删除的任务）
+            totals = get_task_totals(stats_tenant_id)
+            total = totals['total_count']
+            done_count = totals['done_count']
+            processing_count = totals['process_count']
+            failed_count = totals['failed_count']
 
             return APIResponse.success({
                 'total': total,
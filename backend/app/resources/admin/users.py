@@ -9,6 +9,7 @@ from app.models.tenant_user import TenantUser
 from app.utils.auth_tools import hash_password
 from app.utils.response import APIResponse
 from app.utils.admin_tenant_helper import get_admin_tenant_id, is_super_admin
+from app.utils.auth_cache import invalidate_auth_entry
 
 
 class AdminUserListResource(Resource):
@@ -138,6 +139,7 @@ class AdminCreateUserResource(Resource):
         )
         db.session.add(tenant_user)
         db.session.commit()
+        invalidate_auth_entry(user.id, 'admin')
         
         return APIResponse.success({
             'user_id': user.id,
@@ -234,4 +236,5 @@ class AdminDeleteUserResource(Resource):
         
         user.deleted_flag = 'Y'
         db.session.commit()
+        invalidate_auth_entry(user.id, 'admin')
         return APIResponse.success(message='用户删除成功')
@@ -10,6 +10,7 @@ from app.models.tenant import Tenant
 from app.models.tenant_customer import TenantCustomer
 from app.utils.security import hash_password, verify_password
 from app.utils.response import APIResponse
+from app.utils.auth_cache import invalidate_auth_entry
 from app.utils.mail_service import EmailService
 import random
 
@@ -150,6 +151,7 @@ class UserLoginResource(Resource):
             # 更新用户表中的当前 token ID（实现单点登录：新登录会使旧 token 失效）
             customer.current_token_id = token_jti
             db.session.commit()
+            invalidate_auth_entry(customer.id, 'customer')
             
             return APIResponse.success({
                 'token': access_token,
@@ -223,7 +225,8 @@ class UserLogoutResource(Resource):
         # 3. 记录日志等
         
         # 由于JWT是无状态的，服务端不需要特别处理token失效
-        # 客户端清除token即可
+        # 客户端清除token即可，这里只清除认证缓存
+        invalidate_auth_entry(current_user_id, 'customer')
         
         return APIResponse.success(message='退出登录成功')
 
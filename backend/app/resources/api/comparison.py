@@ -18,6 +18,7 @@ from datetime import datetime
 from app.utils.token_checker import require_valid_token
 from app.utils.validators import validate_pagination_params
 from app.utils.tenant_helper import get_current_tenant_id
+from app.utils.pagination import keyset_paginate
 
 # 获取logger
 logger = logging.getLogger(__name__)
@@ -103,6 +104,7 @@ class SharedComparisonListResource(Resource):
         parser.add_argument('page', type=int, default=1, location='args')  # 分页参数
         parser.add_argument('limit', type=int, default=10, location='args')  # 分页参数
         parser.add_argument('order', type=str, default='latest', location='args')  # 排序参数
+        parser.add_argument('cursor', type=str, location='args')  # 游标分页（仅 order=latest 时有效，首页传空字符串）
         args = parser.parse_args()
         
         # 获取当前用户的租户ID
@@ -132,14 +134,25 @@ class SharedComparisonListResource(Resource):
 
         # 根据 order 参数排序
         if args['order'] == 'latest':
-            query = query.order_by(Comparison.created_at.desc())  # 按最新发表排序
+            query = query.order_by(Comparison.created_at.desc(), Comparison.id.desc())  # 按最新发表排序
         elif args['order'] == 'added':
             query = query.order_by(Comparison.added_count.desc())  # 按添加量排序
         elif args['order'] == 'fav':
             query = query.order_by(func.count(ComparisonFav.id).desc())  # 按收藏量排序
 
-        # 分页查询
-        pagination = query.paginate(page=args['page'], per_page=args['limit'], error_out=False)
+        # 分页查询（按最新排序时支持游标分页，总数按租户缓存）
+        try:
+            pagination = keyset_paginate(
+                query, Comparison.created_at, Comparison.id,
+                cursor=args['cursor'] if args['order'] == 'latest' else None,
+                page=args['page'], per_page=args['limit'],
+                count_scope=f"shared_comparison_list:{tenant_id or 'all'}",
+                count_query=Comparison.query.filter(*filters),
+                row_entity=lambda row: row[0],
+                keyset_ordered=args['order'] == 'latest'
+            )
+        except ValueError as e:
+            return APIResponse.error(str(e), 400)
         comparisons = [{
             'id': comparison.id,
             'title': comparison.title,
@@ -158,7 +171,8 @@ class SharedComparisonListResource(Resource):
             'data': comparisons,
             'total': pagination.total,
             'current_page': pagination.page,
-            'per_page': pagination.per_page
+            'per_page': pagination.per_page,
+            'next_cursor': pagination.next_cursor
         })
 
     def parse_content(self, content_str):
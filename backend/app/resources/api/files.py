@@ -14,6 +14,8 @@ from flask import request, current_app
 from datetime import datetime
 from app.utils.token_checker import require_valid_token
 from app.utils.tenant_path import get_tenant_upload_dir
+from app.utils.pagination import invalidate_cached_count
+from app.utils.document_probe import probe_document
 
 
 class FileUploadResource(Resource):
@@ -98,6 +100,9 @@ class FileUploadResource(Resource):
             # 计算文件的 MD5
             file_md5 = self.calculate_md5(save_path)
 
+            # 探测文档元数据（页数、段落数等），供调度器和文件处理器直接使用
+            metadata = probe_document(save_path)
+
             # 创建翻译记录
             translate_record = Translate(
                 translate_no=f"TRANS{datetime.now().strftime('%Y%m%d%H%M%S')}",
@@ -108,13 +113,21 @@ class FileUploadResource(Resource):
                 origin_filepath=os.path.abspath(save_path),  # 使用绝对路径（实际存储的文件路径）
                 target_filepath='',  # 目标文件路径暂为空
                 status='none',  # 初始状态为 none
-                origin_filesize=file_size,
-                size=file_size,
+                origin_filesize=metadata['file_size'] or file_size,  # 磁盘上的实际文件大小
+                size=file_size,  # 存储空间计费仍使用请求长度，与customer.storage保持一致
                 md5=file_md5,
+                page_count=metadata['page_count'],
+                slide_count=metadata['slide_count'],
+                sheet_count=metadata['sheet_count'],
+                paragraph_count=metadata['paragraph_count'],
+                segment_count=metadata['segment_count'],
+                estimated_tokens=metadata['estimated_tokens'],
+                is_scanned=metadata['is_scanned'],
                 created_at=datetime.utcnow()
             )
             db.session.add(translate_record)
             db.session.commit()
+            invalidate_cached_count(f"translate_list:{user_id}")
 
             # 返回响应，包含文件名、UUID 和翻译记录 ID
             return APIResponse.success({
@@ -20,6 +20,7 @@ from app.utils.qwen_mt_image_client import QwenMTImageClient
 from app.models.customer import Customer
 from app.models.image_translate import ImageTranslate
 from app.extensions import db
+from app.utils.queue_notifier import get_queue_notifier, IMAGE_TRANSLATE_QUEUE
 
 
 class ImageUploadResource(Resource):
@@ -376,6 +377,10 @@ class ImageTranslateBatchResource(Resource):
                 if records_to_update:
                     db.session.commit()
                     current_app.logger.info(f"批量提交翻译任务：{len(records_to_update)}个任务已加入队列")
+                    notifier = get_queue_notifier(IMAGE_TRANSLATE_QUEUE)
+                    for image_record in records_to_update:
+                        notifier.record_enqueued(image_record.id)
+                    notifier.notify('enqueue')
             except Exception as e:
                 db.session.rollback()
                 current_app.logger.error(f"批量提交翻译任务时数据库提交失败: {str(e)}", exc_info=True)
@@ -827,6 +832,9 @@ class ImageTranslateRetryResource(Resource):
             image_record.detected_language = None
             db.session.commit()
             
+            notifier = get_queue_notifier(IMAGE_TRANSLATE_QUEUE)
+            notifier.record_enqueued(image_record.id)
+            notifier.notify('enqueue')
             current_app.logger.info(f"图片翻译任务已重置为可重试状态: image_id={image_id}")
             
             return APIResponse.success({
@@ -948,6 +956,7 @@ class PDFToImageResource(Resource):
             image_format = request.form.get('image_format', 'png').lower()
             dpi = int(request.form.get('dpi', 200))
             page_range = request.form.get('page_range')  # 格式: "1-5" 或 None（全部）
+            grayscale = request.form.get('grayscale', 'false').lower() in ('1', 'true')  # 灰度渲染（扫描件体积更小）
             
             # 验证图片格式
             supported_formats = ['png', 'jpg', 'jpeg', 'webp']
@@ -999,7 +1008,8 @@ class PDFToImageResource(Resource):
                     dpi=dpi,
                     page_range=page_range_tuple,
                     prefix="page",
-                    image_format=image_format
+                    image_format=image_format,
+                    grayscale=grayscale
                 )
             except Exception as e:
                 current_app.logger.error(f"PDF转图片失败: {str(e)}")
@@ -21,6 +21,8 @@ from app.utils.token_checker import require_valid_token
 from app.resources.task.translate_service import TranslateEngine
 from app.utils.tenant_helper import get_current_tenant_id
 from app.utils.tenant_path import get_tenant_translate_dir
+from app.utils.statistics_rollup import mark_statistics_dirty
+from app.utils.pagination import keyset_paginate, invalidate_cached_count
 
 # 定义翻译配置（硬编码示例）
 TRANSLATE_SETTINGS = {
@@ -343,6 +345,9 @@ class TranslateStartResource(Resource):
                 translate.pdf_translate_method = pdf_translate_method
             else:
                 translate.pdf_translate_method = data.get('pdf_translate_method', 'direct')
+            # 直接PDF翻译的分段粒度（span逐段翻译，line/block按行/文本块合并后翻译）
+            pdf_segment_mode = data.get('pdf_segment_mode') or 'span'
+            translate.pdf_segment_mode = pdf_segment_mode if pdf_segment_mode in ('span', 'line', 'block') else 'span'
             # 流式翻译配置 - 硬编码策略
             file_size_mb = float(translate.size) / (1024 * 1024) if translate.size else 0
             
@@ -446,12 +451,30 @@ class TranslateStartResource(Resource):
             import pytz
             start_time = datetime.now(pytz.timezone(current_app.config.get('TIMEZONE', 'Asia/Shanghai')))
             
+            # 独立worker模式：API只负责入队，由worker领取执行
+            if current_app.config.get('TRANSLATE_WORKER_MODE') == 'external':
+                translate.status = 'queued'
+                translate.queued_at = datetime.utcnow()
+                db.session.commit()
+                mark_statistics_dirty(translate.created_at)
+                queue_manager.notify_enqueued(translate.id)
+                return APIResponse.success({
+                    "task_id": translate.id,
+                    "uuid": translate.uuid,
+                    "target_path": target_abs_path,
+                    "status": "queued",
+                    "message": "任务已加入队列"
+                })
+            
             # 先快速检查资源（避免不必要的数据库操作）
-            can_start, reason = queue_manager.can_start_task(translate.origin_filepath)
+            can_start, reason = queue_manager.can_start_task(translate.origin_filepath, translate.page_count, task=translate)
             if not can_start:
                 # 资源不足，直接加入队列
                 translate.status = 'queued'
+                translate.queued_at = datetime.utcnow()
                 db.session.commit()
+                mark_statistics_dirty(translate.created_at)
+                queue_manager.notify_enqueued(translate.id)
                 return APIResponse.success({
                     "task_id": translate.id,
                     "uuid": translate.uuid,
@@ -495,12 +518,15 @@ class TranslateStartResource(Resource):
                     return APIResponse.error(f"任务状态异常（状态: {translate.status}），无法启动", 400)
             
             # 在锁定状态下再次检查资源（此时其他进程无法同时检查）
-            can_start_locked, reason_locked = queue_manager.can_start_task(translate.origin_filepath)
+            can_start_locked, reason_locked = queue_manager.can_start_task(translate.origin_filepath, translate.page_count, task=translate)
             if not can_start_locked:
                 # 资源已满，回滚并加入队列
                 db.session.rollback()
                 translate.status = 'queued'
+                translate.queued_at = datetime.utcnow()
                 db.session.commit()
+                mark_statistics_dirty(translate.created_at)
+                queue_manager.notify_enqueued(translate.id)
                 current_app.logger.info(f"任务 {translate.id} 资源检查失败（锁定后），加入队列: {reason_locked}")
                 return APIResponse.success({
                     "task_id": translate.id,
@@ -510,23 +536,28 @@ class TranslateStartResource(Resource):
                     "message": "系统资源紧张，任务已加入队列"
                 })
             
-            # 资源充足，更新状态
+            # 资源充足，更新状态（同时写入租约，由当前进程执行和续约）
+            from app.utils.task_lease import lease_assignments
+            lease_sql, lease_params = lease_assignments()
             update_result = db.session.execute(
-                text("""
+                text(f"""
                     UPDATE translate
                     SET status = 'process',
                         start_at = :start_time,
+                        {lease_sql},
                         updated_at = NOW()
                     WHERE id = :task_id
                 """),
                 {
                     'task_id': translate.id,
-                    'start_time': start_time
+                    'start_time': start_time,
+                    **lease_params
                 }
             )
             
             # 提交状态更新（此时任务状态已经是 'process'，会被其他进程看到）
             db.session.commit()
+            mark_statistics_dirty(translate.created_at)
             current_app.logger.info(f"任务 {translate.id} 状态已更新为 process（原子更新+锁定检查）")
             
             # 启动任务
@@ -555,6 +586,7 @@ class TranslateStartResource(Resource):
                 translate.status = 'failed'
                 translate.failed_reason = '任务启动失败'
                 db.session.commit()
+                mark_statistics_dirty(translate.created_at)
                 return APIResponse.error("任务启动失败", 500)
 
         except Exception as e:
@@ -576,6 +608,7 @@ class TranslateListResource(Resource):
             # 获取查询参数
             page = request.args.get('page', 1, type=int)
             limit = request.args.get('limit', 10, type=int)
+            cursor = request.args.get('cursor', None)  # 游标分页（首页传空字符串）
             status_filter = request.args.get('status', None)
             skip_uuids = request.args.get('skip_uuids', '').split(',') if request.args.get('skip_uuids') else []
 
@@ -608,8 +641,17 @@ class TranslateListResource(Resource):
                 Translate.id.desc()
             )
 
-            # 执行分页查询
-            pagination = query.paginate(page=page, per_page=limit, error_out=False)
+            # 执行分页查询（支持游标分页，总数按用户缓存）
+            try:
+                pagination = keyset_paginate(
+                    query, Translate.created_at, Translate.id,
+                    cursor=cursor, page=page, per_page=limit,
+                    count_scope=f"translate_list:{user_id}",
+                    count_signature=(tenant_id, status_filter, sorted(skip_uuids)),
+                    keyset_ordered=True
+                )
+            except ValueError as e:
+                return APIResponse.error(str(e), 400)
 
             # 处理每条记录
             data = []
@@ -672,7 +714,8 @@ class TranslateListResource(Resource):
             return APIResponse.success({
                 'data': data,
                 'total': pagination.total,
-                'current_page': pagination.page
+                'current_page': pagination.page,
+                'next_cursor': pagination.next_cursor
             })
         except Exception as e:
             current_app.logger.error(f"获取翻译列表失败: {str(e)}", exc_info=True)
@@ -932,16 +975,15 @@ class TranslateDeleteResource(Resource):
             )
             
             db.session.commit()
+            mark_statistics_dirty(translate.created_at)
+            invalidate_cached_count(f"translate_list:{customer_id}")
             
-            # 如果删除了正在运行的任务，立即触发队列处理
+            # 如果删除了正在运行的任务，唤醒队列监控线程（队列只在持有文件锁的进程中处理）
+            from app.utils.queue_manager import queue_manager
+            queue_manager.notifier.discard(id)
             if task_was_running:
-                try:
-                    from app.utils.queue_manager import queue_manager
-                    # 立即触发一次队列处理，让队列中的任务尽快开始
-                    queue_manager._process_queue()
-                    current_app.logger.info(f"已触发队列处理，队列中的任务将尽快开始执行")
-                except Exception as e:
-                    current_app.logger.warning(f"触发队列处理失败: {e}")
+                queue_manager.notify_slot_released('cancel')
+                current_app.logger.info(f"已通知队列监控，队列中的任务将尽快开始执行")
             
             return APIResponse.success(message='删除成功!')
             
@@ -1150,7 +1192,11 @@ class TranslateDeleteAllResource(Resource):
                     f"(减少 {total_size} 字节, 删除 {len(records_to_delete)} 个文件, 实际删除 {deleted_files_count} 个源文件)"
                 )
 
+            created_ats = [record.created_at for record in records_to_delete]
             db.session.commit()
+            for created_at in created_ats:
+                mark_statistics_dirty(created_at)
+            invalidate_cached_count(f"translate_list:{customer_id}")
             return APIResponse.success(message="全部文件删除成功!")
             
         except Exception as e:
@@ -1186,11 +1232,15 @@ class TranslateRandDeleteAllResource(Resource):
         if not rand_user_id:
             return APIResponse.error('需要临时用户ID', 400)
 
-        Translate.query.filter_by(
+        query = Translate.query.filter_by(
             rand_user_id=rand_user_id,
             deleted_flag='N'
-        ).delete()
+        )
+        created_ats = [row.created_at for row in query.with_entities(Translate.created_at).all()]
+        query.delete()
         db.session.commit()
+        for created_at in created_ats:
+            mark_statistics_dirty(created_at)
         return APIResponse.success(message="删除成功")
 
 
@@ -1203,8 +1253,10 @@ class TranslateRandDeleteResource(Resource):
             rand_user_id=rand_user_id
         ).first_or_404()
 
+        created_at = translate.created_at
         db.session.delete(translate)
         db.session.commit()
+        mark_statistics_dirty(created_at)
         return APIResponse.success(message="删除成功")
 
 
@@ -1394,8 +1446,18 @@ class QueueStatusResource(Resource):
                     'start_at': task.start_at.isoformat() if task.start_at else None
                 })
             
+            # 当前租户的排队情况（公平调度按租户分配执行份额）
+            from app.utils.fair_queue import get_tenant_queue_stats
+            tenant_queue = None
+            if tenant_id:
+                tenant_stats = get_tenant_queue_stats(tenant_id)
+                tenant_queue = tenant_stats[0] if tenant_stats else {
+                    'tenant_id': tenant_id, 'queued_count': 0, 'oldest_wait_seconds': 0, 'avg_wait_seconds': 0
+                }
+            
             return APIResponse.success({
                 'system_status': system_status,
+                'tenant_queue': tenant_queue,
                 'user_tasks': user_task_status,
                 'user_id': user_id
             })
@@ -17,6 +17,7 @@ from app.utils.token_checker import require_valid_token
 from app.utils.akool_video import AkoolVideoService
 from app.utils.tenant_helper import get_current_tenant_id
 from app.utils.tenant_path import get_tenant_video_dir
+from app.utils.queue_notifier import get_queue_notifier, VIDEO_QUEUE
 
 
 class VideoUploadResource(Resource):
@@ -422,6 +423,14 @@ class VideoTranslateResource(Resource):
             
             db.session.commit()
             
+            # 记录排队任务的入队时间并唤醒视频队列监控
+            queued_videos = [v for v in created_videos if v.status == 'queued']
+            if queued_videos:
+                notifier = get_queue_notifier(VIDEO_QUEUE)
+                for queued_video in queued_videos:
+                    notifier.record_enqueued(queued_video.id)
+                notifier.notify('enqueue')
+            
             # 生成返回消息
             if started_count == languages_to_start:
                 message = '已启动{}个语言的翻译任务'.format(languages_to_start)
@@ -509,6 +518,8 @@ class VideoStatusResource(Resource):
                             video.error_message = akool_status.get('error_message', '翻译失败')
                         
                         db.session.commit()
+                        if video.status in ('completed', 'failed'):
+                            get_queue_notifier(VIDEO_QUEUE).notify('finished')
                 except Exception as e:
                     current_app.logger.error(f"查询Akool状态失败：{str(e)}")
             
@@ -849,6 +860,9 @@ class VideoWebhookResource(Resource):
             
             video.updated_at = datetime.utcnow()
             db.session.commit()
+            if video.status in ('completed', 'failed'):
+                # 并发名额已释放，唤醒视频队列监控启动排队任务
+                get_queue_notifier(VIDEO_QUEUE).notify('finished')
             
             current_app.logger.info(f"视频翻译任务 {task_id} 状态更新为 {video.status}")
             
@@ -1,4 +1,5 @@
 import os
+import time
 from datetime import datetime
 from threading import Thread, Event
 from flask import current_app
@@ -7,6 +8,13 @@ from app.models.translate import Translate
 from app.models.comparison import Comparison, ComparisonSub
 from app.models.prompt import Prompt
 from app.utils.task_manager import register_task, unregister_task
+from app.utils.statistics_rollup import mark_translate_dirty
+from app.utils.queue_notifier import notify_queue, TRANSLATE_QUEUE
+from app.utils.task_lease import ensure_heartbeat, release_lease
+from app.utils.task_cost import record_observation
+from app.utils.task_memory import start_tracking, finish_tracking
+from app.translate.checkpoint import release_checkpoint, clear_checkpoint
+from app.translate.task_state import release_task_state
 from .main import main_wrapper
 import pytz
 
@@ -15,6 +23,7 @@ class TranslateEngine:
     def __init__(self, task_id):
         self.task_id = task_id
         self.app = current_app._get_current_object()  # 获取真实app对象
+        self._dedicated_process = False  # 是否独占进程（独立worker的任务子进程），独占时才能统计内存和CPU
 
     def execute(self):
         """启动翻译任务入口"""
@@ -35,6 +44,8 @@ class TranslateEngine:
             # 注册任务到任务管理器
             register_task(self.task_id, cancel_event)
             self.app.logger.info(f"任务 {self.task_id} 已注册到任务管理器")
+            # 本进程执行期间为任务续约（多节点调度）
+            ensure_heartbeat()
 
             # 启动线程时传递真实app对象、任务ID和取消事件
             thr = Thread(
@@ -58,10 +69,22 @@ class TranslateEngine:
                 pass
             return False
 
+    def run(self):
+        """在当前线程同步执行任务（独立worker的任务子进程使用，状态直接写回数据库）"""
+        with self.app.app_context():
+            self._prepare_task()
+        cancel_event = Event()
+        register_task(self.task_id, cancel_event)
+        ensure_heartbeat()
+        self._dedicated_process = True
+        self._async_wrapper(self.app, self.task_id, cancel_event)
+
     def _async_wrapper(self, app, task_id, cancel_event):
         """异步执行包装器"""
         with app.app_context():
             from app.extensions import db  # 确保在每个线程中导入
+            run_start = time.time()
+            start_tracking(task_id)
             try:
                 # 使用新会话获取任务对象
                 task = db.session.query(Translate).get(task_id)
@@ -91,7 +114,14 @@ class TranslateEngine:
             finally:
                 # 注销任务并释放资源
                 unregister_task(task_id)
+                release_lease(task_id)
                 app.logger.info(f"任务 {task_id} 已从任务管理器注销")
+                # 写入剩余状态并释放状态对象，同一进程内重试时从新的状态对象开始
+                release_task_state(task_id)
+                self._finish_checkpoint()
+                self._record_cost_observation(time.time() - run_start, self._finish_memory_tracking())
+                # 任务占用的并发名额已释放，唤醒队列监控线程启动排队任务
+                notify_queue(TRANSLATE_QUEUE, 'finished')
                 
                 # 释放内存（使用更激进的清理策略）
                 try:
@@ -106,6 +136,54 @@ class TranslateEngine:
                 
                 db.session.remove()  # 清理线程局部session
     
+    def _finish_checkpoint(self):
+        """写入剩余的断点续译日志；任务完成后删除日志，失败或中断的任务保留以便续译"""
+        try:
+            resumed = release_checkpoint(self.task_id)
+            if resumed:
+                self.app.logger.info(f"任务 {self.task_id} 从断点日志复用了 {resumed} 段译文")
+            db.session.expire_all()
+            task = db.session.query(Translate).get(self.task_id)
+            if task and task.status == 'done':
+                clear_checkpoint(self.task_id)
+        except Exception as e:
+            self.app.logger.warning(f"整理任务 {self.task_id} 断点日志失败: {e}")
+
+    def _finish_memory_tracking(self):
+        """写入任务峰值内存和各阶段内存明细，返回峰值(MB)"""
+        try:
+            memory = finish_tracking(self.task_id)
+            return memory['peak_mb'] if memory else None
+        except Exception as e:
+            self.app.logger.warning(f"记录任务 {self.task_id} 内存统计失败: {e}")
+            return None
+
+    def _record_cost_observation(self, duration, attributed_memory_mb=None):
+        """记录任务实际资源消耗，供调度成本模型校准
+
+        Args:
+            duration: 执行耗时（秒）
+            attributed_memory_mb: 按任务归因的峰值内存（共享进程时使用）
+        """
+        try:
+            db.session.expire_all()
+            task = db.session.query(Translate).get(self.task_id)
+            if not task or task.status not in ('done', 'failed'):
+                return
+            peak_memory_mb = attributed_memory_mb or None
+            cpu_seconds = None
+            if self._dedicated_process:
+                # 独占进程时，进程的峰值内存和CPU时间就是本任务的消耗（含其派生的子进程）
+                import resource
+                usage_self = resource.getrusage(resource.RUSAGE_SELF)
+                usage_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+                peak_memory_mb = max(usage_self.ru_maxrss, usage_children.ru_maxrss) / 1024
+                cpu_seconds = (usage_self.ru_utime + usage_self.ru_stime
+                               + usage_children.ru_utime + usage_children.ru_stime)
+            record_observation(task, duration, task.status, peak_memory_mb=peak_memory_mb, cpu_seconds=cpu_seconds)
+        except Exception as e:
+            self.app.logger.warning(f"记录任务 {self.task_id} 资源消耗失败: {e}")
+
     def _complete_task(self, success, failed_reason=None):
         """更新任务状态（只在任务真正完成或失败时调用）"""
         max_retries = 3
@@ -145,6 +223,7 @@ class TranslateEngine:
                         task.failed_reason = failed_reason
                     
                     db.session.commit()
+                    mark_translate_dirty(self.task_id)
                     self.app.logger.info(f"任务 {self.task_id} 状态已更新为 {task.status}")
                     return  # 成功，退出重试循环
                 else:
@@ -308,6 +387,11 @@ class TranslateEngine:
             'doc2x_api_key':task.doc2x_secret_key,
             'extension': os.path.splitext(task.origin_filepath)[1],  # 动态获取文件扩展名
             'pdf_translate_method': getattr(task, 'pdf_translate_method', None),  # PDF翻译方法
+            'pdf_segment_mode': getattr(task, 'pdf_segment_mode', None),  # 直接PDF翻译分段粒度
+            # 上传时探测的文档元数据（探测失败为None，处理器需自行降级）
+            'page_count': getattr(task, 'page_count', None),
+            'segment_count': getattr(task, 'segment_count', None),
+            'is_scanned': getattr(task, 'is_scanned', None),
             'user_id': task.customer_id,  # 添加用户ID，用于文件隔离
             'customer_id': task.customer_id,  # 添加customer_id，用于token记录
             'tenant_id': tenant_id,  # 添加租户ID，用于API Key获取
@@ -9,7 +9,7 @@ from app.resources.admin.settings import AdminSettingNoticeResource, AdminSettin
 from app.resources.admin.translate import AdminTranslateListResource, \
     AdminTranslateBatchDeleteResource, AdminTranslateRestartResource, AdminTranslateDeteleResource, \
     AdminTranslateStatisticsResource, AdminTranslateDownloadResource, \
-    AdminTranslateDownloadBatchResource
+    AdminTranslateDownloadBatchResource, AdminTranslateMemoryResource
 from app.resources.admin.users import AdminUserListResource, AdminCreateUserResource, \
     AdminUserDetailResource, AdminUpdateUserResource, AdminDeleteUserResource, AdminResetPasswordResource
 from app.resources.admin.tenant import AdminTenantListResource, AdminTenantDetailResource, \
@@ -199,6 +199,7 @@ def register_routes(api):
     api.add_resource(AdminTranslateBatchDeleteResource, '/api/admin/translates/delete/batch')
     api.add_resource(AdminTranslateRestartResource, '/api/admin/translate/<int:id>/restart')
     api.add_resource(AdminTranslateStatisticsResource, '/api/admin/translate/statistics')
+    api.add_resource(AdminTranslateMemoryResource, '/api/admin/translate/memory')  # 运行中任务内存占用排行
     api.add_resource(AdminTranslateDownloadResource, '/api/admin/translate/download/<int:id>')
     api.add_resource(AdminTranslateDownloadBatchResource,'/api/admin/translates/download/batch')
 
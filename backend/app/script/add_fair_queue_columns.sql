@@ -0,0 +1,24 @@
+-- 翻译队列按租户公平调度
+-- tenant.queue_weight: 租户调度权重（默认1，越大分到的执行份额越多）
+-- translate.queued_at: 最近一次入队时间（UTC），用于公平调度和按租户统计排队等待时间
+-- 执行前请备份数据库
+
+ALTER TABLE tenant
+ADD COLUMN queue_weight INT NOT NULL DEFAULT 1 COMMENT '翻译队列调度权重';
+
+ALTER TABLE translate
+ADD COLUMN queued_at DATETIME NULL COMMENT '最近一次入队时间（UTC）';
+
+-- 调度时按入队时间读取排队任务，统计时按租户汇总
+CREATE INDEX idx_translate_status_queued_at ON translate (status, queued_at);
+CREATE INDEX idx_translate_status_tenant ON translate (status, tenant_id);
+
+-- 已在队列中的任务按创建时间补齐
+UPDATE translate SET queued_at = created_at WHERE status = 'queued' AND queued_at IS NULL;
+
+-- 验证修改是否成功
+SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, COLUMN_COMMENT
+FROM INFORMATION_SCHEMA.COLUMNS
+WHERE TABLE_SCHEMA = DATABASE()
+AND ((TABLE_NAME = 'tenant' AND COLUMN_NAME = 'queue_weight')
+  OR (TABLE_NAME = 'translate' AND COLUMN_NAME = 'queued_at'));
@@ -0,0 +1,15 @@
+-- 翻译断点续译日志表
+-- 每翻译完成一段记录一行，任务重新执行时跳过已翻译的段落
+-- 该表由 db.create_all() 自动创建，如需手动创建可参考：
+
+CREATE TABLE IF NOT EXISTS `translate_checkpoint` (
+  `id` bigint NOT NULL AUTO_INCREMENT,
+  `translate_id` int NOT NULL COMMENT '翻译任务ID',
+  `segment_index` int NOT NULL COMMENT '段落序号（-1表示调用方没有序号）',
+  `source_hash` char(32) NOT NULL COMMENT '原文哈希（含目标语言、提示词、术语库）',
+  `target_text` mediumtext NOT NULL COMMENT '译文',
+  `created_at` datetime DEFAULT NULL COMMENT '记录时间（UTC）',
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `unique_translate_segment` (`translate_id`, `segment_index`, `source_hash`),
+  KEY `idx_translate_checkpoint_created` (`created_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='翻译断点续译日志';
@@ -0,0 +1,20 @@
+-- 为translate表添加任务租约字段（多节点调度）
+-- lease_owner: 执行任务的节点:进程号
+-- lease_expires_at: 租约过期时间，执行进程定期续约，过期后由其他节点回收
+-- lease_reclaims: 租约过期被回收的次数，达到上限后任务标记失败（不计入 failed_count）
+-- 执行前请备份数据库
+
+ALTER TABLE translate
+ADD COLUMN lease_owner VARCHAR(128) NULL COMMENT '租约持有者（节点:进程号）',
+ADD COLUMN lease_expires_at DATETIME NULL COMMENT '租约过期时间',
+ADD COLUMN lease_reclaims INT NOT NULL DEFAULT 0 COMMENT '租约过期被回收的次数';
+
+-- 回收过期租约时按状态和过期时间查询
+CREATE INDEX idx_translate_status_lease ON translate (status, lease_expires_at);
+
+-- 验证修改是否成功
+SELECT COLUMN_NAME, COLUMN_TYPE, COLUMN_COMMENT
+FROM INFORMATION_SCHEMA.COLUMNS
+WHERE TABLE_SCHEMA = DATABASE()
+AND TABLE_NAME = 'translate'
+AND COLUMN_NAME IN ('lease_owner', 'lease_expires_at', 'lease_reclaims');
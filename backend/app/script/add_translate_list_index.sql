@@ -0,0 +1,9 @@
+-- 为列表游标分页添加索引
+-- 用户翻译列表按 (customer_id, deleted_flag) 过滤后按 (created_at, id) 倒序翻页
+-- 执行前请备份数据库
+
+ALTER TABLE translate ADD INDEX idx_translate_customer_created (customer_id, deleted_flag, created_at, id);
+
+ALTER TABLE customer ADD INDEX idx_customer_created (created_at, id);
+
+ALTER TABLE comparison ADD INDEX idx_comparison_share_created (share_flag, deleted_flag, created_at, id);
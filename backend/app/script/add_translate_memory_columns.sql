@@ -0,0 +1,17 @@
+-- 翻译任务内存归因
+-- translate.memory_mb: 运行中任务当前占用内存(MB)，执行进程每隔几秒采样写入，任务结束后清空
+-- translate.peak_memory_mb: 任务峰值内存(MB)
+-- translate.memory_phases: 各阶段（extract/translate/fill/save）耗时、内存变化和峰值（JSON）
+-- 执行前请备份数据库
+
+ALTER TABLE translate
+ADD COLUMN memory_mb FLOAT NULL COMMENT '运行中任务当前占用内存(MB)',
+ADD COLUMN peak_memory_mb FLOAT NULL COMMENT '峰值内存(MB)',
+ADD COLUMN memory_phases TEXT NULL COMMENT '各阶段内存明细(JSON)';
+
+-- 验证修改是否成功
+SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, COLUMN_COMMENT
+FROM INFORMATION_SCHEMA.COLUMNS
+WHERE TABLE_SCHEMA = DATABASE()
+AND TABLE_NAME = 'translate'
+AND COLUMN_NAME IN ('memory_mb', 'peak_memory_mb', 'memory_phases');
@@ -0,0 +1,19 @@
+-- 为translate表添加上传时探测的文档元数据字段
+-- 调度器和PDF处理器读取这些字段，不再重复打开文件获取页数
+-- 执行前请备份数据库
+
+ALTER TABLE translate
+ADD COLUMN page_count INT NULL COMMENT 'PDF页数',
+ADD COLUMN slide_count INT NULL COMMENT 'PPT幻灯片数',
+ADD COLUMN sheet_count INT NULL COMMENT 'Excel工作表数',
+ADD COLUMN paragraph_count INT NULL COMMENT '段落数',
+ADD COLUMN segment_count INT NULL COMMENT '预估待翻译段数',
+ADD COLUMN estimated_tokens BIGINT NULL COMMENT '预估token数',
+ADD COLUMN is_scanned TINYINT(1) NULL COMMENT '是否扫描版PDF';
+
+-- 验证修改是否成功
+SELECT COLUMN_NAME, COLUMN_TYPE, COLUMN_COMMENT
+FROM INFORMATION_SCHEMA.COLUMNS
+WHERE TABLE_SCHEMA = DATABASE()
+AND TABLE_NAME = 'translate'
+AND COLUMN_NAME IN ('page_count', 'slide_count', 'sheet_count', 'paragraph_count', 'segment_count', 'estimated_tokens', 'is_scanned');
@@ -0,0 +1,13 @@
+-- 为translate表添加直接PDF翻译的分段粒度字段
+-- span: 逐个span翻译（原有行为）；line: 按行合并后翻译；block: 按文本块合并后翻译，回填时在文本块矩形内重排
+-- 执行前请备份数据库
+
+ALTER TABLE translate
+ADD COLUMN pdf_segment_mode VARCHAR(16) NULL DEFAULT 'span' COMMENT '直接PDF翻译分段粒度：span/line/block';
+
+-- 验证修改是否成功
+SELECT COLUMN_NAME, COLUMN_TYPE, COLUMN_DEFAULT, COLUMN_COMMENT
+FROM INFORMATION_SCHEMA.COLUMNS
+WHERE TABLE_SCHEMA = DATABASE()
+AND TABLE_NAME = 'translate'
+AND COLUMN_NAME = 'pdf_segment_mode';
@@ -0,0 +1,38 @@
+-- 为看板统计汇总和回填添加索引
+-- 汇总线程按小时扫描 translate.created_at，回填按主键分批扫描
+-- 执行前请备份数据库
+
+ALTER TABLE translate ADD INDEX idx_translate_deleted_created (deleted_flag, created_at);
+
+-- 汇总表由 db.create_all() 自动创建，如需手动创建可参考：
+CREATE TABLE IF NOT EXISTS `translate_statistics` (
+  `id` bigint NOT NULL AUTO_INCREMENT,
+  `tenant_id` int NOT NULL DEFAULT '0' COMMENT '租户ID（0表示未分配租户的用户）',
+  `bucket_start` datetime NOT NULL COMMENT '统计小时的起始时间',
+  `stat_date` date NOT NULL COMMENT '统计日期',
+  `total_count` int NOT NULL DEFAULT '0' COMMENT '任务总数',
+  `none_count` int NOT NULL DEFAULT '0' COMMENT '未开始任务数',
+  `queued_count` int NOT NULL DEFAULT '0' COMMENT '排队中任务数',
+  `changing_count` int NOT NULL DEFAULT '0' COMMENT '转换中任务数',
+  `process_count` int NOT NULL DEFAULT '0' COMMENT '翻译中任务数',
+  `done_count` int NOT NULL DEFAULT '0' COMMENT '已完成任务数',
+  `failed_count` int NOT NULL DEFAULT '0' COMMENT '失败任务数',
+  `input_tokens` bigint NOT NULL DEFAULT '0' COMMENT '输入token总数',
+  `output_tokens` bigint NOT NULL DEFAULT '0' COMMENT '输出token总数',
+  `total_tokens` bigint NOT NULL DEFAULT '0' COMMENT '总token数',
+  `origin_filesize` bigint NOT NULL DEFAULT '0' COMMENT '原始文件大小总和（字节）',
+  `updated_at` datetime DEFAULT NULL COMMENT '最近一次汇总时间',
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `unique_tenant_bucket` (`tenant_id`, `bucket_start`),
+  KEY `idx_translate_statistics_bucket` (`bucket_start`),
+  KEY `idx_translate_statistics_date` (`stat_date`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS `tenant_statistics` (
+  `tenant_id` int NOT NULL COMMENT '租户ID（0表示未分配租户的用户）',
+  `customer_count` int NOT NULL DEFAULT '0' COMMENT '未删除用户数',
+  `used_storage` bigint NOT NULL DEFAULT '0' COMMENT '已使用存储空间（字节）',
+  `total_storage` bigint NOT NULL DEFAULT '0' COMMENT '总存储空间（字节）',
+  `updated_at` datetime DEFAULT NULL COMMENT '最近一次汇总时间',
+  PRIMARY KEY (`tenant_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -0,0 +1,31 @@
+"""
+看板统计回填脚本
+一次性扫描 translate / customer 表，重建 translate_statistics 和 tenant_statistics 汇总表。
+首次部署或汇总数据异常时执行：
+
+    cd backend && python -m app.script.backfill_statistics
+"""
+import logging
+
+from app import create_app
+from app.utils.statistics_rollup import backfill_statistics
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    app = create_app()
+    with app.app_context():
+        rows = backfill_statistics()
+        if rows is None:
+            logger.warning("其他进程仍在回填统计数据，请稍后重试")
+            return
+        logger.info(f"统计回填完成，共 {rows} 行汇总数据")
+
+
+if __name__ == '__main__':
+    main()
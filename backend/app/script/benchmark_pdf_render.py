@@ -0,0 +1,105 @@
+"""
+PDF渲染（utils/pdf_to_image）基准测试
+对比原来的单线程逐页渲染与当前按页段分给PDF计算进程池并行渲染（render_pages）的实现，
+以及灰度渲染、DPI上限的效果：
+
+    cd backend && python -m app.script.benchmark_pdf_render                  # 生成60页扫描件测试PDF
+    cd backend && python -m app.script.benchmark_pdf_render --pages 300      # 指定生成的页数
+    cd backend && python -m app.script.benchmark_pdf_render --pdf a.pdf      # 使用已有PDF
+
+并行效果取决于 PDF_COMPUTE_WORKERS（默认 min(CPU核数, 4)），单核环境下进程池不会启用。
+"""
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+import fitz
+
+from app.translate.pdf_compute import get_service
+from app.utils.pdf_to_image import render_pages
+
+logging.basicConfig(level=logging.WARNING)
+
+
+def legacy_pdf_to_png(pdf_path, output_dir, dpi):
+    """原实现：单线程逐页渲染并写文件"""
+    doc = fitz.open(pdf_path)
+    try:
+        mat = fitz.Matrix(dpi / 72.0, dpi / 72.0)
+        for page_num in range(doc.page_count):
+            pix = doc[page_num].get_pixmap(matrix=mat)
+            pix.save(os.path.join(output_dir, f"page_{page_num + 1:04d}.png"))
+    finally:
+        doc.close()
+
+
+def make_scanned_pdf(path, pages):
+    """生成扫描件测试PDF：每页一张带噪点的整页图片加少量文字"""
+    doc = fitz.open()
+    samples = bytearray(os.urandom(850 * 1100 * 3))
+    for i in range(0, len(samples), 3):
+        samples[i] = samples[i + 1] = samples[i + 2] = 200 + samples[i] % 56  # 浅灰色噪点背景
+    pixmap = fitz.Pixmap(fitz.csRGB, 850, 1100, bytes(samples), False)
+    for page_num in range(pages):
+        page = doc.new_page()
+        page.insert_image(page.rect, pixmap=pixmap)
+        for row in range(30):
+            page.insert_text((60, 80 + row * 22), f"Scanned page {page_num + 1}, line {row + 1}", fontsize=11)
+    doc.save(path, deflate=True)
+    doc.close()
+
+
+def measure(label, fn, repeat):
+    best = None
+    for _ in range(repeat):
+        output_dir = tempfile.mkdtemp(prefix="render_bench_")
+        try:
+            started = time.perf_counter()
+            fn(output_dir)
+            elapsed = time.perf_counter() - started
+            size_mb = sum(os.path.getsize(os.path.join(output_dir, name)) for name in os.listdir(output_dir)) / 1024 / 1024
+        finally:
+            shutil.rmtree(output_dir, ignore_errors=True)
+        if best is None or elapsed < best[0]:
+            best = (elapsed, size_mb)
+    print(f"{label:<28}{best[0]:>10.2f}{best[1]:>12.1f}")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PDF渲染前后实现的耗时对比')
+    parser.add_argument('--pages', type=int, default=60, help='生成的测试PDF页数')
+    parser.add_argument('--pdf', default=None, help='使用已有的PDF文件')
+    parser.add_argument('--dpi', type=int, default=200, help='渲染DPI')
+    parser.add_argument('--repeat', type=int, default=1, help='每种实现执行次数（取最快一次）')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="render_bench_src_")
+    try:
+        pdf_path = args.pdf
+        if not pdf_path:
+            pdf_path = os.path.join(work_dir, f"scan_{args.pages}.pdf")
+            make_scanned_pdf(pdf_path, args.pages)
+        with fitz.open(pdf_path) as doc:
+            pages = doc.page_count
+        print(f"{os.path.basename(pdf_path)}: {pages} 页, {args.dpi} DPI, PDF计算进程数 {get_service().max_workers}")
+        print(f"{'实现':<28}{'耗时(s)':>10}{'输出(MB)':>12}")
+
+        def run(**kwargs):
+            return lambda output_dir: list(render_pages(pdf_path, output_dir, args.dpi, **kwargs))
+
+        before = measure('before: 逐页渲染', lambda output_dir: legacy_pdf_to_png(pdf_path, output_dir, args.dpi), args.repeat)
+        after = measure('after: 按页段并行', run(), args.repeat)
+        measure('after: 并行 + 灰度', run(grayscale=True), args.repeat)
+        measure('after: 并行 + 灰度 + 150 DPI上限', run(grayscale=True, max_dpi=150), args.repeat)
+        print(f"并行加速: {before[0] / after[0]:.1f}x")
+    finally:
+        get_service().shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
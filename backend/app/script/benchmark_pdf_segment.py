@@ -0,0 +1,125 @@
+"""
+直接PDF翻译分段粒度（pdf_segment_mode）基准测试
+对比 span / line / block 三种粒度的翻译请求数和耗时。翻译接口用固定延迟模拟
+（每次请求 --latency 秒 + 每字符 --per-char 秒，并发数与 run_translation 相同），
+其余步骤（拆分、分组、回填）使用真实实现：
+
+    cd backend && python -m app.script.benchmark_pdf_segment                 # 生成10页测试PDF
+    cd backend && python -m app.script.benchmark_pdf_segment --pages 30      # 指定生成的页数
+    cd backend && python -m app.script.benchmark_pdf_segment --pdf a.pdf     # 使用已有PDF
+"""
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import fitz
+
+from app.translate import pdf
+from app.translate.pdf import DirectPDFTranslator, SEGMENT_MODES
+
+logging.basicConfig(level=logging.WARNING)
+
+def make_pdf(path, pages):
+    """生成测试PDF：每段多行，句中有加粗词（同一行被拆成多个span），外加页眉页脚和表格"""
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page()
+        page.insert_text((50, 40), "Product Manual - Confidential", fontsize=9)
+        y = 90
+        for para in range(6):
+            writer = fitz.TextWriter(page.rect)
+            for line in range(4):
+                x = 50
+                for text, font in (("The ", fitz.Font("helv")), ("DMA", fitz.Font("hebo")),
+                                   (f" controller supports up to {para + line} channels and the ", fitz.Font("helv")),
+                                   ("firmware", fitz.Font("hebo")), (" must be updated.", fitz.Font("helv"))):
+                    writer.append((x, y), text, font=font, fontsize=10)
+                    x += font.text_length(text, fontsize=10)
+                y += 13
+            writer.write_text(page)
+            y += 14
+        for row in range(8):
+            for col in range(3):
+                page.insert_text((50 + col * 160, y + row * 16), f"Reg {row}.{col}", fontsize=9)
+        page.insert_text((280, 810), f"Page {page_num + 1}", fontsize=9)
+    doc.save(path)
+    doc.close()
+
+
+class SimulatedTranslation:
+    """替代 run_translation：按固定延迟模拟翻译接口，记录请求数"""
+
+    def __init__(self, latency, per_char):
+        self.latency = latency
+        self.per_char = per_char
+        self.requests = 0
+        self.chars = 0
+
+    def _translate(self, item):
+        time.sleep(self.latency + len(item['text']) * self.per_char)
+        item['text'] = "译" * max(1, len(item['text']) // 2)
+        item['complete'] = True
+
+    def __call__(self, trans, texts, max_threads=40):
+        self.requests += len(texts)
+        self.chars += sum(len(item['text']) for item in texts)
+        with ThreadPoolExecutor(max_workers=max_threads) as executor:
+            list(executor.map(self._translate, texts))
+
+
+def run_mode(input_pdf_path, mode, latency, per_char):
+    output_dir = tempfile.mkdtemp(prefix="segment_bench_")
+    simulated = SimulatedTranslation(latency, per_char)
+    original = pdf.run_translation
+    pdf.run_translation = simulated
+    translator = DirectPDFTranslator(input_pdf_path)
+    try:
+        extracted_file, no_text_file = translator.step1_split_pdf(output_dir)
+        started = time.perf_counter()
+        translated_file = translator.step2_translate_texts(extracted_file, {'id': None, 'pdf_segment_mode': mode}, output_dir)
+        translate_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        translator.step3_fill_translated_texts(translated_file, no_text_file, os.path.join(output_dir, "out.pdf"))
+        fill_seconds = time.perf_counter() - started
+    finally:
+        pdf.run_translation = original
+        translator.doc.close()
+        shutil.rmtree(output_dir, ignore_errors=True)
+    return simulated.requests, simulated.chars, translate_seconds, fill_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description='直接PDF翻译不同分段粒度的请求数和耗时对比')
+    parser.add_argument('--pages', nargs='*', type=int, default=[10], help='生成的测试PDF页数')
+    parser.add_argument('--pdf', nargs='*', default=[], help='使用已有的PDF文件')
+    parser.add_argument('--latency', type=float, default=0.5, help='模拟的每次请求延迟（秒）')
+    parser.add_argument('--per-char', type=float, default=0.002, help='模拟的每字符生成耗时（秒）')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="segment_bench_src_")
+    try:
+        inputs = list(args.pdf)
+        for pages in args.pages:
+            path = os.path.join(work_dir, f"bench_{pages}.pdf")
+            make_pdf(path, pages)
+            inputs.append(path)
+
+        rows = []
+        for path in inputs:
+            name = os.path.basename(path)
+            for mode in SEGMENT_MODES:
+                rows.append((name, mode) + run_mode(path, mode, args.latency, args.per_char))
+
+        print(f"\n{'文件':<20}{'粒度':>8}{'请求数':>8}{'字符数':>10}{'翻译(s)':>10}{'回填(s)':>10}")
+        for name, mode, requests, chars, translate_seconds, fill_seconds in rows:
+            print(f"{name:<20}{mode:>8}{requests:>8}{chars:>10}{translate_seconds:>10.2f}{fill_seconds:>10.2f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
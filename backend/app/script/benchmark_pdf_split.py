@@ -0,0 +1,166 @@
+"""
+PDF拆分（DirectPDFTranslator.step1_split_pdf）基准测试
+对比原来的两次解析 + show_pdf_page 复制 + 缩进JSON 的实现与当前单次解析、原地删除、按页段并行、
+二进制文本层文件的实现，并逐页渲染比较两种实现生成的无文本PDF是否一致：
+
+    cd backend && python -m app.script.benchmark_pdf_split                  # 生成25页和300页的测试PDF
+    cd backend && python -m app.script.benchmark_pdf_split --pages 25 100   # 指定生成的页数
+    cd backend && python -m app.script.benchmark_pdf_split --pdf a.pdf      # 使用已有PDF
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+import fitz
+
+from app.translate.pdf import DirectPDFTranslator
+
+logging.basicConfig(level=logging.WARNING)
+
+
+def legacy_split_pdf(input_pdf_path, output_dir):
+    """原实现：提取一次文本，复制页面后再解析一次文本找删除区域"""
+    doc = fitz.open(input_pdf_path)
+    extracted_texts = []
+    for page_num in range(doc.page_count):
+        page = doc[page_num]
+        page_texts = []
+        for block in page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)["blocks"]:
+            if "lines" in block:
+                for line in block["lines"]:
+                    for span in line["spans"]:
+                        text = span["text"].strip()
+                        if text:
+                            page_texts.append({"text": text, "bbox": span["bbox"], "size": span["size"],
+                                               "color": span["color"], "font": span["font"]})
+        extracted_texts.append({"page_number": page_num, "texts": page_texts})
+    with open(os.path.join(output_dir, "extracted_texts.json"), 'w', encoding='utf-8') as f:
+        json.dump(extracted_texts, f, ensure_ascii=False, indent=2)
+
+    no_text_doc = fitz.open()
+    for page_num in range(doc.page_count):
+        page = doc[page_num]
+        new_page = no_text_doc.new_page(width=page.rect.width, height=page.rect.height)
+        new_page.show_pdf_page(page.rect, doc, page_num)
+        for block in page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)["blocks"]:
+            if "lines" in block:
+                for line in block["lines"]:
+                    for span in line["spans"]:
+                        if span["text"].strip():
+                            new_page.add_redact_annot(span["bbox"], fill=None)
+        new_page.apply_redactions()
+    no_text_doc.save(os.path.join(output_dir, "no_text.pdf"))
+    no_text_doc.close()
+    doc.close()
+    return os.path.join(output_dir, "extracted_texts.json"), os.path.join(output_dir, "no_text.pdf")
+
+
+def current_split_pdf(input_pdf_path, output_dir):
+    translator = DirectPDFTranslator(input_pdf_path)
+    try:
+        return translator.step1_split_pdf(output_dir)
+    finally:
+        translator.doc.close()
+
+
+def make_pdf(path, pages):
+    """生成测试PDF：页眉页脚、正文段落、表格线和一张图片（图片上有文字）"""
+    doc = fitz.open()
+    pixmap = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 64, 64), False)
+    pixmap.set_rect(pixmap.irect, (200, 220, 240))
+    for page_num in range(pages):
+        page = doc.new_page()
+        page.insert_text((50, 40), "Product Manual - Confidential", fontsize=9)
+        page.insert_image(fitz.Rect(450, 20, 530, 100), pixmap=pixmap)
+        page.insert_text((460, 64), "LOGO", fontsize=14)
+        for row in range(36):
+            y = 120 + row * 18
+            page.insert_text((50, y), f"Section {page_num}.{row}: the quick brown fox jumps over the lazy dog", fontsize=10)
+            page.draw_line((50, y + 4), (545, y + 4), color=(0.8, 0.8, 0.8))
+        page.insert_text((280, 810), f"Page {page_num + 1}", fontsize=9)
+    doc.save(path)
+    doc.close()
+
+
+def measure(fn, input_pdf_path, repeat):
+    best = None
+    for _ in range(repeat):
+        output_dir = tempfile.mkdtemp(prefix="split_bench_")
+        try:
+            started = time.perf_counter()
+            texts_file, no_text_file = fn(input_pdf_path, output_dir)
+            elapsed = time.perf_counter() - started
+            texts_kb = os.path.getsize(texts_file) / 1024
+            pdf_kb = os.path.getsize(no_text_file) / 1024
+        finally:
+            shutil.rmtree(output_dir, ignore_errors=True)
+        if best is None or elapsed < best[0]:
+            best = (elapsed, texts_kb, pdf_kb)
+    return best
+
+
+def compare_outputs(input_pdf_path, dpi=72):
+    """
+    两种实现生成的无文本PDF逐页渲染比较
+
+    Returns:
+        tuple: (有差异的页数, 单页最大差异像素比例)
+    """
+    dirs = [tempfile.mkdtemp(prefix="split_cmp_") for _ in range(2)]
+    try:
+        files = [fn(input_pdf_path, output_dir)[1] for fn, output_dir in zip((legacy_split_pdf, current_split_pdf), dirs)]
+        diff_pages, max_ratio = 0, 0.0
+        with fitz.open(files[0]) as before, fitz.open(files[1]) as after:
+            for page_before, page_after in zip(before, after):
+                a = page_before.get_pixmap(dpi=dpi).samples
+                b = page_after.get_pixmap(dpi=dpi).samples
+                diff = sum(1 for i in range(0, len(a), 3) if a[i:i + 3] != b[i:i + 3])
+                if diff:
+                    diff_pages += 1
+                    max_ratio = max(max_ratio, diff / (len(a) // 3))
+            if before.page_count != after.page_count:
+                diff_pages += abs(before.page_count - after.page_count)
+        return diff_pages, max_ratio
+    finally:
+        for output_dir in dirs:
+            shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PDF拆分前后实现的耗时对比')
+    parser.add_argument('--pages', nargs='*', type=int, default=[25, 300], help='生成的测试PDF页数')
+    parser.add_argument('--pdf', nargs='*', default=[], help='使用已有的PDF文件')
+    parser.add_argument('--repeat', type=int, default=3, help='每种实现执行次数（取最快一次）')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="split_bench_src_")
+    try:
+        inputs = list(args.pdf)
+        for pages in args.pages:
+            path = os.path.join(work_dir, f"bench_{pages}.pdf")
+            make_pdf(path, pages)
+            inputs.append(path)
+
+        print(f"{'文件':<20}{'页数':>6}{'实现':>8}{'耗时(s)':>10}{'文本(KB)':>10}{'PDF(KB)':>10}")
+        for path in inputs:
+            with fitz.open(path) as doc:
+                pages = doc.page_count
+            name = os.path.basename(path)
+            results = {}
+            for label, fn in (('before', legacy_split_pdf), ('after', current_split_pdf)):
+                results[label] = measure(fn, path, args.repeat)
+                elapsed, texts_kb, pdf_kb = results[label]
+                print(f"{name:<20}{pages:>6}{label:>8}{elapsed:>10.2f}{texts_kb:>10.0f}{pdf_kb:>10.0f}")
+            print(f"{'':<20}{'':>6}{'加速':>8}{results['before'][0] / results['after'][0]:>10.1f}x")
+            diff_pages, max_ratio = compare_outputs(path)
+            print(f"{'':<20}{'':>6}{'渲染差异':>8}  {diff_pages} 页（单页最大 {max_ratio:.4%} 像素）")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
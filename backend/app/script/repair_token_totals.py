@@ -0,0 +1,39 @@
+"""
+Token总数修复脚本
+根据 token_usage 明细全量重新汇总 translate 表上的 input_tokens/output_tokens/total_tokens。
+正常运行时这些字段由 record_token_usage 增量维护，只在数据不一致时执行：
+
+    cd backend && python -m app.script.repair_token_totals            # 修复全部任务
+    cd backend && python -m app.script.repair_token_totals 101 102    # 只修复指定任务
+"""
+import argparse
+import logging
+
+from app.utils.token_recorder import reaggregate_tokens_for_translate, reaggregate_all_tokens
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='根据token_usage明细重新汇总翻译任务的token总数')
+    parser.add_argument('translate_ids', nargs='*', type=int, help='要修复的任务ID，不提供则修复全部任务')
+    args = parser.parse_args()
+
+    if args.translate_ids:
+        for translate_id in args.translate_ids:
+            reaggregate_tokens_for_translate(translate_id)
+        logger.info(f"已修复 {len(args.translate_ids)} 个任务的token总数")
+        return
+
+    if reaggregate_all_tokens():
+        logger.info("已修复全部任务的token总数")
+    else:
+        logger.error("修复全部任务的token总数失败")
+
+
+if __name__ == '__main__':
+    main()
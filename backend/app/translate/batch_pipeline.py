@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+大PDF批次流水线
+原来每个批次依次执行 提取 -> 翻译 -> 生成底稿 -> 回填，下一批次要等上一批次全部完成：
+渲染时翻译接口空闲，等待接口时CPU空闲，每个批次结尾并发还会降到只剩最慢的几个段落。
+这里把各步骤拆成阶段，阶段之间用有界队列连接，多个批次同时处于不同阶段：
+- 每个阶段有若干工作线程，队列满时上游阻塞（背压），同时在途的批次数有上限
+- 新批次进入流水线前检查任务内存（task_memory 归因值），超过上限时等在途批次完成后再放行
+- 结果按批次号排序返回，输出顺序与串行执行一致
+- 取消事件设置后不再放入新批次，各阶段丢弃未开始的批次并尽快退出
+- 统计每个阶段的忙碌时间，计算利用率（忙碌时间 / (总耗时 × 线程数)）
+"""
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()  # 阶段结束标记
+PUT_TIMEOUT = 1.0  # 队列满时检查取消的间隔（秒）
+
+
+class PipelineStage:
+    """
+    流水线阶段
+
+    fn(item) 返回处理后的 item，继续进入下一阶段；
+    返回 None 表示该批次无需继续处理（如没有文本），直接结束；
+    抛出异常表示该批次失败，交给 on_error 生成结果后结束。
+    """
+
+    def __init__(self, name, fn, workers=1):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.busy_seconds = 0.0
+        self.processed = 0
+        self.failed = 0
+
+    def utilization(self, elapsed):
+        if elapsed <= 0:
+            return 0.0
+        return min(1.0, self.busy_seconds / (elapsed * self.workers))
+
+
+class BatchPipeline:
+    """有界队列连接的多阶段批次流水线"""
+
+    def __init__(self, stages, queue_size=1, max_in_flight=None, cancel_event=None,
+                 memory_fn=None, memory_limit_mb=None, on_result=None, on_error=None, name='pipeline'):
+        """
+        Args:
+            stages: PipelineStage 列表（按执行顺序）
+            queue_size: 阶段之间的队列长度
+            max_in_flight: 同时在途的批次数上限，默认为各阶段线程数之和
+            cancel_event: 取消事件
+            memory_fn: 返回当前内存占用（MB）的函数，用于内存背压
+            memory_limit_mb: 内存上限（MB），超过时只在没有在途批次时才放入新批次
+            on_result: 批次完成回调 on_result(item)（在阶段线程中执行）
+            on_error: 批次失败时生成结果 on_error(item, stage_name, exc)，返回值作为该批次结果
+            name: 日志和线程名前缀
+        """
+        self.stages = stages
+        self.queue_size = max(1, queue_size)
+        self.max_in_flight = max_in_flight or sum(stage.workers for stage in stages)
+        self.cancel_event = cancel_event
+        self.memory_fn = memory_fn
+        self.memory_limit_mb = memory_limit_mb
+        self.on_result = on_result
+        self.on_error = on_error
+        self.name = name
+        self.started_at = None
+        self.finished_at = None
+        self.memory_waits = 0
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._results = {}
+        self._queues = []
+        self._alive = []
+
+    @property
+    def cancelled(self):
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+    @property
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def _put(self, q, item):
+        """放入队列，队列满时阻塞（取消时放弃）"""
+        while True:
+            try:
+                q.put(item, timeout=PUT_TIMEOUT)
+                return True
+            except queue.Full:
+                if self.cancelled:
+                    return False
+
+    def _over_memory(self):
+        if self.memory_fn is None or not self.memory_limit_mb:
+            return False
+        try:
+            return self.memory_fn() > self.memory_limit_mb
+        except Exception as e:
+            logger.debug(f"[{self.name}] 读取内存占用失败: {e}")
+            return False
+
+    def _admit(self):
+        """等待放入新批次的许可：在途批次未满，且内存未超限（没有在途批次时总是放行）"""
+        with self._condition:
+            while not self.cancelled:
+                if self._in_flight == 0:
+                    break
+                if self._in_flight < self.max_in_flight:
+                    if not self._over_memory():
+                        break
+                    self.memory_waits += 1
+                    logger.info(f"[{self.name}] 内存超过 {self.memory_limit_mb}MB，等待在途批次完成")
+                # 批次完成时会唤醒；超时用于检查取消和内存变化
+                self._condition.wait(PUT_TIMEOUT)
+            if self.cancelled:
+                return False
+            self._in_flight += 1
+            return True
+
+    def _finish_item(self, key, result):
+        with self._condition:
+            self._in_flight -= 1
+            if result is not None:
+                self._results[key] = result
+            self._condition.notify_all()
+        if result is not None and self.on_result:
+            try:
+                self.on_result(result)
+            except Exception as e:
+                logger.warning(f"[{self.name}] 批次结果回调失败: {e}")
+
+    def _worker(self, index):
+        stage = self.stages[index]
+        in_q = self._queues[index]
+        out_q = self._queues[index + 1] if index + 1 < len(self.stages) else None
+        while True:
+            entry = in_q.get()
+            if entry is _STOP:
+                break
+            key, item = entry
+            if self.cancelled:
+                self._finish_item(key, None)
+                continue
+            started = time.time()
+            try:
+                item = stage.fn(item)
+                error = None
+            except Exception as e:
+                error = e
+            with self._condition:
+                stage.busy_seconds += time.time() - started
+                stage.processed += 1
+                if error is not None:
+                    stage.failed += 1
+            if error is not None:
+                logger.error(f"[{self.name}] 批次 {key} 在 {stage.name} 阶段失败: {error}")
+                result = self.on_error(item, stage.name, error) if self.on_error else None
+                self._finish_item(key, result)
+            elif item is None:
+                self._finish_item(key, None)
+            elif out_q is None:
+                self._finish_item(key, item)
+            elif not self._put(out_q, (key, item)):
+                self._finish_item(key, None)
+        # 本阶段最后一个线程退出时通知下一阶段结束
+        with self._condition:
+            self._alive[index] -= 1
+            last = self._alive[index] == 0
+        if last and out_q is not None:
+            for _ in range(self.stages[index + 1].workers):
+                out_q.put(_STOP)
+
+    def run(self, items):
+        """
+        执行流水线
+
+        Args:
+            items: (key, item) 列表，key 用于排序结果
+
+        Returns:
+            list: 按 key 排序的批次结果（跳过的批次不在其中），被取消时为已完成的部分
+        """
+        self.started_at = time.time()
+        self._queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        self._alive = [stage.workers for stage in self.stages]
+        threads = []
+        for index, stage in enumerate(self.stages):
+            for n in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._worker, args=(index,),
+                    name=f"{self.name}-{stage.name}-{n}", daemon=True
+                )
+                thread.start()
+                threads.append(thread)
+        try:
+            for key, item in items:
+                if not self._admit():
+                    break
+                if not self._put(self._queues[0], (key, item)):
+                    self._finish_item(key, None)
+                    break
+        finally:
+            for _ in range(self.stages[0].workers):
+                self._queues[0].put(_STOP)
+            for thread in threads:
+                thread.join()
+            self.finished_at = time.time()
+        return [self._results[key] for key in sorted(self._results)]
+
+    def get_stats(self):
+        """各阶段的处理数量和利用率"""
+        elapsed = self.elapsed
+        return {
+            'elapsed': round(elapsed, 2),
+            'memory_waits': self.memory_waits,
+            'stages': [{
+                'name': stage.name,
+                'workers': stage.workers,
+                'processed': stage.processed,
+                'failed': stage.failed,
+                'busy_seconds': round(stage.busy_seconds, 2),
+                'utilization': round(stage.utilization(elapsed), 3),
+            } for stage in self.stages],
+        }
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+页面文本框空间索引
+回填译文时每个文本框都要和同页其他文本框做重叠检测、查找下方最近的文本框，
+原来对每个span遍历同页全部文本框（O(n²)），密集的数据手册页面有上千个span。
+这里按页面建一次索引：
+- 重叠检测：文本框按网格分桶，只对与查询矩形所在网格相交的候选框做精确判断
+- 下方最近文本框：按上边界排序，二分查找
+索引只用于缩小候选范围，判断条件与原来的逐个比较完全一致，结果不变。
+"""
+import bisect
+
+import fitz
+
+CELL_SIZE = 32.0  # 网格大小（pt）
+MAX_CELLS = 1024  # 单个文本框/查询覆盖的网格数上限，超过时不分桶（异常大的框）
+
+
+class BBoxIndex:
+    """一页文本框的空间索引，bboxes 为 [[x0, y0, x1, y1], ...]"""
+
+    def __init__(self, bboxes, cell_size=CELL_SIZE):
+        self.bboxes = bboxes
+        self.cell_size = cell_size
+        self._cells = {}
+        self._large = []  # 覆盖网格过多的文本框，每次查询都作为候选
+        for i, bbox in enumerate(bboxes):
+            cells = self._cells_of(bbox[0], bbox[1], bbox[2], bbox[3])
+            if cells is None:
+                self._large.append(i)
+                continue
+            for cell in cells:
+                self._cells.setdefault(cell, []).append(i)
+        self._tops = sorted((bbox[1], i) for i, bbox in enumerate(bboxes))
+        self._top_values = [top for top, _ in self._tops]
+
+    def __len__(self):
+        return len(self.bboxes)
+
+    def _cells_of(self, x0, y0, x1, y1):
+        """矩形覆盖的网格，覆盖过多时返回 None"""
+        size = self.cell_size
+        cx0, cx1 = int(min(x0, x1) // size), int(max(x0, x1) // size)
+        cy0, cy1 = int(min(y0, y1) // size), int(max(y0, y1) // size)
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > MAX_CELLS:
+            return None
+        return [(cx, cy) for cx in range(cx0, cx1 + 1) for cy in range(cy0, cy1 + 1)]
+
+    def candidates(self, x0, y0, x1, y1):
+        """可能与矩形相交的文本框序号"""
+        cells = self._cells_of(x0, y0, x1, y1)
+        if cells is None:
+            return range(len(self.bboxes))
+        found = set(self._large)
+        for cell in cells:
+            found.update(self._cells.get(cell, ()))
+        return found
+
+    def excluding(self, index):
+        """除第 index 个文本框外的其他文本框（index 为 None 或越界时为全部）"""
+        return OtherBBoxes(self, index)
+
+
+class OtherBBoxes:
+    """同一页其他文本框（索引视图），替代原来的 other_bboxes 列表"""
+
+    def __init__(self, index, exclude=None):
+        self._index = index
+        self._exclude = exclude if exclude is not None and 0 <= exclude < len(index) else None
+
+    def __len__(self):
+        return len(self._index) - (0 if self._exclude is None else 1)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __iter__(self):
+        for i, bbox in enumerate(self._index.bboxes):
+            if i != self._exclude:
+                yield bbox
+
+    def overlaps(self, textbox, min_gap=2.0):
+        """是否与其他文本框重叠（交集宽高都超过 min_gap）"""
+        for i in self._index.candidates(textbox.x0, textbox.y0, textbox.x1, textbox.y1):
+            if i == self._exclude:
+                continue
+            other_bbox = self._index.bboxes[i]
+            other_rect = fitz.Rect(other_bbox[0], other_bbox[1], other_bbox[2], other_bbox[3])
+            # 检查是否有重叠（包括最小间距）
+            if textbox.intersects(other_rect):
+                intersection = textbox & other_rect
+                if intersection.width > min_gap and intersection.height > min_gap:
+                    return True
+        return False
+
+    def nearest_top_below(self, y):
+        """上边界严格大于 y 的文本框中最小的上边界，没有时为 None"""
+        index = self._index
+        pos = bisect.bisect_right(index._top_values, y)
+        while pos < len(index._tops):
+            top, i = index._tops[pos]
+            if i != self._exclude:
+                return top
+            pos += 1
+        return None
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+翻译断点续译日志
+每翻译完成一段，把译文记录到 translate_checkpoint 表（按 任务ID + 段落序号 + 原文哈希 唯一）。
+任务因进程重启、容器重新部署、租约回收或管理员重启而重新执行时，
+已有译文的段落直接使用日志中的结果，不再调用翻译接口。
+
+- 记录先缓存在进程内，累计 FLUSH_SEGMENTS 段或超过 FLUSH_SECONDS 秒后批量写入
+- 原文哈希包含目标语言、提示词和术语库，修改翻译设置后旧译文不会被复用
+- 段落序号不稳定时（如并行提取、大PDF分批）按原文哈希匹配
+- 任务完成后清理日志（clear_checkpoint），失败的任务保留日志以便续译；
+  已删除任务和超过 RETENTION_DAYS 天的日志由调度进程定期清理（purge_stale_checkpoints）
+
+与 task_state 相同，同一进程内同一任务共享一个 TaskCheckpoint，任务结束时调用 release_checkpoint。
+"""
+import atexit
+import hashlib
+import logging
+import threading
+import time
+
+from . import db
+
+logger = logging.getLogger(__name__)
+
+FLUSH_SEGMENTS = 50  # 累计多少段后写入
+FLUSH_SECONDS = 5  # 距离上次写入超过多少秒后写入
+NO_INDEX = -1  # 调用方没有段落序号时使用的序号
+RETENTION_DAYS = 30  # 未完成任务的日志保留天数
+
+
+def source_hash(trans, source):
+    """原文哈希（包含影响译文的翻译设置）"""
+    key = '\x1f'.join(str(part) for part in (
+        trans.get('lang'), trans.get('prompt_id'), trans.get('comparison_id'), source
+    ))
+    return hashlib.md5(key.encode('utf-8')).hexdigest()
+
+
+class TaskCheckpoint:
+    """单个任务的断点续译日志"""
+
+    def __init__(self, translate_id):
+        self.translate_id = translate_id
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._by_key = {}  # (段落序号, 原文哈希) -> 译文
+        self._by_hash = {}  # 原文哈希 -> 译文
+        self._pending = []
+        self._last_flush = time.time()
+        self.hits = 0
+
+    def _load(self):
+        rows = db.get_all(
+            "select segment_index, source_hash, target_text from translate_checkpoint where translate_id=%s",
+            self.translate_id
+        )
+        for row in rows:
+            self._by_key[(row['segment_index'], row['source_hash'])] = row['target_text']
+            self._by_hash.setdefault(row['source_hash'], row['target_text'])
+        self._loaded = True
+        if rows:
+            logger.info(f"任务 {self.translate_id} 从断点日志恢复 {len(rows)} 段译文")
+
+    def lookup(self, index, digest):
+        """查找已翻译的段落，没有时返回 None"""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            target = self._by_key.get((index, digest))
+            if target is None:
+                target = self._by_hash.get(digest)
+            if target is not None:
+                self.hits += 1
+            return target
+
+    def record(self, index, digest, target):
+        """记录已翻译的段落（批量写入）"""
+        with self._lock:
+            key = (index, digest)
+            if self._by_key.get(key) == target:
+                return
+            self._by_key[key] = target
+            self._by_hash.setdefault(digest, target)
+            self._pending.append((self.translate_id, index, digest, target))
+            should_flush = len(self._pending) >= FLUSH_SEGMENTS or time.time() - self._last_flush >= FLUSH_SECONDS
+        if should_flush:
+            self.flush()
+
+    def flush(self):
+        """写入缓存的记录，写入失败时放回等待下次写入"""
+        with self._lock:
+            pending = self._pending
+            self._pending = []
+            self._last_flush = time.time()
+        if not pending:
+            return True
+        success = db.execute_batch(
+            "insert into translate_checkpoint (translate_id, segment_index, source_hash, target_text, created_at) "
+            "values (%s, %s, %s, %s, UTC_TIMESTAMP()) "
+            "on duplicate key update target_text=values(target_text)",
+            pending
+        )
+        if not success:
+            with self._lock:
+                self._pending = pending + self._pending
+            logger.error(f"❌ 写入断点日志失败: translate_id={self.translate_id}, 段数={len(pending)}")
+        return success
+
+
+_checkpoints = {}
+_checkpoints_lock = threading.Lock()
+
+
+def get_checkpoint(translate_id):
+    """获取任务的断点日志对象（同一进程内同一任务共享）"""
+    with _checkpoints_lock:
+        checkpoint = _checkpoints.get(translate_id)
+        if checkpoint is None:
+            checkpoint = TaskCheckpoint(translate_id)
+            _checkpoints[translate_id] = checkpoint
+        return checkpoint
+
+
+def lookup(trans, index, source):
+    """
+    查找段落的已有译文
+
+    Args:
+        trans: 翻译配置字典
+        index: 段落序号（没有时传 None）
+        source: 原文
+
+    Returns:
+        str or None: 已有译文
+    """
+    translate_id = trans.get('id')
+    if not translate_id or not source:
+        return None
+    try:
+        return get_checkpoint(translate_id).lookup(NO_INDEX if index is None else index, source_hash(trans, source))
+    except Exception as e:
+        logger.warning(f"读取断点日志失败: translate_id={translate_id}, {e}")
+        return None
+
+
+def record(trans, index, source, target):
+    """记录段落译文（翻译成功后调用，失败保留原文的段落不要记录）"""
+    translate_id = trans.get('id')
+    if not translate_id or not source or target is None:
+        return
+    try:
+        get_checkpoint(translate_id).record(NO_INDEX if index is None else index, source_hash(trans, source), target)
+    except Exception as e:
+        logger.warning(f"记录断点日志失败: translate_id={translate_id}, {e}")
+
+
+def release_checkpoint(translate_id):
+    """写入剩余记录并释放断点日志对象（任务结束时调用）
+
+    Returns:
+        int: 本次执行中从日志复用的段数
+    """
+    with _checkpoints_lock:
+        checkpoint = _checkpoints.pop(translate_id, None)
+    if checkpoint is None:
+        return 0
+    checkpoint.flush()
+    return checkpoint.hits
+
+
+def clear_checkpoint(translate_id):
+    """删除任务的断点日志（任务完成或删除后调用）"""
+    with _checkpoints_lock:
+        _checkpoints.pop(translate_id, None)
+    return db.execute("delete from translate_checkpoint where translate_id=%s", translate_id)
+
+
+def purge_stale_checkpoints():
+    """清理已完成、已删除和超过保留期的任务日志"""
+    return db.execute(
+        "delete c from translate_checkpoint c left join translate t on t.id = c.translate_id "
+        "where t.id is null or t.deleted_flag = 'Y' or t.status = 'done' "
+        "or c.created_at < DATE_SUB(UTC_TIMESTAMP(), INTERVAL %s DAY)",
+        RETENTION_DAYS
+    )
+
+
+@atexit.register
+def _flush_all():
+    """进程正常退出时写入剩余记录"""
+    with _checkpoints_lock:
+        checkpoints = list(_checkpoints.values())
+    for checkpoint in checkpoints:
+        try:
+            checkpoint.flush()
+        except Exception:
+            pass
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+回填译文的字体度量与字号求解
+原来 _adjust_textbox_for_translation 用 box_width / (font_size * 0.6) 估算每行字符数，估算偏差大，
+放不下的文本交给 insert_htmlbox 再缩放或溢出。这里按回填时实际使用的字体计算：
+- 字符宽度用 fitz.Font.text_length 计算并缓存（按字号为1缓存，宽度与字号成正比，任意字号直接换算）；
+  中日韩文字和全角字符按 1em 计算（回填时使用等宽的CJK后备字体）
+- 按与回填HTML相同的规则折行（西文按单词，中日韩按字符，超长单词按字符断开），行高为字号的 LINE_HEIGHT 倍
+- 在 [最小字号, 最大字号] 内按 SIZE_STEP 二分查找能放进矩形的最大字号，一次求解，不做试插入
+- 相同 (文本, 宽, 高, 字号范围) 的结果缓存（页眉页脚、表格标签在每页重复出现）
+"""
+import re
+import threading
+from functools import lru_cache
+
+import fitz
+
+FONT_NAME = "helv"  # 与回填HTML的 font-family: sans-serif 对应的内置字体
+LINE_HEIGHT = 1.2  # 与回填HTML的 line-height 一致
+HEIGHT_PADDING = 1.0  # 排版引擎在文本下方额外占用的高度（pt）
+WIDTH_PADDING = 2.0  # 排版引擎在文本框左右各留 1pt
+WIDTH_MARGIN = 0.99  # 折行宽度留少量余量，抵消与排版引擎的舍入差异
+SIZE_STEP = 0.5  # 字号求解精度（pt）
+FIT_CACHE_SIZE = 8192  # 字号求解结果缓存条数
+TOKEN_CACHE_SIZE = 4096  # 文本分词结果缓存条数
+
+_CJK = r'\u1100-\u11ff\u2e80-\u9fff\uac00-\ud7af\uf900-\ufaff\ufe30-\ufe4f\uff00-\uffef'
+_CJK_PATTERN = re.compile(f'[{_CJK}]')
+_TOKEN_PATTERN = re.compile(f'\\s+|[{_CJK}]|[^\\s{_CJK}]+')  # 空白 / 单个中日韩字符 / 西文单词
+
+
+class FontMetrics:
+    """单个字体的字符宽度缓存（线程安全，进程内共享）"""
+
+    def __init__(self, fontname=FONT_NAME):
+        self.fontname = fontname
+        self._font = None
+        self._widths = {}  # 字符 -> 字号为1时的宽度
+        self._lock = threading.Lock()
+
+    def char_width(self, char):
+        """字号为1时的字符宽度"""
+        width = self._widths.get(char)
+        if width is None:
+            if _CJK_PATTERN.match(char):
+                width = 1.0
+            else:
+                with self._lock:
+                    if self._font is None:
+                        self._font = fitz.Font(self.fontname)
+                    width = self._font.text_length(char, fontsize=1)
+            self._widths[char] = width
+        return width
+
+    def text_width(self, text, size=1.0):
+        return sum(self.char_width(char) for char in text) * size
+
+    @lru_cache(maxsize=TOKEN_CACHE_SIZE)
+    def tokens(self, text):
+        """
+        折行单元：[(类型, 宽度, 各字符宽度)]，类型为 'space'、'word'（西文单词）或 'char'（中日韩字符）；
+        宽度均为字号为1时的值
+        """
+        result = []
+        for match in _TOKEN_PATTERN.finditer(text):
+            token = match.group()
+            if token.isspace():
+                result.append(('space', self.char_width(' '), ()))
+            elif len(token) == 1 and _CJK_PATTERN.match(token):
+                result.append(('char', self.char_width(token), ()))
+            else:
+                widths = tuple(self.char_width(char) for char in token)
+                result.append(('word', sum(widths), widths))
+        return tuple(result)
+
+    def count_lines(self, text, width, size):
+        """文本在宽度 width、字号 size 下折行后的行数"""
+        if size <= 0:
+            return 0
+        limit = (width - WIDTH_PADDING) * WIDTH_MARGIN / size  # 换算到字号为1
+        lines, x = 1, 0.0
+        for kind, token_width, char_widths in self.tokens(text):
+            if kind == 'space':
+                if x > 0:
+                    x += token_width  # 行尾空格不换行
+                continue
+            if x + token_width <= limit:
+                x += token_width
+                continue
+            if x > 0:
+                lines += 1
+                x = 0.0
+            if token_width <= limit or kind == 'char':
+                x = token_width
+                continue
+            # 超长单词按字符断开
+            for char_width in char_widths:
+                if x > 0 and x + char_width > limit:
+                    lines += 1
+                    x = 0.0
+                x += char_width
+        return lines
+
+    def needed_height(self, text, width, size):
+        return self.count_lines(text, width, size) * size * LINE_HEIGHT + HEIGHT_PADDING
+
+    def fits(self, text, width, height, size):
+        return self.needed_height(text, width, size) <= height
+
+    def fit(self, text, width, height, max_size, min_size):
+        """
+        求能放进 width × height 的最大字号
+
+        Returns:
+            tuple: (字号, 所需高度, 是否放得下)；最小字号也放不下时返回最小字号和其所需高度
+        """
+        steps = max(0, int((max_size - min_size) / SIZE_STEP))
+        sizes = [min_size + i * SIZE_STEP for i in range(steps + 1)]
+        if sizes[-1] < max_size:
+            sizes.append(max_size)
+        # 字号越小行数越少、行高越小，可放下的字号区间是连续的，二分查找其上界
+        low, high = 0, len(sizes) - 1
+        if not self.fits(text, width, height, sizes[low]):
+            return sizes[low], self.needed_height(text, width, sizes[low]), False
+        while low < high:
+            mid = (low + high + 1) // 2
+            if self.fits(text, width, height, sizes[mid]):
+                low = mid
+            else:
+                high = mid - 1
+        return sizes[low], self.needed_height(text, width, sizes[low]), True
+
+
+_metrics = FontMetrics()
+
+
+@lru_cache(maxsize=FIT_CACHE_SIZE)
+def _fit_cached(text, width, height, max_size, min_size):
+    return _metrics.fit(text, width, height, max_size, min_size)
+
+
+def fit_font_size(text, width, height, max_size, min_size):
+    """
+    求译文在矩形内的最大字号（结果缓存）
+
+    Args:
+        text: 译文
+        width, height: 矩形宽高
+        max_size: 最大字号
+        min_size: 最小字号
+
+    Returns:
+        tuple: (字号, 所需高度, 是否放得下)
+    """
+    min_size = max(SIZE_STEP, min_size)
+    max_size = max(min_size, max_size)
+    return _fit_cached(text.strip(), round(width, 1), round(height, 1), round(max_size, 2), round(min_size, 2))
+
+
+def get_cache_stats():
+    info = _fit_cached.cache_info()
+    return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize, 'chars': len(_metrics._widths)}
@@ -3,15 +3,17 @@
 """
 大文件PDF翻译器
 基于big_pdf_trans项目集成，支持多线程翻译，每5页分批处理，最后合并成完整PDF
+批次按 提取 -> 翻译 -> 生成底稿 -> 回填 的流水线执行（见 batch_pipeline），多个批次同时在途，
+PyMuPDF 操作在 PDF 计算进程池中执行，压缩和合并在单独的进程中执行（见 pdf_compute）
 """
 
 import fitz
 from app.utils.pymupdf_queue import (
-    safe_fitz_open, safe_fitz_close, safe_fitz_save, 
-    safe_fitz_new_document, safe_fitz_insert_pdf,
+    safe_fitz_close, safe_fitz_save, 
+    safe_fitz_new_document,
     safe_fitz_get_text_blocks, safe_fitz_insert_text,
     safe_fitz_insert_textbox, safe_fitz_new_rect,
-    PyMuPDFContext
+    PyMuPDFContext, pymupdf_queue
 )
 import os
 import json
@@ -21,12 +23,18 @@ import shutil
 import threading
 import time
 import uuid
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import as_completed
 from datetime import datetime
 from pathlib import Path
-from multiprocessing import Process, Queue, cpu_count
+from multiprocessing import get_context
 from multiprocessing import set_start_method
 import ctypes
+from .batch_pipeline import BatchPipeline, PipelineStage
+from .segment_pool import SegmentPool
+from .bbox_index import BBoxIndex, OtherBBoxes
+from .font_metrics import fit_font_size
+from .text_layer import TextLayerReader, TextLayerWriter
+from .pdf_compute import get_service as get_pdf_compute, PDFComputeCancelled
 
 # 设置进程启动方法（仅在主进程中设置一次）
 try:
@@ -36,6 +44,11 @@ except RuntimeError:
 
 logger = logging.getLogger(__name__)
 
+# 批次流水线配置
+PIPELINE_QUEUE_SIZE = 1  # 阶段之间的队列长度
+PIPELINE_TRANSLATE_WORKERS = 2  # 同时翻译的批次数（段落仍在进程级线程池中按任务配额执行）
+PIPELINE_MEMORY_LIMIT_MB = int(os.getenv('LARGE_PDF_PIPELINE_MEMORY_MB', 1024))  # 任务内存超过该值时暂停放入新批次
+
 def force_memory_release():
     """强制释放内存到操作系统"""
     try:
@@ -51,34 +64,34 @@ def force_memory_release():
     except Exception as e:
         logger.warning(f"强制释放内存失败: {e}")
 
-# 全局进程池管理器
-_process_pool = None
-_process_pool_lock = threading.Lock()
-
 def get_process_pool():
-    """获取全局进程池（单例模式）"""
-    global _process_pool
-    with _process_pool_lock:
-        if _process_pool is None:
-            # 限制进程池大小为CPU核心数，避免资源耗尽
-            max_processes = min(cpu_count(), 4)  # 最多4个进程
-            _process_pool = ThreadPoolExecutor(max_workers=max_processes)
-            logger.info(f"创建进程池，最大进程数: {max_processes}")
-        return _process_pool
+    """获取PDF计算进程池（见 pdf_compute，真正的多进程执行）"""
+    return get_pdf_compute()
 
 def shutdown_process_pool():
-    """关闭全局进程池"""
-    global _process_pool
-    with _process_pool_lock:
-        if _process_pool is not None:
-            try:
-                _process_pool.shutdown(wait=True)
-                logger.info("全局进程池已关闭")
-            except Exception as e:
-                logger.warning(f"关闭进程池失败: {e}")
-            finally:
-                _process_pool = None
+    """关闭PDF计算进程池"""
+    try:
+        get_pdf_compute().shutdown(wait=True)
+    except Exception as e:
+        logger.warning(f"关闭进程池失败: {e}")
+
+def _run_translator_job(input_pdf_path, temp_dir, method_name, args):
+    """
+    在PDF计算进程中执行翻译器的PyMuPDF操作（提取/生成底稿/回填）
+    文档按路径在worker中打开，参数和返回值只包含可序列化的数据
+    """
+    translator = LargePDFTranslator(input_pdf_path, temp_dir=temp_dir)
+    try:
+        return getattr(translator, method_name)(*args)
+    finally:
+        translator.temp_dir = ""  # 临时目录由主进程的翻译器负责清理，避免 __del__ 删除
+        import gc
+        gc.collect()
 
+def _insert_batch_pdf(merged_doc, batch_pdf_path):
+    """打开批次PDF插入到合并文档，插入后立即关闭（单个任务内完成）"""
+    with fitz.open(batch_pdf_path) as batch_doc:
+        merged_doc.insert_pdf(batch_doc, from_page=0, to_page=batch_doc.page_count - 1)
 
 def _merge_pdfs_in_process(batch_results, output_path, input_pdf_path, temp_dir, progress_queue=None):
     """
@@ -111,19 +124,16 @@ def _merge_pdfs_in_process(batch_results, output_path, input_pdf_path, temp_dir,
         merged_doc = safe_fitz_new_document()
         
         # 真正的流式合并：合并一个就立即关闭，避免同时打开多个PDF
+        # 打开、插入、关闭批次PDF在合并文档所属的工作线程上作为一个任务执行
         for idx, batch_result in enumerate(successful_batches):
-            batch_doc = None
             try:
                 translated_pdf_path = batch_result["translated_pdf_path"]
                 if not os.path.exists(translated_pdf_path):
                     logger.warning(f"批次 {batch_result['batch_num']} 的PDF文件不存在: {translated_pdf_path}")
                     continue
                 
-                # 打开批次PDF
-                batch_doc = safe_fitz_open(translated_pdf_path)
-                
-                # 插入到合并文档
-                safe_fitz_insert_pdf(merged_doc, batch_doc, 0, batch_doc.page_count)
+                # 打开批次PDF，插入到合并文档后立即关闭，释放内存
+                pymupdf_queue.run(merged_doc, _insert_batch_pdf, translated_pdf_path, timeout=None)
                 
                 logger.info(f"✅ 合并批次 {batch_result['batch_num']}/{total_batches}: 页面 {batch_result['start_page']}-{batch_result['end_page']-1}")
                 
@@ -135,10 +145,6 @@ def _merge_pdfs_in_process(batch_results, output_path, input_pdf_path, temp_dir,
                     except Exception as e:
                         logger.debug(f"更新进度失败: {e}")
                 
-                # 立即关闭批次PDF，释放内存
-                safe_fitz_close(batch_doc)
-                batch_doc = None
-                
                 # 每合并3个批次后强制垃圾回收和内存释放
                 if (idx + 1) % 3 == 0:
                     import gc
@@ -153,12 +159,6 @@ def _merge_pdfs_in_process(batch_results, output_path, input_pdf_path, temp_dir,
                     
             except Exception as e:
                 logger.error(f"合并批次 {batch_result.get('batch_num', idx)} 时出错: {e}")
-                # 确保即使出错也关闭文档
-                if batch_doc is not None:
-                    try:
-                        safe_fitz_close(batch_doc)
-                    except Exception:
-                        pass
                 continue
         
         # 保存合并后的PDF（这是最耗内存的操作）
@@ -169,7 +169,7 @@ def _merge_pdfs_in_process(batch_results, output_path, input_pdf_path, temp_dir,
             except Exception:
                 pass
         
-        merged_doc.save(output_path)
+        pymupdf_queue.run(merged_doc, lambda doc: doc.save(output_path), timeout=None)
         logger.info(f"✅ PDF保存完成: {output_path}")
         
         # 删除原始文件
@@ -204,7 +204,7 @@ def _merge_pdfs_in_process(batch_results, output_path, input_pdf_path, temp_dir,
         # 确保合并文档被正确关闭
         if merged_doc is not None:
             try:
-                merged_doc.close()
+                safe_fitz_close(merged_doc)
                 logger.debug("合并PDF文档已关闭")
             except Exception as e:
                 logger.warning(f"关闭合并PDF文档时出错: {e}")
@@ -308,6 +308,8 @@ class LargePDFTranslator:
         
         # 线程安全锁
         self.lock = threading.Lock()
+        # 全文档段落池（run_complete_translation 中创建），每个唯一文本只翻译一次
+        self.segment_pool = None
     
     def _check_textbox_overlap(self, textbox, other_bboxes, min_gap=2.0):
         """
@@ -315,29 +317,23 @@ class LargePDFTranslator:
         
         Args:
             textbox: 要检查的文本框Rect对象
-            other_bboxes: 其他文本框的边界列表 [[x0, y0, x1, y1], ...]
+            other_bboxes: 其他文本框（BBoxIndex.excluding() 或边界列表 [[x0, y0, x1, y1], ...]）
             min_gap: 最小间距（像素），默认2.0
         
         Returns:
             bool: True表示有重叠，False表示无重叠
         """
         try:
-            for other_bbox in other_bboxes:
-                other_rect = fitz.Rect(other_bbox[0], other_bbox[1], other_bbox[2], other_bbox[3])
-                # 检查是否有重叠（包括最小间距）
-                if textbox.intersects(other_rect):
-                    # 计算重叠区域
-                    intersection = textbox & other_rect
-                    if intersection.width > min_gap and intersection.height > min_gap:
-                        return True
-            return False
+            if not isinstance(other_bboxes, OtherBBoxes):
+                other_bboxes = BBoxIndex(other_bboxes).excluding(None)
+            return other_bboxes.overlaps(textbox, min_gap)
         except Exception as e:
             logger.warning(f"检查文本框重叠失败: {e}")
             return False
     
     def _adjust_textbox_for_translation(self, original_text, translated_text, font_size, bbox, box_width, box_height, other_bboxes=None):
         """
-        根据翻译后文本长度调整文本框大小和字体大小，避免与其他文本框重叠
+        根据译文的实际排版尺寸（font_metrics.fit_font_size）调整字体大小和文本框，避免溢出和与其他文本框重叠
         
         Args:
             original_text: 原始文本
@@ -346,12 +342,15 @@ class LargePDFTranslator:
             bbox: 原始文本框边界 [x0, y0, x1, y1]
             box_width: 文本框宽度
             box_height: 文本框高度
-            other_bboxes: 同一页面上其他文本框的边界列表，用于检测重叠
+            other_bboxes: 同一页面上其他文本框（BBoxIndex.excluding() 或边界列表），用于检测重叠
         
         Returns:
             tuple: (调整后的字体大小, 调整后的文本框Rect对象)
         """
         try:
+            if other_bboxes is not None and not isinstance(other_bboxes, OtherBBoxes):
+                other_bboxes = BBoxIndex(other_bboxes).excluding(None)
+            
             # 计算文本长度比例
             original_length = len(original_text.strip()) if original_text else 0
             translated_length = len(translated_text.strip()) if translated_text else 0
@@ -361,87 +360,45 @@ class LargePDFTranslator:
                 return font_size, fitz.Rect(bbox[0], bbox[1], bbox[2], bbox[3])
             
             length_ratio = translated_length / original_length if original_length > 0 else 1.0
+            original_textbox = fitz.Rect(bbox[0], bbox[1], bbox[2], bbox[3])
             
-            # 估算每行字符数（中文字符按字体大小，英文字符按字体大小的0.6倍）
-            chars_per_line = max(1, int(box_width / (font_size * 0.6)))
-            
-            # 策略1: 如果翻译后文本变长，先尝试缩小字体
-            adjusted_font_size = font_size
-            adjusted_height = box_height
+            # 译文明显变短时允许放大字体（不超过原始大小的120%），否则不超过原始大小
+            max_font_size = font_size * 1.2 if length_ratio < 0.8 else font_size
             
-            if length_ratio > 1.2:  # 文本长度增加超过20%
-                # 根据长度比例缩小字体，但不要小于原始大小的60%
-                adjusted_font_size = max(font_size * 0.6, font_size / length_ratio)
-                adjusted_font_size = int(adjusted_font_size)
-                
-                # 重新计算需要的行数
-                new_chars_per_line = max(1, int(box_width / (adjusted_font_size * 0.6)))
-                new_translated_lines = max(1, int(translated_length / new_chars_per_line) + 1)
-                new_line_height = adjusted_font_size * 1.2
-                needed_height = new_translated_lines * new_line_height
-                
-                # 如果缩小字体后还是放不下，适当增加文本框高度
-                if needed_height > box_height:
-                    # 尝试逐步增加高度，检查是否与其他文本框重叠
-                    max_height_increase = box_height * 0.5  # 最多增加50%高度
-                    test_height = min(needed_height, box_height + max_height_increase)
-                    
-                    # 如果有其他文本框信息，检查重叠
-                    if other_bboxes:
-                        test_textbox = fitz.Rect(bbox[0], bbox[1], bbox[2], bbox[1] + test_height)
-                        if self._check_textbox_overlap(test_textbox, other_bboxes):
-                            # 如果会重叠，进一步缩小字体而不是增加高度
-                            # 计算不重叠的最大高度
-                            max_safe_height = box_height
-                            for other_bbox in other_bboxes:
-                                if other_bbox[1] > bbox[1]:  # 只检查下方的文本框
-                                    # 计算到下方文本框的距离
-                                    gap = other_bbox[1] - bbox[3]
-                                    if gap > 0:
-                                        max_safe_height = min(max_safe_height, box_height + gap - 2.0)
-                            
-                            # 如果安全高度不够，进一步缩小字体
-                            if max_safe_height < needed_height:
-                                # 根据需要的行数和安全高度，计算合适的字体大小
-                                safe_lines = max(1, int(max_safe_height / (adjusted_font_size * 1.2)))
-                                if safe_lines < new_translated_lines:
-                                    # 需要进一步缩小字体
-                                    adjusted_font_size = max(font_size * 0.5, adjusted_font_size * (safe_lines / new_translated_lines))
-                                    adjusted_font_size = int(adjusted_font_size)
-                                    adjusted_height = max_safe_height
-                                else:
-                                    adjusted_height = max_safe_height
-                            else:
-                                adjusted_height = test_height
-                        else:
-                            adjusted_height = test_height
-                    else:
-                        # 没有其他文本框信息，保守处理：最多增加30%高度
-                        adjusted_height = min(needed_height, box_height * 1.3)
-                else:
-                    adjusted_height = needed_height
-            elif length_ratio < 0.8:  # 文本长度减少超过20%
-                # 如果文本变短，可以适当增大字体，但不要超过原始大小的120%
-                adjusted_font_size = min(font_size * 1.2, font_size / length_ratio)
-                adjusted_font_size = int(adjusted_font_size)
-            
-            # 创建调整后的文本框
-            # 保持左上角不变，调整右下角
+            # 策略1: 按字体度量求原文本框内能放下的最大字体（不小于原始大小的60%）
+            adjusted_font_size, needed_height, fits = fit_font_size(
+                translated_text, box_width, box_height, max_font_size, font_size * 0.6
+            )
+            if fits:
+                return adjusted_font_size, original_textbox
+            
+            # 策略2: 放不下时向下扩展文本框，最多增加50%高度且不超过下方最近的文本框；
+            # 没有其他文本框信息时保守处理，最多增加30%高度；字体不小于原始大小的50%
+            if other_bboxes:
+                max_height = box_height * 1.5
+                # 只看下方最近的文本框（上边界同时在原文本框上下边界之下）
+                nearest_top = other_bboxes.nearest_top_below(max(bbox[1], bbox[3]))
+                if nearest_top is not None:
+                    max_height = min(max_height, box_height + max(0.0, nearest_top - bbox[3] - 2.0))
+            else:
+                max_height = box_height * 1.3
+            adjusted_font_size, needed_height, fits = fit_font_size(
+                translated_text, box_width, max_height, max_font_size, font_size * 0.5
+            )
             adjusted_textbox = fitz.Rect(
-                bbox[0], 
-                bbox[1], 
-                bbox[2], 
-                bbox[1] + adjusted_height
+                bbox[0],
+                bbox[1],
+                bbox[2],
+                bbox[1] + min(max_height, max(box_height, needed_height))
             )
             
-            # 最后再次检查重叠（如果提供了其他文本框信息）
-            if other_bboxes and self._check_textbox_overlap(adjusted_textbox, other_bboxes):
-                # 如果仍然重叠，使用原始大小，但缩小字体
-                logger.warning(f"调整后的文本框仍会重叠，使用原始大小并缩小字体")
-                adjusted_textbox = fitz.Rect(bbox[0], bbox[1], bbox[2], bbox[3])
-                if length_ratio > 1.2:
-                    adjusted_font_size = max(font_size * 0.5, font_size / length_ratio)
-                    adjusted_font_size = int(adjusted_font_size)
+            # 扩展后与其他文本框重叠（如右侧相邻的文本框）时，使用原始大小并缩小字体
+            if adjusted_textbox.height > box_height and other_bboxes and self._check_textbox_overlap(adjusted_textbox, other_bboxes):
+                logger.warning(f"调整后的文本框会重叠，使用原始大小并缩小字体")
+                adjusted_font_size, _, _ = fit_font_size(
+                    translated_text, box_width, box_height, max_font_size, font_size * 0.5
+                )
+                adjusted_textbox = original_textbox
             
             return adjusted_font_size, adjusted_textbox
             
@@ -476,21 +433,26 @@ class LargePDFTranslator:
             logger.error(f"获取PDF页数失败: {e}")
             raise
     
-    def extract_texts_from_pages(self, start_page, end_page):
+    def extract_texts_from_pages(self, start_page, end_page, output_path=None):
         """
         从指定页面范围提取文本
         
         Args:
             start_page: 起始页（从0开始）
             end_page: 结束页（不包含）
+            output_path: 文本层文件路径，指定时逐页写入该文件（见 text_layer.py）
         
         Returns:
-            list: 提取的文本数据
+            list: 提取的文本数据；指定 output_path 时返回写入的页数
         """
         doc = None
+        writer = None
         try:
             doc = fitz.open(self.input_pdf_path)
             extracted_texts = []
+            written_pages = 0
+            if output_path:
+                writer = TextLayerWriter(output_path)
             
             for page_num in range(start_page, min(end_page, doc.page_count)):
                 page = doc[page_num]
@@ -519,15 +481,21 @@ class LargePDFTranslator:
                     "page_number": page_num,
                     "texts": page_texts
                 }
-                extracted_texts.append(page_data)
+                if writer is not None:
+                    writer.add_page(page_num, page_texts)
+                    written_pages += 1
+                else:
+                    extracted_texts.append(page_data)
                 logger.info(f"第 {page_num + 1} 页提取了 {len(page_texts)} 个文本块")
             
-            return extracted_texts
+            return written_pages if writer is not None else extracted_texts
             
         except Exception as e:
             logger.error(f"提取文本失败: {e}")
             raise
         finally:
+            if writer is not None:
+                writer.close()
             # 确保文档对象被正确关闭
             if doc is not None:
                 try:
@@ -536,17 +504,19 @@ class LargePDFTranslator:
                 except Exception as close_error:
                     logger.warning(f"关闭PDF文档时出错: {close_error}")
     
-    def translate_texts_batch(self, extracted_texts, trans):
+    def translate_texts_batch(self, extracted_texts, trans, output_path=None):
         """
         多线程翻译文本批次
         
         Args:
-            extracted_texts: 提取的文本数据
+            extracted_texts: 提取的文本数据（页面列表或 TextLayerReader）
             trans: 翻译任务信息
+            output_path: 文本层文件路径，指定时翻译结果逐页写入该文件
         
         Returns:
-            list: 翻译后的文本数据
+            list: 翻译后的文本数据；指定 output_path 时返回该路径
         """
+        writer = None
         try:
             translated_texts = []
             
@@ -565,57 +535,50 @@ class LargePDFTranslator:
             
             logger.info(f"批次中共有 {len(unique_texts)} 个唯一文本需要翻译")
             
-            # 多线程翻译唯一文本
+            # 全文档段落池：已翻译的文本直接取用，其他批次正在翻译的文本等待其结果
             translated_results = {}
-            if unique_texts:
+            pending_texts = unique_texts
+            waiting = {}
+            if self.segment_pool is not None and unique_texts:
+                translated_results, pending_texts, waiting = self.segment_pool.claim(unique_texts)
+                logger.info(f"段落池命中 {len(translated_results)} 个，等待其他批次 {len(waiting)} 个，需要翻译 {len(pending_texts)} 个")
+            
+            # 多线程翻译唯一文本
+            if pending_texts:
                 # 记录翻译开始时间
                 start_time = time.time()
                 
                 # 使用配置的线程数
-                actual_workers = min(self.max_workers, len(unique_texts))
+                actual_workers = min(self.max_workers, len(pending_texts))
                 logger.info(f"使用 {actual_workers} 个线程进行翻译")
                 
-                # 使用与小PDF完全相同的并发方式，但避免进度冲突
+                # 使用与小PDF相同的进程级翻译线程池，但避免进度冲突
                 import threading
-                from .to_translate import get
+                from .to_translate import translate_segments
                 
                 # 标记为大PDF翻译，避免 to_translate.py 中的进度更新
                 trans['is_large_pdf'] = True
                 
                 # 创建文本数组，格式与小PDF一致
                 texts = []
-                for text in unique_texts:
+                for text in pending_texts:
                     texts.append({'text': text, 'complete': False})
                 
-                # 线程启动控制变量，与小PDF保持一致
                 event = threading.Event()
-                run_index = 0
-                active_count = threading.activeCount()
-                max_threads = actual_workers
-                
-                logger.info(f"开始翻译 {len(texts)} 个文本片段，使用 {max_threads} 个线程")
-                
-                # 启动线程，与小PDF保持完全一致的方式
-                while run_index < len(texts):
-                    if threading.activeCount() < max_threads + active_count and not event.is_set():
-                        thread = threading.Thread(
-                            target=get,
-                            args=(trans, event, texts, run_index)
-                        )
-                        thread.start()
-                        logger.info(f"启动翻译线程 {run_index}")
-                        run_index += 1
-                    time.sleep(0.1)  # 与小PDF保持相同的延迟
-                
-                # 等待翻译完成，与小PDF保持一致
-                while not all(t.get('complete') for t in texts) and not event.is_set():
-                    time.sleep(0.1)
+                logger.info(f"开始翻译 {len(texts)} 个文本片段，并发数 {actual_workers}")
+                try:
+                    finished = translate_segments(trans, event, texts, actual_workers)
+                except BaseException:
+                    if self.segment_pool is not None:
+                        self.segment_pool.release(pending_texts)
+                    raise
                 
                 # 收集翻译结果
+                new_results = {}
                 for i, text_item in enumerate(texts):
-                    original_text = unique_texts[i]
+                    original_text = pending_texts[i]
                     translated_text = text_item['text']
-                    translated_results[original_text] = translated_text
+                    new_results[original_text] = translated_text
                     
                     # 添加详细的调试日志
                     if original_text != translated_text:
@@ -624,6 +587,17 @@ class LargePDFTranslator:
                         pass  # if 块不能为空，添加 pass 占位
                     else:
                         logger.warning(f"翻译结果与原文相同 ({i+1}/{len(texts)}): '{original_text[:20]}...'")
+                translated_results.update(new_results)
+                
+                # 任务被取消时结果不完整，不写入段落池；译文与原文相同（翻译失败）的不写入，
+                # 放弃认领，后续批次遇到时重新翻译
+                if self.segment_pool is not None:
+                    if finished:
+                        translated_only = {text: translated for text, translated in new_results.items() if translated != text}
+                        self.segment_pool.put_many(translated_only)
+                        self.segment_pool.release([text for text in pending_texts if text not in translated_only])
+                    else:
+                        self.segment_pool.release(pending_texts)
                 
                 # 注意：这里不调用 to_translate.py 的 process 函数，避免进度冲突
                 # 大PDF翻译有自己的进度更新机制
@@ -632,7 +606,12 @@ class LargePDFTranslator:
                 # 翻译成功日志已关闭（调试时可打开）
                 # logger.info(f"批次翻译完成，共 {len(unique_texts)} 个文本，总用时: {total_time:.1f}s")
             
+            if waiting:
+                translated_results.update(self.segment_pool.wait_for(waiting, trans.get('cancel_event')))
+            
             # 重新组织翻译结果
+            if output_path:
+                writer = TextLayerWriter(output_path)
             for page_data in extracted_texts:
                 page_num = page_data["page_number"]
                 translated_page_data = {"page_number": page_num, "texts": []}
@@ -657,13 +636,19 @@ class LargePDFTranslator:
                     else:
                         translated_page_data["texts"].append(text_info)
                 
-                translated_texts.append(translated_page_data)
+                if writer is not None:
+                    writer.add_page(page_num, translated_page_data["texts"])
+                else:
+                    translated_texts.append(translated_page_data)
             
-            return translated_texts
+            return output_path if writer is not None else translated_texts
             
         except Exception as e:
             logger.error(f"翻译文本失败: {e}")
             raise
+        finally:
+            if writer is not None:
+                writer.close()
     
     def translate_single_text_with_delay(self, text, trans, delay):
         """
@@ -774,12 +759,16 @@ class LargePDFTranslator:
         将翻译后的文本填充到PDF
         
         Args:
-            translated_texts: 翻译后的文本数据
+            translated_texts: 翻译后的文本数据，或文本层文件路径（逐页读取）
             no_text_pdf_path: 无文本PDF路径
             output_path: 输出PDF路径
         """
         doc = None
+        layer = None
         try:
+            if isinstance(translated_texts, str):
+                layer = translated_texts = TextLayerReader(translated_texts)
+            
             # 添加详细日志，定位崩溃点
             logger.info(f"[fill] 准备打开无文本PDF: {no_text_pdf_path}")
             logger.info(f"[fill] 文件是否存在: {os.path.exists(no_text_pdf_path)}")
@@ -792,9 +781,12 @@ class LargePDFTranslator:
             
             # 创建页面索引映射：原始页面号 -> 批次内页面索引
             page_index_map = {}
-            for i, page_data in enumerate(translated_texts):
-                original_page_num = page_data["page_number"]
-                page_index_map[original_page_num] = i
+            if layer is not None:
+                page_index_map = {page_num: i for i, page_num in enumerate(layer.page_numbers)}
+            else:
+                for i, page_data in enumerate(translated_texts):
+                    original_page_num = page_data["page_number"]
+                    page_index_map[original_page_num] = i
             
             # 批量处理文本插入，每处理一定数量后清理内存
             text_insert_count = 0
@@ -810,6 +802,7 @@ class LargePDFTranslator:
                 
                 # 收集当前页面的所有文本框边界，用于重叠检测
                 all_bboxes = [text_info["bbox"] for text_info in page_data["texts"] if text_info.get("text", "").strip()]
+                bbox_index = BBoxIndex(all_bboxes)
                 
                 for text_idx, text_info in enumerate(page_data["texts"]):
                     # 使用翻译后的文本
@@ -844,7 +837,7 @@ class LargePDFTranslator:
                         box_height = bbox[3] - bbox[1]
                         
                         # 获取其他文本框的边界（排除当前文本框）
-                        other_bboxes = [b for i, b in enumerate(all_bboxes) if i != text_idx]
+                        other_bboxes = bbox_index.excluding(text_idx)
                         
                         # 根据翻译后文本长度调整文本框和字体大小，避免重叠
                         adjusted_font_size, adjusted_textbox = self._adjust_textbox_for_translation(
@@ -937,6 +930,8 @@ class LargePDFTranslator:
             logger.error(f"填充翻译文本失败: {e}")
             return False
         finally:
+            if layer is not None:
+                layer.close()
             # 确保文档对象被正确关闭
             if doc is not None:
                 try:
@@ -947,7 +942,7 @@ class LargePDFTranslator:
     
     def compress_pdf(self, input_pdf_path, output_pdf_path, cancel_event=None):
         """
-        压缩PDF文件（使用独立进程执行，避免阻塞其他任务）
+        压缩PDF文件（在单独的进程中执行，避免阻塞其他任务，取消时终止该进程）
         
         Args:
             input_pdf_path: 输入PDF路径
@@ -965,34 +960,16 @@ class LargePDFTranslator:
                 logger.info("PDF压缩被取消")
                 return False
             
-            # 使用独立进程执行压缩操作，避免阻塞其他翻译任务
-            # 虽然当前任务会等待压缩完成，但其他任务不会受影响
-            process = Process(
-                target=_compress_pdf_in_process,
-                args=(input_pdf_path, output_pdf_path)
-            )
-            process.start()
-            
-            # 等待进程完成，但定期检查取消事件
-            while process.is_alive():
-                if cancel_event and cancel_event.is_set():
-                    logger.info("PDF压缩被取消，终止进程")
-                    process.terminate()
-                    process.join(timeout=5)  # 等待5秒让进程优雅退出
-                    if process.is_alive():
-                        process.kill()  # 强制杀死进程
-                    return False
-                time.sleep(0.1)  # 短暂等待
-            
-            process.join()  # 确保进程完全结束
-            
-            if process.exitcode == 0:
+            # 在独立进程中执行压缩（不受进程池内存上限限制），避免阻塞其他翻译任务
+            if get_pdf_compute().run_isolated(_compress_pdf_in_process, input_pdf_path, output_pdf_path, cancel_event=cancel_event):
                 logger.info("PDF压缩完成")
                 return True
-            else:
-                logger.error(f"PDF压缩进程失败，退出码: {process.exitcode}")
-                return False
+            logger.error("PDF压缩进程失败")
+            return False
             
+        except PDFComputeCancelled:
+            logger.info("PDF压缩被取消")
+            return False
         except Exception as e:
             logger.error(f"PDF压缩失败: {e}")
             return False
@@ -1101,7 +1078,7 @@ class LargePDFTranslator:
     
     def merge_translated_pdfs(self, batch_results, output_path, cancel_event=None, trans=None):
         """
-        合并所有翻译后的PDF（使用独立进程执行，避免阻塞其他任务）
+        合并所有翻译后的PDF（在单独的进程中执行，避免阻塞其他任务，取消或超时时终止该进程）
         优化：添加进度反馈、超时机制和真正的流式合并
         
         Args:
@@ -1124,89 +1101,65 @@ class LargePDFTranslator:
             if not successful_batches:
                 raise Exception("没有成功的批次可以合并")
             
-            # 创建进度队列，用于接收合并进度
-            progress_queue = Queue()
-            
-            # 使用独立进程执行合并操作，避免阻塞其他翻译任务
-            process = Process(
-                target=_merge_pdfs_in_process,
-                args=(successful_batches, output_path, self.input_pdf_path, self.temp_dir, progress_queue)
-            )
-            process.start()
-            logger.info(f"PDF合并进程已启动 (PID: {process.pid})")
-            
             # 合并超时时间：根据批次数动态计算，最少5分钟，最多30分钟
             total_batches = len(successful_batches)
             timeout_seconds = max(300, min(1800, total_batches * 30))  # 每个批次最多30秒
-            start_time = time.time()
             
-            # 等待进程完成，同时监控进度和取消事件
-            last_progress = 90.0
-            while process.is_alive():
-                # 检查取消事件
-                if cancel_event and cancel_event.is_set():
-                    logger.info("PDF合并被取消，终止进程")
-                    process.terminate()
-                    process.join(timeout=5)  # 等待5秒让进程优雅退出
-                    if process.is_alive():
-                        process.kill()  # 强制杀死进程
-                    return False
-                
-                # 检查超时
-                elapsed_time = time.time() - start_time
-                if elapsed_time > timeout_seconds:
-                    logger.error(f"PDF合并超时（{elapsed_time:.1f}秒 > {timeout_seconds}秒），终止进程")
-                    process.terminate()
-                    process.join(timeout=5)
-                    if process.is_alive():
-                        process.kill()
-                    raise Exception(f"PDF合并超时（超过{timeout_seconds}秒）")
-                
-                # 尝试获取进度更新（非阻塞）
-                try:
-                    while not progress_queue.empty():
-                        progress = progress_queue.get_nowait()
-                        if progress > last_progress:
-                            last_progress = progress
-                            logger.info(f"📊 PDF合并进度: {progress:.1f}%")
-                            # 更新数据库进度
-                            if trans:
-                                try:
-                                    self.update_progress(trans, progress)
-                                except Exception as e:
-                                    logger.debug(f"更新合并进度失败: {e}")
-                except Exception:
-                    pass  # 队列为空或出错，继续等待
-                
-                time.sleep(0.5)  # 每0.5秒检查一次，减少CPU占用
+            # 合并进程通过队列上报进度，等待期间读取并更新数据库进度
+            progress_queue = get_context('spawn').Queue()
+            progress = {'last': 90.0}
             
-            process.join(timeout=10)  # 确保进程完全结束
+            def _read_progress():
+                progress['last'] = self._drain_merge_progress(progress_queue, progress['last'], trans)
             
-            # 获取最终进度
             try:
-                while not progress_queue.empty():
-                    progress = progress_queue.get_nowait()
-                    last_progress = progress
-            except Exception:
-                pass
-            
-            if process.exitcode == 0:
-                logger.info(f"✅ PDF合并完成: {output_path} (最终进度: {last_progress:.1f}%)")
-                # 确保进度更新为100%
-                if trans and last_progress < 100.0:
-                    try:
-                        self.update_progress(trans, 100.0)
-                    except Exception as e:
-                        logger.debug(f"更新最终进度失败: {e}")
-                return output_path
-            else:
-                logger.error(f"❌ PDF合并进程失败，退出码: {process.exitcode}")
+                # 整份文档的合并可能占用大量内存，不受进程池内存上限限制；取消或超时时终止合并进程
+                get_pdf_compute().run_isolated(
+                    _merge_pdfs_in_process,
+                    successful_batches, output_path, self.input_pdf_path, self.temp_dir, progress_queue,
+                    cancel_event=cancel_event, timeout=timeout_seconds, on_wait=_read_progress
+                )
+            except PDFComputeCancelled:
+                logger.info("PDF合并被取消，已终止合并进程")
                 return False
+            except TimeoutError:
+                logger.error(f"PDF合并超时（超过{timeout_seconds}秒），已终止合并进程")
+                raise Exception(f"PDF合并超时（超过{timeout_seconds}秒）")
+            finally:
+                # 获取最终进度
+                last_progress = self._drain_merge_progress(progress_queue, progress['last'], None)
+                progress_queue.close()
+            
+            logger.info(f"✅ PDF合并完成: {output_path} (最终进度: {last_progress:.1f}%)")
+            # 确保进度更新为100%
+            if trans and last_progress < 100.0:
+                try:
+                    self.update_progress(trans, 100.0)
+                except Exception as e:
+                    logger.debug(f"更新最终进度失败: {e}")
+            return output_path
             
         except Exception as e:
             logger.error(f"PDF合并失败: {e}", exc_info=True)
             return False
     
+    def _drain_merge_progress(self, progress_queue, last_progress, trans):
+        """读取合并进程上报的进度（非阻塞），trans 不为空时更新数据库进度"""
+        try:
+            while not progress_queue.empty():
+                progress = progress_queue.get_nowait()
+                if progress > last_progress:
+                    last_progress = progress
+                    logger.info(f"📊 PDF合并进度: {progress:.1f}%")
+                    if trans:
+                        try:
+                            self.update_progress(trans, progress)
+                        except Exception as e:
+                            logger.debug(f"更新合并进度失败: {e}")
+        except Exception:
+            pass  # 队列为空或出错，继续等待
+        return last_progress
+    
     def _cleanup_temp_files(self, temp_files=None, temp_dir=None):
         """清理临时文件和目录，与小PDF保持一致"""
         logger.info("🧹 开始清理临时文件...")
@@ -1248,10 +1201,9 @@ class LargePDFTranslator:
     def update_progress(self, trans, progress_percentage):
         """更新翻译进度"""
         try:
-            from .to_translate import db
-            db.execute("update translate set process=%s where id=%s", 
-                     str(format(progress_percentage, '.1f')), 
-                     trans['id'])
+            from .task_state import get_task_state
+            # 进度合并写入，避免每个批次都写一次库（100%由完成状态一并写入）
+            get_task_state(trans['id']).set_process(progress_percentage)
             logger.info(f"进度更新: {progress_percentage:.1f}%")
         except Exception as e:
             logger.error(f"更新进度失败: {str(e)}")
@@ -1294,55 +1246,66 @@ class LargePDFTranslator:
             print(f"每个批次进度: {batch_progress_percentage:.1f}%")
             print("=" * 60)
             
-            # 顺序处理每个批次，避免批次间并发
-            batch_results = []
+            # 批次流水线：提取 -> 翻译 -> 生成底稿 -> 回填压缩，多个批次同时处于不同阶段
             start_time = time.time()
-            successful_pages = 0
+            progress_lock = threading.Lock()
+            completed = {'batches': 0}
+            
+            def on_batch_done(result):
+                # 显示进度并更新数据库（合并前最多90%）
+                with progress_lock:
+                    completed['batches'] += 1
+                    completed_batches = completed['batches']
+                batch_progress = min(completed_batches * batch_progress_percentage, 90.0)
+                elapsed_time = time.time() - start_time
+                status = "完成" if result["status"] == "success" else "失败"
+                print(f"{'✅' if status == '完成' else '❌'} 批次 {result['batch_num'] + 1} 处理{status}")
+                print(f"📊 进度计算: {completed_batches} × {batch_progress_percentage:.1f}% = {batch_progress:.1f}% - 已用时: {elapsed_time:.1f}s")
+                self.update_progress(trans, batch_progress)
+            
+            def on_batch_error(batch, stage_name, error):
+                print(f"❌ 批次 {batch['batch_num'] + 1} 处理失败（{stage_name}）: {str(error)}")
+                self._cleanup_batch_files(batch)
+                return {
+                    "batch_num": batch['batch_num'],
+                    "start_page": batch['start_page'],
+                    "end_page": batch['end_page'],
+                    "status": "failed",
+                    "error": str(error)
+                }
             
-            # 逐个处理批次，确保一个批次完全处理完后再处理下一个
+            # 全文档段落池：页眉、页脚等重复文本在整个任务内只翻译一次
+            self.segment_pool = SegmentPool(os.path.join(self.temp_dir, "segments.db"))
+            
+            from app.utils.task_memory import get_task_memory_mb
+            pipeline = BatchPipeline(
+                [
+                    PipelineStage('extract', self._extract_stage),
+                    PipelineStage('translate', lambda batch: self._translate_stage(batch, trans), PIPELINE_TRANSLATE_WORKERS),
+                    PipelineStage('render_base', self._render_base_stage),
+                    PipelineStage('fill', lambda batch: self._fill_stage(batch, trans)),
+                ],
+                queue_size=PIPELINE_QUEUE_SIZE,
+                cancel_event=cancel_event,
+                memory_fn=lambda: get_task_memory_mb(trans.get('id')),
+                memory_limit_mb=PIPELINE_MEMORY_LIMIT_MB,
+                on_result=on_batch_done,
+                on_error=on_batch_error,
+                name=f"large-pdf-{trans.get('id')}",
+            )
+            batches = []
             for batch_num in range(total_batches):
-                # 检查是否已被取消
-                if cancel_event and cancel_event.is_set():
-                    print("翻译任务已被取消，停止处理")
-                    return False
-                
                 start_page = batch_num * self.batch_size
                 end_page = min(start_page + self.batch_size, self.total_pages)
-                
-                print(f"\n🔄 开始处理批次 {batch_num + 1}/{total_batches} (第{start_page + 1}-{end_page}页)")
-                print("=" * 60)
-                
-                try:
-                    # 处理当前批次
-                    batch_result = self.process_single_batch(
-                        batch_num, 
-                        start_page, 
-                        end_page,
-                        trans
-                    )
-                    
-                    if batch_result:
-                        batch_results.append(batch_result)
-                        successful_pages += (end_page - start_page)
-                        print(f"✅ 批次 {batch_num + 1} 处理完成")
-                        
-                        # 显示进度并更新数据库（合并前最多90%）
-                        # 使用预先计算的每个批次百分比
-                        completed_batches = len(batch_results)
-                        batch_progress = min(completed_batches * batch_progress_percentage, 90.0)
-                        elapsed_time = time.time() - start_time
-                        
-                        print(f"📊 进度计算: {completed_batches} × {batch_progress_percentage:.1f}% = {batch_progress:.1f}% - 已用时: {elapsed_time:.1f}s")
-                        
-                        # 更新数据库进度
-                        self.update_progress(trans, batch_progress)
-                    else:
-                        print(f"❌ 批次 {batch_num + 1} 处理失败")
-                        
-                except Exception as e:
-                    print(f"❌ 批次 {batch_num + 1} 处理出错: {str(e)}")
-                    logger.error(f"批次 {batch_num + 1} 处理出错: {str(e)}")
-                    continue
+                batches.append((batch_num, {"batch_num": batch_num, "start_page": start_page, "end_page": end_page}))
+            
+            # 结果按批次号排序，与串行处理的输出顺序一致
+            batch_results = pipeline.run(batches)
+            self._report_pipeline_stats(pipeline, trans)
+            
+            if cancel_event and cancel_event.is_set():
+                print("翻译任务已被取消，停止处理")
+                return False
             
             # 合并所有翻译后的PDF
             print(f"\n🔄 合并所有翻译后的PDF...")
@@ -1400,6 +1363,9 @@ class LargePDFTranslator:
             # 清理资源
             if self.doc:
                 self.doc.close()
+            if self.segment_pool is not None:
+                self.segment_pool.close()
+                self.segment_pool = None
             
             # 内存优化：翻译完成后彻底清理所有数据结构
             try:
@@ -1419,6 +1385,107 @@ class LargePDFTranslator:
             except Exception as cleanup_error:
                 logger.warning(f"清理翻译完成后的内存时出错: {cleanup_error}")
     
+    def _compute(self, method_name, *args):
+        """在PDF计算进程池中执行PyMuPDF操作（worker按路径打开文档），各批次可在多个CPU核上并行"""
+        return get_pdf_compute().run(_run_translator_job, self.input_pdf_path, self.temp_dir, method_name, args)
+    
+    def _extract_stage(self, batch):
+        """流水线阶段：提取文本（没有文本时返回 None，跳过该批次）"""
+        start_page, end_page = batch["start_page"], batch["end_page"]
+        print(f"📄 提取第{start_page+1}-{end_page}页文本...")
+        # 各阶段之间只传文本层文件路径，worker 与翻译线程按页读取，不在进程间传递整批文本
+        batch["extracted_path"] = os.path.join(self.temp_dir, f"batch_{batch['batch_num']}_extracted.layer")
+        if not self._compute("extract_texts_from_pages", start_page, end_page, batch["extracted_path"]):
+            print(f"⚠️ 第{start_page+1}-{end_page}页没有提取到文本")
+            self._cleanup_batch_files(batch)
+            return None
+        return batch
+    
+    def _translate_stage(self, batch, trans):
+        """流水线阶段：翻译文本"""
+        print(f"🔄 开始翻译第{batch['start_page']+1}-{batch['end_page']}页...")
+        translated_path = os.path.join(self.temp_dir, f"batch_{batch['batch_num']}_translated.layer")
+        with TextLayerReader(batch["extracted_path"]) as extracted_texts:
+            batch["translated_path"] = self.translate_texts_batch(extracted_texts, trans, translated_path)
+        self._remove_file(batch.pop("extracted_path"))
+        return batch
+    
+    def _render_base_stage(self, batch):
+        """流水线阶段：生成无文本底稿PDF"""
+        batch_num = batch["batch_num"]
+        no_text_pdf_path = os.path.join(self.temp_dir, f"batch_{batch_num}_no_text.pdf")
+        batch["no_text_pdf_path"] = no_text_pdf_path
+        logger.info(f"[batch_{batch_num}] 开始创建附加文本PDF...")
+        if not self._compute("create_no_text_pdf", batch["start_page"], batch["end_page"], no_text_pdf_path):
+            raise Exception("创建无文本PDF失败")
+        return batch
+    
+    def _fill_stage(self, batch, trans):
+        """流水线阶段：填充翻译文本 -> 压缩 -> 删除中间文件，返回批次结果"""
+        batch_num = batch["batch_num"]
+        batch_output_path = os.path.join(self.temp_dir, f"batch_{batch_num}_translated.pdf")
+        batch["batch_output_path"] = batch_output_path
+        print(f"📝 生成翻译后的PDF: {batch_output_path}")
+        
+        if not self._compute("fill_translated_texts_to_pdf", batch["translated_path"], batch["no_text_pdf_path"], batch_output_path):
+            raise Exception("填充翻译文本失败")
+        logger.info(f"[batch_{batch_num}] 翻译文本填充完成")
+        
+        # 压缩PDF
+        compressed_path = batch_output_path.replace('.pdf', '_compressed.pdf')
+        print(f"🗜️ 压缩PDF: {compressed_path}")
+        self.compress_pdf(batch_output_path, compressed_path, trans.get('cancel_event'))
+        
+        # 删除未压缩的临时文件和无文本PDF，只保留压缩文件
+        self._cleanup_batch_files(batch)
+        
+        import gc
+        gc.collect()
+        print(f"✅ 批次 {batch_num + 1} 处理完成: {compressed_path}")
+        
+        return {
+            "batch_num": batch_num,
+            "start_page": batch["start_page"],
+            "end_page": batch["end_page"],
+            "translated_pdf_path": compressed_path,  # 使用与big_pdf_trans一致的字段名
+            "status": "success"
+        }
+    
+    def _cleanup_batch_files(self, batch):
+        """删除批次的中间文件（文本层文件、无文本PDF、未压缩的翻译PDF）"""
+        for key in ("extracted_path", "translated_path", "batch_output_path", "no_text_pdf_path"):
+            self._remove_file(batch.pop(key, None))
+    
+    def _remove_file(self, path):
+        if path and os.path.exists(path):
+            try:
+                os.remove(path)
+                logger.debug(f"已删除中间文件: {path}")
+            except Exception as e:
+                logger.warning(f"删除中间文件失败: {path} - {e}")
+    
+    def _report_pipeline_stats(self, pipeline, trans):
+        """输出流水线各阶段的利用率，并写入耗时日志"""
+        stats = pipeline.get_stats()
+        print("📊 流水线阶段利用率:")
+        for stage in stats['stages']:
+            print(f"   {stage['name']}: {stage['utilization'] * 100:.1f}% "
+                  f"(线程 {stage['workers']}, 批次 {stage['processed']}, 失败 {stage['failed']}, 忙碌 {stage['busy_seconds']:.1f}s)")
+        if stats['memory_waits']:
+            print(f"   内存背压等待: {stats['memory_waits']} 次")
+        pool_stats = self.segment_pool.stats() if self.segment_pool is not None else {}
+        if pool_stats:
+            print(f"   段落池: 翻译 {pool_stats['stored']} 个唯一文本，复用 {pool_stats['hits']} 次，等待其他批次 {pool_stats['waits']} 次")
+        try:
+            from .to_translate import _log_timing
+            extra = {f"{stage['name']}_util": stage['utilization'] for stage in stats['stages']}
+            extra['memory_waits'] = stats['memory_waits']
+            extra.update({f"pool_{key}": value for key, value in pool_stats.items()})
+            _log_timing("大PDF批次流水线", stats['elapsed'], translate_id=trans.get('id'),
+                        comparison_id=trans.get('comparison_id'), extra=extra)
+        except Exception as e:
+            logger.debug(f"记录流水线耗时失败: {e}")
+    
     def process_single_batch(self, batch_num, start_page, end_page, trans):
         """
         处理单个批次：提取文本 -> 翻译 -> 生成PDF -> 压缩 -> 删除临时文件
@@ -1432,88 +1499,17 @@ class LargePDFTranslator:
         Returns:
             dict: 批次处理结果
         """
+        batch = {"batch_num": batch_num, "start_page": start_page, "end_page": end_page}
         try:
-            print(f"📄 提取第{start_page+1}-{end_page}页文本...")
-            
-            # 1. 提取文本
-            extracted_texts = self.extract_texts_from_pages(start_page, end_page)
-            if not extracted_texts:
-                print(f"⚠️ 第{start_page+1}-{end_page}页没有提取到文本")
+            if self._extract_stage(batch) is None:
                 return None
-            
-            # 2. 翻译文本
-            print(f"🔄 开始翻译第{start_page+1}-{end_page}页...")
-            translated_texts = self.translate_texts_batch(extracted_texts, trans)
-            
-            # 3. 生成翻译后的PDF
-            batch_output_path = os.path.join(self.temp_dir, f"batch_{batch_num}_translated.pdf")
-            print(f"📝 生成翻译后的PDF: {batch_output_path}")
-            
-            # 先创建无文本PDF
-            no_text_pdf_path = os.path.join(self.temp_dir, f"batch_{batch_num}_no_text.pdf")
-            logger.info(f"[batch_{batch_num}] 开始创建附加文本PDF...")
-            if not self.create_no_text_pdf(start_page, end_page, no_text_pdf_path):
-                raise Exception("创建无文本PDF失败")
-            
-            # 创建完成后立即清理内存，避免后续步骤内存不足
-            logger.info(f"[batch_{batch_num}] 无文本PDF创建完成，清理内存...")
-            import gc
-            gc.collect()
-            logger.info(f"[batch_{batch_num}] 内存清理完成，开始填充翻译文本...")
-            
-            # 填充翻译文本
-            if not self.fill_translated_texts_to_pdf(translated_texts, no_text_pdf_path, batch_output_path):
-                raise Exception("填充翻译文本失败")
-            
-            logger.info(f"[batch_{batch_num}] 翻译文本填充完成")
-            
-            # 4. 压缩PDF
-            compressed_path = batch_output_path.replace('.pdf', '_compressed.pdf')
-            print(f"🗜️ 压缩PDF: {compressed_path}")
-            
-            self.compress_pdf(batch_output_path, compressed_path, trans.get('cancel_event'))
-            
-            # 5. 删除未压缩的临时文件，只保留压缩文件
-            if os.path.exists(batch_output_path):
-                os.remove(batch_output_path)
-                print(f"🗑️ 已删除未压缩的临时文件: {batch_output_path}")
-            
-            # 删除无文本PDF文件
-            if os.path.exists(no_text_pdf_path):
-                os.remove(no_text_pdf_path)
-                print(f"🗑️ 已删除无文本PDF文件: {no_text_pdf_path}")
-            
-            # 内存优化：立即清理批次处理中的临时数据
-            try:
-                # 清理文本数据
-                extracted_texts.clear()
-                del extracted_texts
-                translated_texts.clear()
-                del translated_texts
-                
-                # 强制垃圾回收
-                import gc
-                gc.collect()
-                
-                print(f"🧹 批次 {batch_num + 1} 内存已清理")
-            except Exception as cleanup_error:
-                print(f"⚠️ 清理批次内存时出错: {cleanup_error}")
-            
-            print(f"✅ 批次处理完成，保留压缩文件: {compressed_path}")
-            
-            print(f"✅ 批次 {batch_num + 1} 处理完成: {compressed_path}")
-            
-            return {
-                "batch_num": batch_num,
-                "start_page": start_page,
-                "end_page": end_page,
-                "translated_pdf_path": compressed_path,  # 使用与big_pdf_trans一致的字段名
-                "status": "success"
-            }
-            
+            self._translate_stage(batch, trans)
+            self._render_base_stage(batch)
+            return self._fill_stage(batch, trans)
         except Exception as e:
             print(f"❌ 批次 {batch_num + 1} 处理失败: {str(e)}")
             logger.error(f"批次 {batch_num + 1} 处理失败: {str(e)}")
+            self._cleanup_batch_files(batch)
             return {
                 "batch_num": batch_num,
                 "start_page": start_page,
@@ -1521,10 +1517,3 @@ class LargePDFTranslator:
                 "status": "failed",
                 "error": str(e)
             }
-            # 清理临时文件
-            if hasattr(self, 'temp_dir') and os.path.exists(self.temp_dir):
-                try:
-                    shutil.rmtree(self.temp_dir)
-                    logger.info(f"已清理临时目录: {self.temp_dir}")
-                except Exception as e:
-                    logger.warning(f"清理临时目录失败: {e}")
@@ -50,10 +50,11 @@ def main():
     if not lang_value:
         logging.error(f"翻译记录中lang字段缺失或为空: uuid={uuid}, trans={trans}")
         # 更新任务状态为失败
-        from datetime import datetime
-        import pytz
-        end_time = datetime.now(pytz.timezone('Asia/Shanghai'))
-        db.execute("update translate set status='failed', failed_reason='目标语言参数(lang)缺失或为空', end_at=%s where uuid=%s", end_time, uuid)
+        from .task_state import get_task_state, release_task_state, now_shanghai
+        get_task_state(trans['id']).transition(
+            'failed', failed_reason='目标语言参数(lang)缺失或为空', end_at=now_shanghai()
+        )
+        release_task_state(trans['id'])
         sys.exit(1)
     
     translate_id=trans['id']
@@ -2,8 +2,8 @@ import os
 import threading
 from . import to_translate
 from . import common
+from .task_state import get_task_state
 import datetime
-import time
 import re
 
 def start(trans):
@@ -13,8 +13,6 @@ def start(trans):
         max_threads=10
     else:
         max_threads=int(threads)
-    # 当前执行的索引位置
-    run_index=0
     start_time = datetime.datetime.now()
 
     try:
@@ -58,8 +56,6 @@ def start(trans):
     append_text(current_text, texts, False)
     # print(texts);
     # exit()
-    max_run=max_threads if len(texts)>max_threads else len(texts)
-    before_active_count=threading.activeCount()
     event=threading.Event()
     
     # 进度更新相关变量
@@ -75,70 +71,15 @@ def start(trans):
             progress_percentage = min((completed_count / total_count) * 100, 100.0)
             print(f"翻译进度: {completed_count}/{total_count} ({progress_percentage:.1f}%)")
             
-            # 更新数据库进度
+            # 更新数据库进度（合并写入，完成状态由 to_translate.complete 统一写入）
             try:
-                from .to_translate import db
-                db.execute("update translate set process=%s where id=%s", 
-                         str(format(progress_percentage, '.1f')), 
-                         trans['id'])
-                
-                # 如果进度达到100%，立即更新状态为已完成
-                if progress_percentage >= 100.0:
-                    from datetime import datetime
-                    import pytz
-                    end_time = datetime.now(pytz.timezone('Asia/Shanghai'))
-                    db.execute(
-                        "update translate set status='done',end_at=%s,process=100 where id=%s",
-                        end_time, trans['id']
-                    )
-                    # 翻译成功日志已关闭（调试时可打开）
-                    # print("✅ 翻译完成，状态已更新为已完成")
-                    
+                get_task_state(trans['id']).set_process(progress_percentage)
             except Exception as e:
                 print(f"更新进度失败: {str(e)}")
     
-    while run_index<=len(texts)-1:
-        if threading.activeCount()<max_run+before_active_count:
-            if not event.is_set():
-                thread = threading.Thread(target=to_translate.get, args=(trans, event, texts, run_index))
-                thread.start()
-                run_index+=1
-            else:
-                return False
-    
-    # 等待翻译完成，并监控进度
-    last_completed_count = 0
-    while True:
-        complete=True
-        current_completed = 0
-        for text in texts:
-            if not text['complete']:
-                complete=False
-            else:
-                current_completed += 1
-        
-        # 检查是否有新的文本完成
-        if current_completed > last_completed_count:
-            completed_count = current_completed
-            progress_percentage = min((completed_count / total_count) * 100, 100.0)
-            print(f"翻译进度: {completed_count}/{total_count} ({progress_percentage:.1f}%)")
-            
-            # 更新数据库进度
-            try:
-                from .to_translate import db
-                db.execute("update translate set process=%s where id=%s", 
-                         str(format(progress_percentage, '.1f')), 
-                         trans['id'])
-                
-            except Exception as e:
-                print(f"更新进度失败: {str(e)}")
-            
-            last_completed_count = current_completed
-        
-        if complete:
-            break
-        else:
-            time.sleep(1)
+    # 段落提交到进程级翻译线程池，等待全部完成
+    if not to_translate.translate_segments(trans, event, texts, max_threads):
+        return False
 
     text_count=0
     # print(texts)
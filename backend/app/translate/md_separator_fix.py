@@ -1,10 +1,10 @@
 import os
 import threading
 import datetime
-import time
 import re
 from . import to_translate
 from . import common
+from .task_state import get_task_state
 
 def start(trans):
     """专门修复表格分隔行的markdown翻译函数"""
@@ -15,7 +15,6 @@ def start(trans):
     else:
         max_threads = int(threads)
     
-    run_index = 0
     start_time = datetime.datetime.now()
 
     try:
@@ -57,8 +56,6 @@ def start(trans):
             append_text(element['content'], texts, False, element, preserve=True)
 
     # 多线程翻译处理
-    max_run = max_threads if len(texts) > max_threads else len(texts)
-    before_active_count = threading.activeCount()
     event = threading.Event()
     
     # 进度更新相关变量
@@ -74,48 +71,15 @@ def start(trans):
             progress_percentage = min((completed_count / total_count) * 100, 100.0)
             print(f"翻译进度: {completed_count}/{total_count} ({progress_percentage:.1f}%)")
             
-            # 更新数据库进度
+            # 更新数据库进度（合并写入，完成状态由 to_translate.complete 统一写入）
             try:
-                from .to_translate import db
-                db.execute("update translate set process=%s where id=%s", 
-                         str(format(progress_percentage, '.1f')), 
-                         trans['id'])
-                
-                if progress_percentage >= 100.0:
-                    from datetime import datetime
-                    import pytz
-                    end_time = datetime.now(pytz.timezone('Asia/Shanghai'))
-                    db.execute(
-                        "update translate set status='done',end_at=%s,process=100 where id=%s",
-                        end_time, trans['id']
-                    )
-                    # 翻译成功日志已关闭（调试时可打开）
-                    # print("✅ 翻译完成，状态已更新为已完成")
-                    
+                get_task_state(trans['id']).set_process(progress_percentage)
             except Exception as e:
                 print(f"更新进度失败: {str(e)}")
     
-    # 启动翻译线程
-    while run_index <= len(texts) - 1:
-        if threading.activeCount() < max_run + before_active_count:
-            if not event.is_set():
-                thread = threading.Thread(target=to_translate.get, args=(trans, event, texts, run_index))
-                thread.start()
-                run_index += 1
-            else:
-                return False
-    
-    # 等待翻译完成
-    while True:
-        complete = True
-        for text in texts:
-            if not text['complete']:
-                complete = False
-                break
-        if complete:
-            break
-        else:
-            time.sleep(1)
+    # 段落提交到进程级翻译线程池，等待全部完成
+    if not to_translate.translate_segments(trans, event, texts, max_threads):
+        return False
 
     # 将翻译结果写入文件，保持原有结构
     try:
@@ -9,24 +9,28 @@ from docx import Document
 from docx.oxml.ns import qn
 from . import to_translate
 from . import common
+from .task_state import get_task_state, release_task_state, now_shanghai
+from ..utils.task_memory import mark_phase
 import zipfile
 import xml.etree.ElementTree as ET
 from threading import Lock
 import re
 import shutil
 import fitz
-import json
 import logging
 import pathlib
 from app.utils.pymupdf_queue import (
-    safe_fitz_open, safe_fitz_close, safe_fitz_save, 
+    safe_fitz_save, 
     safe_fitz_new_document, safe_fitz_insert_pdf,
     safe_fitz_get_text_blocks, safe_fitz_insert_text,
     safe_fitz_insert_textbox, safe_fitz_new_rect,
-    PyMuPDFContext
+    safe_fitz_page_count, PyMuPDFContext
 )
 
 from ..utils.doc2x import Doc2XService
+from .bbox_index import BBoxIndex, OtherBBoxes
+from .font_metrics import fit_font_size
+from .text_layer import TextLayerReader, TextLayerWriter
 
 # 配置日志记录器
 logger = logging.getLogger(__name__)
@@ -258,8 +262,7 @@ def start_doc2x_pdf_translation(trans):
         
         # 立即更新任务状态为"changing"，设置PDF转换初始进度0%
         try:
-            from .to_translate import db
-            db.execute("update translate set status='changing', process='0' where id=%s", trans['id'])
+            get_task_state(trans['id']).transition('changing', process=0)
             print("✅ 已更新任务状态为changing，进度0%（开始PDF转换）")
         except Exception as e:
             print(f"⚠️  更新任务状态失败: {str(e)}")
@@ -331,9 +334,8 @@ def start_doc2x_pdf_translation(trans):
             
             # Doc2X任务启动成功，设置为changing状态
             try:
-                from .to_translate import db
                 print(f"🔍 准备更新任务状态: 任务ID={trans['id']}, 新状态=changing, 新进度=0")
-                result = db.execute("update translate set status='changing', process='0' where id=%s", trans['id'])
+                result = get_task_state(trans['id']).transition('changing', process=0)
                 print(f"🔍 数据库更新结果: {result}")
                 print("✅ 已更新任务状态为changing，进度0%（Doc2X任务启动成功）")
             except Exception as e:
@@ -380,7 +382,7 @@ def start_doc2x_pdf_translation(trans):
                 # 实时更新数据库进度
                 try:
                     print(f"🔍 准备更新进度: 任务ID={trans['id']}, 新进度={simulated_progress}%")
-                    result = db.execute("update translate set process=%s where id=%s", str(simulated_progress), trans['id'])
+                    result = get_task_state(trans['id']).set_process(simulated_progress)
                     print(f"🔍 进度更新结果: {result}")
                     print(f"✅ 已更新进度为 {simulated_progress}%")
                 except Exception as e:
@@ -406,8 +408,7 @@ def start_doc2x_pdf_translation(trans):
         # 开始导出阶段，进度设为95%（changing状态下的进度）
         print("📤 开始导出阶段")
         try:
-            from .to_translate import db
-            db.execute("update translate set process='95' where id=%s", trans['id'])
+            get_task_state(trans['id']).set_process(95)
             print("✅ 已更新进度为95%（开始导出）")
         except Exception as e:
             print("⚠️  更新进度失败: " + str(e))
@@ -432,7 +433,7 @@ def start_doc2x_pdf_translation(trans):
         # 开始下载阶段，进度设为98%（changing状态下的进度）
         print("📥 开始下载阶段")
         try:
-            db.execute("update translate set process='98' where id=%s", trans['id'])
+            get_task_state(trans['id']).set_process(98)
             print("✅ 已更新进度为98%（开始下载）")
         except Exception as e:
             print("⚠️  更新进度失败: " + str(e))
@@ -453,7 +454,7 @@ def start_doc2x_pdf_translation(trans):
             
             # 下载完成，进度设为100%（changing状态下的进度）
             try:
-                db.execute("update translate set process='100' where id=%s", trans['id'])
+                get_task_state(trans['id']).set_process(100)
                 print("✅ 已更新进度为100%（下载完成）")
             except Exception as e:
                 print("⚠️  更新进度失败: " + str(e))
@@ -461,7 +462,7 @@ def start_doc2x_pdf_translation(trans):
             # Doc2X所有阶段完成，切换到process状态开始翻译
             try:
                 print(f"🔍 准备切换到process状态: 任务ID={trans['id']}, 新状态=process, 新进度=0")
-                result = db.execute("update translate set status='process', process='0' where id=%s", trans['id'])
+                result = get_task_state(trans['id']).transition('process', process=0)
                 print(f"🔍 状态切换结果: {result}")
                 print("✅ 已更新状态为process，进度0%（Doc2X全部完成，开始翻译）")
             except Exception as e:
@@ -604,7 +605,7 @@ def start_doc2x_pdf_translation(trans):
                     
                     # 更新进度为100%（翻译完成）
                     try:
-                        db.execute("update translate set process='100' where id=%s", trans['id'])
+                        get_task_state(trans['id']).set_process(100)
                         # 翻译成功日志已关闭（调试时可打开）
                         # print("✅ 已更新进度为100%（翻译完成）")
                     except Exception as e:
@@ -636,6 +637,7 @@ def start_doc2x_pdf_translation(trans):
         print("应用了 " + str(text_count) + " 个翻译结果")
 
         # 保存文档
+        mark_phase(trans['id'], 'save')
         try:
             document.save(target_file)
             print("翻译后的文档保存成功: " + target_file)
@@ -652,7 +654,7 @@ def start_doc2x_pdf_translation(trans):
         
         # 更新进度为100%（传统方法翻译完成）
         try:
-            db.execute("update translate set process='100' where id=%s", trans['id'])
+            get_task_state(trans['id']).set_process(100)
             # 翻译成功日志已关闭（调试时可打开）
             # print("✅ 已更新进度为100%（传统方法翻译完成）")
         except Exception as e:
@@ -1081,8 +1083,6 @@ def run_translation(trans, texts, max_threads=40):
     else:
         event = threading.Event()
         print("创建新的取消事件")
-    run_index = 0
-    active_count = threading.activeCount()
     
     # 进度更新相关变量
     completed_count = 0
@@ -1097,65 +1097,16 @@ def run_translation(trans, texts, max_threads=40):
             progress_percentage = min((completed_count / total_count) * 100, 100.0)
             print(f"翻译进度: {completed_count}/{total_count} ({progress_percentage:.1f}%)")
             
-            # 更新数据库进度
+            # 更新数据库进度（合并写入）
             try:
-                from .to_translate import db
-                db.execute("update translate set process=%s where id=%s", 
-                         str(format(progress_percentage, '.1f')), 
-                         trans['id'])
-                
+                get_task_state(trans['id']).set_process(progress_percentage)
             except Exception as e:
                 print(f"更新进度失败: {str(e)}")
 
     print(f"开始翻译 {len(texts)} 个文本片段")
 
-    while run_index < len(texts):
-        if threading.activeCount() < max_threads + active_count and not event.is_set():
-            thread = threading.Thread(
-                target=to_translate.get,
-                args=(trans, event, texts, run_index)
-            )
-            thread.start()
-            print(f"启动翻译线程 {run_index}")
-            run_index += 1
-        time.sleep(0.1)
-
-    # 等待翻译完成，并监控进度
-    last_completed_count = 0
-    while not all(t.get('complete') for t in texts) and not event.is_set():
-        # 检查暂停事件
-        from app.utils.task_manager import get_task_pause_event
-        pause_event = get_task_pause_event(trans['id'])
-        if pause_event and pause_event.is_set():
-            print(f"任务 {trans['id']} 已被暂停，等待恢复...")
-            while pause_event.is_set():
-                time.sleep(0.1)
-                if event.is_set():
-                    print(f"任务 {trans['id']} 在暂停期间被取消")
-                    return
-            print(f"任务 {trans['id']} 已恢复")
-        
-        # 检查完成的文本数量
-        current_completed = sum(1 for t in texts if t.get('complete', False))
-        if current_completed > last_completed_count:
-            # 有新的文本完成，更新进度
-            completed_count = current_completed
-            progress_percentage = min((completed_count / total_count) * 100, 100.0)
-            print(f"翻译进度: {completed_count}/{total_count} ({progress_percentage:.1f}%)")
-            
-            # 更新数据库进度
-            try:
-                from .to_translate import db
-                db.execute("update translate set process=%s where id=%s", 
-                         str(format(progress_percentage, '.1f')), 
-                         trans['id'])
-                
-            except Exception as e:
-                print(f"更新进度失败: {str(e)}")
-            
-            last_completed_count = current_completed
-        
-        time.sleep(1)
+    # 段落提交到进程级翻译线程池，等待全部完成（暂停时翻译线程在 get 中阻塞）
+    to_translate.translate_segments(trans, event, texts, max_threads)
 
     # 翻译成功日志已关闭（调试时可打开）
     # print("所有翻译任务已完成")
@@ -1347,8 +1298,7 @@ def start_direct_pdf_translation(trans):
         
         # 更新任务状态为处理中，但不设置初始进度
         try:
-            from .to_translate import db
-            db.execute("update translate set status='process', process='0' where id=%s", trans['id'])
+            get_task_state(trans['id']).transition('process', process=0)
             print("✅ 已更新任务状态为process，进度0%（开始PDF处理）")
         except Exception as e:
             print(f"⚠️ 更新任务状态失败: {str(e)}")
@@ -1379,14 +1329,14 @@ def start_direct_pdf_translation(trans):
                 logger.warning(f"📚 术语库预加载失败: {comparison_id}")
             _log_pdf_timing("术语库预加载(PDF)", time.time() - preload_start, translate_id=translate_id, comparison_id=comparison_id)
         
-        # 检测PDF页数，决定使用哪种翻译方法
+        # 检测PDF页数，决定使用哪种翻译方法（优先使用上传时探测的页数）
         try:
             page_detect_start = time.time()
-            with PyMuPDFContext("检测PDF页数"):
-                doc = safe_fitz_open(str(original_path))
-                total_pages = doc.page_count
-                safe_fitz_close(doc)
-                print(f"📄 PDF总页数: {total_pages}")
+            total_pages = trans.get('page_count')
+            if total_pages is None:
+                with PyMuPDFContext("检测PDF页数"):
+                    total_pages = safe_fitz_page_count(str(original_path))
+            print(f"📄 PDF总页数: {total_pages}")
             _log_pdf_timing("检测PDF页数", time.time() - page_detect_start, translate_id=translate_id, comparison_id=comparison_id, extra={"pages": total_pages})
             
             if total_pages > 25:
@@ -1451,12 +1401,10 @@ def start_small_pdf_translation(trans):
             # 翻译成功日志已关闭（调试时可打开）
             # print(f"✅ 小文件PDF翻译完成: {result_file}")
             
-            # 更新任务状态为完成
+            # 更新任务状态为完成（与未写入的进度合并为一条UPDATE）
             try:
-                from .to_translate import db
-                import pytz
-                end_time = datetime.datetime.now(pytz.timezone('Asia/Shanghai'))
-                db.execute("update translate set status='done', process='100', end_at=%s where id=%s", end_time, trans['id'])
+                get_task_state(trans['id']).transition('done', process=100, end_at=now_shanghai())
+                release_task_state(trans['id'])
                 print("✅ 已更新任务状态为done，进度100%")
             except Exception as e:
                 print(f"⚠️ 更新任务状态失败: {str(e)}")
@@ -1519,12 +1467,10 @@ def start_large_pdf_translation(trans, total_pages):
             # 翻译成功日志已关闭（调试时可打开）
             # print(f"✅ 大文件PDF翻译完成: {result_file}")
             
-            # 更新任务状态为完成
+            # 更新任务状态为完成（与未写入的进度合并为一条UPDATE）
             try:
-                from .to_translate import db
-                import pytz
-                end_time = datetime.datetime.now(pytz.timezone('Asia/Shanghai'))
-                db.execute("update translate set status='done', process='100', end_at=%s where id=%s", end_time, trans['id'])
+                get_task_state(trans['id']).transition('done', process=100, end_at=now_shanghai())
+                release_task_state(trans['id'])
                 print("✅ 已更新任务状态为done，进度100%")
             except Exception as e:
                 print(f"⚠️ 更新任务状态失败: {str(e)}")
@@ -1552,6 +1498,126 @@ def start_large_pdf_translation(trans, total_pages):
         return False
 
 
+SPLIT_PARALLEL_MIN_PAGES = 16  # 页数达到该值且PDF计算进程池多于1个进程时按页段并行拆分
+SPLIT_CHUNK_PAGES = 8  # 并行拆分时每段的页数
+SEGMENT_MODES = ('span', 'line', 'block')  # 直接PDF翻译的分段粒度（任务字段 pdf_segment_mode）
+_CJK_PATTERN = re.compile(r'[\u3000-\u30ff\u3400-\u9fff\uac00-\ud7af\uff00-\uffef]')
+
+
+def _split_pdf_pages(input_pdf_path, start_page, end_page, output_path):
+    """
+    提取页面文本并在文档副本上原地删除文本（每页只解析一次，提取的span同时作为删除区域），
+    删除方式与原来相同：逐个span添加删除注释，按默认方式应用（图片和矢量图形中被文字覆盖的部分一并处理）；
+    处理后的页面保存到 output_path；可在PDF计算进程中执行（按路径打开文档）
+
+    Returns:
+        list: 页面文本数据 [{'page_number', 'texts': [{'text', 'bbox', 'size', 'color', 'font', 'block', 'line'}]}]
+    """
+    doc = fitz.open(input_pdf_path)
+    try:
+        end_page = min(end_page, doc.page_count)
+        extracted_texts = []
+        for page_num in range(start_page, end_page):
+            page = doc[page_num]
+            page_texts = []
+            for block_no, block in enumerate(page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)["blocks"]):
+                for line_no, line in enumerate(block.get("lines", ())):
+                    for span in line["spans"]:
+                        text = span["text"].strip()
+                        if not text:
+                            continue
+                        page_texts.append({
+                            "text": text,
+                            "bbox": span["bbox"],
+                            "size": span["size"],
+                            "color": span["color"],
+                            "font": span["font"],
+                            "block": block_no,  # 页内文本块序号，按行/块分段时使用
+                            "line": line_no  # 块内行序号
+                        })
+                        try:
+                            # 逐个span删除，不填充避免白色遮挡
+                            page.add_redact_annot(span["bbox"], fill=None)
+                        except Exception as e:
+                            logging.warning(f"删除文本失败: {e}")
+                            # 如果失败，尝试用透明填充
+                            try:
+                                page.add_redact_annot(span["bbox"], fill=(0, 0, 0, 0))
+                            except Exception as e2:
+                                logging.warning(f"透明填充也失败: {e2}")
+            if page_texts:
+                try:
+                    page.apply_redactions()
+                except Exception as e:
+                    logging.warning(f"第 {page_num + 1} 页应用删除操作失败: {e}")
+            extracted_texts.append({"page_number": page_num, "texts": page_texts})
+        
+        if start_page > 0 or end_page < doc.page_count:
+            doc.select(list(range(start_page, end_page)))
+        # 删除文本后旧的内容流不再被引用，保存时回收
+        doc.save(output_path, garbage=3, deflate=True)
+        return extracted_texts
+    finally:
+        doc.close()
+
+
+def _join_segment_texts(parts):
+    """
+    拼接同一行/块内的span文本：
+    中日韩文字之间直接拼接，其他文字之间加空格；行尾连字符与下一行小写字母开头的单词合并
+    """
+    result = ""
+    for part in parts:
+        if not result:
+            result = part
+        elif result.endswith("-") and part[:1].islower():
+            result = result[:-1] + part
+        elif _CJK_PATTERN.match(result[-1]) or _CJK_PATTERN.match(part[0]):
+            result += part
+        else:
+            result += " " + part
+    return result
+
+
+def _group_page_texts(page_texts, mode):
+    """
+    按分段粒度把一页的span分组
+
+    Returns:
+        list: 每组为 page_texts 中的序号列表（按原顺序）；span 粒度或缺少行/块信息的span单独成组
+    """
+    groups = {}
+    for idx, text_info in enumerate(page_texts):
+        if not text_info.get("text", "").strip():
+            continue
+        if mode == 'block' and "block" in text_info:
+            key = ("block", text_info["block"])
+        elif mode == 'line' and "line" in text_info:
+            key = ("line", text_info["block"], text_info["line"])
+        else:
+            key = ("span", idx)
+        groups.setdefault(key, []).append(idx)
+    return list(groups.values())
+
+
+def _merge_segment_infos(infos):
+    """
+    合并一组span为一个回填单元：矩形取外接矩形，字号、颜色、字体取文字最多的span，
+    回填时译文在该矩形内重新排版
+    """
+    main = max(infos, key=lambda info: len(info["text"]))
+    rect = fitz.Rect()
+    for info in infos:
+        rect |= info["bbox"]
+    return {
+        "bbox": [rect.x0, rect.y0, rect.x1, rect.y1],
+        "size": main["size"],
+        "color": main["color"],
+        "font": main["font"],
+        "spans": len(infos),
+    }
+
+
 class DirectPDFTranslator:
     """
     直接PDF翻译器 - 支持中文字符显示，保持原始样式，无背景覆盖
@@ -1571,29 +1637,23 @@ class DirectPDFTranslator:
         
         Args:
             textbox: 要检查的文本框Rect对象
-            other_bboxes: 其他文本框的边界列表 [[x0, y0, x1, y1], ...]
+            other_bboxes: 其他文本框（BBoxIndex.excluding() 或边界列表 [[x0, y0, x1, y1], ...]）
             min_gap: 最小间距（像素），默认2.0
         
         Returns:
             bool: True表示有重叠，False表示无重叠
         """
         try:
-            for other_bbox in other_bboxes:
-                other_rect = fitz.Rect(other_bbox[0], other_bbox[1], other_bbox[2], other_bbox[3])
-                # 检查是否有重叠（包括最小间距）
-                if textbox.intersects(other_rect):
-                    # 计算重叠区域
-                    intersection = textbox & other_rect
-                    if intersection.width > min_gap and intersection.height > min_gap:
-                        return True
-            return False
+            if not isinstance(other_bboxes, OtherBBoxes):
+                other_bboxes = BBoxIndex(other_bboxes).excluding(None)
+            return other_bboxes.overlaps(textbox, min_gap)
         except Exception as e:
             logging.warning(f"检查文本框重叠失败: {e}")
             return False
     
     def _adjust_textbox_for_translation(self, original_text, translated_text, font_size, bbox, box_width, box_height, other_bboxes=None):
         """
-        根据翻译后文本长度调整文本框大小和字体大小，避免与其他文本框重叠
+        根据译文的实际排版尺寸（font_metrics.fit_font_size）调整字体大小和文本框，避免溢出和与其他文本框重叠
         
         Args:
             original_text: 原始文本
@@ -1602,12 +1662,15 @@ class DirectPDFTranslator:
             bbox: 原始文本框边界 [x0, y0, x1, y1]
             box_width: 文本框宽度
             box_height: 文本框高度
-            other_bboxes: 同一页面上其他文本框的边界列表，用于检测重叠
+            other_bboxes: 同一页面上其他文本框（BBoxIndex.excluding() 或边界列表），用于检测重叠
         
         Returns:
             tuple: (调整后的字体大小, 调整后的文本框Rect对象)
         """
         try:
+            if other_bboxes is not None and not isinstance(other_bboxes, OtherBBoxes):
+                other_bboxes = BBoxIndex(other_bboxes).excluding(None)
+            
             # 计算文本长度比例
             original_length = len(original_text.strip()) if original_text else 0
             translated_length = len(translated_text.strip()) if translated_text else 0
@@ -1617,87 +1680,45 @@ class DirectPDFTranslator:
                 return font_size, fitz.Rect(bbox[0], bbox[1], bbox[2], bbox[3])
             
             length_ratio = translated_length / original_length if original_length > 0 else 1.0
+            original_textbox = fitz.Rect(bbox[0], bbox[1], bbox[2], bbox[3])
             
-            # 估算每行字符数（中文字符按字体大小，英文字符按字体大小的0.6倍）
-            chars_per_line = max(1, int(box_width / (font_size * 0.6)))
-            
-            # 策略1: 如果翻译后文本变长，先尝试缩小字体
-            adjusted_font_size = font_size
-            adjusted_height = box_height
+            # 译文明显变短时允许放大字体（不超过原始大小的120%），否则不超过原始大小
+            max_font_size = font_size * 1.2 if length_ratio < 0.8 else font_size
             
-            if length_ratio > 1.2:  # 文本长度增加超过20%
-                # 根据长度比例缩小字体，但不要小于原始大小的60%
-                adjusted_font_size = max(font_size * 0.6, font_size / length_ratio)
-                adjusted_font_size = int(adjusted_font_size)
-                
-                # 重新计算需要的行数
-                new_chars_per_line = max(1, int(box_width / (adjusted_font_size * 0.6)))
-                new_translated_lines = max(1, int(translated_length / new_chars_per_line) + 1)
-                new_line_height = adjusted_font_size * 1.2
-                needed_height = new_translated_lines * new_line_height
-                
-                # 如果缩小字体后还是放不下，适当增加文本框高度
-                if needed_height > box_height:
-                    # 尝试逐步增加高度，检查是否与其他文本框重叠
-                    max_height_increase = box_height * 0.5  # 最多增加50%高度
-                    test_height = min(needed_height, box_height + max_height_increase)
-                    
-                    # 如果有其他文本框信息，检查重叠
-                    if other_bboxes:
-                        test_textbox = fitz.Rect(bbox[0], bbox[1], bbox[2], bbox[1] + test_height)
-                        if self._check_textbox_overlap(test_textbox, other_bboxes):
-                            # 如果会重叠，进一步缩小字体而不是增加高度
-                            # 计算不重叠的最大高度
-                            max_safe_height = box_height
-                            for other_bbox in other_bboxes:
-                                if other_bbox[1] > bbox[1]:  # 只检查下方的文本框
-                                    # 计算到下方文本框的距离
-                                    gap = other_bbox[1] - bbox[3]
-                                    if gap > 0:
-                                        max_safe_height = min(max_safe_height, box_height + gap - 2.0)
-                            
-                            # 如果安全高度不够，进一步缩小字体
-                            if max_safe_height < needed_height:
-                                # 根据需要的行数和安全高度，计算合适的字体大小
-                                safe_lines = max(1, int(max_safe_height / (adjusted_font_size * 1.2)))
-                                if safe_lines < new_translated_lines:
-                                    # 需要进一步缩小字体
-                                    adjusted_font_size = max(font_size * 0.5, adjusted_font_size * (safe_lines / new_translated_lines))
-                                    adjusted_font_size = int(adjusted_font_size)
-                                    adjusted_height = max_safe_height
-                                else:
-                                    adjusted_height = max_safe_height
-                            else:
-                                adjusted_height = test_height
-                        else:
-                            adjusted_height = test_height
-                    else:
-                        # 没有其他文本框信息，保守处理：最多增加30%高度
-                        adjusted_height = min(needed_height, box_height * 1.3)
-                else:
-                    adjusted_height = needed_height
-            elif length_ratio < 0.8:  # 文本长度减少超过20%
-                # 如果文本变短，可以适当增大字体，但不要超过原始大小的120%
-                adjusted_font_size = min(font_size * 1.2, font_size / length_ratio)
-                adjusted_font_size = int(adjusted_font_size)
-            
-            # 创建调整后的文本框
-            # 保持左上角不变，调整右下角
+            # 策略1: 按字体度量求原文本框内能放下的最大字体（不小于原始大小的60%）
+            adjusted_font_size, needed_height, fits = fit_font_size(
+                translated_text, box_width, box_height, max_font_size, font_size * 0.6
+            )
+            if fits:
+                return adjusted_font_size, original_textbox
+            
+            # 策略2: 放不下时向下扩展文本框，最多增加50%高度且不超过下方最近的文本框；
+            # 没有其他文本框信息时保守处理，最多增加30%高度；字体不小于原始大小的50%
+            if other_bboxes:
+                max_height = box_height * 1.5
+                # 只看下方最近的文本框（上边界同时在原文本框上下边界之下）
+                nearest_top = other_bboxes.nearest_top_below(max(bbox[1], bbox[3]))
+                if nearest_top is not None:
+                    max_height = min(max_height, box_height + max(0.0, nearest_top - bbox[3] - 2.0))
+            else:
+                max_height = box_height * 1.3
+            adjusted_font_size, needed_height, fits = fit_font_size(
+                translated_text, box_width, max_height, max_font_size, font_size * 0.5
+            )
             adjusted_textbox = fitz.Rect(
-                bbox[0], 
-                bbox[1], 
-                bbox[2], 
-                bbox[1] + adjusted_height
+                bbox[0],
+                bbox[1],
+                bbox[2],
+                bbox[1] + min(max_height, max(box_height, needed_height))
             )
             
-            # 最后再次检查重叠（如果提供了其他文本框信息）
-            if other_bboxes and self._check_textbox_overlap(adjusted_textbox, other_bboxes):
-                # 如果仍然重叠，使用原始大小，但缩小字体
-                logging.warning(f"调整后的文本框仍会重叠，使用原始大小并缩小字体")
-                adjusted_textbox = fitz.Rect(bbox[0], bbox[1], bbox[2], bbox[3])
-                if length_ratio > 1.2:
-                    adjusted_font_size = max(font_size * 0.5, font_size / length_ratio)
-                    adjusted_font_size = int(adjusted_font_size)
+            # 扩展后与其他文本框重叠（如右侧相邻的文本框）时，使用原始大小并缩小字体
+            if adjusted_textbox.height > box_height and other_bboxes and self._check_textbox_overlap(adjusted_textbox, other_bboxes):
+                logging.warning(f"调整后的文本框会重叠，使用原始大小并缩小字体")
+                adjusted_font_size, _, _ = fit_font_size(
+                    translated_text, box_width, box_height, max_font_size, font_size * 0.5
+                )
+                adjusted_textbox = original_textbox
             
             return adjusted_font_size, adjusted_textbox
             
@@ -1706,105 +1727,35 @@ class DirectPDFTranslator:
             return font_size, fitz.Rect(bbox[0], bbox[1], bbox[2], bbox[3])
     
     def step1_split_pdf(self, output_dir):
-        """步骤1: 拆分PDF为文本JSON和无文本PDF"""
+        """
+        步骤1: 拆分PDF为文本层文件和无文本PDF
+        每页只解析一次文本：提取的span同时作为删除区域，在文档副本上原地删除文本；
+        页数较多时按页段分给PDF计算进程池并行处理，再按页序合并
+        """
         print("=" * 60)
-        print("步骤1: 拆分PDF为文本JSON和无文本PDF")
+        print("步骤1: 拆分PDF为文本层文件和无文本PDF")
         print("=" * 60)
         
         try:
             # 1. 打开PDF
             print("1. 打开PDF...")
             self.doc = fitz.open(self.input_pdf_path)
-            print(f"   打开了 {self.doc.page_count} 页的PDF")
-            
-            # 2. 提取文本信息
-            print("\n2. 提取文本信息...")
-            self.extracted_texts = []
-            
-            for page_num in range(self.doc.page_count):
-                page = self.doc[page_num]
-                print(f"   处理第 {page_num + 1} 页...")
-                
-                # 提取文本块
-                text_blocks = page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)["blocks"]
-                page_texts = []
-                
-                for block in text_blocks:
-                    if "lines" in block:
-                        for line in block["lines"]:
-                            for span in line["spans"]:
-                                text = span["text"].strip()
-                                if text:
-                                    text_info = {
-                                        "text": text,
-                                        "bbox": span["bbox"],
-                                        "size": span["size"],
-                                        "color": span["color"],
-                                        "font": span["font"]
-                                    }
-                                    page_texts.append(text_info)
-                
-                page_data = {
-                    "page_number": page_num,
-                    "texts": page_texts
-                }
-                self.extracted_texts.append(page_data)
-                print(f"   提取了 {len(page_texts)} 个文本块")
-            
-            # 3. 保存提取的文本
-            print("\n3. 保存提取的文本...")
-            extracted_texts_file = os.path.join(output_dir, "extracted_texts.json")
-            with open(extracted_texts_file, 'w', encoding='utf-8') as f:
-                json.dump(self.extracted_texts, f, ensure_ascii=False, indent=2)
-            print(f"✅ 提取的文本已保存到: {extracted_texts_file}")
-            
-            # 4. 创建无文本PDF
-            print("\n4. 创建无文本PDF...")
-            no_text_doc = fitz.open()
-            
-            for page_num in range(self.doc.page_count):
-                page = self.doc[page_num]
-                new_page = no_text_doc.new_page(width=page.rect.width, height=page.rect.height)
-                
-                # 复制页面内容（图片、背景等）
-                new_page.show_pdf_page(page.rect, self.doc, page_num)
-                
-                # 使用精确方法删除所有文本
-                text_blocks = page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)["blocks"]
-                text_count = 0
-                
-                for block in text_blocks:
-                    if "lines" in block:
-                        for line in block["lines"]:
-                            for span in line["spans"]:
-                                bbox = span["bbox"]
-                                text = span["text"].strip()
-                                if text:
-                                    try:
-                                        # 使用add_redact_annot但不填充，避免白色遮挡
-                                        redact_annot = new_page.add_redact_annot(bbox, fill=None)
-                                        text_count += 1
-                                    except Exception as e:
-                                        logging.warning(f"删除文本失败: {e}")
-                                        # 如果失败，尝试用透明填充
-                                        try:
-                                            redact_annot = new_page.add_redact_annot(bbox, fill=(0, 0, 0, 0))
-                                            text_count += 1
-                                        except Exception as e2:
-                                            logging.warning(f"透明填充也失败: {e2}")
-                
-                # 应用删除操作
-                try:
-                    new_page.apply_redactions()
-                    print(f"   第 {page_num + 1} 页删除了 {text_count} 个文本块")
-                except Exception as e:
-                    logging.warning(f"应用删除操作失败: {e}")
-                    print(f"   ⚠️ 第 {page_num + 1} 页应用删除操作失败: {e}")
+            page_count = self.doc.page_count
+            print(f"   打开了 {page_count} 页的PDF")
             
+            # 2. 提取文本并删除原文（单次遍历）
+            print("\n2. 提取文本并创建无文本PDF...")
             no_text_pdf_file = os.path.join(output_dir, "no_text.pdf")
-            no_text_doc.save(no_text_pdf_file)
-            no_text_doc.close()
+            # 提取的文本逐页写入二进制文本层文件（见 text_layer.py），不在内存中保留整份数据
+            extracted_texts_file = os.path.join(output_dir, "extracted_texts.layer")
+            from .pdf_compute import get_service
+            with TextLayerWriter(extracted_texts_file) as writer:
+                if page_count < SPLIT_PARALLEL_MIN_PAGES or get_service().max_workers < 2:
+                    self._write_extracted_pages(writer, _split_pdf_pages(self.input_pdf_path, 0, page_count, no_text_pdf_file))
+                else:
+                    self._split_pdf_parallel(page_count, output_dir, no_text_pdf_file, writer)
             print(f"✅ 无文本PDF已保存到: {no_text_pdf_file}")
+            print(f"✅ 提取的文本已保存到: {extracted_texts_file}")
             
             return extracted_texts_file, no_text_pdf_file
             
@@ -1812,45 +1763,89 @@ class DirectPDFTranslator:
             logging.error(f"拆分PDF时出错: {e}")
             raise
     
+    def _write_extracted_pages(self, writer, extracted_texts):
+        """把一段页面的提取结果写入文本层文件"""
+        for page_data in extracted_texts:
+            writer.add_page(page_data["page_number"], page_data["texts"])
+            print(f"   第 {page_data['page_number'] + 1} 页提取并删除了 {len(page_data['texts'])} 个文本块")
+    
+    def _split_pdf_parallel(self, page_count, output_dir, no_text_pdf_file, writer):
+        """按页段并行拆分，提取结果按页序写入文本层文件，各页段的无文本PDF按页序合并"""
+        from .pdf_compute import get_service
+        service = get_service()
+        ranges = [(start, min(start + SPLIT_CHUNK_PAGES, page_count)) for start in range(0, page_count, SPLIT_CHUNK_PAGES)]
+        part_files = [os.path.join(output_dir, f"no_text_part_{index}.pdf") for index in range(len(ranges))]
+        futures = [
+            service.submit(_split_pdf_pages, self.input_pdf_path, start, end, part_file)
+            for (start, end), part_file in zip(ranges, part_files)
+        ]
+        print(f"   分 {len(ranges)} 段并行处理（每段 {SPLIT_CHUNK_PAGES} 页）")
+        
+        no_text_doc = fitz.open()
+        try:
+            for future, part_file in zip(futures, part_files):
+                self._write_extracted_pages(writer, future.result())
+                part_doc = fitz.open(part_file)
+                try:
+                    no_text_doc.insert_pdf(part_doc)
+                finally:
+                    part_doc.close()
+            no_text_doc.save(no_text_pdf_file, garbage=3, deflate=True)
+        finally:
+            no_text_doc.close()
+            for future in futures:
+                future.cancel()
+            for part_file in part_files:
+                if os.path.exists(part_file):
+                    try:
+                        os.remove(part_file)
+                    except Exception as e:
+                        logging.warning(f"删除页段文件失败: {part_file} - {e}")
+    
     def step2_translate_texts(self, extracted_texts_file, trans, output_dir):
-        """步骤2: 使用多线程翻译JSON中的文本"""
+        """步骤2: 使用多线程翻译文本层文件中的文本"""
         print("\n" + "=" * 60)
-        print("步骤2: 使用多线程翻译JSON中的文本")
+        print("步骤2: 使用多线程翻译文本层文件中的文本")
         print("=" * 60)
         
         try:
-            # 1. 加载提取的文本
-            print("1. 加载提取的文本...")
-            with open(extracted_texts_file, 'r', encoding='utf-8') as f:
-                extracted_texts = json.load(f)
-            
-            print("   加载了 " + str(len(extracted_texts)) + " 页的文本数据")
-            
-            # 2. 准备多线程翻译数据
-            print("\n2. 准备多线程翻译数据...")
+            # 1. 打开提取的文本（按页读取，不整体加载）
+            print("1. 打开提取的文本...")
+            extracted_texts = None
+            extracted_texts = TextLayerReader(extracted_texts_file)
+            print("   共 " + str(len(extracted_texts)) + " 页的文本数据")
+            
+            # 2. 准备多线程翻译数据（按分段粒度把span合并为翻译单元，每个单元一次请求）
+            segment_mode = trans.get('pdf_segment_mode') or 'span'
+            if segment_mode not in SEGMENT_MODES:
+                logging.warning(f"未知的PDF分段粒度 {segment_mode}，使用 span")
+                segment_mode = 'span'
+            print("\n2. 准备多线程翻译数据（分段粒度: " + segment_mode + "）...")
             texts_for_translation = []
-            text_mapping = {}  # 用于映射翻译结果回原始位置
+            page_segments = []  # 每页的 [(span序号列表, 原文, 翻译任务)]，只保存文本，页面数据回填时重新读取
+            span_count = 0
             
             for page_idx, page_data in enumerate(extracted_texts):
-                page_num = page_data["page_number"]
-                for text_idx, text_info in enumerate(page_data["texts"]):
-                    original_text = text_info["text"]
-                    if original_text and original_text.strip():
-                        # 创建翻译任务
-                        translation_task = {
-                            'text': original_text,
-                            'complete': False,
-                            'page_idx': page_idx,
-                            'text_idx': text_idx,
-                            'original_info': text_info
-                        }
-                        texts_for_translation.append(translation_task)
-                        text_mapping[(page_idx, text_idx)] = translation_task
-            
-            print("   准备翻译 " + str(len(texts_for_translation)) + " 个文本片段")
+                segments = []
+                for indices in _group_page_texts(page_data["texts"], segment_mode):
+                    span_count += len(indices)
+                    original_text = _join_segment_texts([page_data["texts"][i]["text"].strip() for i in indices])
+                    # 创建翻译任务
+                    translation_task = {
+                        'text': original_text,
+                        'complete': False,
+                        'page_idx': page_idx,
+                        'text_idx': indices[0]
+                    }
+                    texts_for_translation.append(translation_task)
+                    segments.append((indices, original_text, translation_task))
+                page_segments.append(segments)
+            
+            print("   准备翻译 " + str(len(texts_for_translation)) + " 个文本片段（原始span " + str(span_count) + " 个）")
             
             # 3. 使用多线程翻译
             print("\n3. 开始多线程翻译...")
+            translate_start = time.time()
             if texts_for_translation:
                 # 使用现有的多线程翻译系统
                 run_translation(trans, texts_for_translation, max_threads=40)
@@ -1858,21 +1853,21 @@ class DirectPDFTranslator:
                 # print("   多线程翻译完成")
             else:
                 print("   没有需要翻译的文本")
-            
-            # 4. 重新组织翻译结果
-            print("\n4. 重新组织翻译结果...")
-            translated_texts = []
-            
-            for page_data in extracted_texts:
-                page_num = page_data["page_number"]
-                translated_page_data = {"page_number": page_num, "texts": []}
-                
-                for text_idx, text_info in enumerate(page_data["texts"]):
-                    original_text = text_info["text"]
-                    if original_text and original_text.strip():
+            _log_pdf_timing("直接PDF文本翻译", time.time() - translate_start,
+                            translate_id=trans.get('id'), comparison_id=trans.get('comparison_id'),
+                            extra={"segment_mode": segment_mode, "requests": len(texts_for_translation), "spans": span_count})
+            
+            # 4. 重新组织翻译结果并逐页写入文本层文件（合并的翻译单元回填到外接矩形内）
+            print("\n4. 重新组织并保存翻译结果...")
+            translated_texts_file = os.path.join(output_dir, "translated_texts.layer")
+            with TextLayerWriter(translated_texts_file) as writer:
+                for page_idx, segments in enumerate(page_segments):
+                    page_data = extracted_texts.page(page_idx)
+                    translated_page_texts = []
+                    
+                    for indices, original_text, translation_task in segments:
                         # 获取翻译结果
-                        translation_task = text_mapping.get((extracted_texts.index(page_data), text_idx))
-                        if translation_task and translation_task.get('complete'):
+                        if translation_task.get('complete'):
                             translated_text = translation_task.get('text', original_text)
                             print("   ✅ 翻译: '" + original_text[:20] + "...' -> '" + translated_text[:20] + "...'")
                         else:
@@ -1880,20 +1875,16 @@ class DirectPDFTranslator:
                             print("   ⚠️ 翻译失败，使用原文: '" + original_text[:20] + "...'")
                         
                         # 创建翻译后的文本信息
-                        translated_text_info = text_info.copy()
+                        if len(indices) == 1:
+                            translated_text_info = page_data["texts"][indices[0]]
+                        else:
+                            translated_text_info = _merge_segment_infos([page_data["texts"][i] for i in indices])
                         translated_text_info["text"] = translated_text
                         translated_text_info["original_text"] = original_text
-                        translated_page_data["texts"].append(translated_text_info)
-                    else:
-                        translated_page_data["texts"].append(text_info)
-                
-                translated_texts.append(translated_page_data)
-            
-            # 5. 保存翻译后的文本
-            print("\n5. 保存翻译后的文本...")
-            translated_texts_file = os.path.join(output_dir, "translated_texts.json")
-            with open(translated_texts_file, 'w', encoding='utf-8') as f:
-                json.dump(translated_texts, f, ensure_ascii=False, indent=2)
+                        translated_page_texts.append(translated_text_info)
+                    
+                    writer.add_page(page_data["page_number"], translated_page_texts)
+                    segments.clear()
             print("✅ 翻译后的文本已保存到: " + translated_texts_file)
             
             return translated_texts_file
@@ -1901,6 +1892,9 @@ class DirectPDFTranslator:
         except Exception as e:
             logging.error("翻译文本时出错: " + str(e))
             raise
+        finally:
+            if extracted_texts is not None:
+                extracted_texts.close()
     
     def step3_fill_translated_texts(self, translated_texts_file, no_text_pdf_file, output_file):
         """步骤3: 使用insert_htmlbox回填翻译后的文本"""
@@ -1909,12 +1903,12 @@ class DirectPDFTranslator:
         print("=" * 60)
         
         try:
-            # 1. 加载翻译后的文本
-            print("1. 加载翻译后的文本...")
-            with open(translated_texts_file, 'r', encoding='utf-8') as f:
-                translated_texts = json.load(f)
+            # 1. 打开翻译后的文本（逐页读取）
+            print("1. 打开翻译后的文本...")
+            translated_texts = None
+            translated_texts = TextLayerReader(translated_texts_file)
             
-            print(f"   加载了 {len(translated_texts)} 页的翻译文本数据")
+            print(f"   共 {len(translated_texts)} 页的翻译文本数据")
             
             # 2. 打开无文本PDF
             print("\n2. 打开无文本PDF...")
@@ -1932,6 +1926,7 @@ class DirectPDFTranslator:
                 
                 # 收集当前页面的所有文本框边界，用于重叠检测
                 all_bboxes = [text_info["bbox"] for text_info in page_data["texts"] if text_info.get("text", "").strip()]
+                bbox_index = BBoxIndex(all_bboxes)
                 
                 for text_idx, text_info in enumerate(page_data["texts"]):
                     text = text_info["text"]
@@ -1967,7 +1962,7 @@ class DirectPDFTranslator:
                             box_height = bbox[3] - bbox[1]
                             
                             # 获取其他文本框的边界（排除当前文本框）
-                            other_bboxes = [b for i, b in enumerate(all_bboxes) if i != text_idx]
+                            other_bboxes = bbox_index.excluding(text_idx)
                             
                             # 根据翻译后文本长度调整文本框和字体大小，避免重叠
                             adjusted_font_size, adjusted_textbox = self._adjust_textbox_for_translation(
@@ -2015,6 +2010,8 @@ class DirectPDFTranslator:
             logging.error(f"回填PDF时出错: {e}")
             raise
         finally:
+            if translated_texts is not None:
+                translated_texts.close()
             # 确保PDF文档被正确关闭，防止内存泄漏
             if doc is not None:
                 try:
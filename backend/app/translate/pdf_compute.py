@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""
+PDF计算进程池
+原来的 get_process_pool() 实际创建的是线程池，PyMuPDF 的提取、生成底稿、回填都在Web进程的线程里执行，
+受GIL限制且内存直接计入Web进程；合并和压缩则每次单独启动一个进程。这里提供真正的进程池：
+- 基于 ProcessPoolExecutor（spawn 启动），任务只传文件路径和可序列化的数据，worker 自行打开文档
+- 每个 worker 用 RLIMIT_AS 限制内存（PDF_WORKER_MEMORY_MB，0 表示不限制），超限时该任务失败而不是拖垮Web进程
+- 进程池平均每个 worker 执行 PDF_WORKER_MAX_JOBS 个任务后整体替换（新任务提交到新进程池，旧进程池执行完
+  已提交的任务后退出），释放 MuPDF 的碎片内存。不使用 max_tasks_per_child：Python 3.11 中 worker
+  按该参数退出时进程池会挂起
+- worker 异常退出（如被系统OOM杀掉）导致进程池损坏时，下一次提交会重建进程池
+- 等待结果时响应取消事件：已开始的任务在后台执行完，结果丢弃
+- 整份文档的合并、压缩不进进程池，用 run_isolated 在单独的进程中执行：默认不限制内存
+  （RLIMIT_AS 限制的是虚拟地址空间，大文档合并可能超过进程池的上限），取消或超时时直接终止该进程
+"""
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+MAX_WORKERS = int(os.getenv('PDF_COMPUTE_WORKERS', min(multiprocessing.cpu_count(), 4)))
+WORKER_MEMORY_MB = int(os.getenv('PDF_WORKER_MEMORY_MB', 2048))  # 单个worker的内存上限
+WORKER_MAX_JOBS = int(os.getenv('PDF_WORKER_MAX_JOBS', 20))  # worker执行多少个任务后替换
+ISOLATED_MEMORY_MB = int(os.getenv('PDF_ISOLATED_MEMORY_MB', 0))  # run_isolated 进程的内存上限，0 表示不限制
+WAIT_SECONDS = 0.5  # 等待结果时检查取消的间隔（秒）
+STOP_SECONDS = 5  # 终止进程时等待其退出的时间（秒），超时后强制杀死
+
+
+class PDFComputeCancelled(Exception):
+    """等待结果期间任务被取消"""
+
+
+def _init_worker(memory_mb):
+    """worker 启动时设置内存上限"""
+    if memory_mb <= 0:
+        return
+    try:
+        import resource
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except Exception as e:  # 非Linux平台没有 resource 模块
+        logger.warning(f"设置PDF计算进程内存上限失败: {e}")
+
+
+def _run_isolated_entry(result_queue, memory_mb, fn, args):
+    """run_isolated 进程入口：执行 fn 并通过队列返回结果（异常转成字符串，避免不可序列化）"""
+    _init_worker(memory_mb)
+    try:
+        result_queue.put((True, fn(*args)))
+    except BaseException as e:
+        result_queue.put((False, f"{type(e).__name__}: {e}"))
+
+
+def _stop_process(process):
+    """终止进程，STOP_SECONDS 内未退出时强制杀死"""
+    if process.is_alive():
+        process.terminate()
+        process.join(timeout=STOP_SECONDS)
+    if process.is_alive():
+        process.kill()
+        process.join()
+
+
+class PDFComputeService:
+    """进程级PDF计算进程池"""
+
+    def __init__(self, max_workers=MAX_WORKERS, memory_mb=WORKER_MEMORY_MB, max_jobs=WORKER_MAX_JOBS):
+        self.max_workers = max(1, max_workers)
+        self.memory_mb = memory_mb
+        self.max_jobs = max_jobs
+        self._pool = None
+        self._pid = None
+        self._pool_jobs = 0  # 当前进程池已提交的任务数
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.failed = 0
+        self.restarts = 0
+        self.recycles = 0
+        self.isolated = 0
+        self.killed = 0
+
+    def _get_pool(self):
+        retired = None
+        with self._lock:
+            # 达到任务数后替换进程池
+            if self._pool is not None and self.max_jobs and self._pool_jobs >= self.max_jobs * self.max_workers:
+                retired, self._pool = self._pool, None
+                self.recycles += 1
+            # gunicorn fork 出的子进程不能复用父进程的进程池
+            if self._pool is None or self._pid != os.getpid():
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=(self.memory_mb,),
+                )
+                self._pid = os.getpid()
+                self._pool_jobs = 0
+                logger.info(f"创建PDF计算进程池，最大进程数: {self.max_workers}，"
+                            f"单进程内存上限: {self.memory_mb or '不限'}MB，每进程约 {self.max_jobs} 个任务后替换")
+            self._pool_jobs += 1
+            pool = self._pool
+        if retired is not None:
+            # 已提交的任务继续执行，完成后进程退出
+            retired.shutdown(wait=False)
+        return pool
+
+    def _reset(self, pool):
+        """进程池损坏后丢弃，下次提交时重建"""
+        with self._lock:
+            if self._pool is not pool:
+                return
+            self._pool = None
+            self.restarts += 1
+        try:
+            pool.shutdown(wait=False, cancel_futures=True)
+        except Exception as e:
+            logger.debug(f"关闭损坏的PDF计算进程池失败: {e}")
+
+    def submit(self, fn, *args):
+        """提交任务（fn 必须是模块级函数），返回 Future"""
+        pool = self._get_pool()
+        try:
+            future = pool.submit(fn, *args)
+        except BrokenProcessPool:
+            self._reset(pool)
+            pool = self._get_pool()
+            future = pool.submit(fn, *args)
+        with self._lock:
+            self.submitted += 1
+        future.add_done_callback(lambda f, pool=pool: self._done(f, pool))
+        return future
+
+    def _done(self, future, pool):
+        if future.cancelled():
+            return
+        exc = future.exception()
+        if exc is None:
+            return
+        with self._lock:
+            self.failed += 1
+        if isinstance(exc, BrokenProcessPool):
+            logger.error(f"PDF计算进程异常退出（可能超过内存上限 {self.memory_mb}MB），重建进程池")
+            self._reset(pool)
+
+    def run(self, fn, *args, cancel_event=None, timeout=None):
+        """
+        提交任务并等待结果
+
+        Args:
+            fn: 模块级函数
+            cancel_event: 取消事件，设置后抛出 PDFComputeCancelled
+            timeout: 超时时间（秒），超时抛出 TimeoutError
+
+        Returns:
+            fn 的返回值（fn 中的异常原样抛出）
+        """
+        future = self.submit(fn, *args)
+        started = time.time()
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                future.cancel()
+                raise PDFComputeCancelled(f"{getattr(fn, '__name__', fn)} 已取消")
+            if timeout is not None and time.time() - started > timeout:
+                future.cancel()
+                raise TimeoutError(f"{getattr(fn, '__name__', fn)} 超时（超过{timeout}秒）")
+            try:
+                return future.result(timeout=WAIT_SECONDS)
+            except FutureTimeoutError:
+                continue
+
+    def run_isolated(self, fn, *args, cancel_event=None, timeout=None, on_wait=None, memory_mb=ISOLATED_MEMORY_MB):
+        """
+        在单独的进程中执行任务并等待结果（整份文档的合并、压缩）
+
+        Args:
+            fn: 模块级函数
+            cancel_event: 取消事件，设置后终止进程并抛出 PDFComputeCancelled
+            timeout: 超时时间（秒），超时终止进程并抛出 TimeoutError
+            on_wait: 等待期间每 WAIT_SECONDS 调用一次（如读取进度）
+            memory_mb: 进程内存上限，0 表示不限制
+
+        Returns:
+            fn 的返回值；fn 抛出异常或进程异常退出时抛出 RuntimeError
+        """
+        name = getattr(fn, '__name__', fn)
+        context = multiprocessing.get_context('spawn')
+        result_queue = context.Queue()
+        process = context.Process(target=_run_isolated_entry, args=(result_queue, memory_mb, fn, args))
+        process.start()
+        with self._lock:
+            self.isolated += 1
+        started = time.time()
+        finished = False
+        try:
+            while True:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise PDFComputeCancelled(f"{name} 已取消")
+                if timeout is not None and time.time() - started > timeout:
+                    raise TimeoutError(f"{name} 超时（超过{timeout}秒）")
+                if on_wait is not None:
+                    on_wait()
+                alive = process.is_alive()
+                try:
+                    ok, value = result_queue.get(timeout=WAIT_SECONDS)
+                    break
+                except queue.Empty:
+                    if not alive:
+                        raise RuntimeError(f"{name} 进程异常退出（exitcode={process.exitcode}）")
+            finished = True
+        except BaseException:
+            with self._lock:
+                self.failed += 1
+                self.killed += process.is_alive()
+            raise
+        finally:
+            if finished:
+                process.join(timeout=STOP_SECONDS)
+            _stop_process(process)
+            result_queue.close()
+        if not ok:
+            with self._lock:
+                self.failed += 1
+            raise RuntimeError(f"{name} 失败: {value}")
+        return value
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'memory_mb': self.memory_mb,
+                'max_jobs': self.max_jobs,
+                'submitted': self.submitted,
+                'failed': self.failed,
+                'restarts': self.restarts,
+                'recycles': self.recycles,
+                'isolated': self.isolated,
+                'killed': self.killed,
+            }
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait)
+            logger.info("PDF计算进程池已关闭")
+
+
+_service = PDFComputeService()
+
+
+def get_service():
+    """获取进程级PDF计算服务"""
+    return _service
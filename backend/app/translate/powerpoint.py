@@ -2,9 +2,10 @@ import threading
 import pptx
 from . import to_translate
 from . import common
+from .task_state import get_task_state, release_task_state, now_shanghai
+from ..utils.task_memory import mark_phase
 import os
 import sys
-import time
 import logging
 from datetime import datetime
 import re # Added for regex operations
@@ -135,12 +136,9 @@ def start_with_okapi(trans):
                         
                         logger.info(f"翻译进度: {actual_completed}/{total_count} ({progress_percentage:.1f}%)")
                         
-                        # 更新数据库进度
+                        # 更新数据库进度（合并写入）
                         try:
-                            from .to_translate import db
-                            db.execute("update translate set process=%s where id=%s", 
-                                     str(format(progress_percentage, '.1f')), 
-                                     self.trans['id'])
+                            get_task_state(self.trans['id']).set_process(progress_percentage)
                         except Exception as e:
                             logger.error(f"更新进度失败: {str(e)}")
                 
@@ -152,7 +150,8 @@ def start_with_okapi(trans):
                             self.trans,
                             text,
                             source_lang="auto",
-                            target_lang=self.trans.get('lang', 'English')
+                            target_lang=self.trans.get('lang', 'English'),
+                            segment_index=index
                         )
                         return result
                     except Exception as e:
@@ -222,13 +221,12 @@ def start_with_okapi(trans):
         )
         
         if success:
-            # 更新数据库状态
+            # 更新数据库状态（与未写入的进度合并为一条UPDATE）
             try:
-                from .to_translate import db
-                import pytz
-                end_time = datetime.now(pytz.timezone('Asia/Shanghai'))
-                db.execute("update translate set status='done', process='100.0', target_filepath=%s, end_at=%s where id=%s",
-                         output_file, end_time, trans['id'])
+                get_task_state(trans['id']).transition(
+                    'done', process=100, target_filepath=output_file, end_at=now_shanghai()
+                )
+                release_task_state(trans['id'])
                 # 翻译成功日志已关闭（调试时可打开）
                 # logger.info(f"✅ PPTX 翻译完成: {output_file}")
             except Exception as e:
@@ -287,8 +285,6 @@ def start_traditional(trans):
         max_threads=10
     else:
         max_threads=int(threads)
-    # 当前执行的索引位置
-    run_index=0
     start_time = datetime.now()
     
     try:
@@ -505,8 +501,6 @@ def start_traditional(trans):
     
     logger.info(f"提取的文本类型分布: {text_types}")
     logger.info(f"总共提取了 {len(texts)} 个文本元素")
-    max_run=max_threads if len(texts)>max_threads else len(texts)
-    before_active_count=threading.activeCount()
     event=threading.Event()
     
     # 进度更新相关变量
@@ -521,68 +515,15 @@ def start_traditional(trans):
             completed_count += 1
             progress_percentage = min((completed_count / total_count) * 100, 100.0)
             
-            # 更新数据库进度
+            # 更新数据库进度（合并写入，完成状态由 to_translate.complete 统一写入）
             try:
-                from .to_translate import db
-                db.execute("update translate set process=%s where id=%s", 
-                         str(format(progress_percentage, '.1f')), 
-                         trans['id'])
-                
-                # 如果进度达到100%，立即更新状态为已完成
-                if progress_percentage >= 100.0:
-                    import pytz
-                    end_time = datetime.now(pytz.timezone('Asia/Shanghai'))
-                    db.execute(
-                        "update translate set status='done',end_at=%s,process=100 where id=%s",
-                        end_time, trans['id']
-                    )
-                    # 翻译成功日志已关闭（调试时可打开）
-                    # print("✅ 翻译完成，状态已更新为已完成")
-                    
+                get_task_state(trans['id']).set_process(progress_percentage)
             except Exception as e:
                 print(f"更新进度失败: {str(e)}")
     
-    while run_index<=len(texts)-1:
-        if threading.activeCount()<max_run+before_active_count:
-            if not event.is_set():
-                thread = threading.Thread(target=to_translate.get,args=(trans,event,texts,run_index))
-                thread.start()
-                run_index+=1
-            else:
-                return False
-    
-    # 等待翻译完成，并监控进度
-    last_completed_count = 0
-    while True:
-        complete=True
-        current_completed = 0
-        for text in texts:
-            if not text['complete']:
-                complete=False
-            else:
-                current_completed += 1
-        
-        # 检查是否有新的文本完成
-        if current_completed > last_completed_count:
-            completed_count = current_completed
-            progress_percentage = min((completed_count / total_count) * 100, 100.0)
-            
-            # 更新数据库进度
-            try:
-                from .to_translate import db
-                db.execute("update translate set process=%s where id=%s", 
-                         str(format(progress_percentage, '.1f')), 
-                         trans['id'])
-                
-            except Exception as e:
-                print(f"更新进度失败: {str(e)}")
-            
-            last_completed_count = current_completed
-        
-        if complete:
-            break
-        else:
-            time.sleep(1)
+    # 段落提交到进程级翻译线程池，等待全部完成
+    if not to_translate.translate_segments(trans, event, texts, max_threads):
+        return False
 
     # 计算每个slide的翻译文本总长度和缩放比例
     slide_translated_lengths = {}  # {slide_index: total_length}
@@ -782,6 +723,7 @@ def start_traditional(trans):
     logger.info(f"处理成功率: {text_count / (len(texts) + text_count) * 100:.1f}%" if (len(texts) + text_count) > 0 else "0%")
 
     logger.info(f"总共处理了 {text_count} 个文本元素")
+    mark_phase(trans['id'], 'save')
     wb.save(trans['target_file'])
     end_time = datetime.now()
     spend_time=common.display_spend(start_time, end_time)
@@ -227,6 +227,13 @@ def handle_429_error(attempt, error_msg):
         logging.warning("达到429错误最大重试次数 (100)，返回原文")
         return False  # 停止重试
 
+def _create_completion(control, client, **kwargs):
+    """调用翻译接口；任务取消时（TaskControl.cancel）关闭客户端以中断进行中的请求"""
+    if control is None:
+        return client.chat.completions.create(**kwargs)
+    with control.track(client):
+        return client.chat.completions.create(**kwargs)
+
 def qwen_translate(text, target_language, source_lang="auto", tm_list=None, terms=None, domains=None, prompt=None, prompt_id=None, max_retries=10, texts=None, index=None, tenant_id=None, api_key=None, translate_id=None, customer_id=None, uuid=None):
     """
     使用阿里云Qwen-MT翻译模型进行翻译
@@ -271,8 +278,14 @@ def qwen_translate(text, target_language, source_lang="auto", tm_list=None, term
     
     # 初始化术语表token数量（用于统计）
     terms_tokens = 0
+
+    # 任务控制对象（取消时中断请求、停止重试）
+    from app.utils.task_manager import get_task_control
+    control = get_task_control(translate_id)
     
     for attempt in range(max_retries):
+        if control and control.is_cancelled:
+            return text
         try:
             # 使用传入的api_key（已在启动接口中从数据库获取并传入）
             if not api_key:
@@ -463,7 +476,8 @@ def qwen_translate(text, target_language, source_lang="auto", tm_list=None, term
                 # 调用API（不使用translation_options）
                 # 翻译日志已关闭（调试时可打开）
                 # logging.info(f"📡 发送API请求...")
-                completion = client.chat.completions.create(
+                completion = _create_completion(
+                    control, client,
                     model="qwen-mt-plus",
                     messages=messages
                 )
@@ -551,7 +565,8 @@ def qwen_translate(text, target_language, source_lang="auto", tm_list=None, term
                 
                 # 调用API
                 logging.info(f"📡 发送API请求...")
-                completion = client.chat.completions.create(
+                completion = _create_completion(
+                    control, client,
                     model="qwen-mt-plus",
                     messages=[{"role": "user", "content": text}],
                     extra_body={"translation_options": translation_options}
@@ -648,6 +663,11 @@ def qwen_translate(text, target_language, source_lang="auto", tm_list=None, term
             return translated_text
             
         except Exception as e:
+            # 任务已取消：请求被中断，不记录失败、不重试
+            if control and control.is_cancelled:
+                logging.info(f"任务 {translate_id} 已取消，停止翻译请求")
+                return text
+
             error_msg = str(e)
             error_type = type(e).__name__
             
@@ -704,7 +724,10 @@ def qwen_translate(text, target_language, source_lang="auto", tm_list=None, term
                 if attempt < max_retries - 1:
                     wait_time = (attempt + 1) * 2  # 递增等待时间：2秒、4秒、6秒
                     logging.warning(f"⏳ 遇到非频率限制错误，等待 {wait_time} 秒后重试...")
-                    time.sleep(wait_time)
+                    if control:
+                        control.cancel_event.wait(wait_time)  # 等待期间任务取消立即返回
+                    else:
+                        time.sleep(wait_time)
                     continue
                 else:
                     # 达到最大重试次数，打印所有传参（单条日志）- 使用error级别
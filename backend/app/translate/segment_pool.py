@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+大PDF全文档段落池
+原来 translate_texts_batch 只在单个批次（几页）内去重，页眉、页脚、重复的表格标签在整份文档中
+每个批次都会翻译一次。段落池在整个任务内共享：
+- 每个唯一文本只翻译一次，后续批次直接取用译文
+- 流水线中多个批次同时翻译时，先认领（claim）的批次负责翻译，其他批次等待其结果，不重复提交
+- 译文写入任务临时目录下的 SQLite 文件，内存中只保留最近使用的 MEMORY_ITEMS 条，
+  内存占用与文档大小无关（临时目录在任务结束时统一清理）
+"""
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+MEMORY_ITEMS = 5000  # 内存中缓存的译文条数
+WAIT_SECONDS = 1.0  # 等待其他批次翻译时检查取消的间隔（秒）
+
+
+class SegmentPool:
+    """任务级段落池（线程安全）"""
+
+    def __init__(self, path, memory_items=MEMORY_ITEMS):
+        self.path = path
+        self.memory_items = memory_items
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # 原文 -> 译文（LRU）
+        self._pending = {}  # 原文 -> Event，正在由某个批次翻译
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("create table if not exists segments (source text primary key, target text)")
+        self.stored = 0
+        self.hits = 0
+        self.waits = 0
+
+    def _get_locked(self, text):
+        if text in self._cache:
+            self._cache.move_to_end(text)
+            return self._cache[text]
+        row = self._conn.execute("select target from segments where source=?", (text,)).fetchone()
+        if row is None:
+            return None
+        self._remember(text, row[0])
+        return row[0]
+
+    def _remember(self, text, translated):
+        self._cache[text] = translated
+        self._cache.move_to_end(text)
+        while len(self._cache) > self.memory_items:
+            self._cache.popitem(last=False)
+
+    def claim(self, texts):
+        """
+        认领一批唯一文本
+
+        Returns:
+            tuple: (已有译文 {原文: 译文}, 需要本批次翻译的原文列表, 正在由其他批次翻译的 {原文: Event})
+        """
+        ready, mine, waiting = {}, [], {}
+        with self._lock:
+            for text in texts:
+                translated = self._get_locked(text)
+                if translated is not None:
+                    ready[text] = translated
+                elif text in self._pending:
+                    waiting[text] = self._pending[text]
+                else:
+                    self._pending[text] = threading.Event()
+                    mine.append(text)
+            self.hits += len(ready)
+            self.waits += len(waiting)
+        return ready, mine, waiting
+
+    def put_many(self, results):
+        """写入本批次翻译的结果并唤醒等待的批次"""
+        with self._lock:
+            self._conn.executemany("insert or replace into segments (source, target) values (?, ?)", list(results.items()))
+            self._conn.commit()
+            self.stored += len(results)
+            for text, translated in results.items():
+                self._remember(text, translated)
+                event = self._pending.pop(text, None)
+                if event is not None:
+                    event.set()
+
+    def release(self, texts):
+        """放弃认领（翻译失败或取消），等待的批次将使用原文"""
+        with self._lock:
+            for text in texts:
+                event = self._pending.pop(text, None)
+                if event is not None:
+                    event.set()
+
+    def wait_for(self, waiting, cancel_event=None):
+        """
+        等待其他批次翻译的文本
+
+        Returns:
+            dict: {原文: 译文}，翻译失败或被取消的文本不在其中
+        """
+        results = {}
+        for text, event in waiting.items():
+            while not event.wait(WAIT_SECONDS):
+                if cancel_event is not None and cancel_event.is_set():
+                    return results
+            with self._lock:
+                translated = self._get_locked(text)
+            if translated is not None:
+                results[text] = translated
+        return results
+
+    def stats(self):
+        with self._lock:
+            return {'stored': self.stored, 'hits': self.hits, 'waits': self.waits, 'cached': len(self._cache)}
+
+    def close(self):
+        with self._lock:
+            try:
+                self._conn.close()
+            except Exception as e:
+                logger.debug(f"关闭段落池失败: {e}")
+        if os.path.exists(self.path):
+            try:
+                os.remove(self.path)
+            except Exception as e:
+                logger.debug(f"删除段落池文件失败: {e}")
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+翻译任务状态（写回缓存）
+集中管理翻译流程中对 translate 表的状态写入：
+- 字段修改先记录为脏字段，不立即写库
+- 进度（process）等中间状态按时间间隔合并写入，避免每完成一段就写一次
+- 状态转换（process/changing/done/failed）与待写入的脏字段合并为一条 UPDATE 立即写入
+
+同一进程内同一任务共享一个 TaskState（get_task_state），任务结束时调用 release_task_state 清理。
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+
+import pytz
+
+from . import db
+
+logger = logging.getLogger(__name__)
+
+PROCESS_FLUSH_INTERVAL = 2.0  # 进度合并写入的最小间隔（秒）
+
+# 允许写入的字段（防止拼接任意列名）
+_WRITABLE_FIELDS = {
+    'status', 'process', 'start_at', 'end_at', 'failed_reason', 'target_filepath',
+    'target_filesize', 'word_count'
+}
+_INCREMENT_FIELDS = {'failed_count'}
+_TERMINAL_STATUSES = {'done', 'failed'}
+
+
+def now_shanghai():
+    """任务时间统一使用东八区时间，与translate_service.py保持一致"""
+    return datetime.now(pytz.timezone('Asia/Shanghai'))
+
+
+class TaskState:
+    """单个翻译任务的状态，记录脏字段并延迟写入"""
+
+    def __init__(self, translate_id):
+        self.translate_id = translate_id
+        self._lock = threading.Lock()
+        self._dirty = {}
+        self._increments = {}
+        self._last_flush = 0.0
+        self._status = None
+
+    @property
+    def status(self):
+        """本进程最近一次写入的状态"""
+        return self._status
+
+    def set(self, **fields):
+        """修改字段（只记录为脏字段，不写库）"""
+        with self._lock:
+            for name, value in fields.items():
+                if name not in _WRITABLE_FIELDS:
+                    raise ValueError(f"不支持的任务状态字段: {name}")
+                self._dirty[name] = value
+
+    def set_process(self, value, force=False):
+        """
+        更新进度，按 PROCESS_FLUSH_INTERVAL 合并写入
+
+        Args:
+            value: 进度百分比
+            force: 是否立即写入
+        """
+        if self._status in _TERMINAL_STATUSES:
+            # 任务已结束，忽略迟到的进度更新（避免覆盖 process=100）
+            return
+        self.set(process=str(format(float(value), '.1f')))
+        if force or time.time() - self._last_flush >= PROCESS_FLUSH_INTERVAL:
+            self.flush()
+
+    def transition(self, status, increments=None, **fields):
+        """
+        状态转换：与待写入的脏字段合并为一条 UPDATE 立即写入
+
+        Args:
+            status: 新状态
+            increments: 需要自增的字段，如 {'failed_count': 1}
+            **fields: 同时写入的其他字段
+
+        Returns:
+            bool: 是否写入成功
+        """
+        with self._lock:
+            for name, value in (increments or {}).items():
+                if name not in _INCREMENT_FIELDS:
+                    raise ValueError(f"不支持的自增字段: {name}")
+                self._increments[name] = self._increments.get(name, 0) + value
+        self.set(status=status, **fields)
+        return self.flush()
+
+    def flush(self):
+        """
+        将脏字段合并为一条 UPDATE 写入
+
+        Returns:
+            bool: 是否写入成功（没有脏字段时返回True）
+        """
+        with self._lock:
+            if not self._dirty and not self._increments:
+                return True
+            dirty = self._dirty
+            increments = self._increments
+            self._dirty = {}
+            self._increments = {}
+            self._last_flush = time.time()
+
+        assignments = [f"{name}=%s" for name in dirty]
+        params = list(dirty.values())
+        assignments.extend(f"{name}={name}+%s" for name in increments)
+        params.extend(increments.values())
+
+        success = db.execute(
+            f"update translate set {','.join(assignments)} where id=%s",
+            *params, self.translate_id
+        )
+
+        if success and 'status' in dirty:
+            # 状态变化后通知看板统计重新汇总
+            from app.utils.statistics_rollup import mark_translate_dirty
+            mark_translate_dirty(self.translate_id)
+
+        with self._lock:
+            if success:
+                if 'status' in dirty:
+                    self._status = dirty['status']
+            else:
+                # 写入失败时放回，等待下次写入（新修改优先）
+                for name, value in dirty.items():
+                    self._dirty.setdefault(name, value)
+                for name, value in increments.items():
+                    self._increments[name] = self._increments.get(name, 0) + value
+                logger.error(f"❌ 写入任务状态失败: translate_id={self.translate_id}, 字段={list(dirty)}")
+        return success
+
+
+_states = {}
+_states_lock = threading.Lock()
+
+
+def get_task_state(translate_id):
+    """获取任务状态对象（同一进程内同一任务共享）"""
+    with _states_lock:
+        state = _states.get(translate_id)
+        if state is None:
+            state = TaskState(translate_id)
+            _states[translate_id] = state
+        return state
+
+
+def release_task_state(translate_id):
+    """写入剩余脏字段并释放任务状态对象（任务结束时调用）"""
+    with _states_lock:
+        state = _states.pop(translate_id, None)
+    if state is not None:
+        state.flush()
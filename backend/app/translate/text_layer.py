@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+PDF文本层二进制文件
+两个PDF翻译器原来把提取/翻译后的文本写成JSON，再整体 json.load 读回，1000页的PDF文件有几百MB，
+读写时整份数据在内存中展开两次。这里改为按页索引的二进制文件：
+- 每页一条记录，按列存放 bbox(4×float32)、size(float32)、color(uint32)、font(字符串表序号)、
+  block/line(int32，-1 表示无)、spans(uint16，0 表示无)，文本按页存为 UTF-8 串接 + 偏移
+- 字体名在整个文件内去重，存在文件末尾的字符串表中
+- 文件末尾是页索引（页码 -> 记录偏移），读取时 mmap 文件，按页随机访问，只解码需要的页
+- 写入时逐页追加，不需要整份数据在内存中
+
+页面数据与原JSON结构相同：{'page_number', 'texts': [{'text', 'bbox', 'size', 'color', 'font', ...}]}，
+texts 中可选的字段为 original_text、block、line、spans，其他字段不保存。
+"""
+import mmap
+import struct
+
+MAGIC = b"DTLAYER1"
+_HEADER = struct.Struct("<8sI")  # 魔数, 版本
+_TRAILER = struct.Struct("<QQI8s")  # 字符串表偏移, 页索引偏移, 页数, 魔数
+_PAGE_HEADER = struct.Struct("<IIII")  # 页码, 文本框数, 文本区字节数, 标志
+_INDEX_ENTRY = struct.Struct("<IQ")  # 页码, 记录偏移
+VERSION = 1
+FLAG_ORIGINAL = 1  # 每个文本框带 original_text
+
+
+class TextLayerWriter:
+    """逐页写入文本层文件"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'wb')
+        self._file.write(_HEADER.pack(MAGIC, VERSION))
+        self._fonts = {}  # 字体名 -> 序号
+        self._index = []  # [(页码, 偏移)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _font_id(self, font):
+        font = font or ""
+        font_id = self._fonts.get(font)
+        if font_id is None:
+            font_id = self._fonts[font] = len(self._fonts)
+        return font_id
+
+    def add_page(self, page_number, texts):
+        """追加一页（texts 为文本框字典列表）"""
+        count = len(texts)
+        has_original = any("original_text" in info for info in texts)
+        strings = []
+        for info in texts:
+            strings.append(info.get("text") or "")
+            if has_original:
+                strings.append(info.get("original_text") or "")
+        encoded = [s.encode('utf-8') for s in strings]
+        offsets = [0]
+        for data in encoded:
+            offsets.append(offsets[-1] + len(data))
+
+        bboxes = []
+        for info in texts:
+            bboxes.extend(info["bbox"][:4])
+        color = [info.get("color") if isinstance(info.get("color"), int) else 0 for info in texts]
+
+        self._index.append((page_number, self._file.tell()))
+        write = self._file.write
+        write(_PAGE_HEADER.pack(page_number, count, offsets[-1], FLAG_ORIGINAL if has_original else 0))
+        write(struct.pack(f"<{4 * count}f", *bboxes))
+        write(struct.pack(f"<{count}f", *(info.get("size") or 0 for info in texts)))
+        write(struct.pack(f"<{count}I", *(c & 0xFFFFFFFF for c in color)))
+        write(struct.pack(f"<{count}I", *(self._font_id(info.get("font")) for info in texts)))
+        write(struct.pack(f"<{count}i", *(info.get("block", -1) for info in texts)))
+        write(struct.pack(f"<{count}i", *(info.get("line", -1) for info in texts)))
+        write(struct.pack(f"<{count}H", *(min(info.get("spans", 0), 0xFFFF) for info in texts)))
+        write(struct.pack(f"<{len(offsets)}I", *offsets))
+        write(b"".join(encoded))
+
+    def close(self):
+        if self._file is None:
+            return
+        write = self._file.write
+        fonts_offset = self._file.tell()
+        write(struct.pack("<I", len(self._fonts)))
+        for font in self._fonts:  # 插入顺序即序号
+            data = font.encode('utf-8')
+            write(struct.pack("<H", len(data)))
+            write(data)
+        index_offset = self._file.tell()
+        for page_number, offset in self._index:
+            write(_INDEX_ENTRY.pack(page_number, offset))
+        write(_TRAILER.pack(fonts_offset, index_offset, len(self._index), MAGIC))
+        self._file.close()
+        self._file = None
+
+
+class TextLayerReader:
+    """按页随机访问文本层文件（mmap，只解码访问到的页）"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # 空文件
+            self._file.close()
+            raise ValueError(f"文本层文件为空: {path}")
+        magic, version = _HEADER.unpack_from(self._mm, 0)
+        fonts_offset, index_offset, page_count, trailer_magic = _TRAILER.unpack_from(self._mm, len(self._mm) - _TRAILER.size)
+        if magic != MAGIC or trailer_magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"不是有效的文本层文件: {path}")
+
+        (font_count,) = struct.unpack_from("<I", self._mm, fonts_offset)
+        pos = fonts_offset + 4
+        self.fonts = []
+        for _ in range(font_count):
+            (length,) = struct.unpack_from("<H", self._mm, pos)
+            self.fonts.append(bytes(self._mm[pos + 2:pos + 2 + length]).decode('utf-8'))
+            pos += 2 + length
+
+        self._offsets = []
+        self.page_numbers = []
+        for i in range(page_count):
+            page_number, offset = _INDEX_ENTRY.unpack_from(self._mm, index_offset + i * _INDEX_ENTRY.size)
+            self.page_numbers.append(page_number)
+            self._offsets.append(offset)
+        self._positions = {page_number: i for i, page_number in enumerate(self.page_numbers)}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __iter__(self):
+        for i in range(len(self._offsets)):
+            yield self.page(i)
+
+    def text_count(self, i):
+        """第 i 页（按写入顺序）的文本框数，不解码"""
+        return _PAGE_HEADER.unpack_from(self._mm, self._offsets[i])[1]
+
+    def get_page(self, page_number):
+        """按页码读取，不存在时返回 None"""
+        i = self._positions.get(page_number)
+        return None if i is None else self.page(i)
+
+    def page(self, i):
+        """读取第 i 页（按写入顺序）"""
+        mm = self._mm
+        pos = self._offsets[i]
+        page_number, count, text_bytes, flags = _PAGE_HEADER.unpack_from(mm, pos)
+        pos += _PAGE_HEADER.size
+        bboxes = struct.unpack_from(f"<{4 * count}f", mm, pos)
+        pos += 16 * count
+        sizes = struct.unpack_from(f"<{count}f", mm, pos)
+        pos += 4 * count
+        colors = struct.unpack_from(f"<{count}I", mm, pos)
+        pos += 4 * count
+        fonts = struct.unpack_from(f"<{count}I", mm, pos)
+        pos += 4 * count
+        blocks = struct.unpack_from(f"<{count}i", mm, pos)
+        pos += 4 * count
+        lines = struct.unpack_from(f"<{count}i", mm, pos)
+        pos += 4 * count
+        spans = struct.unpack_from(f"<{count}H", mm, pos)
+        pos += 2 * count
+        has_original = flags & FLAG_ORIGINAL
+        string_count = count * 2 if has_original else count
+        offsets = struct.unpack_from(f"<{string_count + 1}I", mm, pos)
+        pos += 4 * (string_count + 1)
+        blob = mm[pos:pos + text_bytes]
+        strings = [blob[offsets[j]:offsets[j + 1]].decode('utf-8') for j in range(string_count)]
+
+        texts = []
+        for j in range(count):
+            info = {
+                "text": strings[2 * j] if has_original else strings[j],
+                "bbox": list(bboxes[4 * j:4 * j + 4]),
+                "size": sizes[j],
+                "color": colors[j],
+                "font": self.fonts[fonts[j]],
+            }
+            if has_original:
+                info["original_text"] = strings[2 * j + 1]
+            if blocks[j] >= 0:
+                info["block"] = blocks[j]
+            if lines[j] >= 0:
+                info["line"] = lines[j]
+            if spans[j]:
+                info["spans"] = spans[j]
+            texts.append(info)
+        return {"page_number": page_number, "texts": texts}
+
+    def close(self):
+        mm, self._mm = getattr(self, '_mm', None), None
+        if mm is not None:
+            mm.close()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def write_text_layer(path, pages):
+    """把页面数据列表（或逐页生成的迭代器）写入文本层文件，返回页数"""
+    count = 0
+    with TextLayerWriter(path) as writer:
+        for page_data in pages:
+            writer.add_page(page_data["page_number"], page_data["texts"])
+            count += 1
+    return count
@@ -13,6 +13,8 @@ import logging
 from . import common
 from . import db
 from .main import get_comparison
+from .task_state import get_task_state, release_task_state, now_shanghai
+from . import checkpoint
 
 # 术语库进程内缓存，避免在同一次翻译流程中重复访问数据库
 _comparison_cache = {}
@@ -111,19 +113,32 @@ except ImportError as e:
         return False, "Qwen模块未找到"
 
 
-def translate_text(trans, text, source_lang="auto", target_lang=None):
+def translate_text(trans, text, source_lang="auto", target_lang=None, segment_index=None):
     """
-    翻译单个文本
+    翻译单个文本（已在断点日志中的文本直接返回之前的译文）
     
     Args:
         trans: 翻译配置字典
         text: 要翻译的文本
         source_lang: 源语言
         target_lang: 目标语言
+        segment_index: 段落序号（用于断点续译，没有时按原文匹配）
         
     Returns:
         str: 翻译后的文本
     """
+    resumed = checkpoint.lookup(trans, segment_index, text)
+    if resumed is not None:
+        return resumed
+    result = _translate_text(trans, text, source_lang, target_lang)
+    # 失败时返回的是原文，与原文相同的结果不记录，续译时重新翻译
+    if result and result != text and check_translated(result):
+        checkpoint.record(trans, segment_index, text, result)
+    return result
+
+
+def _translate_text(trans, text, source_lang="auto", target_lang=None):
+    """翻译单个文本（不经过断点日志）"""
     try:
         # 获取翻译配置
         api_key = trans.get('api_key', '')
@@ -361,18 +376,14 @@ def get(trans, event, texts, index):
         logging.info(f"任务 {trans.get('id')} 已被用户取消")
         exit(0)
     
-    # 检查暂停事件（如果存在）
-    from app.utils.task_manager import get_task_pause_event
-    pause_event = get_task_pause_event(trans.get('id'))
-    if pause_event and pause_event.is_set():
+    # 任务暂停时阻塞等待恢复（不轮询），等待期间被取消则退出
+    from app.utils.task_manager import get_task_control
+    control = get_task_control(trans.get('id'))
+    if control and control.is_paused:
         logging.info(f"任务 {trans.get('id')} 已被暂停，等待恢复...")
-        # 等待暂停事件被清除（恢复）
-        while pause_event.is_set():
-            time.sleep(0.1)  # 短暂等待
-            # 在等待期间也要检查取消事件
-            if cancel_event and cancel_event.is_set():
-                logging.info(f"任务 {trans.get('id')} 在暂停期间被取消")
-                exit(0)
+        if not control.wait_if_paused():
+            logging.info(f"任务 {trans.get('id')} 在暂停期间被取消")
+            exit(0)
         logging.info(f"任务 {trans.get('id')} 已恢复")
     # 恢复线程数为40，提高翻译效率
     max_threads = 40
@@ -430,6 +441,15 @@ def get(trans, event, texts, index):
         str(api_key) + str(api_url) + str(old_text) + str(prompt) + str(backup_model) + str(
             model) + str(target_lang))
 
+    # 断点续译：之前的执行中已翻译过的段落直接使用日志中的译文
+    if not text['complete']:
+        resumed = checkpoint.lookup(trans, index, old_text)
+        if resumed is not None:
+            text['count'] = count_text(old_text)
+            text['text'] = resumed
+            text['complete'] = True
+            return _finish_segment(trans, event, texts, index, text)
+
     # ============== 百度翻译处理 ==============
     if server == 'baidu':
         try:
@@ -445,6 +465,7 @@ def get(trans, event, texts, index):
                 text['count'] = count_text(text['text'])
                 if check_translated(content):
                     text['text'] = content  # 百度翻译无需过滤<think>标签
+                    checkpoint.record(trans, index, old_text, content)
                 text['complete'] = True
         except Exception as e:
             logging.error(f"百度翻译错误: {str(e)}")
@@ -704,6 +725,7 @@ def get(trans, event, texts, index):
                     logging.warning(f"内容检查失败，跳过此内容: {text['text'][:50]}...")
                     text['text'] = ""  # 设置为空字符串
                     text['complete'] = True
+                    checkpoint.record(trans, index, old_text, "")
                 elif check_translated(content):
                     # 过滤deepseek思考过程
                     cleaned_content = re.sub(r'<think>.*?</think>', '', content, flags=re.DOTALL)
@@ -711,6 +733,7 @@ def get(trans, event, texts, index):
                     # cleaned_content = clean_translation_result(cleaned_content)
                     text['text'] = cleaned_content
                     text['complete'] = True
+                    checkpoint.record(trans, index, old_text, cleaned_content)
                 else:
                     # 翻译失败，记录警告但继续处理
                     logging.warning(f"翻译失败，保留原文: {text['text'][:50]}...")
@@ -772,18 +795,58 @@ def get(trans, event, texts, index):
             # traceback.print_exc()
             # print("translate error")
     
-    texts[index] = text
     # print(text)
+    # set_threading_num(mredis)
+    return _finish_segment(trans, event, texts, index, text)
+
+
+def _finish_segment(trans, event, texts, index, text):
+    """段落翻译结束：写回结果并更新进度"""
+    texts[index] = text
     if not event.is_set():
         # 对于Word文档翻译和大PDF翻译，不调用process函数，因为它们有自己的进度更新机制
         extension = trans.get('extension', '').lower()
         is_large_pdf = trans.get('is_large_pdf', False)  # 检查是否为大PDF翻译
         if extension not in ['.docx', '.doc'] and not is_large_pdf:
-            process(texts, translate_id)
-    # set_threading_num(mredis)
+            process(texts, trans['id'])
     return True  # 返回结果而不是exit(0)
 
 
+def translate_segments(trans, event, texts, max_threads=40):
+    """
+    用进程级段落翻译线程池翻译 texts 中的全部段落并等待完成（进度由 get 内部更新）
+
+    Args:
+        trans: 翻译配置字典
+        event: 文档翻译的停止事件（get 出错时设置）
+        texts: 段落列表
+        max_threads: 该任务同时翻译的段落数
+
+    Returns:
+        bool: 全部段落翻译结束，且任务未被取消、未出错时为 True
+    """
+    if not texts:
+        return True
+    from app.utils.translate_executor import get_executor
+    from app.utils.task_memory import mark_phase
+    mark_phase(trans.get('id'), 'translate')
+    start = time.time()
+    batch = get_executor().submit_batch(
+        trans.get('id'), get,
+        [(trans, event, texts, index) for index in range(len(texts))],
+        quota=max_threads, cancel_event=event
+    )
+    success = batch.wait()
+    mark_phase(trans.get('id'), 'fill')
+    _log_timing("段落翻译", time.time() - start, translate_id=trans.get('id'), extra={
+        "segments": batch.dispatched,
+        "failed": batch.failed,
+        "dispatch_rate": round(batch.dispatch_rate, 1),
+    })
+    cancel_event = trans.get('cancel_event')
+    return success and not (cancel_event and cancel_event.is_set())
+
+
 def get11(trans, event, texts, index):
     if event.is_set():
         exit(0)
@@ -1083,23 +1146,26 @@ def process(texts, translate_id):
             complete += 1
     if total != complete:
         if (total != 0):
-            process = format((complete / total) * 100, '.1f')
-            db.execute("update translate set process=%s where id=%s", str(process), translate_id)
+            # 进度写入由任务状态对象合并，避免每段完成都写一次库
+            get_task_state(translate_id).set_process((complete / total) * 100)
 
 
 def complete(trans, text_count, spend_time):
     target_filesize = 1 #os.stat(trans['target_file']).st_size
-    # 使用Python时区时间，与start_at保持一致
-    from datetime import datetime
-    import pytz
-    end_time = datetime.now(pytz.timezone('Asia/Shanghai'))  # 使用东八区时区，与translate_service.py保持一致
     
     # 确保target_filepath字段被正确更新
     target_filepath = trans.get('target_file', '')
     
-    db.execute(
-        "update translate set status='done',end_at=%s,process=100,target_filesize=%s,word_count=%s,target_filepath=%s where id=%s",
-        end_time, target_filesize, text_count, target_filepath, trans['id'])
+    # 完成状态与未写入的进度等字段合并为一条UPDATE
+    get_task_state(trans['id']).transition(
+        'done',
+        end_at=now_shanghai(),  # 使用东八区时区，与translate_service.py保持一致
+        process=100,
+        target_filesize=target_filesize,
+        word_count=text_count,
+        target_filepath=target_filepath
+    )
+    release_task_state(trans['id'])
     
     # 汇总token使用情况
     try:
@@ -1110,14 +1176,13 @@ def complete(trans, text_count, spend_time):
 
 
 def error(translate_id, message):
-    # 使用Python时区时间，与start_at保持一致
-    from datetime import datetime
-    import pytz
-    end_time = datetime.now(pytz.timezone('Asia/Shanghai'))  # 使用东八区时区，与translate_service.py保持一致
-    
-    db.execute(
-        "update translate set failed_count=failed_count+1,status='failed',end_at=%s,failed_reason=%s where id=%s",
-        end_time, message, translate_id)
+    get_task_state(translate_id).transition(
+        'failed',
+        increments={'failed_count': 1},
+        end_at=now_shanghai(),  # 使用东八区时区，与translate_service.py保持一致
+        failed_reason=message
+    )
+    release_task_state(translate_id)
 
 
 def count_text(text):
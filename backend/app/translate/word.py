@@ -4,6 +4,8 @@ from docx import Document
 from docx.oxml.ns import qn
 from . import to_translate
 from . import common
+from . import checkpoint
+from .task_state import get_task_state
 import os
 import time
 import datetime
@@ -17,6 +19,7 @@ import shutil
 import logging
 from typing import List, Dict, Any, Optional
 from ..utils.word_run_optimizer import SafeRunMerger, quick_optimize
+from ..utils.task_memory import mark_phase
 from docx.text.paragraph import Paragraph
 from docx.oxml import OxmlElement
 
@@ -180,19 +183,20 @@ def start_with_okapi(trans, start_time):
                         
                         logger.info(f"翻译进度: {actual_completed}/{total_count} ({progress_percentage:.1f}%)")
                         
-                        # 更新数据库进度
+                        # 更新数据库进度（合并写入）
                         try:
-                            from .to_translate import db
-                            db.execute("update translate set process=%s where id=%s", 
-                                     str(format(progress_percentage, '.1f')), 
-                                     self.trans['id'])
-                            
+                            get_task_state(self.trans['id']).set_process(progress_percentage)
                         except Exception as e:
                             logger.error(f"更新进度失败: {str(e)}")
                 
                 def translate_single_text(index, text):
                     """翻译单个文本，支持术语库筛选"""
                     try:
+                        # 断点续译：之前的执行中已翻译过的文本直接使用日志中的译文
+                        resumed = checkpoint.lookup(self.trans, index, text)
+                        if resumed is not None:
+                            return index, resumed, None
+                        
                         # 检查是否有术语库配置
                         comparison_id = self.trans.get('comparison_id')
                         if comparison_id:
@@ -237,7 +241,7 @@ def start_with_okapi(trans, start_time):
                                     )
                                 else:
                                     translated = to_translate.translate_text(
-                                        temp_trans, text, "auto", target_lang
+                                        temp_trans, text, "auto", target_lang, segment_index=index
                                     )
                             else:
                                 logger.debug(f"文本 {index} 没有找到相关术语")
@@ -257,7 +261,7 @@ def start_with_okapi(trans, start_time):
                                     )
                                 else:
                                     translated = to_translate.translate_text(
-                                        self.trans, text, "auto", target_lang
+                                        self.trans, text, "auto", target_lang, segment_index=index
                                     )
                         else:
                             logger.debug(f"文本 {index} 未使用术语库")
@@ -277,7 +281,7 @@ def start_with_okapi(trans, start_time):
                                 )
                             else:
                                 translated = to_translate.translate_text(
-                                    self.trans, text, "auto", target_lang
+                                    self.trans, text, "auto", target_lang, segment_index=index
                                 )
                         
                         logger.debug(f"文本 {index} 翻译完成: {text[:50]}... -> {translated[:50]}...")
@@ -287,6 +291,7 @@ def start_with_okapi(trans, start_time):
                             logger.warning(f"文本 {index} 翻译结果为空，保持原文: {text[:50]}...")
                             return index, text, "translation_empty"  # 标记为空结果
                         
+                        checkpoint.record(self.trans, index, text, translated)
                         return index, translated, None
                     except Exception as e:
                         logger.error(f"文本 {index} 翻译失败: {e}")
@@ -480,6 +485,7 @@ def start_traditional(trans, start_time, max_threads):
 
     # 保存文档
     docx_path = trans['target_file']
+    mark_phase(trans['id'], 'save')
     document.save(docx_path)
 
     # 智能run拼接已经在翻译过程中处理，这里不需要额外处理
@@ -1327,17 +1333,14 @@ def run_translation(trans, texts, max_threads):
             
             logger.info(f"翻译进度: {actual_completed}/{total_count} ({progress_percentage:.1f}%)")
             
-            # 更新数据库进度
+            # 更新数据库进度（合并写入）
             try:
-                from .to_translate import db
-                db.execute("update translate set process=%s where id=%s", 
-                         str(format(progress_percentage, '.1f')), 
-                         trans['id'])
-                    
+                get_task_state(trans['id']).set_process(progress_percentage)
             except Exception as e:
                 logger.error(f"更新进度失败: {str(e)}")
 
     # 使用线程池执行翻译任务
+    mark_phase(trans['id'], 'translate')
     executor = None
     try:
         executor = ThreadPoolExecutor(max_workers=max_threads)
@@ -1368,13 +1371,13 @@ def run_translation(trans, texts, max_threads):
             except Exception as shutdown_error:
                 logger.warning(f"关闭翻译线程池时出错: {shutdown_error}")
 
+    mark_phase(trans['id'], 'fill')
     with print_lock:
         logger.info("所有翻译任务已完成")
         
         # 最终进度确认，确保设置为100%
         try:
-            from .to_translate import db
-            db.execute("update translate set process='100.0' where id=%s", trans['id'])
+            get_task_state(trans['id']).set_process(100, force=True)
             logger.info("✅ 最终进度已设置为100%")
         except Exception as e:
             logger.error(f"设置最终进度失败: {str(e)}")
@@ -6,7 +6,6 @@ from functools import wraps
 from flask import g, current_app
 from flask_jwt_extended import get_jwt_identity
 from app.models.tenant_customer import TenantCustomer
-from app.models.tenant_user import TenantUser
 from app.utils.response import APIResponse
 from app.extensions import db
 
@@ -64,11 +63,8 @@ def get_admin_tenant_id(user_id=None):
     if not user_id:
         return None
     
-    tenant_user = TenantUser.query.filter_by(user_id=user_id).first()
-    if tenant_user:
-        return tenant_user.tenant_id
-    
-    return None
+    from app.utils.auth_cache import get_cached_tenant_id
+    return get_cached_tenant_id(user_id, 'admin')
 
 
 def filter_by_admin_tenant(query, model_class):
@@ -215,8 +215,7 @@ def get_current_tenant_id_from_request():
     """
     from flask import g
     from flask_jwt_extended import get_jwt_identity
-    from app.models.tenant_customer import TenantCustomer
-    from app.models.tenant_user import TenantUser
+    from app.utils.auth_cache import get_cached_tenant_id
     
     # 优先从g对象获取
     tenant_id = getattr(g, 'tenant_id', None)
@@ -228,16 +227,11 @@ def get_current_tenant_id_from_request():
     if not user_id:
         return None
     
-    # 先尝试作为customer查询
-    tenant_customer = TenantCustomer.query.filter_by(customer_id=user_id).first()
-    if tenant_customer:
-        return tenant_customer.tenant_id
-    
-    # 再尝试作为admin/user查询
-    tenant_user = TenantUser.query.filter_by(user_id=user_id).first()
-    if tenant_user:
-        return tenant_user.tenant_id
+    # 先尝试作为customer查询，再尝试作为admin/user查询（均走认证缓存）
+    tenant_id = get_cached_tenant_id(user_id, 'customer')
+    if tenant_id:
+        return tenant_id
     
-    return None
+    return get_cached_tenant_id(user_id, 'admin')
 
 
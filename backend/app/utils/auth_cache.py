@@ -0,0 +1,182 @@
+"""
+认证/租户查询缓存
+缓存 (user_id, user_type) -> 账户状态、当前 token jti、租户ID，
+减少 token_checker / tenant_helper 在每个请求上的重复查询。
+
+- 配置了 Redis 时缓存在 Redis 中，所有 worker 共享，失效立即全局生效
+- 未配置 Redis 时降级为进程内 LRU 缓存，依赖较短的 TTL 保证最终一致；
+  其他 worker 上的登录/状态变更无法使本进程缓存失效，因此缓存条目会拒绝
+  请求中的 token 时（jti 不一致、已禁用、已删除）先回源数据库确认再拒绝
+- 登录、退出、状态变更、删除和租户分配时必须调用 invalidate_auth_entry
+"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from app.utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+AUTH_CACHE_TTL = 30  # 缓存有效期（秒）
+AUTH_CACHE_MAX_SIZE = 10000  # 进程内缓存最大条目数
+_REDIS_KEY_PREFIX = 'auth_cache:'
+
+USER_TYPE_CUSTOMER = 'customer'
+USER_TYPE_ADMIN = 'admin'
+
+_local_cache = OrderedDict()
+_local_lock = threading.Lock()
+
+
+def _normalize_user_type(user_type):
+    """tenant_helper 使用 'user' 表示管理员，统一为 'admin'"""
+    return USER_TYPE_CUSTOMER if user_type == USER_TYPE_CUSTOMER else USER_TYPE_ADMIN
+
+
+def _cache_key(user_id, user_type):
+    return f"{_normalize_user_type(user_type)}:{user_id}"
+
+
+def _load_entry(user_id, user_type):
+    """从数据库加载缓存条目"""
+    if _normalize_user_type(user_type) == USER_TYPE_CUSTOMER:
+        from app.models.customer import Customer
+        from app.models.tenant_customer import TenantCustomer
+
+        user = Customer.query.get(user_id)
+        if not user:
+            return {'exists': False}
+        tenant_link = TenantCustomer.query.filter_by(customer_id=user_id).first()
+        return {
+            'exists': True,
+            'status': user.status,
+            'deleted_flag': user.deleted_flag,
+            'current_token_id': user.current_token_id,
+            'tenant_id': tenant_link.tenant_id if tenant_link else None
+        }
+
+    from app.models.user import User
+    from app.models.tenant_user import TenantUser
+
+    user = User.query.get(user_id)
+    if not user:
+        return {'exists': False}
+    tenant_link = TenantUser.query.filter_by(user_id=user_id).first()
+    return {
+        'exists': True,
+        'status': None,
+        'deleted_flag': user.deleted_flag,
+        'current_token_id': user.current_token_id,
+        'tenant_id': tenant_link.tenant_id if tenant_link else None
+    }
+
+
+def _local_get(key):
+    with _local_lock:
+        item = _local_cache.get(key)
+        if item is None:
+            return None
+        expires_at, entry = item
+        if expires_at < time.time():
+            _local_cache.pop(key, None)
+            return None
+        _local_cache.move_to_end(key)
+        return entry
+
+
+def _local_set(key, entry):
+    with _local_lock:
+        _local_cache[key] = (time.time() + AUTH_CACHE_TTL, entry)
+        _local_cache.move_to_end(key)
+        while len(_local_cache) > AUTH_CACHE_MAX_SIZE:
+            _local_cache.popitem(last=False)
+
+
+def _rejects_token(entry, token_jti):
+    """缓存条目是否会拒绝该 token（账号禁用/删除，或单点登录 jti 不一致）"""
+    if not entry.get('exists'):
+        return False
+    if entry.get('status') == 'disabled' or entry.get('deleted_flag') == 'Y':
+        return True
+    stored_jti = entry.get('current_token_id')
+    return bool(token_jti and stored_jti and token_jti != stored_jti)
+
+
+def get_auth_entry(user_id, user_type=USER_TYPE_CUSTOMER, token_jti=None):
+    """
+    获取用户的认证/租户信息（优先读缓存）
+
+    Args:
+        user_id: 用户ID
+        user_type: 'customer' 或 'admin'（也接受 'user'）
+        token_jti: 当前请求 token 的 jti；缓存条目会拒绝该 token 时回源数据库确认，
+                   避免其他 worker 刚签发的 token 被本进程的旧缓存拒绝
+
+    Returns:
+        dict: {'exists', 'status', 'deleted_flag', 'current_token_id', 'tenant_id'}
+    """
+    key = _cache_key(user_id, user_type)
+    client = get_redis()
+
+    entry = None
+    if client is not None:
+        try:
+            cached = client.get(_REDIS_KEY_PREFIX + key)
+            if cached:
+                entry = json.loads(cached)
+        except Exception as e:
+            logger.warning(f"读取认证缓存失败: {e}")
+    else:
+        entry = _local_get(key)
+
+    if entry is not None and not _rejects_token(entry, token_jti):
+        return entry
+
+    entry = _load_entry(user_id, user_type)
+
+    if client is not None:
+        try:
+            client.setex(_REDIS_KEY_PREFIX + key, AUTH_CACHE_TTL, json.dumps(entry))
+        except Exception as e:
+            logger.warning(f"写入认证缓存失败: {e}")
+    else:
+        _local_set(key, entry)
+
+    return entry
+
+
+def get_cached_tenant_id(user_id, user_type=USER_TYPE_CUSTOMER):
+    """获取用户的租户ID（走缓存），没有租户时返回None"""
+    if not user_id:
+        return None
+    return get_auth_entry(user_id, user_type).get('tenant_id')
+
+
+def invalidate_auth_entry(user_id, user_type=None):
+    """
+    使用户的缓存条目失效
+
+    Args:
+        user_id: 用户ID
+        user_type: 'customer' / 'admin'，不提供则两种类型都失效
+    """
+    if not user_id:
+        return
+
+    if user_type is None:
+        keys = [_cache_key(user_id, USER_TYPE_CUSTOMER), _cache_key(user_id, USER_TYPE_ADMIN)]
+    else:
+        keys = [_cache_key(user_id, user_type)]
+
+    with _local_lock:
+        for key in keys:
+            _local_cache.pop(key, None)
+
+    client = get_redis()
+    if client is not None:
+        try:
+            client.delete(*[_REDIS_KEY_PREFIX + key for key in keys])
+        except Exception as e:
+            logger.warning(f"清除认证缓存失败: {e}")
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+文档元数据探测
+上传时对文件做一次轻量探测（页数、幻灯片/工作表/段落数、预估段落和token数、是否扫描版PDF），
+结果写入 translate 表，调度器和文件处理器直接读取，不再重复打开文件。
+
+探测失败不影响上传，对应字段保持为 None，使用方需要自行降级（如重新打开文件）。
+"""
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+PDF_SAMPLE_PAGES = 30  # PDF最多抽样的页数，超过部分按比例外推
+SCANNED_TEXT_CHARS_PER_PAGE = 20  # 平均每页文本字符数低于该值视为扫描版PDF
+XLSX_MAX_CELLS = 200000  # 统计Excel单元格的上限，避免超大表格拖慢上传
+
+
+def _estimate_tokens(text):
+    """粗略估算token数（与 token_counter 降级方案一致：中文1字符=1token，其余0.5token）"""
+    count = 0
+    for char in text:
+        if '\u4e00' <= char <= '\u9fff':
+            count += 1
+        elif not char.isspace():
+            count += 0.5
+    return int(count)
+
+
+def _empty_metadata():
+    return {
+        'page_count': None,
+        'slide_count': None,
+        'sheet_count': None,
+        'paragraph_count': None,
+        'segment_count': None,
+        'estimated_tokens': None,
+        'is_scanned': None,
+    }
+
+
+def _probe_pdf(file_path, metadata):
+    import fitz
+
+    doc = fitz.open(file_path)
+    try:
+        page_count = doc.page_count
+        metadata['page_count'] = page_count
+        if page_count == 0:
+            metadata.update(segment_count=0, estimated_tokens=0, is_scanned=False)
+            return
+
+        sample_pages = min(page_count, PDF_SAMPLE_PAGES)
+        text_chars = 0
+        blocks = 0
+        tokens = 0
+        for page_index in range(sample_pages):
+            page = doc[page_index]
+            for block in page.get_text("blocks"):
+                # block: (x0, y0, x1, y1, text, block_no, block_type)，block_type=0 为文本块
+                if len(block) > 6 and block[6] != 0:
+                    continue
+                text = (block[4] or '').strip()
+                if not text:
+                    continue
+                blocks += 1
+                text_chars += len(text)
+                tokens += _estimate_tokens(text)
+
+        ratio = page_count / sample_pages
+        metadata['segment_count'] = int(blocks * ratio)
+        metadata['paragraph_count'] = metadata['segment_count']
+        metadata['estimated_tokens'] = int(tokens * ratio)
+        metadata['is_scanned'] = (text_chars / sample_pages) < SCANNED_TEXT_CHARS_PER_PAGE
+    finally:
+        doc.close()
+
+
+def _probe_docx(file_path, metadata):
+    from docx import Document
+
+    document = Document(file_path)
+    paragraphs = 0
+    tokens = 0
+    for paragraph in document.paragraphs:
+        text = paragraph.text.strip()
+        if text:
+            paragraphs += 1
+            tokens += _estimate_tokens(text)
+
+    cells = 0
+    for table in document.tables:
+        for row in table.rows:
+            for cell in row.cells:
+                text = cell.text.strip()
+                if text:
+                    cells += 1
+                    tokens += _estimate_tokens(text)
+
+    metadata['paragraph_count'] = paragraphs
+    metadata['segment_count'] = paragraphs + cells
+    metadata['estimated_tokens'] = tokens
+
+
+def _probe_xlsx(file_path, metadata):
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        metadata['sheet_count'] = len(workbook.sheetnames)
+        cells = 0
+        tokens = 0
+        scanned = 0
+        for sheet in workbook.worksheets:
+            for row in sheet.iter_rows(values_only=True):
+                for value in row:
+                    scanned += 1
+                    if isinstance(value, str) and value.strip():
+                        cells += 1
+                        tokens += _estimate_tokens(value)
+                if scanned >= XLSX_MAX_CELLS:
+                    break
+            if scanned >= XLSX_MAX_CELLS:
+                break
+        metadata['segment_count'] = cells
+        metadata['estimated_tokens'] = tokens
+    finally:
+        workbook.close()
+
+
+def _probe_pptx(file_path, metadata):
+    from pptx import Presentation
+
+    presentation = Presentation(file_path)
+    slides = 0
+    paragraphs = 0
+    tokens = 0
+    for slide in presentation.slides:
+        slides += 1
+        for shape in slide.shapes:
+            if not getattr(shape, 'has_text_frame', False) or not shape.has_text_frame:
+                continue
+            for paragraph in shape.text_frame.paragraphs:
+                text = ''.join(run.text for run in paragraph.runs).strip()
+                if text:
+                    paragraphs += 1
+                    tokens += _estimate_tokens(text)
+
+    metadata['slide_count'] = slides
+    metadata['paragraph_count'] = paragraphs
+    metadata['segment_count'] = paragraphs
+    metadata['estimated_tokens'] = tokens
+
+
+def _probe_text(file_path, metadata):
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        content = f.read()
+    lines = [line for line in content.splitlines() if line.strip()]
+    metadata['paragraph_count'] = len(lines)
+    metadata['segment_count'] = len(lines)
+    metadata['estimated_tokens'] = _estimate_tokens(content)
+
+
+_PROBERS = {
+    '.pdf': _probe_pdf,
+    '.docx': _probe_docx,
+    '.xlsx': _probe_xlsx,
+    '.pptx': _probe_pptx,
+    '.txt': _probe_text,
+    '.md': _probe_text,
+    '.csv': _probe_text,
+}
+
+
+def probe_document(file_path):
+    """
+    探测文档元数据
+
+    Args:
+        file_path: 文件绝对路径
+
+    Returns:
+        dict: page_count / slide_count / sheet_count / paragraph_count /
+              segment_count / estimated_tokens / is_scanned / file_size，无法探测的字段为 None
+    """
+    metadata = _empty_metadata()
+    metadata['file_size'] = os.path.getsize(file_path) if os.path.exists(file_path) else None
+
+    extension = os.path.splitext(file_path)[1].lower()
+    prober = _PROBERS.get(extension)
+    if prober is None:
+        return metadata
+
+    try:
+        prober(file_path, metadata)
+    except Exception as e:
+        logger.warning(f"文档元数据探测失败: {os.path.basename(file_path)} - {e}")
+    return metadata
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+翻译队列公平调度
+按租户做加权差额轮询（Deficit Round Robin），租户内按用户轮询，避免单个租户/用户
+一次上传大量文件后占满队列：
+- 每个租户轮到时获得 QUANTUM_SECONDS × 权重 的额度（权重在租户管理中配置，tenant.queue_weight）
+- 任务的成本为估算执行耗时（utils/task_cost.py），额度足够时才能出队，大任务需要积累多轮额度
+- 租户没有排队任务时额度清零（标准DRR，防止空闲租户积累额度后突发占满）
+- 可选的小任务通道：每 SMALL_LANE_EVERY 次选择中有一次优先选小任务，在有小任务的租户中选
+  剩余额度（按权重折算）最多的租户，同样扣减其额度，最多预支一轮额度；小任务通道不改变轮询位置，
+  单个租户的大量小文件不能绕过租户间的公平
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+QUANTUM_SECONDS = 120.0  # 每轮每单位权重获得的额度（估算执行秒数）
+CANDIDATES_PER_TENANT = 50  # 每个租户参与公平选择的排队任务数（按入队时间最早的若干个）
+SMALL_JOB_SECONDS = 60.0  # 小任务阈值（估算执行秒数）
+SMALL_LANE_EVERY = 3  # 小任务通道频率：每N次选择中有一次走小任务通道
+WEIGHT_CACHE_TTL = 60  # 租户权重缓存时间（秒）
+MAX_WEIGHT = 100
+
+
+class QueuedTask:
+    """参与调度的排队任务"""
+
+    def __init__(self, id, tenant_id, customer_id, origin_filepath, page_count, queued_at, cost):
+        self.id = id
+        self.tenant_id = tenant_id or 0
+        self.customer_id = customer_id or 0
+        self.origin_filepath = origin_filepath
+        self.page_count = page_count
+        self.queued_at = queued_at
+        self.cost = cost  # TaskCost
+
+    @property
+    def size(self):
+        """调度成本：估算执行耗时（秒）"""
+        return max(1.0, self.cost.wall_seconds)
+
+
+class FairQueueScheduler:
+    """加权差额轮询调度器（进程内状态，只在调度进程中使用）"""
+
+    def __init__(self, small_lane_enabled=True):
+        self.small_lane_enabled = small_lane_enabled
+        self._lock = threading.Lock()
+        self._deficits = {}  # tenant_id -> 剩余额度
+        self._round = []  # 租户轮询顺序
+        self._current = None  # 当前轮到的租户
+        self._customer_served = {}  # customer_id -> 上次被选中的时间（租户内按用户轮询）
+        self._picks = 0
+        self._weights = {}
+        self._weights_loaded_at = 0.0
+
+    # ==================== 租户权重 ====================
+
+    def _get_weights(self):
+        if time.time() - self._weights_loaded_at < WEIGHT_CACHE_TTL:
+            return self._weights
+        try:
+            from app.models.tenant import Tenant
+            rows = Tenant.query.with_entities(Tenant.id, Tenant.queue_weight).all()
+            self._weights = {row.id: min(MAX_WEIGHT, max(1, row.queue_weight or 1)) for row in rows}
+        except Exception as e:
+            logger.warning(f"读取租户调度权重失败，使用默认权重: {e}")
+        self._weights_loaded_at = time.time()
+        return self._weights
+
+    def invalidate_weights(self):
+        """租户权重修改后调用（只影响本进程，其他进程最多 WEIGHT_CACHE_TTL 秒后生效）"""
+        self._weights_loaded_at = 0.0
+
+    # ==================== 选择 ====================
+
+    def select(self, candidates):
+        """
+        从候选任务中选择下一个要启动的任务
+
+        Args:
+            candidates: QueuedTask 列表（按入队时间升序）
+
+        Returns:
+            QueuedTask or None
+        """
+        if not candidates:
+            return None
+        weights = self._get_weights()
+
+        with self._lock:
+            self._picks += 1
+            by_tenant = {}
+            for task in candidates:
+                by_tenant.setdefault(task.tenant_id, []).append(task)
+            self._sync_round(by_tenant)
+
+            if self.small_lane_enabled and self._picks % SMALL_LANE_EVERY == 0:
+                task = self._select_small(by_tenant, weights)
+                if task is not None:
+                    self._charge(task)
+                    return task
+
+            # 轮询租户，直到某个租户的额度足够支付其队首任务
+            # 额度每轮至少增加 QUANTUM_SECONDS，循环次数有上限
+            max_cost = max(task.size for task in candidates)
+            # 小任务通道最多预支一轮额度（再加一个小任务），多留两轮
+            max_iterations = len(self._round) * (int(max_cost / QUANTUM_SECONDS) + 4)
+            for _ in range(max_iterations):
+                tenant_id = self._current
+                head = self._head_of_tenant(by_tenant[tenant_id])
+                if self._deficits[tenant_id] >= head.size:
+                    self._charge(head)
+                    return head
+                self._advance(weights)
+            # 理论上不会到达这里，兜底返回最早入队的任务
+            task = candidates[0]
+            self._charge(task)
+            return task
+
+    def _select_small(self, by_tenant, weights):
+        """小任务通道：在有小任务且预支未超过一轮额度的租户中，选剩余额度（按权重折算）最多的租户"""
+        best, best_credit = None, None
+        for tenant_id, tasks in by_tenant.items():
+            weight = weights.get(tenant_id, 1)
+            credit = self._deficits[tenant_id] / weight
+            if credit <= -QUANTUM_SECONDS or (best is not None and credit <= best_credit):
+                continue
+            small = [task for task in tasks if task.size <= SMALL_JOB_SECONDS]
+            if small:
+                best, best_credit = small, credit
+        if best is None:
+            return None
+        return self._head_of_tenant(best)
+
+    def refund(self, task):
+        """选中的任务未能启动（资源不足/已被其他节点领取）时退还额度"""
+        with self._lock:
+            if task.tenant_id in self._deficits:
+                self._deficits[task.tenant_id] += task.size
+
+    def _charge(self, task):
+        self._deficits[task.tenant_id] = self._deficits.get(task.tenant_id, 0.0) - task.size
+        self._customer_served[task.customer_id] = time.time()
+
+    def _sync_round(self, by_tenant):
+        """同步轮询列表：加入新出现的租户，移除没有排队任务的租户（额度清零）"""
+        for tenant_id in list(self._deficits):
+            if tenant_id not in by_tenant:
+                del self._deficits[tenant_id]
+        self._round = [tenant_id for tenant_id in self._round if tenant_id in by_tenant]
+        for tenant_id in by_tenant:
+            self._deficits.setdefault(tenant_id, 0.0)
+            if tenant_id not in self._round:
+                self._round.append(tenant_id)
+        if self._current not in by_tenant:
+            self._current = self._round[0]
+            self._deficits[self._current] += QUANTUM_SECONDS * self._weights.get(self._current, 1)
+        # 清理长时间未出现的用户
+        if len(self._customer_served) > 10000:
+            self._customer_served.clear()
+
+    def _advance(self, weights):
+        index = self._round.index(self._current)
+        self._current = self._round[(index + 1) % len(self._round)]
+        self._deficits[self._current] += QUANTUM_SECONDS * weights.get(self._current, 1)
+
+    def _head_of_tenant(self, tasks):
+        """租户内按用户轮询：选最久未被服务的用户的最早任务"""
+        by_customer = {}
+        for task in tasks:
+            by_customer.setdefault(task.customer_id, task)  # tasks 按入队时间升序，第一个即最早
+        customer_id = min(by_customer, key=lambda cid: (self._customer_served.get(cid, 0.0),
+                                                        by_customer[cid].queued_at or datetime.min))
+        return by_customer[customer_id]
+
+
+# ==================== 队列统计 ====================
+
+def get_tenant_queue_stats(tenant_id=None):
+    """
+    按租户统计排队情况（需在应用上下文中调用）
+
+    Args:
+        tenant_id: 只统计指定租户，None 表示全部租户
+
+    Returns:
+        list: [{'tenant_id', 'tenant_name', 'queue_weight', 'queued_count', 'oldest_wait_seconds', 'avg_wait_seconds'}]
+    """
+    from sqlalchemy import func, literal_column
+    from app.models.tenant import Tenant
+    from app.models.translate import Translate
+
+    # queued_at 为空（上线前入队的任务）时按创建时间计算，两者均为UTC时间
+    enqueued_at = func.coalesce(Translate.queued_at, Translate.created_at)
+    wait_seconds = func.timestampdiff(literal_column('SECOND'), enqueued_at, func.utc_timestamp())
+    query = Translate.query.with_entities(
+        Translate.tenant_id,
+        func.count(Translate.id),
+        func.max(wait_seconds),
+        func.avg(wait_seconds)
+    ).filter(
+        Translate.status == 'queued',
+        Translate.deleted_flag == 'N'
+    )
+    if tenant_id is not None:
+        query = query.filter(Translate.tenant_id == tenant_id)
+    rows = query.group_by(Translate.tenant_id).all()
+
+    tenants = {}
+    if rows:
+        tenants = {
+            tenant.id: tenant for tenant in Tenant.query.with_entities(
+                Tenant.id, Tenant.name, Tenant.queue_weight
+            ).filter(Tenant.id.in_([row[0] for row in rows])).all()
+        }
+    stats = [{
+        'tenant_id': row_tenant_id,
+        'tenant_name': tenants[row_tenant_id].name if row_tenant_id in tenants else None,
+        'queue_weight': (tenants[row_tenant_id].queue_weight or 1) if row_tenant_id in tenants else 1,
+        'queued_count': count,
+        'oldest_wait_seconds': int(oldest or 0),
+        'avg_wait_seconds': int(avg or 0),
+    } for row_tenant_id, count, oldest, avg in rows]
+    stats.sort(key=lambda item: item['queued_count'], reverse=True)
+    return stats
@@ -13,6 +13,7 @@ from typing import Dict
 from datetime import datetime
 from flask import current_app
 from pathlib import Path
+from app.utils.queue_notifier import get_queue_notifier, IMAGE_TRANSLATE_QUEUE
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +33,8 @@ class ImageTranslateQueueManager:
         self.last_submit_time = 0  # 上次提交时间
         self._lock_file = None  # 文件锁
         self._lock_file_handle = None  # 文件锁句柄
+        self.notifier = get_queue_notifier(IMAGE_TRANSLATE_QUEUE)  # 提交翻译/任务结束时唤醒监控线程
+        self.idle_poll_seconds = 30  # 空闲时的兜底轮询间隔（秒，Redis可用时）
         
     def set_app(self, app):
         """设置应用实例（由主应用调用）"""
@@ -67,6 +70,7 @@ class ImageTranslateQueueManager:
     def stop_monitor(self):
         """停止队列监控线程"""
         self.running = False
+        self.notifier.notify('stop')
         if self.monitor_thread:
             self.monitor_thread.join(timeout=5)
         self._release_lock()
@@ -125,24 +129,33 @@ class ImageTranslateQueueManager:
         """监控循环"""
         while self.running:
             try:
-                self._process_queue()
-                time.sleep(self.check_interval)
+                has_more = self._process_queue()
+                if has_more or not self.notifier.distributed:
+                    # 可能还有待提交的任务（受提交间隔限制），或无法跨进程通知时按原间隔轮询
+                    timeout = self.submit_interval if has_more else self.check_interval
+                else:
+                    timeout = self.idle_poll_seconds
+                self.notifier.wait(timeout)
             except Exception as e:
                 logger.error(f"图片翻译队列监控循环异常: {str(e)}", exc_info=True)
                 time.sleep(self.check_interval)
     
     def _process_queue(self):
-        """处理队列中的任务"""
+        """处理队列中的任务
+        
+        Returns:
+            bool: 是否可能还有可立即提交的任务（监控线程据此决定短间隔重试还是等待通知）
+        """
         try:
             # 快速检查并发数，避免长时间持有锁
             with self.processing_lock:
                 if self.processing_count >= self.max_concurrent_tasks:
-                    return  # 已达到最大并发数
+                    return False  # 已达到最大并发数，等待任务结束通知
                 
                 # 检查提交间隔
                 current_time = time.time()
                 if current_time - self.last_submit_time < self.submit_interval:
-                    return  # 还未到提交间隔
+                    return True  # 还未到提交间隔
             
             # 在独立的上下文中快速获取任务，避免长时间占用连接
             app = self._get_app()
@@ -164,10 +177,10 @@ class ImageTranslateQueueManager:
                     db.session.remove()
                 except:
                     pass
-                return
+                return False
             
             if not queued_tasks:
-                return
+                return False
             
             # 处理任务
             for task in queued_tasks:
@@ -184,6 +197,8 @@ class ImageTranslateQueueManager:
                     self.processing_count += 1
                     self.last_submit_time = current_time
                 
+                self.notifier.record_started(task.id)
+                
                 # 在后台线程中处理任务
                 thread = threading.Thread(
                     target=self._process_single_task,
@@ -191,9 +206,12 @@ class ImageTranslateQueueManager:
                     daemon=True
                 )
                 thread.start()
+            
+            return True
                     
         except Exception as e:
             logger.error(f"处理图片翻译队列异常: {str(e)}", exc_info=True)
+            return False
     
     def _get_queued_tasks(self, limit=1):
         """
@@ -445,6 +463,7 @@ class ImageTranslateQueueManager:
         finally:
             with self.processing_lock:
                 self.processing_count -= 1
+            self.notifier.notify('finished')
     
     def _convert_filepath_to_url(self, filepath):
         """将本地文件路径转换为公网可访问的URL"""
@@ -71,65 +71,43 @@ def configure_jwt_callbacks(jwt):
                 logger.error("❌ 单点登录检查时没有应用上下文，无法查询数据库")
                 return False  # 没有应用上下文时，允许通过（避免影响正常流程）
             
-            # 检查用户状态和单点登录（支持 customer 和 admin 两种用户类型）
-            from app.models.customer import Customer
-            from app.models.user import User
-            from app.extensions import db
+            # 检查用户状态和单点登录（支持 customer 和 admin 两种用户类型，走认证缓存）
+            from app.utils.auth_cache import get_auth_entry
             
             # 优先从 JWT payload 中获取 user_type（如果存在）
             user_type = jwt_payload.get('user_type')
             
             # 根据 user_type 查询对应的用户表
-            if user_type == 'admin':
-                # 管理员登录，查询 User 表
-                user = User.query.get(user_id)
-                if not user:
-                    logger.warning(f"⚠️ 管理员用户不存在: user_id={user_id}")
-                    return True  # 用户不存在，视为 token 已撤销
-            elif user_type == 'customer':
-                # 普通用户登录，查询 Customer 表
-                user = Customer.query.get(user_id)
-                if not user:
-                    logger.warning(f"⚠️ 普通用户不存在: user_id={user_id}")
-                    return True  # 用户不存在，视为 token 已撤销
+            if user_type in ('admin', 'customer'):
+                user = get_auth_entry(user_id, user_type, token_jti)
             else:
                 # 兼容旧 token（没有 user_type 字段），先查 Customer 再查 User
-                # logger.info(f"ℹ️ Token 中没有 user_type 字段，使用兼容模式: user_id={user_id}")
-                user = Customer.query.get(user_id)
+                user = get_auth_entry(user_id, 'customer', token_jti)
                 user_type = 'customer'
                 
                 # 如果不是 customer，尝试作为 admin/user 查询
-                if not user:
-                    user = User.query.get(user_id)
+                if not user.get('exists'):
+                    user = get_auth_entry(user_id, 'admin', token_jti)
                     user_type = 'admin'
             
-            if not user:
+            if not user.get('exists'):
                 logger.warning(f"⚠️ 用户不存在: user_id={user_id}, user_type={user_type}")
                 return True  # 用户不存在，视为 token 已撤销
             
             # 检查用户状态
-            if hasattr(user, 'status') and user.status == 'disabled':
+            if user.get('status') == 'disabled':
                 logger.warning(f"⚠️ 用户账号已禁用: user_id={user_id}, user_type={user_type}")
                 return True  # 账号已禁用，视为 token 已撤销
-            if hasattr(user, 'deleted_flag') and user.deleted_flag == 'Y':
+            if user.get('deleted_flag') == 'Y':
                 logger.warning(f"⚠️ 用户账号已删除: user_id={user_id}, user_type={user_type}")
                 return True  # 账号已删除，视为 token 已撤销
             
             # 单点登录检查：验证当前 token 的 jti 是否与数据库中存储的一致
-            if hasattr(user, 'current_token_id'):
-                stored_jti = user.current_token_id
-                # 单点登录检查日志已关闭
-                # logger.info(f"🔍 单点登录检查: user_id={user_id}, user_type={user_type}, token_jti={token_jti}, stored_jti={stored_jti}")
-                
-                if stored_jti:
-                    if token_jti != stored_jti:
-                        # 只在token被替换时记录警告日志（重要错误）
-                        logger.warning(f"❌ Token已被新登录替换: user_id={user_id}, user_type={user_type}")
-                        return True  # token 不匹配，视为已撤销
-                    # else:
-                    #     logger.info(f"✅ Token验证通过: user_id={user_id}, user_type={user_type}")
-                # else:
-                #     logger.info(f"ℹ️ 用户尚未设置 current_token_id: user_id={user_id}, user_type={user_type}")
+            stored_jti = user.get('current_token_id')
+            if stored_jti and token_jti != stored_jti:
+                # 只在token被替换时记录警告日志（重要错误）
+                logger.warning(f"❌ Token已被新登录替换: user_id={user_id}, user_type={user_type}")
+                return True  # token 不匹配，视为已撤销
             
             return False  # token 有效
         except Exception as e:
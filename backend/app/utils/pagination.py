@@ -0,0 +1,213 @@
+"""
+列表分页工具
+- 游标（keyset）分页：按 (created_at, id) 倒序翻页，避免大 OFFSET 扫描
+- 总数缓存：COUNT(*) 结果按范围（如用户）缓存，翻页时不再重复计数，总数为近似值
+
+兼容原有的 page/limit 分页：不传 cursor 时仍按页码查询，只是总数走缓存；
+传入 cursor（首页传空字符串）时使用游标分页，响应中的 next_cursor 用于请求下一页。
+"""
+import base64
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from sqlalchemy import or_, and_
+
+from app.utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+COUNT_CACHE_TTL = 60  # 总数缓存有效期（秒）
+COUNT_CACHE_MAX_SIZE = 10000  # 进程内缓存最大条目数
+_REDIS_COUNT_PREFIX = 'list_count:'
+_REDIS_GEN_PREFIX = 'list_count_gen:'
+
+_local_counts = OrderedDict()
+_local_generations = {}
+_local_lock = threading.Lock()
+
+
+class ListPage:
+    """分页结果"""
+
+    def __init__(self, items, total, page, per_page, next_cursor=None):
+        self.items = items
+        self.total = total
+        self.page = page
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+
+
+# ==================== 游标编码 ====================
+
+def encode_cursor(created_at, record_id):
+    """将 (created_at, id) 编码为URL安全的游标字符串"""
+    raw = f"{created_at.isoformat() if created_at else ''}|{record_id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """
+    解析游标字符串
+
+    Returns:
+        tuple: (created_at, id)
+
+    Raises:
+        ValueError: 游标格式错误
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        created_str, record_id = raw.rsplit('|', 1)
+        created_at = datetime.fromisoformat(created_str) if created_str else None
+        return created_at, int(record_id)
+    except Exception:
+        raise ValueError('无效的分页游标')
+
+
+# ==================== 总数缓存 ====================
+
+def _get_generation(client, scope):
+    if client is not None:
+        try:
+            return client.get(_REDIS_GEN_PREFIX + scope) or '0'
+        except Exception as e:
+            logger.warning(f"读取列表总数缓存版本失败: {e}")
+            return None
+    with _local_lock:
+        return str(_local_generations.get(scope, 0))
+
+
+def get_cached_count(scope, signature, count_fn):
+    """
+    获取缓存的列表总数，缓存未命中时调用 count_fn 计数
+
+    Args:
+        scope: 缓存范围（如 'translate_list:123'），可通过 invalidate_cached_count 整体失效
+        signature: 过滤条件签名（同一范围内不同过滤条件分别缓存）
+        count_fn: 计数函数
+
+    Returns:
+        int: 总数（近似值，最多滞后 COUNT_CACHE_TTL 秒）
+    """
+    client = get_redis()
+    generation = _get_generation(client, scope)
+    if generation is None:
+        return count_fn()
+
+    digest = hashlib.md5(str(signature).encode('utf-8')).hexdigest()
+    key = f"{scope}:{generation}:{digest}"
+
+    if client is not None:
+        try:
+            cached = client.get(_REDIS_COUNT_PREFIX + key)
+            if cached is not None:
+                return int(cached)
+        except Exception as e:
+            logger.warning(f"读取列表总数缓存失败: {e}")
+    else:
+        with _local_lock:
+            item = _local_counts.get(key)
+            if item is not None and item[0] >= time.time():
+                _local_counts.move_to_end(key)
+                return item[1]
+
+    total = count_fn()
+
+    if client is not None:
+        try:
+            client.setex(_REDIS_COUNT_PREFIX + key, COUNT_CACHE_TTL, total)
+        except Exception as e:
+            logger.warning(f"写入列表总数缓存失败: {e}")
+    else:
+        with _local_lock:
+            _local_counts[key] = (time.time() + COUNT_CACHE_TTL, total)
+            _local_counts.move_to_end(key)
+            while len(_local_counts) > COUNT_CACHE_MAX_SIZE:
+                _local_counts.popitem(last=False)
+
+    return total
+
+
+def invalidate_cached_count(scope):
+    """使某个范围内缓存的全部总数失效（新增/删除记录后调用）"""
+    with _local_lock:
+        _local_generations[scope] = _local_generations.get(scope, 0) + 1
+
+    client = get_redis()
+    if client is not None:
+        try:
+            client.incr(_REDIS_GEN_PREFIX + scope)
+            client.expire(_REDIS_GEN_PREFIX + scope, COUNT_CACHE_TTL * 10)
+        except Exception as e:
+            logger.warning(f"清除列表总数缓存失败: {e}")
+
+
+# ==================== 分页查询 ====================
+
+def keyset_paginate(query, created_col, id_col, cursor=None, page=1, per_page=10,
+                    count_scope=None, count_signature=None, count_query=None,
+                    row_entity=None, keyset_ordered=False):
+    """
+    游标/页码分页查询
+
+    Args:
+        query: 已添加过滤条件的查询
+        created_col: 创建时间列（如 Translate.created_at）
+        id_col: 主键列（如 Translate.id）
+        cursor: 游标字符串；None 表示页码分页，空字符串表示游标分页的第一页
+        page: 页码（页码分页时使用，游标分页时原样返回）
+        per_page: 每页数量
+        count_scope: 总数缓存范围，None 表示不缓存直接计数
+        count_signature: 过滤条件签名
+        count_query: 用于计数的查询，默认使用 query
+        row_entity: 从结果行中取出模型对象的函数（多实体查询时使用）
+        keyset_ordered: 页码分页时 query 是否已按 (created_at, id) 倒序，是则同样返回 next_cursor
+
+    Returns:
+        ListPage
+
+    Raises:
+        ValueError: 游标格式错误
+    """
+    page = max(page or 1, 1)
+    per_page = max(per_page or 10, 1)
+    row_entity = row_entity or (lambda row: row)
+    count_query = count_query if count_query is not None else query
+
+    if cursor is not None:
+        query = query.order_by(None).order_by(created_col.desc(), id_col.desc())
+        if cursor:
+            cursor_created, cursor_id = decode_cursor(cursor)
+            if cursor_created is None:
+                query = query.filter(and_(created_col.is_(None), id_col < cursor_id))
+            else:
+                query = query.filter(or_(
+                    created_col < cursor_created,
+                    and_(created_col == cursor_created, id_col < cursor_id),
+                    created_col.is_(None)
+                ))
+        emit_cursor = True
+    else:
+        query = query.offset((page - 1) * per_page)
+        emit_cursor = keyset_ordered
+
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    items = rows[:per_page]
+
+    next_cursor = None
+    if emit_cursor and has_more and items:
+        last = row_entity(items[-1])
+        next_cursor = encode_cursor(getattr(last, created_col.key), getattr(last, id_col.key))
+
+    count_fn = lambda: count_query.order_by(None).count()
+    if count_scope:
+        total = get_cached_count(count_scope, count_signature, count_fn)
+    else:
+        total = count_fn()
+
+    return ListPage(items, total, page, per_page, next_cursor)
@@ -2,15 +2,158 @@
 """
 PDF转PNG工具
 使用PyMuPDF将PDF页面转换为PNG图片
+
+多页转换使用 render_pages：按页段分给PDF计算进程池（translate/pdf_compute.py），
+每个进程只打开一次文档并渲染一段连续页面，结果按页序逐个产出；
+支持灰度渲染（扫描件体积和编码耗时明显减小）和 DPI 上限。
 """
 import fitz  # PyMuPDF
 import os
 from pathlib import Path
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple, Union
 import logging
 
 logger = logging.getLogger(__name__)
 
+MAX_DPI = int(os.getenv('PDF_RENDER_MAX_DPI', 600))  # 渲染DPI上限
+RENDER_CHUNK_PAGES = 8  # 每个渲染任务的页数
+RENDER_PARALLEL_MIN_PAGES = 8  # 页数少于该值或进程池只有1个进程时在当前进程渲染
+SUPPORTED_FORMATS = ["png", "jpg", "jpeg", "webp"]
+
+
+def _render_matrix(dpi: int, max_dpi: Optional[int] = None) -> fitz.Matrix:
+    """DPI转换为缩放矩阵（PyMuPDF以72 DPI为基准），超过上限时按上限渲染"""
+    dpi = min(dpi, max_dpi or MAX_DPI)
+    zoom = dpi / 72.0
+    return fitz.Matrix(zoom, zoom)
+
+
+def _encode_pixmap(pix, image_format: str, output_path: Optional[str] = None, jpg_quality: int = 95):
+    """按格式保存或编码 pixmap，output_path 为 None 时返回字节数据"""
+    if image_format == "jpg":
+        # JPG不支持透明通道
+        if pix.alpha:
+            pix = fitz.Pixmap(pix, 0)
+        if output_path:
+            pix.save(output_path, output="jpeg", jpg_quality=jpg_quality)
+            return output_path
+        return pix.tobytes("jpeg", jpg_quality=jpg_quality)
+    output = "webp" if image_format == "webp" else "png"
+    if output_path:
+        pix.save(output_path, output=output)
+        return output_path
+    return pix.tobytes(output)
+
+
+def _render_page_range(pdf_path: str, start_page: int, end_page: int, dpi: int, image_format: str,
+                       grayscale: bool, max_dpi: Optional[int], output_dir: Optional[str], prefix: str):
+    """
+    渲染一段连续页面（文档只打开一次）；可在PDF计算进程中执行
+
+    Returns:
+        list: [(页码(从1开始), 图片路径或字节数据)]
+    """
+    doc = fitz.open(pdf_path)
+    try:
+        mat = _render_matrix(dpi, max_dpi)
+        colorspace = fitz.csGRAY if grayscale else fitz.csRGB
+        results = []
+        for page_num in range(start_page, end_page):
+            pix = doc[page_num].get_pixmap(matrix=mat, colorspace=colorspace, alpha=False)
+            output_path = None
+            if output_dir:
+                output_path = os.path.join(output_dir, f"{prefix}_{page_num + 1:04d}.{image_format}")
+            results.append((page_num + 1, _encode_pixmap(pix, image_format, output_path)))
+            pix = None
+        return results
+    finally:
+        doc.close()
+
+
+def render_pages(
+    pdf_path: str,
+    output_dir: Optional[str] = None,
+    dpi: int = 200,
+    page_range: Optional[tuple] = None,
+    prefix: str = "page",
+    image_format: str = "png",
+    grayscale: bool = False,
+    max_dpi: Optional[int] = None,
+    chunk_pages: int = RENDER_CHUNK_PAGES,
+    parallel: bool = True
+) -> Iterator[Tuple[int, Union[str, bytes]]]:
+    """
+    按页段并行渲染PDF，按页序逐个产出结果
+
+    Args:
+        pdf_path: PDF文件路径
+        output_dir: 输出目录，为None时产出图片字节数据而不写文件
+        dpi: 图片分辨率
+        page_range: 页面范围 (start, end)，从1开始，包含end；为None时转换所有页面
+        prefix: 输出文件名前缀
+        image_format: 图片格式 png/jpg/jpeg/webp
+        grayscale: 是否渲染为灰度图
+        max_dpi: DPI上限，默认 PDF_RENDER_MAX_DPI
+        chunk_pages: 每个渲染任务的页数
+        parallel: 是否使用PDF计算进程池
+
+    Yields:
+        tuple: (页码(从1开始), 图片路径或字节数据)
+    """
+    pdf_path = str(pdf_path)
+    if not os.path.exists(pdf_path):
+        raise FileNotFoundError(f"PDF文件不存在: {pdf_path}")
+    image_format = image_format.lower()
+    if image_format not in SUPPORTED_FORMATS:
+        raise ValueError(f"不支持的图片格式: {image_format}，支持的格式: {SUPPORTED_FORMATS}")
+    if image_format == "jpeg":
+        image_format = "jpg"
+    if output_dir is not None:
+        output_dir = str(output_dir)
+        os.makedirs(output_dir, exist_ok=True)
+
+    with fitz.open(pdf_path) as doc:
+        total_pages = doc.page_count
+    if page_range:
+        start_page = max(1, page_range[0]) - 1  # 转换为0索引
+        end_page = min(page_range[1], total_pages)
+    else:
+        start_page, end_page = 0, total_pages
+    if end_page <= start_page:
+        return
+
+    chunk_pages = max(1, chunk_pages)
+    ranges = [(start, min(start + chunk_pages, end_page)) for start in range(start_page, end_page, chunk_pages)]
+    args = (dpi, image_format, grayscale, max_dpi, output_dir, prefix)
+
+    service = None
+    if parallel and end_page - start_page >= RENDER_PARALLEL_MIN_PAGES:
+        from app.translate.pdf_compute import get_service
+        service = get_service()
+        if service.max_workers < 2:
+            service = None
+
+    if service is None:
+        for start, end in ranges:
+            yield from _render_page_range(pdf_path, start, end, *args)
+        return
+
+    # 同时提交的页段数有上限，按页序等待结果，避免字节数据在内存中堆积
+    max_pending = service.max_workers * 2
+    pending = []
+    next_range = 0
+    try:
+        while pending or next_range < len(ranges):
+            while next_range < len(ranges) and len(pending) < max_pending:
+                start, end = ranges[next_range]
+                pending.append(service.submit(_render_page_range, pdf_path, start, end, *args))
+                next_range += 1
+            yield from pending.pop(0).result()
+    finally:
+        # 调用方提前结束迭代时取消未开始的页段
+        for future in pending:
+            future.cancel()
+
 
 def pdf_to_images(
     pdf_path: str,
@@ -18,7 +161,9 @@ def pdf_to_images(
     dpi: int = 200,
     page_range: Optional[tuple] = None,
     prefix: str = "page",
-    image_format: str = "png"
+    image_format: str = "png",
+    grayscale: bool = False,
+    max_dpi: Optional[int] = None
 ) -> List[str]:
     """
     将PDF转换为图片（支持多种格式）
@@ -30,6 +175,8 @@ def pdf_to_images(
         page_range: 页面范围，格式为(start, end)，从1开始。如果为None则转换所有页面
         prefix: 输出文件名前缀，默认"page"
         image_format: 图片格式，支持 "png", "jpg", "jpeg", "webp"，默认"png"
+        grayscale: 是否渲染为灰度图（扫描件推荐）
+        max_dpi: DPI上限，默认 PDF_RENDER_MAX_DPI
     
     Returns:
         List[str]: 生成的图片文件路径列表
@@ -51,68 +198,17 @@ def pdf_to_images(
     # 确定输出目录
     if output_dir is None:
         output_dir = pdf_path.parent
-    else:
-        output_dir = Path(output_dir)
-        output_dir.mkdir(parents=True, exist_ok=True)
-    
-    doc = None
-    image_paths = []
     
     try:
-        # 打开PDF
-        doc = fitz.open(str(pdf_path))
-        total_pages = doc.page_count
-        
-        # 确定要转换的页面范围
-        if page_range:
-            start_page, end_page = page_range
-            start_page = max(1, start_page) - 1  # 转换为0索引
-            end_page = min(end_page, total_pages)
-        else:
-            start_page = 0
-            end_page = total_pages
-        
-        # 验证图片格式
-        image_format = image_format.lower()
-        supported_formats = ["png", "jpg", "jpeg", "webp"]
-        if image_format not in supported_formats:
-            raise ValueError(f"不支持的图片格式: {image_format}，支持的格式: {supported_formats}")
-        
-        # 统一jpg和jpeg
-        if image_format == "jpeg":
-            image_format = "jpg"
-        
-        logger.info(f"开始转换PDF: {pdf_path.name}, 页数: {end_page - start_page}/{total_pages}, DPI: {dpi}, 格式: {image_format.upper()}")
-        
-        # 计算缩放因子（DPI转换为缩放比例）
-        # PyMuPDF使用72 DPI作为基准，所以缩放因子 = dpi / 72
-        zoom = dpi / 72.0
-        mat = fitz.Matrix(zoom, zoom)
-        
-        # 逐页转换
-        for page_num in range(start_page, end_page):
-            page = doc[page_num]
-            
-            # 渲染页面为图片
-            pix = page.get_pixmap(matrix=mat)
-            
-            # 生成输出文件名
-            output_filename = f"{prefix}_{page_num + 1:04d}.{image_format}"
-            output_path = output_dir / output_filename
-            
-            # 根据格式保存
-            if image_format == "jpg":
-                # JPG需要RGB模式
-                if pix.alpha:
-                    pix = fitz.Pixmap(fitz.csRGB, pix)
-                pix.save(str(output_path), output="jpeg", jpg_quality=95)
-            elif image_format == "webp":
-                pix.save(str(output_path), output="webp")
-            else:  # PNG
-                pix.save(str(output_path))
-            
-            image_paths.append(str(output_path))
-            logger.debug(f"已转换第 {page_num + 1} 页: {output_filename}")
+        logger.info(f"开始转换PDF: {pdf_path.name}, 页面范围: {page_range or '全部'}, DPI: {dpi}, "
+                    f"格式: {image_format.upper()}, 灰度: {grayscale}")
+        image_paths = []
+        for page_no, output_path in render_pages(
+            str(pdf_path), output_dir, dpi, page_range, prefix, image_format,
+            grayscale=grayscale, max_dpi=max_dpi
+        ):
+            image_paths.append(output_path)
+            logger.debug(f"已转换第 {page_no} 页: {os.path.basename(output_path)}")
         
         logger.info(f"PDF转换完成，共生成 {len(image_paths)} 张图片")
         return image_paths
@@ -120,9 +216,6 @@ def pdf_to_images(
     except Exception as e:
         logger.error(f"PDF转图片失败: {str(e)}")
         raise
-    finally:
-        if doc:
-            doc.close()
 
 
 # 保持向后兼容的别名
@@ -131,10 +224,12 @@ def pdf_to_png(
     output_dir: Optional[str] = None,
     dpi: int = 200,
     page_range: Optional[tuple] = None,
-    prefix: str = "page"
+    prefix: str = "page",
+    grayscale: bool = False,
+    max_dpi: Optional[int] = None
 ) -> List[str]:
     """向后兼容的别名，默认转换为PNG"""
-    return pdf_to_images(pdf_path, output_dir, dpi, page_range, prefix, "png")
+    return pdf_to_images(pdf_path, output_dir, dpi, page_range, prefix, "png", grayscale, max_dpi)
 
 
 def pdf_to_png_single_page(
@@ -200,15 +295,20 @@ def pdf_to_png_single_page(
 def pdf_to_png_bytes(
     pdf_path: str,
     page_num: int,
-    dpi: int = 200
+    dpi: int = 200,
+    grayscale: bool = False,
+    max_dpi: Optional[int] = None
 ) -> bytes:
     """
     将PDF的指定页面转换为PNG字节数据（不保存文件）
+    多页转换请使用 render_pages(output_dir=None)，文档只打开一次
     
     Args:
         pdf_path: PDF文件路径
         page_num: 页码（从1开始）
         dpi: 图片分辨率，默认200
+        grayscale: 是否渲染为灰度图
+        max_dpi: DPI上限，默认 PDF_RENDER_MAX_DPI
     
     Returns:
         bytes: PNG图片的字节数据
@@ -225,12 +325,11 @@ def pdf_to_png_bytes(
             raise ValueError(f"页码超出范围: {page_num} (总页数: {doc.page_count})")
         
         # 计算缩放因子
-        zoom = dpi / 72.0
-        mat = fitz.Matrix(zoom, zoom)
+        mat = _render_matrix(dpi, max_dpi)
         
         # 获取指定页面并渲染
         page = doc[page_num - 1]
-        pix = page.get_pixmap(matrix=mat)
+        pix = page.get_pixmap(matrix=mat, colorspace=fitz.csGRAY if grayscale else fitz.csRGB, alpha=False)
         
         # 转换为PNG字节数据
         png_bytes = pix.tobytes("png")
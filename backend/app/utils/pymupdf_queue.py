@@ -1,200 +1,448 @@
 # -*- coding: utf-8 -*-
 """
-PyMuPDF操作队列管理器 - 防死锁版本
-限制PyMuPDF的插入、压缩等操作最多允许2个线程同时处理
-避免资源竞争和内存问题，同时防止死锁
+PyMuPDF操作队列管理器 - 文档亲和版本
+原来所有 safe_fitz_* 操作都提交到一个2线程的线程池，每个小操作都要经过一次线程切换和 future 等待，
+两个槽位占满时直接报错，同一文档的连续操作还会落在不同线程上交替执行。现在改为文档亲和模型：
+- 管理器有 max_workers 个工作线程，每个线程有自己的任务队列
+- 打开/新建文档时把文档分配给归属文档最少的工作线程，之后该文档的所有操作都在这个线程上执行
+  （页面操作按 page.parent 找到所属文档）：同一文档的操作串行，不同文档的操作可以并行
+- run(doc, func, ...) 把对同一文档的一组操作作为一个任务执行，只切换一次线程；
+  safe_fitz_* 单个操作保留原接口，内部同样提交到文档所属线程
+- 工作线程内再次调用（嵌套）时直接执行，不会等待自己或其他工作线程而死锁；等待结果有超时
+- 统计每个工作线程的任务数、排队等待时间、忙碌时间和争用次数（提交时该线程正忙或已有排队任务）
+- 死锁检测：提交任务时（最多每 CHECK_INTERVAL 秒一次）检查工作线程的当前任务是否超过 stuck_threshold
+  仍未完成且有任务在排队，是则停用该线程，由新线程接替：
+  · 停用的线程不再分配新文档和无文档任务，排队中的无文档任务转给新线程
+  · 已归属它的文档及其排队任务留在原线程，卡住的任务结束后继续串行执行（MuPDF 不是线程安全的，
+    同一文档不能同时在两个线程上操作），文档全部关闭后该线程退出
+
+文档对象不能跨进程传递，所以这里的工作单元是线程；需要多核并行的重操作使用
+translate/pdf_compute.py 的进程池（按路径打开文档）。
 """
 import threading
 import time
 import logging
-from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from concurrent.futures import Future, TimeoutError
 from functools import wraps
 import queue
-import weakref
+
+import fitz
 
 logger = logging.getLogger(__name__)
 
+_DEFAULT = object()  # 使用管理器的默认超时时间
+_OWNER_ATTR = '_pymupdf_worker'  # 文档上记录所属工作线程的属性
+CHECK_INTERVAL = 5  # 死锁检测间隔（秒）
+
+
+class _Job:
+    """工作线程任务"""
+    __slots__ = ('func', 'args', 'kwargs', 'doc', 'future', 'name', 'submitted_at')
+
+    def __init__(self, func, args, kwargs, doc=None):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.doc = doc  # 任务操作的文档，None 表示与已打开的文档无关
+        self.future = Future()
+        self.name = getattr(func, '__name__', 'operation')
+        self.submitted_at = time.time()
+
+
+class _DocumentWorker:
+    """文档工作线程：依次执行归属文档的任务"""
+
+    def __init__(self, manager, index):
+        self.manager = manager
+        self.index = index
+        self.queue = queue.Queue()
+        self.jobs = 0
+        self.failed = 0
+        self.contended = 0
+        self.busy_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.documents = 0  # 归属该线程且未通过 safe_fitz_close 关闭的文档数（用于分配文档）
+        self.current_name = None
+        self.current_started = None
+        self.retired = False  # 被判定卡死后停用：不再分配新文档，归属的文档全部关闭后退出
+        self.exited = False
+        self.thread = threading.Thread(target=self._loop, name=f"PyMuPDF-{index}", daemon=True)
+        self.thread.start()
+
+    def _loop(self):
+        self.manager._thread_local.worker = self
+        lock = self.manager.lock
+        while True:
+            job = self.queue.get()
+            if job is None:
+                break
+            if not job.future.set_running_or_notify_cancel():
+                continue  # 等待方已超时放弃
+            started = time.time()
+            with lock:
+                wait = started - job.submitted_at
+                self.wait_seconds += wait
+                self.max_wait_seconds = max(self.max_wait_seconds, wait)
+                self.current_name = job.name
+                self.current_started = started
+            try:
+                job.future.set_result(job.func(*job.args, **job.kwargs))
+                failed = False
+            except BaseException as e:
+                job.future.set_exception(e)
+                failed = True
+            with lock:
+                self.jobs += 1
+                self.failed += failed
+                self.busy_seconds += time.time() - started
+                self.current_name = None
+                self.current_started = None
+        with lock:
+            self.exited = True
+
+    def running_seconds(self, now=None):
+        started = self.current_started
+        return 0.0 if started is None else (now or time.time()) - started
+
+
+# 死锁检测和恢复机制
+class DeadlockDetector:
+    """死锁检测器：按工作线程检查当前任务是否卡住且阻塞了排队任务"""
+
+    def __init__(self, queue_manager, stuck_threshold=None, check_interval=CHECK_INTERVAL):
+        self.queue_manager = queue_manager
+        self.stuck_threshold = stuck_threshold or queue_manager.stuck_threshold  # 秒
+        self.check_interval = check_interval
+        self.last_check_time = 0.0
+
+    def check_deadlock(self):
+        """检查是否可能存在死锁"""
+        self.last_check_time = time.time()
+        stuck = self.queue_manager.find_stuck_workers(self.stuck_threshold)
+        if stuck:
+            logger.warning(f"检测到可能的PyMuPDF队列死锁，卡住的工作线程: {stuck}")
+            return True
+        return False
+
+    def recover_from_deadlock(self):
+        """从死锁中恢复：停用卡住的工作线程，由新线程接替（见 PyMuPDFQueueManager.replace_worker）"""
+        stuck = self.queue_manager.find_stuck_workers(self.stuck_threshold)
+        for index in stuck:
+            self.queue_manager.replace_worker(index)
+        return len(stuck)
+
+    def check_and_recover(self):
+        """距上次检查超过 check_interval 时检查，发现卡住的工作线程即恢复（提交任务时调用）"""
+        if time.time() - self.last_check_time < self.check_interval:
+            return 0
+        return self.recover_from_deadlock() if self.check_deadlock() else 0
+
+
 class PyMuPDFQueueManager:
-    """PyMuPDF操作队列管理器 - 防死锁版本"""
-    
-    def __init__(self, max_workers=2):
-        self.max_workers = max_workers
-        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="PyMuPDF")
-        self.active_operations = 0
+    """PyMuPDF操作队列管理器 - 文档亲和版本"""
+
+    def __init__(self, max_workers=2, stuck_threshold=60):
+        self.max_workers = max(1, max_workers)
         self.lock = threading.RLock()  # 使用可重入锁
-        self.operation_queue = queue.Queue()
         self.timeout_seconds = 30  # 操作超时时间
-        self._thread_local = threading.local()  # 线程本地存储
-        
+        self.stuck_threshold = stuck_threshold  # 单个任务超过该时间且有任务排队时判定为卡死
+        self._thread_local = threading.local()  # 线程本地存储（工作线程标记）
+        self._workers = []  # 工作线程在第一次提交时创建
+        self._retired = []  # 已停用、仍有归属文档的工作线程
+        self.deadlock_detector = DeadlockDetector(self)
+        self.inline_calls = 0
+        self.timeouts = 0
+        self.recoveries = 0
+
         logger.info(f"PyMuPDF队列管理器已初始化，最大并发数: {max_workers}")
-    
+
     def _is_current_thread_pymupdf(self):
         """检查当前线程是否是PyMuPDF工作线程"""
-        return hasattr(self._thread_local, 'is_pymupdf_thread')
-    
-    def _mark_as_pymupdf_thread(self):
-        """标记当前线程为PyMuPDF工作线程"""
-        self._thread_local.is_pymupdf_thread = True
-    
-    def submit_operation(self, func, *args, **kwargs):
-        """提交PyMuPDF操作到队列 - 防死锁版本"""
-        
-        # 如果当前线程已经是PyMuPDF工作线程，直接执行（避免嵌套死锁）
+        return getattr(self._thread_local, 'worker', None) is not None
+
+    def _get_workers(self):
+        with self.lock:
+            if not self._workers:
+                self._workers = [_DocumentWorker(self, index) for index in range(self.max_workers)]
+            return self._workers
+
+    def _least_loaded(self):
+        """归属文档最少（其次排队任务最少）的工作线程"""
+        workers = self._get_workers()
+        with self.lock:
+            return min(workers, key=lambda worker: (worker.documents, worker.queue.qsize()))
+
+    def _owner_of(self, doc):
+        """文档（或页面所属文档）归属的工作线程，未登记时分配一个"""
+        if isinstance(doc, fitz.Page):
+            doc = doc.parent
+        worker = getattr(doc, _OWNER_ATTR, None)
+        if worker is None or worker.exited:  # 管理器关闭后重新分配
+            worker = self._adopt(doc, self._least_loaded())
+        return doc, worker
+
+    def _adopt(self, doc, worker):
+        """登记文档归属，返回文档实际所属的工作线程（已被其他线程登记时以先登记的为准）"""
+        if not isinstance(doc, fitz.Document):
+            return worker
+        with self.lock:
+            owner = getattr(doc, _OWNER_ATTR, None)
+            if owner is not None and not owner.exited:
+                return owner
+            # fitz.Document 不支持弱引用，归属直接记在文档对象上
+            setattr(doc, _OWNER_ATTR, worker)
+            worker.documents += 1
+            return worker
+
+    def release(self, doc):
+        """文档关闭后解除归属"""
+        with self.lock:
+            worker = getattr(doc, _OWNER_ATTR, None)
+            if worker is None:
+                return
+            setattr(doc, _OWNER_ATTR, None)
+            if worker.documents > 0:
+                worker.documents -= 1
+            if worker.retired and worker.documents == 0:
+                worker.queue.put(None)  # 停用的线程执行完剩余任务后退出
+
+    def _dispatch(self, worker, func, args, kwargs, timeout=_DEFAULT, doc=None):
+        """在指定工作线程上执行，等待结果"""
+        # 工作线程内的嵌套调用直接执行（避免等待其他工作线程造成死锁）
         if self._is_current_thread_pymupdf():
-            logger.debug(f"当前线程已是PyMuPDF工作线程，直接执行: {func.__name__}")
+            with self.lock:
+                self.inline_calls += 1
+            logger.debug(f"当前线程已是PyMuPDF工作线程，直接执行: {getattr(func, '__name__', func)}")
             return func(*args, **kwargs)
-        
-        # 检查是否会导致死锁（活跃操作数接近最大值）
+
+        job = _Job(func, args, kwargs, doc)
         with self.lock:
-            if self.active_operations >= self.max_workers:
-                logger.warning(f"PyMuPDF队列已满({self.active_operations}/{self.max_workers})，等待可用槽位...")
-                # 等待一小段时间再重试
-                time.sleep(0.1)
-                if self.active_operations >= self.max_workers:
-                    logger.error("PyMuPDF队列持续满载，可能存在死锁风险")
-                    raise RuntimeError("PyMuPDF队列满载，无法提交新操作")
-            
-            self.active_operations += 1
-            logger.debug(f"提交PyMuPDF操作: {func.__name__}, 当前活跃操作数: {self.active_operations}")
-        
+            if worker.current_started is not None or not worker.queue.empty():
+                worker.contended += 1
+            worker.queue.put(job)
+
+        timeout = self.timeout_seconds if timeout is _DEFAULT else timeout
         try:
-            # 使用线程池执行操作，设置超时防止死锁
-            future = self.executor.submit(self._execute_with_context, func, args, kwargs)
-            result = future.result(timeout=self.timeout_seconds)
-            return result
+            return job.future.result(timeout=timeout)
         except TimeoutError:
-            logger.error(f"PyMuPDF操作超时: {func.__name__}, 超时时间: {self.timeout_seconds}秒")
-            raise RuntimeError(f"PyMuPDF操作超时: {func.__name__}")
-        except Exception as e:
-            logger.error(f"PyMuPDF操作失败: {func.__name__}, 错误: {str(e)}")
+            if not job.future.done():
+                job.future.cancel()
+                with self.lock:
+                    self.timeouts += 1
+                logger.error(f"PyMuPDF操作超时: {job.name}, 超时时间: {timeout}秒")
+                raise RuntimeError(f"PyMuPDF操作超时: {job.name}")
             raise
-        finally:
-            with self.lock:
-                self.active_operations -= 1
-                logger.debug(f"PyMuPDF操作完成: {func.__name__}, 当前活跃操作数: {self.active_operations}")
-    
-    def _execute_with_context(self, func, args, kwargs):
-        """在线程池中执行操作，设置线程上下文"""
-        try:
-            self._mark_as_pymupdf_thread()
-            return func(*args, **kwargs)
-        finally:
-            # 清理线程本地状态
-            if hasattr(self._thread_local, 'is_pymupdf_thread'):
-                delattr(self._thread_local, 'is_pymupdf_thread')
-    
+
+    def _check_deadlock(self):
+        """提交任务前检查卡住的工作线程（工作线程内的嵌套调用不检查）"""
+        if not self._is_current_thread_pymupdf():
+            self.deadlock_detector.check_and_recover()
+
+    def run(self, doc, func, *args, timeout=_DEFAULT):
+        """
+        在文档所属的工作线程上执行 func(doc, *args)，对同一文档的一组操作应放在一个 func 中
+
+        Args:
+            doc: fitz.Document 或 fitz.Page（按所属文档路由）
+            timeout: 等待超时（秒），None 表示不限，默认 timeout_seconds
+        """
+        self._check_deadlock()
+        document, worker = self._owner_of(doc)
+        return self._dispatch(worker, func, (doc,) + args, {}, timeout, doc=document)
+
+    def batch(self, doc, operations, timeout=_DEFAULT):
+        """把对同一文档的多个操作 op(doc) 作为一个任务执行，单个操作失败时结果为 None"""
+        def _batch_execute(target):
+            results = []
+            for operation in operations:
+                try:
+                    results.append(operation(target))
+                except Exception as e:
+                    logger.error(f"批量操作中单个操作失败: {str(e)}")
+                    results.append(None)
+            return results
+        return self.run(doc, _batch_execute, timeout=timeout)
+
+    def open_document(self, *args, **kwargs):
+        """在归属文档最少的工作线程上打开文档（参数同 fitz.open），文档归属该线程"""
+        self._check_deadlock()
+        worker = self._least_loaded()
+        doc = self._dispatch(worker, fitz.open, args, kwargs)
+        self._adopt(doc, worker)
+        return doc
+
+    def submit_operation(self, func, *args, **kwargs):
+        """提交与具体文档无关的PyMuPDF操作（兼容原接口）；返回的新文档归属执行它的工作线程"""
+        self._check_deadlock()
+        worker = self._least_loaded()
+        result = self._dispatch(worker, func, args, kwargs)
+        self._adopt(result, worker)
+        return result
+
+    def find_stuck_workers(self, threshold=None):
+        """当前任务执行超过 threshold 秒且有任务在排队的工作线程序号（只检查未停用的线程）"""
+        threshold = self.stuck_threshold if threshold is None else threshold
+        now = time.time()
+        with self.lock:
+            return [worker.index for worker in self._workers
+                    if worker.running_seconds(now) > threshold and not worker.queue.empty()]
+
+    def replace_worker(self, index):
+        """
+        停用卡死的工作线程，由新线程接替：
+        排队中的无文档任务转给新线程；已归属原线程的文档及其任务留在原线程，
+        卡住的任务结束后继续执行，保证同一文档不会同时在两个线程上操作
+        """
+        with self.lock:
+            old = self._workers[index]
+            old.retired = True
+            new = _DocumentWorker(self, index)
+            self._workers[index] = new
+            kept, moved = [], 0
+            while True:
+                try:
+                    job = old.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is not None and job.doc is None:
+                    new.queue.put(job)
+                    moved += 1
+                else:
+                    kept.append(job)
+            for job in kept:
+                old.queue.put(job)
+            if old.documents == 0:
+                old.queue.put(None)
+            else:
+                self._retired.append(old)
+            self.recoveries += 1
+            current, running, documents = old.current_name, old.running_seconds(), old.documents
+        logger.critical(f"PyMuPDF工作线程 {index} 卡在 {current}（{running:.0f}秒），已停用："
+                        f"{moved} 个无文档任务转给新线程，归属的 {documents} 个文档及 {len(kept)} 个任务留在原线程")
+
     def get_status(self):
         """获取队列状态"""
+        now = time.time()
         with self.lock:
+            self._retired = [worker for worker in self._retired if not worker.exited]
+            workers = [{
+                'index': worker.index,
+                'retired': worker.retired,
+                'documents': worker.documents,
+                'queue_size': worker.queue.qsize(),
+                'jobs': worker.jobs,
+                'failed': worker.failed,
+                'contended': worker.contended,
+                'busy_seconds': round(worker.busy_seconds, 2),
+                'avg_wait_ms': round(worker.wait_seconds / worker.jobs * 1000, 2) if worker.jobs else 0.0,
+                'max_wait_ms': round(worker.max_wait_seconds * 1000, 2),
+                'current': worker.current_name,
+                'running_seconds': round(worker.running_seconds(now), 2),
+            } for worker in self._workers + self._retired]
             return {
-                'active_operations': self.active_operations,
+                'active_operations': sum(1 for worker in workers if worker['current'] is not None),
                 'max_workers': self.max_workers,
-                'queue_size': self.operation_queue.qsize(),
-                'timeout_seconds': self.timeout_seconds
+                'queue_size': sum(worker['queue_size'] for worker in workers),
+                'timeout_seconds': self.timeout_seconds,
+                'documents': sum(worker['documents'] for worker in workers),
+                'inline_calls': self.inline_calls,
+                'timeouts': self.timeouts,
+                'recoveries': self.recoveries,
+                'stuck_workers': [worker['index'] for worker in workers if not worker['retired']
+                                  and worker['running_seconds'] > self.stuck_threshold and worker['queue_size']],
+                'workers': workers,
             }
-    
+
     def set_timeout(self, timeout_seconds):
         """设置操作超时时间"""
         self.timeout_seconds = timeout_seconds
         logger.info(f"PyMuPDF操作超时时间设置为: {timeout_seconds}秒")
-    
+
     def shutdown(self):
         """关闭队列管理器"""
         logger.info("正在关闭PyMuPDF队列管理器...")
-        self.executor.shutdown(wait=True, timeout=10)
+        with self.lock:
+            workers, self._workers = self._workers + self._retired, []
+            self._retired = []
+        for worker in workers:
+            worker.queue.put(None)
+        for worker in workers:
+            worker.thread.join(timeout=10)
         logger.info("PyMuPDF队列管理器已关闭")
 
 # 全局PyMuPDF队列管理器实例
 pymupdf_queue = PyMuPDFQueueManager(max_workers=2)
 
 def pymupdf_operation(func):
-    """PyMuPDF操作装饰器，自动将操作加入队列 - 防死锁版本"""
+    """PyMuPDF操作装饰器，自动将操作加入队列（与具体文档无关的操作）"""
     @wraps(func)
     def wrapper(*args, **kwargs):
         return pymupdf_queue.submit_operation(func, *args, **kwargs)
     return wrapper
 
-# PyMuPDF操作的包装函数 - 防死锁版本
+# PyMuPDF操作的包装函数 - 按文档路由到所属工作线程
 def safe_fitz_open(file_path, **kwargs):
-    """安全的fitz.open操作 - 防死锁版本"""
-    @pymupdf_operation
-    def _open():
-        import fitz
-        return fitz.open(file_path, **kwargs)
-    return _open()
+    """安全的fitz.open操作，文档归属执行打开的工作线程"""
+    return pymupdf_queue.open_document(file_path, **kwargs)
 
 def safe_fitz_open_stream(stream, **kwargs):
-    """安全的fitz.open(stream)操作 - 防死锁版本"""
-    @pymupdf_operation
-    def _open_stream():
-        import fitz
-        return fitz.open(stream=stream, **kwargs)
-    return _open_stream()
+    """安全的fitz.open(stream)操作"""
+    return pymupdf_queue.open_document(stream=stream, **kwargs)
 
 def safe_fitz_save(doc, file_path, **kwargs):
-    """安全的doc.save操作 - 防死锁版本"""
-    @pymupdf_operation
-    def _save():
-        return doc.save(file_path, **kwargs)
-    return _save()
+    """安全的doc.save操作"""
+    return pymupdf_queue.run(doc, lambda target: target.save(file_path, **kwargs))
 
 def safe_fitz_close(doc):
-    """安全的doc.close操作 - 防死锁版本"""
-    @pymupdf_operation
-    def _close():
-        return doc.close()
-    return _close()
+    """安全的doc.close操作"""
+    try:
+        return pymupdf_queue.run(doc, lambda target: target.close())
+    finally:
+        pymupdf_queue.release(doc)
 
 def safe_fitz_new_document():
-    """安全的fitz.open()创建新文档 - 防死锁版本"""
-    @pymupdf_operation
-    def _new_doc():
-        import fitz
-        return fitz.open()
-    return _new_doc()
+    """安全的fitz.open()创建新文档"""
+    return pymupdf_queue.open_document()
 
 def safe_fitz_insert_pdf(doc, src_doc, from_page, to_page):
-    """安全的doc.insert_pdf操作 - 防死锁版本"""
-    @pymupdf_operation
-    def _insert():
-        return doc.insert_pdf(src_doc, from_page=from_page, to_page=to_page)
-    return _insert()
+    """安全的doc.insert_pdf操作（在目标文档所属线程执行）"""
+    return pymupdf_queue.run(doc, lambda target: target.insert_pdf(src_doc, from_page=from_page, to_page=to_page))
 
 def safe_fitz_get_text_blocks(page, flags=None):
-    """安全的page.get_text操作 - 防死锁版本"""
-    @pymupdf_operation
-    def _get_text():
-        import fitz
-        if flags is None:
-            flags = fitz.TEXTFLAGS_TEXT
-        return page.get_text("dict", flags=flags)["blocks"]
-    return _get_text()
+    """安全的page.get_text操作"""
+    if flags is None:
+        flags = fitz.TEXTFLAGS_TEXT
+    return pymupdf_queue.run(page, lambda target: target.get_text("dict", flags=flags)["blocks"])
 
 def safe_fitz_insert_text(page, point, text, fontsize, **kwargs):
-    """安全的page.insert_text操作 - 防死锁版本"""
-    @pymupdf_operation
-    def _insert_text():
-        return page.insert_text(point, text, fontsize=fontsize, **kwargs)
-    return _insert_text()
+    """安全的page.insert_text操作"""
+    return pymupdf_queue.run(page, lambda target: target.insert_text(point, text, fontsize=fontsize, **kwargs))
 
 def safe_fitz_insert_textbox(page, rect, text, fontsize, **kwargs):
-    """安全的page.insert_textbox操作 - 防死锁版本"""
-    @pymupdf_operation
-    def _insert_textbox():
-        return page.insert_textbox(rect, text, fontsize=fontsize, **kwargs)
-    return _insert_textbox()
+    """安全的page.insert_textbox操作"""
+    return pymupdf_queue.run(page, lambda target: target.insert_textbox(rect, text, fontsize=fontsize, **kwargs))
 
 def safe_fitz_new_rect(x0, y0, x1, y1):
-    """安全的fitz.Rect创建 - 防死锁版本"""
-    @pymupdf_operation
-    def _new_rect():
-        import fitz
-        return fitz.Rect(x0, y0, x1, y1)
-    return _new_rect()
-
-# 批量操作支持 - 防死锁版本
-def safe_fitz_batch_operations(operations):
-    """批量执行PyMuPDF操作 - 防死锁版本"""
+    """fitz.Rect 是纯数据对象，不涉及文档，直接创建"""
+    return fitz.Rect(x0, y0, x1, y1)
+
+def safe_fitz_page_count(file_path):
+    """打开文档读取页数后关闭（一个任务内完成）"""
+    def _page_count(path):
+        with fitz.open(path) as doc:
+            return doc.page_count
+    return pymupdf_queue.submit_operation(_page_count, file_path)
+
+# 批量操作支持
+def safe_fitz_batch_operations(operations, doc=None):
+    """
+    批量执行PyMuPDF操作（一个任务内完成）
+    指定 doc 时在该文档所属线程上执行 op(doc)，否则执行无参数的 op()
+    """
+    if doc is not None:
+        return pymupdf_queue.batch(doc, operations)
+
     @pymupdf_operation
     def _batch_execute():
         results = []
@@ -208,15 +456,15 @@ def safe_fitz_batch_operations(operations):
         return results
     return _batch_execute()
 
-# 上下文管理器支持 - 防死锁版本
+# 上下文管理器支持
 class PyMuPDFContext:
-    """PyMuPDF操作上下文管理器 - 防死锁版本"""
-    
+    """PyMuPDF操作上下文管理器"""
+
     def __init__(self, operation_name="PyMuPDF操作"):
         self.operation_name = operation_name
         self.start_time = None
         self.is_nested = False
-    
+
     def __enter__(self):
         self.start_time = time.time()
         self.is_nested = pymupdf_queue._is_current_thread_pymupdf()
@@ -225,7 +473,7 @@ class PyMuPDFContext:
         else:
             logger.debug(f"开始PyMuPDF操作: {self.operation_name}")
         return self
-    
+
     def __exit__(self, exc_type, exc_val, exc_tb):
         duration = time.time() - self.start_time if self.start_time else 0
         if exc_type:
@@ -233,71 +481,38 @@ class PyMuPDFContext:
         else:
             logger.debug(f"PyMuPDF操作完成: {self.operation_name}, 耗时: {duration:.2f}秒")
 
-# 死锁检测和恢复机制
-class DeadlockDetector:
-    """死锁检测器"""
-    
-    def __init__(self, queue_manager):
-        self.queue_manager = queue_manager
-        self.last_check_time = time.time()
-        self.stuck_threshold = 60  # 60秒无变化认为可能死锁
-    
-    def check_deadlock(self):
-        """检查是否可能存在死锁"""
-        current_time = time.time()
-        status = self.queue_manager.get_status()
-        
-        # 如果队列满载且长时间无变化，可能存在死锁
-        if (status['active_operations'] >= status['max_workers'] and 
-            current_time - self.last_check_time > self.stuck_threshold):
-            logger.warning("检测到可能的PyMuPDF队列死锁，尝试恢复...")
-            return True
-        
-        self.last_check_time = current_time
-        return False
-    
-    def recover_from_deadlock(self):
-        """从死锁中恢复"""
-        logger.critical("尝试从PyMuPDF队列死锁中恢复...")
-        # 这里可以实现更复杂的恢复逻辑
-        # 比如强制关闭线程池并重新创建
-        pass
-
 # 使用示例和测试函数
 def test_pymupdf_queue():
-    """测试PyMuPDF队列功能 - 防死锁版本"""
-    import fitz
-    
-    def test_operation():
-        # 创建一个简单的PDF文档
-        doc = fitz.open()
+    """测试PyMuPDF队列功能"""
+
+    def test_operation(doc):
+        # 同一文档的多个操作作为一个任务执行
         page = doc.new_page()
         page.insert_text((100, 100), "Test", fontsize=12)
-        doc.close()
         return "操作完成"
-    
-    def test_nested_operation():
+
+    def test_nested_operation(doc):
         """测试嵌套操作（应该不会死锁）"""
-        doc = fitz.open()
         page = doc.new_page()
-        # 嵌套调用其他PyMuPDF操作
-        page.insert_text((100, 100), "Nested Test", fontsize=12)
-        doc.close()
+        # 嵌套调用其他PyMuPDF操作（在工作线程内直接执行）
+        safe_fitz_insert_text(page, (100, 100), "Nested Test", 12)
         return "嵌套操作完成"
-    
+
     try:
+        doc = safe_fitz_new_document()
         # 测试普通操作
-        result1 = pymupdf_queue.submit_operation(test_operation)
+        result1 = pymupdf_queue.run(doc, test_operation)
         logger.info(f"测试结果1: {result1}")
-        
+
         # 测试嵌套操作
-        result2 = pymupdf_queue.submit_operation(test_nested_operation)
+        result2 = pymupdf_queue.run(doc, test_nested_operation)
         logger.info(f"测试结果2: {result2}")
-        
+        safe_fitz_close(doc)
+
         # 检查状态
         status = pymupdf_queue.get_status()
         logger.info(f"队列状态: {status}")
-        
+
     except Exception as e:
         logger.error(f"测试失败: {str(e)}")
 
@@ -2,7 +2,8 @@
 """
 队列管理器 - 智能任务调度
 根据系统资源（任务数和内存使用）智能调度翻译任务
-支持多进程环境：使用文件锁确保只有一个进程运行队列管理器
+支持多进程环境：使用文件锁确保每个节点只有一个进程运行队列管理器
+支持多节点：任务通过租约领取（见 utils/task_lease.py），并发和内存限制按本节点持有的租约计算
 """
 import threading
 import time
@@ -12,6 +13,12 @@ import fcntl
 from typing import Dict, Tuple
 from flask import current_app
 from pathlib import Path
+from app.utils.statistics_rollup import mark_translate_dirty
+from app.utils.queue_notifier import get_queue_notifier, TRANSLATE_QUEUE
+from app.utils import task_lease
+from app.utils.task_cost import cost_model, TaskCost
+from app.utils.fair_queue import FairQueueScheduler, QueuedTask, CANDIDATES_PER_TENANT
+from app.utils.translate_executor import get_stats as get_executor_stats
 
 logger = logging.getLogger(__name__)
 
@@ -30,16 +37,30 @@ class QueueManager:
         self.max_large_pdf_tasks = 2  # 最大大PDF翻译任务数（从1增加到2，超过25页）
         self.max_small_pdf_tasks = 4  # 最大小PDF翻译任务数（从3增加到4，25页以内）
         self.large_pdf_page_threshold = 25  # 大PDF页数阈值
+        # 成本预算（本节点同时运行任务的估算成本之和不超过预算，见 utils/task_cost.py）
+        self.memory_budget_mb = self.max_memory_gb * 1024  # 内存预算(MB)
+        self.cpu_budget = float(os.cpu_count() or 4)  # CPU预算（核数）
+        self.token_budget = 3000000  # 同时在途的token预算（大模型接口吞吐）
         self.queue_lock = threading.Lock()
         self.monitor_thread = None
         self.running = False
         self._app = None  # 缓存应用实例
         self._lock_file = None  # 文件锁
         self._lock_file_handle = None  # 文件锁句柄
+        self.notifier = get_queue_notifier(TRANSLATE_QUEUE)  # 入队/任务结束时唤醒监控线程
+        self.idle_poll_seconds = 30  # 无运行任务时的兜底轮询间隔（秒）
+        self.busy_poll_seconds = 5  # 有运行任务时的轮询间隔（秒），用于内存监控
+        self.local_poll_seconds = 2  # 无Redis时的轮询间隔（秒），其他进程的入队通知无法送达
+        self._last_reclaim_at = 0  # 上次回收过期租约的时间
+        self._last_checkpoint_purge_at = 0  # 上次清理断点续译日志的时间
+        self.checkpoint_purge_seconds = 3600  # 清理断点续译日志的间隔（秒）
+        self.fair_queue = FairQueueScheduler()  # 按租户/用户公平选择排队任务
+        self.max_claim_attempts = 3  # 选中的任务被其他节点领取时最多重新选择的次数
         
     def set_app(self, app):
         """设置应用实例（由主应用调用）"""
         self._app = app
+        self.fair_queue.small_lane_enabled = app.config.get('FAIR_QUEUE_SMALL_LANE', True)
         
     def _get_app(self):
         """获取应用实例"""
@@ -78,9 +99,16 @@ class QueueManager:
         threading.Thread(target=delayed_start, daemon=True).start()
         logger.info("队列监控线程启动中...")
         
+    def _poll_interval(self, running_tasks):
+        """下一次兜底轮询前的最长等待时间（收到通知会提前唤醒）"""
+        if not self.notifier.distributed:
+            return self.local_poll_seconds
+        return self.busy_poll_seconds if running_tasks else self.idle_poll_seconds
+    
     def stop_monitor(self):
         """停止队列监控"""
         self.running = False
+        self.notifier.notify('stop')
         if self.monitor_thread:
             self.monitor_thread.join(timeout=5)
         self._release_lock()
@@ -201,9 +229,13 @@ class QueueManager:
                     self.running = False
                     break
                 
-                self._process_queue()
+                started_count, running_tasks, has_more = self._process_queue()
                 error_count = 0  # 重置错误计数
-                time.sleep(2)  # 每2秒检查一次
+                if has_more:
+                    # 本轮达到启动上限但仍有空位，立即继续处理
+                    continue
+                # 等待入队/任务结束通知，超时后兜底轮询
+                self.notifier.wait(self._poll_interval(running_tasks))
                 
             except Exception as e:
                 error_count += 1
@@ -225,9 +257,20 @@ class QueueManager:
         2. 线程锁确保单进程内不会并发处理队列
         3. 数据库使用 SKIP LOCKED 避免行锁等待
         4. 所有事务都尽可能短，避免长时间持有锁
+        
+        Returns:
+            tuple: (本次启动的任务数, 当前运行任务数, 是否可能还有可立即启动的任务)
         """
+        started_count = 0
+        current_tasks = 0
+        has_more = False
         with self.queue_lock:  # 线程锁：确保单进程内不会并发（文件锁已保证只有一个进程运行）
             try:
+                # 回收其他节点（或本节点已退出进程）过期的租约
+                self._reclaim_expired_leases()
+                # 定期清理断点续译日志
+                self._purge_checkpoints()
+                
                 # 检查当前资源状态
                 current_tasks = self._get_current_running_tasks()
                 memory_gb = self._get_memory_usage_gb()
@@ -252,7 +295,7 @@ class QueueManager:
                         logger.info(f"安全内存清理完成，系统总内存: {memory_gb:.2f}GB")
                     else:
                         logger.warning(f"系统总内存使用率较高({memory_gb:.2f}GB >= {self.critical_memory_gb}GB)，当前有{current_tasks}个任务运行中，暂停启动新任务保护现有任务")
-                        return  # 暂停启动新任务，保护正在运行的任务
+                        return started_count, current_tasks, False  # 暂停启动新任务，保护正在运行的任务
                 
                 # 如果内存使用率极高（超过紧急阈值），动态暂停任务
                 elif memory_gb >= self.emergency_memory_gb:
@@ -280,6 +323,12 @@ class QueueManager:
                     self.emergency_pause_active = False
                     self.emergency_start_time = None
                 
+                # 有任务处于暂停状态（紧急保护）时不派发新任务，避免新任务抢占暂停释放的资源
+                paused_tasks = self._get_paused_tasks()
+                if paused_tasks:
+                    logger.info(f"⏸️ 有{len(paused_tasks)}个任务暂停中，暂不启动新任务")
+                    return started_count, current_tasks, False
+
                 # 如果资源充足，启动队列中的任务（一次可以启动多个）
                 if current_tasks < self.max_concurrent_tasks and memory_gb < self.max_memory_gb:
                     # 计算可以启动的任务数
@@ -288,7 +337,6 @@ class QueueManager:
                     max_start_per_cycle = min(5, available_slots)
                     
                     # 循环启动任务，直到没有可用资源或没有符合条件的任务
-                    started_count = 0
                     consecutive_failures = 0  # 连续失败计数
                     max_consecutive_failures = 3  # 最多连续失败3次后退出
                     
@@ -316,13 +364,56 @@ class QueueManager:
                             time.sleep(0.1)
                     
                     if started_count > 0:
-                        logger.info(f"✅ 本次循环启动了 {started_count} 个任务（当前运行: {current_tasks + started_count}/{self.max_concurrent_tasks}）")
+                        logger.info(f"✅ 本次循环启动了 {started_count} 个任务（当前运行: {current_tasks}/{self.max_concurrent_tasks}）")
+                    has_more = started_count >= max_start_per_cycle and current_tasks < self.max_concurrent_tasks
                     
             except Exception as e:
                 logger.error(f"处理队列时出错: {e}")
+        
+        return started_count, current_tasks, has_more
+    
+    def _reclaim_expired_leases(self):
+        """定期回收租约过期的任务，放回队列的任务会唤醒监控线程"""
+        if time.time() - self._last_reclaim_at < task_lease.RECLAIM_INTERVAL_SECONDS:
+            return
+        self._last_reclaim_at = time.time()
+        try:
+            from app.extensions import db
+            
+            app = self._get_app()
+            with app.app_context():
+                try:
+                    requeued, failed = task_lease.reclaim_expired_leases(db.session)
+                except Exception:
+                    db.session.rollback()
+                    raise
+            for task_id in requeued + failed:
+                mark_translate_dirty(task_id)
+            for task_id in requeued:
+                self.notifier.record_enqueued(task_id)
+        except Exception as e:
+            logger.error(f"回收过期租约失败: {e}")
+    
+    def _purge_checkpoints(self):
+        """定期清理已完成/已删除任务的断点续译日志"""
+        if time.time() - self._last_checkpoint_purge_at < self.checkpoint_purge_seconds:
+            return
+        self._last_checkpoint_purge_at = time.time()
+        from app.translate.checkpoint import purge_stale_checkpoints
+        if not purge_stale_checkpoints():
+            logger.warning("清理断点续译日志失败")
+    
+    def _node_task_filter(self):
+        """本节点运行中任务的过滤条件（租约属于本节点；无租约的旧任务按本节点计算，保守处理）"""
+        from app.models.translate import Translate
+        from sqlalchemy import or_
+        return or_(
+            Translate.lease_owner.like(task_lease.node_owner_pattern()),
+            Translate.lease_owner.is_(None)
+        )
     
     def _get_current_running_tasks(self) -> int:
-        """获取当前运行的任务数（使用数据库状态，支持多进程环境）"""
+        """获取本节点当前运行的任务数（使用数据库状态，支持多进程、多节点环境）"""
         try:
             from app.models.translate import Translate
             
@@ -335,7 +426,8 @@ class QueueManager:
                 # 查询所有状态为 process 或 changing 的任务（这些是正在运行的任务）
                 running_count = Translate.query.filter(
                     Translate.status.in_(['process', 'changing']),
-                    Translate.deleted_flag == 'N'
+                    Translate.deleted_flag == 'N',
+                    self._node_task_filter()
                 ).count()
                 
                 return running_count
@@ -348,6 +440,89 @@ class QueueManager:
             except:
                 return 0
     
+    def _get_running_cost(self) -> Tuple[TaskCost, int]:
+        """本节点运行中任务的成本之和（剩余耗时按进度折算，内存取估算值和实测峰值的较大者）"""
+        from app.models.translate import Translate
+        
+        app = self._get_app()
+        with app.app_context():
+            tasks = Translate.query.with_entities(
+                Translate.origin_filepath, Translate.page_count, Translate.segment_count,
+                Translate.origin_filesize, Translate.size, Translate.estimated_tokens, Translate.process,
+                Translate.peak_memory_mb
+            ).filter(
+                Translate.status.in_(['process', 'changing']),
+                Translate.deleted_flag == 'N',
+                self._node_task_filter()
+            ).all()
+        
+        total = TaskCost()
+        for task in tasks:
+            cost = cost_model.estimate_task(task)
+            cost.wall_seconds *= max(0.0, 1 - float(task.process or 0) / 100)
+            # 实测内存（utils/task_memory.py）已超过估算时按实测计算
+            cost.memory_mb = max(cost.memory_mb, float(task.peak_memory_mb or 0))
+            total = total + cost
+        return total, len(tasks)
+    
+    def _cost_budgets(self) -> Dict:
+        return {
+            'memory_mb': self.memory_budget_mb,
+            'cpu': self.cpu_budget,
+            'tokens': self.token_budget,
+        }
+    
+    def _admit_cost(self, cost: TaskCost, running=None) -> Tuple[bool, str]:
+        """
+        按估算成本判断任务能否在本节点启动
+        本节点没有运行中的任务时总是允许（超出预算的大任务也需要能执行）
+        
+        Args:
+            cost: 任务的估算成本
+            running: 运行中任务的 (成本之和, 任务数)，批量检查时由调用方计算一次后传入
+        """
+        try:
+            running_cost, running_count = running if running is not None else self._get_running_cost()
+        except Exception as e:
+            logger.warning(f"计算运行中任务成本失败，跳过成本检查: {e}")
+            return True, "成本检查跳过"
+        if running_count == 0:
+            return True, "无运行中任务"
+        for metric, budget in self._cost_budgets().items():
+            in_flight = getattr(running_cost, metric)
+            needed = getattr(cost, metric)
+            if in_flight + needed > budget:
+                return False, f"{metric} 预算不足（运行中 {in_flight:.0f} + 本任务 {needed:.0f} > 预算 {budget:.0f}）"
+        return True, "预算充足"
+    
+    def _estimate_queue_drain_seconds(self, running_cost: TaskCost) -> float:
+        """估算清空队列所需时间：待执行总耗时 / 预算允许的有效并发数"""
+        from app.models.translate import Translate
+        
+        app = self._get_app()
+        with app.app_context():
+            queued = Translate.query.with_entities(
+                Translate.origin_filepath, Translate.page_count, Translate.segment_count,
+                Translate.origin_filesize, Translate.size, Translate.estimated_tokens
+            ).filter(
+                Translate.status == 'queued',
+                Translate.deleted_flag == 'N'
+            ).limit(1000).all()
+        if not queued:
+            return running_cost.wall_seconds / max(1, self.max_concurrent_tasks)
+        
+        queued_cost = TaskCost()
+        for task in queued:
+            queued_cost = queued_cost + cost_model.estimate_task(task)
+        count = len(queued)
+        parallelism = float(self.max_concurrent_tasks)
+        for metric, budget in self._cost_budgets().items():
+            average = getattr(queued_cost, metric) / count
+            if average > 0:
+                parallelism = min(parallelism, budget / average)
+        parallelism = max(1.0, parallelism)
+        return (running_cost.wall_seconds + queued_cost.wall_seconds) / parallelism
+    
     def _get_memory_usage_gb(self) -> float:
         """
         获取系统总内存使用量(GB) - 所有Gunicorn进程的总和
@@ -367,15 +542,19 @@ class QueueManager:
             logger.debug(f"获取系统总内存使用量失败: {type(e).__name__}: {e}")
             return 0.0
     
-    def _is_large_pdf(self, file_path):
+    def _is_large_pdf(self, file_path, page_count=None):
         """判断PDF是否为大PDF（超过阈值页数）
         
         Args:
             file_path: PDF文件路径
+            page_count: 上传时探测的页数（translate.page_count），有值时不再打开文件
             
         Returns:
             bool: True表示大PDF，False表示小PDF（默认）
         """
+        if page_count is not None:
+            return page_count > self.large_pdf_page_threshold
+        
         try:
             import os
             import fitz
@@ -406,11 +585,14 @@ class QueueManager:
             
             # 在应用上下文中执行数据库操作
             with app.app_context():
-                # 获取所有正在运行的PDF任务
-                pdf_tasks = Translate.query.filter(
+                # 获取所有正在运行的PDF任务（只取路径和页数，页数由上传时探测）
+                pdf_tasks = Translate.query.with_entities(
+                    Translate.origin_filepath, Translate.page_count
+                ).filter(
                     Translate.status.in_(['process', 'changing']),
                     Translate.deleted_flag == 'N',
-                    Translate.origin_filepath.like('%.pdf')
+                    Translate.origin_filepath.like('%.pdf'),
+                    self._node_task_filter()
                 ).all()
                 
                 # 分别统计大PDF和小PDF
@@ -418,7 +600,7 @@ class QueueManager:
                 small_pdf_count = 0
                 
                 for task in pdf_tasks:
-                    if self._is_large_pdf(task.origin_filepath):
+                    if self._is_large_pdf(task.origin_filepath, task.page_count):
                         large_pdf_count += 1
                     else:
                         small_pdf_count += 1
@@ -515,10 +697,43 @@ class QueueManager:
         except Exception as e:
             logger.error(f"安全内存清理过程中出错: {e}")
     
+    def _get_paused_tasks(self):
+        """本进程中暂停的任务ID列表"""
+        try:
+            from app.utils.task_manager import get_paused_tasks
+            return get_paused_tasks()
+        except Exception as e:
+            logger.debug(f"获取暂停任务失败: {e}")
+            return []
+
+    def _select_tasks_to_pause(self, running_tasks):
+        """
+        选择紧急保护时要暂停的任务：按归因内存从大到小，直到暂停任务的占用覆盖超出紧急阈值的部分
+        没有内存归因数据（psutil不可用、任务刚启动）时暂停全部任务
+        """
+        try:
+            from app.utils.task_memory import get_local_usage
+            running_ids = {item.get('task_id') for item in running_tasks}
+            usage = [item for item in get_local_usage() if item['task_id'] in running_ids and item['memory_mb'] > 0]
+        except Exception as e:
+            logger.debug(f"读取任务内存归因失败: {e}")
+            usage = []
+        if not usage:
+            return running_tasks
+        
+        excess_mb = (self._get_memory_usage_gb() - self.emergency_memory_gb) * 1024
+        selected, covered_mb = [], 0.0
+        for item in usage:
+            selected.append({'task_id': item['task_id']})
+            covered_mb += item['memory_mb']
+            logger.info(f"任务 {item['task_id']} 占用 {item['memory_mb']:.0f}MB（阶段: {item['phase']}），列入暂停")
+            if covered_mb >= excess_mb:
+                break
+        return selected
+
     def _emergency_pause_tasks(self, current_tasks):
         """紧急内存保护 - 根据当前任务数量动态暂停任务"""
         try:
-            import random
             import threading
             import time
             
@@ -530,17 +745,12 @@ class QueueManager:
                 logger.warning("🚨 紧急保护机制：没有运行中的任务可以暂停")
                 return
             
-            # 暂停所有当前运行的任务
-            pause_count = len(running_tasks)  # 暂停所有任务
-            
-            # 确保暂停数量不超过可用任务数
-            pause_count = min(pause_count, len(running_tasks))
+            # 按任务实际占用的内存从大到小选择要暂停的任务
+            tasks_to_pause = self._select_tasks_to_pause(running_tasks)
+            pause_count = len(tasks_to_pause)
             
             logger.critical(f"🚨 紧急保护机制：当前{current_tasks}个任务，将暂停{pause_count}个任务")
             
-            # 随机选择要暂停的任务
-            tasks_to_pause = random.sample(running_tasks, pause_count)
-            
             # 在后台线程中执行暂停和恢复
             def pause_and_resume():
                 try:
@@ -671,7 +881,6 @@ class QueueManager:
         """
         try:
             from app.models.translate import Translate
-            from app.resources.task.translate_service import TranslateEngine
             from app.extensions import db
             from sqlalchemy import text
             from datetime import datetime
@@ -691,62 +900,66 @@ class QueueManager:
                 # 这样可以减少数据库往返次数，提高多进程环境下的性能
                 start_time = datetime.now(pytz.timezone(app.config.get('TIMEZONE', 'Asia/Shanghai')))
                 
-                # 使用 SELECT FOR UPDATE SKIP LOCKED 原子获取并锁定任务
+                # 读取排队任务（不加锁），按租户/用户公平选择后再锁定选中的任务
                 # SKIP LOCKED 确保：如果行被其他进程锁定，会跳过而不是等待，避免死锁
-                # 一次只获取1个任务，减少多进程竞争和锁持有时间
-                query = text("""
-                    SELECT id, origin_filepath FROM translate
-                    WHERE status = 'queued'
-                      AND deleted_flag = 'N'
-                    ORDER BY created_at ASC
-                    LIMIT 1
-                    FOR UPDATE SKIP LOCKED
-                """)
-                
-                result = db.session.execute(query)
-                task_row = result.fetchone()
-                
-                if not task_row:
+                candidates = self._load_queued_candidates(db)
+                if not candidates:
                     logger.debug("队列中没有等待的任务")
                     return False
                 
-                task_id, origin_filepath = task_row[0], task_row[1]
-                
-                # 快速检查PDF任务限制（在事务外检查，避免长时间持有行锁）
+                # PDF任务限制在事务外检查，避免长时间持有行锁
                 # 注意：这里检查可能不准确（因为其他进程可能同时启动任务），
                 # 但可以避免大部分无效更新，最终通过UPDATE的WHERE条件保证原子性
-                if origin_filepath and origin_filepath.lower().endswith('.pdf'):
-                    current_pdf_tasks = self._get_current_pdf_tasks()
-                    is_large_pdf = self._is_large_pdf(origin_filepath)
-                    
-                    if is_large_pdf:
-                        if current_pdf_tasks.get('large', 0) >= self.max_large_pdf_tasks:
-                            logger.debug(f"大PDF任务数已达上限({current_pdf_tasks.get('large', 0)}/{self.max_large_pdf_tasks})，跳过任务 {task_id}")
-                            db.session.rollback()
-                            return False
-                    else:
-                        # 小PDF：可用配额 = 小PDF限制 - 大PDF数量
-                        available_small_slots = self.max_small_pdf_tasks - current_pdf_tasks.get('large', 0)
-                        if current_pdf_tasks.get('small', 0) >= available_small_slots:
-                            logger.debug(f"小PDF任务数已达上限({current_pdf_tasks.get('small', 0)}/{available_small_slots})，跳过任务 {task_id}")
-                            db.session.rollback()
-                            return False
+                current_pdf_tasks = self._get_current_pdf_tasks() if any(
+                    c.origin_filepath and c.origin_filepath.lower().endswith('.pdf') for c in candidates
+                ) else {}
+                
+                selected = None
+                for _ in range(self.max_claim_attempts):
+                    selected = self._select_next_task(candidates, current_pdf_tasks)
+                    if selected is None:
+                        db.session.rollback()
+                        return False
+                    locked = db.session.execute(text("""
+                        SELECT id FROM translate
+                        WHERE id = :task_id
+                          AND status = 'queued'
+                          AND deleted_flag = 'N'
+                        FOR UPDATE SKIP LOCKED
+                    """), {'task_id': selected.id}).fetchone()
+                    if locked:
+                        break
+                    # 已被其他节点领取或删除：退还调度额度，重新选择
+                    logger.debug(f"任务 {selected.id} 已被其他进程处理，重新选择")
+                    self.fair_queue.refund(selected)
+                    candidates.remove(selected)
+                    selected = None
+                
+                if selected is None:
+                    db.session.rollback()
+                    return False
+                
+                task_id, origin_filepath = selected.id, selected.origin_filepath
                 
                 # 原子更新：只有状态为queued时才更新为process
                 # 这个WHERE条件确保即使多个进程同时处理，也只有一个能成功更新
                 # 使用SKIP LOCKED已经避免了行锁等待，这里只是最终的一致性保证
+                # 同时写入租约（本进程负责执行和续约）
+                lease_sql, lease_params = task_lease.lease_assignments()
                 update_result = db.session.execute(
-                    text("""
+                    text(f"""
                         UPDATE translate
                         SET status = 'process',
                             start_at = :start_time,
+                            {lease_sql},
                             updated_at = NOW()
                         WHERE id = :task_id
                           AND status = 'queued'
                     """),
                     {
                         'task_id': task_id,
-                        'start_time': start_time
+                        'start_time': start_time,
+                        **lease_params
                     }
                 )
                 
@@ -754,10 +967,13 @@ class QueueManager:
                     # 更新失败（可能已被其他进程处理）
                     logger.debug(f"任务状态更新失败（可能已被其他进程处理）: task_id={task_id}")
                     db.session.rollback()
+                    self.fair_queue.refund(selected)
                     return False
                 
                 # 立即提交事务，释放行锁（避免长时间持有锁）
                 db.session.commit()
+                mark_translate_dirty(task_id)
+                self.notifier.record_started(task_id)
                 logger.info(f"队列任务 {task_id} ({origin_filepath}) 状态已更新为 process")
                 
                 # 获取完整任务信息（在事务外，避免长时间持有连接）
@@ -769,7 +985,7 @@ class QueueManager:
                 # 在事务外启动任务（避免长时间持有数据库连接和锁）
                 # 注意：此时任务状态已经是 'process'，即使启动失败也会被标记为失败
                 try:
-                    success = TranslateEngine(task_id).execute()
+                    success = self._launch_task(task_id)
                     
                     if success:
                         logger.info(f"队列任务 {task_id} 已启动")
@@ -827,15 +1043,66 @@ class QueueManager:
                 pass
             return False
     
+    def _launch_task(self, task_id):
+        """启动已领取的任务：在当前进程中以线程执行（独立worker覆盖为子进程执行）
+        
+        Returns:
+            bool: 是否成功启动
+        """
+        from app.resources.task.translate_service import TranslateEngine
+        return TranslateEngine(task_id).execute()
+    
+    def _load_queued_candidates(self, db):
+        """读取参与公平调度的排队任务（每个租户按入队时间最早的 CANDIDATES_PER_TENANT 个）
+        
+        按租户分别截取，保证任何有排队任务的租户都能进入候选集，
+        不会因其他租户大量提前入队而被挤出公平选择
+        
+        Returns:
+            list: QueuedTask 列表（按入队时间升序）
+        """
+        from sqlalchemy import text
+        
+        rows = db.session.execute(text("""
+            SELECT id, tenant_id, customer_id, origin_filepath, page_count, segment_count, estimated_tokens,
+                   file_size, enqueued_at
+            FROM (
+                SELECT id, tenant_id, customer_id, origin_filepath, page_count, segment_count, estimated_tokens,
+                       COALESCE(NULLIF(origin_filesize, 0), size) AS file_size,
+                       COALESCE(queued_at, created_at) AS enqueued_at,
+                       ROW_NUMBER() OVER (PARTITION BY tenant_id ORDER BY queued_at ASC, id ASC) AS tenant_rank
+                FROM translate
+                WHERE status = 'queued'
+                  AND deleted_flag = 'N'
+            ) ranked
+            WHERE tenant_rank <= :per_tenant
+            ORDER BY enqueued_at ASC, id ASC
+        """), {'per_tenant': CANDIDATES_PER_TENANT}).fetchall()
+        
+        candidates = []
+        for row in rows:
+            cost = cost_model.estimate(
+                row.origin_filepath, page_count=row.page_count, segment_count=row.segment_count,
+                file_size=row.file_size, estimated_tokens=row.estimated_tokens
+            )
+            candidates.append(QueuedTask(
+                row.id, row.tenant_id, row.customer_id, row.origin_filepath,
+                row.page_count, row.enqueued_at, cost
+            ))
+        return candidates
+    
     def _select_next_task(self, queued_tasks, current_pdf_tasks):
-        """智能选择下一个要启动的任务
+        """按租户公平调度选择下一个要启动的任务
+        
+        先过滤掉受PDF任务数限制或超出成本预算、当前无法启动的任务，
+        再在剩余任务中按租户加权差额轮询选择（见 utils/fair_queue.py）
         
         Args:
-            queued_tasks: 队列中的任务列表
+            queued_tasks: 队列中的任务列表（QueuedTask，按入队时间升序）
             current_pdf_tasks: 当前运行的PDF任务数（字典，包含 'total', 'large', 'small'）
             
         Returns:
-            Translate: 要启动的任务，如果没有合适的则返回None
+            QueuedTask: 要启动的任务（已扣除调度额度，未能启动时需退还），没有合适的则返回None
         """
         try:
             # 从字典中提取大PDF和小PDF的任务数
@@ -846,42 +1113,32 @@ class QueueManager:
             # 例如：小PDF配额3，当前有1个大PDF，则小PDF可用配额为 3-1=2
             available_small_pdf_slots = self.max_small_pdf_tasks - current_large_pdf
             
-            # 按队列顺序遍历任务
+            try:
+                running = self._get_running_cost()
+            except Exception as e:
+                logger.warning(f"计算运行中任务成本失败，跳过成本检查: {e}")
+                running = (TaskCost(), 0)
+            
+            eligible = []
             for task in queued_tasks:
-                is_pdf = task.origin_filepath.lower().endswith('.pdf')
-                
-                if is_pdf:
-                    # 如果是PDF任务，判断是大PDF还是小PDF
-                    is_large = self._is_large_pdf(task.origin_filepath)
-                    
-                    if is_large:
-                        # 大PDF任务：检查大PDF任务数是否未达上限
-                        if current_large_pdf < self.max_large_pdf_tasks:
-                            logger.info(f"选择PDF任务 {task.id} 开始处理")
-                            logger.debug(f"选择大PDF任务 {task.id} (当前大PDF: {current_large_pdf}/{self.max_large_pdf_tasks})")
-                            return task
-                        else:
-                            logger.debug(f"跳过大PDF任务 {task.id} (大PDF已达上限: {current_large_pdf}/{self.max_large_pdf_tasks})")
+                if task.origin_filepath and task.origin_filepath.lower().endswith('.pdf'):
+                    if self._is_large_pdf(task.origin_filepath, task.page_count):
+                        if current_large_pdf >= self.max_large_pdf_tasks:
                             continue
-                    else:
-                        # 小PDF任务：检查可用的小PDF配额
-                        if current_small_pdf < available_small_pdf_slots:
-                            logger.info(f"选择PDF任务 {task.id} 开始处理")
-                            logger.debug(f"选择小PDF任务 {task.id} (当前小PDF: {current_small_pdf}, 可用配额: {available_small_pdf_slots}, 大PDF占用: {current_large_pdf})")
-                            return task
-                        else:
-                            logger.debug(f"跳过小PDF任务 {task.id} (小PDF配额不足: {current_small_pdf}/{available_small_pdf_slots}, 大PDF占用: {current_large_pdf})")
-                            continue
-                else:
-                    # 如果不是PDF任务，直接选择
-                    logger.info(f"选择非PDF任务 {task.id} 开始处理")
-                    logger.debug(f"选择非PDF任务 {task.id} (大PDF: {current_large_pdf}, 小PDF: {current_small_pdf})")
-                    return task
-            
-            # 如果遍历完所有任务都没有找到合适的，返回None
-            logger.debug(f"队列中没有符合条件的任务启动 (大PDF: {current_large_pdf}/{self.max_large_pdf_tasks}, 小PDF: {current_small_pdf}/{available_small_pdf_slots})")
-            logger.info("队列中没有符合条件的任务启动，等待资源释放")
-            return None
+                    elif current_small_pdf >= available_small_pdf_slots:
+                        continue
+                admitted, _ = self._admit_cost(task.cost, running)
+                if admitted:
+                    eligible.append(task)
+            
+            if not eligible:
+                logger.debug(f"队列中没有符合条件的任务启动 (大PDF: {current_large_pdf}/{self.max_large_pdf_tasks}, 小PDF: {current_small_pdf}/{available_small_pdf_slots})")
+                return None
+            
+            task = self.fair_queue.select(eligible)
+            logger.info(f"选择任务 {task.id} 开始处理 (租户: {task.tenant_id}, 用户: {task.customer_id}, "
+                        f"估算耗时: {task.cost.wall_seconds:.0f}s, 可启动/排队: {len(eligible)}/{len(queued_tasks)})")
+            return task
             
         except Exception as e:
             logger.error(f"选择下一个任务时出错: {e}")
@@ -898,19 +1155,32 @@ class QueueManager:
             
             # 在应用上下文中执行数据库操作
             with app.app_context():
+                from datetime import datetime
                 task = Translate.query.get(task_id)
                 if not task:
                     logger.error(f"任务 {task_id} 不存在")
                     return False
                     
                 task.status = 'queued'
+                task.queued_at = datetime.utcnow()
                 db.session.commit()
+                mark_translate_dirty(task_id)
+                self.notify_enqueued(task_id)
                 logger.info(f"任务 {task_id} 已加入队列")
                 return True
         except Exception as e:
             logger.error(f"添加任务到队列失败: {e}")
             return False
     
+    def notify_enqueued(self, task_id: int):
+        """任务状态已提交为queued后调用：记录入队时间并唤醒监控线程"""
+        self.notifier.record_enqueued(task_id)
+        self.notifier.notify('enqueue')
+    
+    def notify_slot_released(self, reason: str = 'finished'):
+        """任务结束/取消/删除后调用：唤醒监控线程启动排队任务"""
+        self.notifier.notify(reason)
+    
     def get_queue_status(self) -> Dict:
         """获取队列状态"""
         try:
@@ -934,6 +1204,16 @@ class QueueManager:
                 # 计算小PDF可用配额
                 available_small_pdf_slots = self.max_small_pdf_tasks - pdf_tasks_info.get('large', 0)
                 
+                # 成本预算使用情况和队列清空时间估算
+                running_cost, _ = self._get_running_cost()
+                cost_status = {
+                    metric: {'budget': budget, 'in_flight': round(getattr(running_cost, metric), 1)}
+                    for metric, budget in self._cost_budgets().items()
+                }
+                drain_seconds = round(self._estimate_queue_drain_seconds(running_cost), 1)
+                from app.translate.pdf_compute import get_service as get_pdf_compute
+                from app.utils.pymupdf_queue import pymupdf_queue
+                
                 return {
                     'queued_count': queued_count,
                     'running_count': running_count,
@@ -950,6 +1230,13 @@ class QueueManager:
                     'memory_limit_gb': self.max_memory_gb,
                     'task_limit': self.max_concurrent_tasks,
                     'can_start_new': current_tasks < self.max_concurrent_tasks and memory_gb < self.max_memory_gb,
+                    'queue_wait': self.notifier.get_wait_stats(),
+                    'cost_budgets': cost_status,
+                    'estimated_drain_seconds': drain_seconds,
+                    'cost_model': cost_model.coefficients(),
+                    'segment_executor': get_executor_stats(),
+                    'pdf_compute': get_pdf_compute().get_stats(),
+                    'pymupdf_queue': pymupdf_queue.get_status(),
                     'resource_status': {
                         'tasks_ok': current_tasks < self.max_concurrent_tasks,
                         'memory_ok': memory_gb < self.max_memory_gb,
@@ -968,11 +1255,25 @@ class QueueManager:
             logger.error(f"获取队列状态失败: {e}")
             return {}
 
-    def can_start_task(self, file_path=None) -> Tuple[bool, str]:
+    def _has_other_queued_tasks(self, task_id) -> bool:
+        """除指定任务外是否还有排队中的任务"""
+        from app.models.translate import Translate
+        
+        app = self._get_app()
+        with app.app_context():
+            return Translate.query.with_entities(Translate.id).filter(
+                Translate.status == 'queued',
+                Translate.deleted_flag == 'N',
+                Translate.id != task_id
+            ).first() is not None
+    
+    def can_start_task(self, file_path=None, page_count=None, task=None) -> Tuple[bool, str]:
         """检查是否可以启动新任务
         
         Args:
             file_path: 要启动的任务的文件路径（可选）
+            page_count: 要启动的任务的PDF页数（可选，上传时探测）
+            task: 要启动的 Translate 记录（可选，用于按成本检查预算）
         
         Returns:
             tuple: (是否可以启动, 原因说明)
@@ -987,6 +1288,9 @@ class QueueManager:
             
             if memory_gb >= self.max_memory_gb:
                 return False, f"内存使用量过高 ({memory_gb:.1f}GB/{self.max_memory_gb}GB)"
+
+            if self._get_paused_tasks():
+                return False, "系统资源紧张"
             
             # 检查PDF任务限制
             if file_path and file_path.lower().endswith('.pdf'):
@@ -995,7 +1299,7 @@ class QueueManager:
                 current_small_pdf = pdf_tasks_info.get('small', 0)
                 
                 # 判断要启动的PDF是大PDF还是小PDF
-                is_large = self._is_large_pdf(file_path)
+                is_large = self._is_large_pdf(file_path, page_count)
                 
                 if is_large:
                     # 检查大PDF限制
@@ -1007,6 +1311,15 @@ class QueueManager:
                     if current_small_pdf >= available_small_pdf_slots:
                         return False, "系统资源紧张"
             
+            if task is not None:
+                # 已有排队任务时新任务也进入队列，由公平调度决定启动顺序，避免直接启动插队
+                if self._has_other_queued_tasks(task.id):
+                    return False, "队列中有等待的任务"
+                admitted, reason = self._admit_cost(cost_model.estimate_task(task))
+                if not admitted:
+                    logger.debug(f"任务 {task.id} 成本检查未通过: {reason}")
+                    return False, "系统资源紧张"
+            
             return True, "资源充足，可以启动"
             
         except Exception as e:
@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+队列唤醒通知
+入队、任务结束、任务取消时发出通知，队列监控线程收到通知后立即处理队列，
+空闲时只做间隔较长的兜底轮询，不再每隔几秒查询一次数据库。
+
+- 配置了 Redis：通过 Redis 列表（RPUSH / BLPOP）跨进程通知
+  （gunicorn 多 worker 下，接收请求的进程和运行监控线程的进程通常不是同一个）
+- 未配置 Redis：使用进程内 Condition，只能唤醒本进程的监控线程，
+  其他进程的事件依赖兜底轮询（此时监控线程使用较短的轮询间隔）
+
+同时记录任务排队等待时间（入队到开始执行），通过 get_queue_wait_stats 导出。
+"""
+import logging
+import math
+import threading
+import time
+
+from app.utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# 队列名称
+TRANSLATE_QUEUE = 'translate'
+IMAGE_TRANSLATE_QUEUE = 'image_translate'
+VIDEO_QUEUE = 'video'
+
+_REDIS_WAKEUP_PREFIX = 'queue_wakeup:'
+_REDIS_ENQUEUED_PREFIX = 'queue_enqueued_at:'
+_REDIS_WAIT_STATS_PREFIX = 'queue_wait_stats:'
+_WAKEUP_KEY_TTL = 300  # 唤醒列表过期时间（秒），监控进程不在时避免堆积
+_WAKEUP_MAX_LENGTH = 100  # 唤醒列表最大长度，多个通知只需唤醒一次
+_ENQUEUED_KEY_TTL = 7 * 24 * 3600  # 入队时间记录过期时间（秒）
+
+
+class QueueNotifier:
+    """单个队列的唤醒通知和排队等待时间统计"""
+
+    def __init__(self, name):
+        self.name = name
+        self._condition = threading.Condition()
+        self._pending = False
+        self._blocking_client = None
+        self._blocking_lock = threading.Lock()
+        # 未配置 Redis 时的进程内记录
+        self._local_enqueued = {}
+        self._local_stats = {'count': 0, 'total': 0.0, 'max': 0.0, 'last': 0.0}
+        self._stats_lock = threading.Lock()
+
+    @property
+    def distributed(self):
+        """是否可以跨进程通知（Redis 可用）"""
+        return get_redis() is not None
+
+    # ==================== 唤醒通知 ====================
+
+    def notify(self, reason=''):
+        """
+        发出唤醒通知（不会阻塞，失败只记录日志）
+
+        Args:
+            reason: 通知原因（enqueue / finished / cancel 等，仅用于日志）
+        """
+        with self._condition:
+            self._pending = True
+            self._condition.notify_all()
+
+        client = get_redis()
+        if client is None:
+            return
+        key = _REDIS_WAKEUP_PREFIX + self.name
+        try:
+            pipe = client.pipeline()
+            pipe.rpush(key, reason or '1')
+            pipe.ltrim(key, -_WAKEUP_MAX_LENGTH, -1)
+            pipe.expire(key, _WAKEUP_KEY_TTL)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"发送队列唤醒通知失败({self.name}): {e}")
+
+    def _get_blocking_client(self, client):
+        """BLPOP 需要独立连接（共享客户端设置了2秒读超时）"""
+        with self._blocking_lock:
+            if self._blocking_client is None:
+                import redis
+                kwargs = dict(client.connection_pool.connection_kwargs)
+                kwargs['socket_timeout'] = None
+                self._blocking_client = redis.Redis(**kwargs)
+            return self._blocking_client
+
+    def wait(self, timeout):
+        """
+        等待唤醒通知
+
+        Args:
+            timeout: 最长等待时间（秒），超时即兜底轮询
+
+        Returns:
+            bool: True 表示收到通知，False 表示等待超时
+        """
+        with self._condition:
+            if self._pending:
+                self._pending = False
+                self._drain_redis()
+                return True
+
+        client = get_redis()
+        if client is not None:
+            try:
+                blocking = self._get_blocking_client(client)
+                result = blocking.blpop(_REDIS_WAKEUP_PREFIX + self.name, timeout=max(1, math.ceil(timeout)))
+                with self._condition:
+                    self._pending = False
+                if result:
+                    # 合并等待期间的多个通知，一次处理队列即可
+                    self._drain_redis()
+                    return True
+                return False
+            except Exception as e:
+                logger.warning(f"等待队列唤醒通知失败({self.name})，使用进程内等待: {e}")
+                with self._blocking_lock:
+                    self._blocking_client = None
+
+        with self._condition:
+            woken = self._condition.wait_for(lambda: self._pending, timeout=timeout)
+            self._pending = False
+            return bool(woken)
+
+    def _drain_redis(self):
+        client = get_redis()
+        if client is None:
+            return
+        try:
+            client.delete(_REDIS_WAKEUP_PREFIX + self.name)
+        except Exception as e:
+            logger.debug(f"清理队列唤醒通知失败({self.name}): {e}")
+
+    # ==================== 排队等待时间 ====================
+
+    def record_enqueued(self, task_id, enqueued_at=None):
+        """记录任务入队时间"""
+        enqueued_at = enqueued_at or time.time()
+        client = get_redis()
+        if client is not None:
+            key = _REDIS_ENQUEUED_PREFIX + self.name
+            try:
+                # 重复入队时保留最早的入队时间
+                client.hsetnx(key, str(task_id), enqueued_at)
+                client.expire(key, _ENQUEUED_KEY_TTL)
+                return
+            except Exception as e:
+                logger.warning(f"记录任务入队时间失败({self.name}): {e}")
+        with self._stats_lock:
+            self._local_enqueued.setdefault(task_id, enqueued_at)
+
+    def record_started(self, task_id):
+        """
+        记录任务开始执行，累计排队等待时间
+
+        Returns:
+            float or None: 本任务的排队等待时间（秒），没有入队记录时返回 None
+        """
+        enqueued_at = None
+        client = get_redis()
+        if client is not None:
+            key = _REDIS_ENQUEUED_PREFIX + self.name
+            try:
+                pipe = client.pipeline()
+                pipe.hget(key, str(task_id))
+                pipe.hdel(key, str(task_id))
+                value, _ = pipe.execute()
+                enqueued_at = float(value) if value is not None else None
+            except Exception as e:
+                logger.warning(f"读取任务入队时间失败({self.name}): {e}")
+        with self._stats_lock:
+            local_value = self._local_enqueued.pop(task_id, None)
+        if enqueued_at is None:
+            enqueued_at = local_value
+        if enqueued_at is None:
+            return None
+
+        wait_seconds = max(0.0, time.time() - enqueued_at)
+        self._add_wait_sample(client, wait_seconds)
+        logger.info(f"队列任务开始执行({self.name}): task_id={task_id}, 排队等待 {wait_seconds:.2f}s")
+        return wait_seconds
+
+    def discard(self, task_id):
+        """任务未经过队列就结束（删除/取消）时清理入队记录"""
+        client = get_redis()
+        if client is not None:
+            try:
+                client.hdel(_REDIS_ENQUEUED_PREFIX + self.name, str(task_id))
+            except Exception as e:
+                logger.debug(f"清理任务入队时间失败({self.name}): {e}")
+        with self._stats_lock:
+            self._local_enqueued.pop(task_id, None)
+
+    def _add_wait_sample(self, client, wait_seconds):
+        if client is not None:
+            key = _REDIS_WAIT_STATS_PREFIX + self.name
+            try:
+                pipe = client.pipeline()
+                pipe.hincrby(key, 'count', 1)
+                pipe.hincrbyfloat(key, 'total', wait_seconds)
+                pipe.hset(key, 'last', wait_seconds)
+                pipe.hget(key, 'max')
+                result = pipe.execute()
+                current_max = float(result[3]) if result[3] is not None else 0.0
+                if wait_seconds > current_max:
+                    client.hset(key, 'max', wait_seconds)
+                return
+            except Exception as e:
+                logger.warning(f"记录排队等待时间失败({self.name}): {e}")
+        with self._stats_lock:
+            stats = self._local_stats
+            stats['count'] += 1
+            stats['total'] += wait_seconds
+            stats['last'] = wait_seconds
+            stats['max'] = max(stats['max'], wait_seconds)
+
+    def get_wait_stats(self):
+        """
+        获取排队等待时间统计（进程启动或Redis键创建以来的累计值）
+
+        Returns:
+            dict: count / avg_seconds / max_seconds / last_seconds
+        """
+        stats = None
+        client = get_redis()
+        if client is not None:
+            try:
+                raw = client.hgetall(_REDIS_WAIT_STATS_PREFIX + self.name)
+                stats = {
+                    'count': int(raw.get('count') or 0),
+                    'total': float(raw.get('total') or 0),
+                    'max': float(raw.get('max') or 0),
+                    'last': float(raw.get('last') or 0),
+                }
+            except Exception as e:
+                logger.warning(f"读取排队等待时间统计失败({self.name}): {e}")
+        if stats is None:
+            with self._stats_lock:
+                stats = dict(self._local_stats)
+
+        count = stats['count']
+        return {
+            'count': count,
+            'avg_seconds': round(stats['total'] / count, 2) if count else 0.0,
+            'max_seconds': round(stats['max'], 2),
+            'last_seconds': round(stats['last'], 2),
+        }
+
+
+_notifiers = {}
+_notifiers_lock = threading.Lock()
+
+
+def get_queue_notifier(name):
+    """获取队列通知对象（进程内单例）"""
+    with _notifiers_lock:
+        notifier = _notifiers.get(name)
+        if notifier is None:
+            notifier = QueueNotifier(name)
+            _notifiers[name] = notifier
+        return notifier
+
+
+def notify_queue(name, reason=''):
+    """唤醒指定队列的监控线程"""
+    get_queue_notifier(name).notify(reason)
+
+
+def get_queue_wait_stats(name):
+    """获取指定队列的排队等待时间统计"""
+    return get_queue_notifier(name).get_wait_stats()
@@ -0,0 +1,57 @@
+"""
+Redis 连接工具
+未配置 REDIS_HOST 或连接失败时返回 None，调用方需自行降级到进程内实现
+"""
+import os
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_client_lock = threading.Lock()
+_client_checked = False
+
+
+def get_redis():
+    """
+    获取共享的 Redis 客户端（进程内单例）
+
+    Returns:
+        redis.Redis or None: 未配置或不可用时返回 None
+    """
+    global _client, _client_checked
+
+    if _client_checked:
+        return _client
+
+    with _client_lock:
+        if _client_checked:
+            return _client
+
+        redis_host = os.getenv('REDIS_HOST')
+        if not redis_host:
+            _client_checked = True
+            return None
+
+        try:
+            import redis
+            pool = redis.ConnectionPool(
+                host=redis_host,
+                port=int(os.getenv('REDIS_PORT') or 6379),
+                password=os.getenv('REDIS_PASSWORD') or None,
+                db=int(os.getenv('REDIS_SELECT') or 0),
+                decode_responses=True,
+                socket_timeout=2,
+                socket_connect_timeout=2
+            )
+            client = redis.Redis(connection_pool=pool)
+            client.ping()
+            _client = client
+            logger.info(f"Redis 已连接: {redis_host}")
+        except Exception as e:
+            _client = None
+            logger.warning(f"Redis 不可用，使用进程内降级方案: {e}")
+
+        _client_checked = True
+        return _client
@@ -0,0 +1,526 @@
+"""
+看板统计汇总（Rollup）
+将 translate / customer 表的统计预先汇总到 translate_statistics（小时级、按租户）
+和 tenant_statistics（存储快照），看板接口只读汇总表，响应时间不再随历史数据增长。
+
+汇总方式：
+- 任务状态变化时调用 mark_translate_dirty / mark_statistics_dirty 标记所在小时
+- 后台线程定期重算被标记的小时（以及当前和上一个小时），每次只扫描一个小时的任务，结果幂等
+- 标记只保存在本进程内，独立worker（app/worker.py）同样运行汇总线程，
+  任务子进程退出前自行重算本进程标记的小时
+- 存储快照按固定间隔重算
+- 历史数据通过 app/script/backfill_statistics.py 一次性回填，回填持有数据库命名锁，同一时间只有一个进程执行
+"""
+import threading
+import time
+import logging
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from flask import Flask
+from sqlalchemy import func, text
+
+logger = logging.getLogger(__name__)
+
+_STATUS_FIELDS = {
+    'none': 'none_count',
+    'queued': 'queued_count',
+    'changing': 'changing_count',
+    'process': 'process_count',
+    'done': 'done_count',
+    'failed': 'failed_count',
+}
+_COUNTER_FIELDS = [
+    'total_count', 'none_count', 'queued_count', 'changing_count', 'process_count',
+    'done_count', 'failed_count', 'input_tokens', 'output_tokens', 'total_tokens',
+    'origin_filesize'
+]
+
+BACKFILL_LOCK_NAME = 'translate_statistics_backfill'
+BACKFILL_LOCK_TIMEOUT = 600  # 手动回填等待其他进程回填结束的最长时间（秒）
+
+_dirty_lock = threading.Lock()
+_dirty_buckets = set()
+_dirty_translate_ids = set()
+
+
+def get_bucket_start(value):
+    """返回时间所在小时的起始时间"""
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def mark_statistics_dirty(created_at):
+    """
+    标记某个任务创建时间所在的小时需要重新汇总
+
+    Args:
+        created_at: 任务的 created_at
+    """
+    if not created_at:
+        return
+    with _dirty_lock:
+        _dirty_buckets.add(get_bucket_start(created_at))
+
+
+def mark_translate_dirty(translate_id):
+    """
+    标记某个任务所在的小时需要重新汇总（只知道任务ID时使用，由后台线程解析创建时间）
+
+    Args:
+        translate_id: 翻译任务ID
+    """
+    if not translate_id:
+        return
+    with _dirty_lock:
+        _dirty_translate_ids.add(int(translate_id))
+
+
+def _pop_dirty():
+    with _dirty_lock:
+        buckets = set(_dirty_buckets)
+        translate_ids = set(_dirty_translate_ids)
+        _dirty_buckets.clear()
+        _dirty_translate_ids.clear()
+    return buckets, translate_ids
+
+
+def _empty_counters():
+    return {field: 0 for field in _COUNTER_FIELDS}
+
+
+def _accumulate(counters, status, count, input_tokens, output_tokens, total_tokens, origin_filesize):
+    counters['total_count'] += int(count or 0)
+    field = _STATUS_FIELDS.get(status)
+    if field:
+        counters[field] += int(count or 0)
+    counters['input_tokens'] += int(input_tokens or 0)
+    counters['output_tokens'] += int(output_tokens or 0)
+    counters['total_tokens'] += int(total_tokens or 0)
+    counters['origin_filesize'] += int(origin_filesize or 0)
+
+
+def _replace_buckets(bucket_starts, counters_by_key):
+    """用新的汇总结果替换指定小时的全部行（在同一个事务中）"""
+    from app.extensions import db
+    from app.models.statistics import TranslateStatistics
+
+    if not bucket_starts:
+        return
+    TranslateStatistics.query.filter(
+        TranslateStatistics.bucket_start.in_(list(bucket_starts))
+    ).delete(synchronize_session=False)
+    for (tenant_id, bucket_start), counters in counters_by_key.items():
+        db.session.add(TranslateStatistics(
+            tenant_id=tenant_id,
+            bucket_start=bucket_start,
+            stat_date=bucket_start.date(),
+            **counters
+        ))
+
+
+def refresh_bucket(bucket_start):
+    """
+    重新汇总某个小时内创建的任务（需要在应用上下文中调用）
+
+    Args:
+        bucket_start: 小时起始时间
+    """
+    from app.extensions import db
+    from app.models.translate import Translate
+    from app.models.tenant_customer import TenantCustomer
+
+    bucket_start = get_bucket_start(bucket_start)
+    bucket_end = bucket_start + timedelta(hours=1)
+    tenant_col = func.coalesce(TenantCustomer.tenant_id, 0)
+
+    try:
+        rows = db.session.query(
+            tenant_col.label('tenant_id'),
+            Translate.status,
+            func.count(Translate.id),
+            func.sum(Translate.input_tokens),
+            func.sum(Translate.output_tokens),
+            func.sum(Translate.total_tokens),
+            func.sum(Translate.origin_filesize)
+        ).outerjoin(
+            TenantCustomer, Translate.customer_id == TenantCustomer.customer_id
+        ).filter(
+            Translate.deleted_flag == 'N',
+            Translate.created_at >= bucket_start,
+            Translate.created_at < bucket_end
+        ).group_by(tenant_col, Translate.status).all()
+
+        counters_by_key = defaultdict(_empty_counters)
+        for tenant_id, status, count, input_tokens, output_tokens, total_tokens, origin_filesize in rows:
+            _accumulate(counters_by_key[(tenant_id, bucket_start)], status, count,
+                        input_tokens, output_tokens, total_tokens, origin_filesize)
+
+        _replace_buckets({bucket_start}, counters_by_key)
+        db.session.commit()
+    except Exception as e:
+        # 多个进程同时汇总同一小时可能触发唯一约束冲突，回滚即可（另一方的结果同样正确）
+        db.session.rollback()
+        logger.warning(f"汇总统计小时 {bucket_start} 失败: {e}")
+
+
+def refresh_tenant_storage():
+    """重新汇总各租户的存储使用快照（需要在应用上下文中调用）"""
+    from app.extensions import db
+    from app.models.customer import Customer
+    from app.models.tenant_customer import TenantCustomer
+    from app.models.statistics import TenantStatistics
+
+    tenant_col = func.coalesce(TenantCustomer.tenant_id, 0)
+    try:
+        rows = db.session.query(
+            tenant_col.label('tenant_id'),
+            func.count(Customer.id),
+            func.sum(Customer.storage),
+            func.sum(Customer.total_storage)
+        ).outerjoin(
+            TenantCustomer, Customer.id == TenantCustomer.customer_id
+        ).filter(
+            Customer.deleted_flag == 'N'
+        ).group_by(tenant_col).all()
+
+        existing = {row.tenant_id: row for row in TenantStatistics.query.all()}
+        seen = set()
+        for tenant_id, customer_count, used_storage, total_storage in rows:
+            seen.add(tenant_id)
+            record = existing.get(tenant_id)
+            if record is None:
+                record = TenantStatistics(tenant_id=tenant_id)
+                db.session.add(record)
+            record.customer_count = int(customer_count or 0)
+            record.used_storage = int(used_storage or 0)
+            record.total_storage = int(total_storage or 0)
+            record.updated_at = datetime.utcnow()
+
+        for tenant_id, record in existing.items():
+            if tenant_id not in seen:
+                db.session.delete(record)
+
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"汇总租户存储统计失败: {e}")
+
+
+def flush_dirty_statistics():
+    """重算所有被标记的小时（需要在应用上下文中调用）"""
+    from app.models.translate import Translate
+
+    buckets, translate_ids = _pop_dirty()
+
+    if translate_ids:
+        try:
+            rows = Translate.query.with_entities(Translate.created_at).filter(
+                Translate.id.in_(list(translate_ids))
+            ).all()
+            for (created_at,) in rows:
+                if created_at:
+                    buckets.add(get_bucket_start(created_at))
+        except Exception as e:
+            logger.warning(f"解析待汇总任务失败: {e}")
+
+    # 当前小时和上一个小时始终重算，覆盖未显式标记的新建任务和状态变化
+    now_bucket = get_bucket_start(datetime.utcnow())
+    buckets.add(now_bucket)
+    buckets.add(now_bucket - timedelta(hours=1))
+
+    for bucket_start in sorted(buckets):
+        refresh_bucket(bucket_start)
+
+
+@contextmanager
+def _backfill_lock(timeout):
+    """
+    回填命名锁（MySQL GET_LOCK），多个进程同时启动时只有一个执行回填
+
+    锁绑定在独立连接上，不受回填过程中 session 提交的影响；非 MySQL 数据库（本地开发）不加锁。
+
+    Yields:
+        bool: 是否获得锁
+    """
+    from app.extensions import db
+
+    if db.engine.dialect.name != 'mysql':
+        yield True
+        return
+
+    conn = db.engine.connect()
+    try:
+        acquired = conn.execute(
+            text("SELECT GET_LOCK(:name, :timeout)"), {'name': BACKFILL_LOCK_NAME, 'timeout': timeout}
+        ).scalar() == 1
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                conn.execute(text("SELECT RELEASE_LOCK(:name)"), {'name': BACKFILL_LOCK_NAME})
+    finally:
+        conn.close()
+
+
+def backfill_statistics(batch_size=5000, only_if_empty=False, lock_timeout=BACKFILL_LOCK_TIMEOUT):
+    """
+    一次性回填全部历史统计（需要在应用上下文中调用）
+
+    按ID分批流式扫描 translate 表，在内存中按 (租户, 小时) 汇总后整体替换汇总表。
+
+    Args:
+        batch_size: 每批扫描的任务数
+        only_if_empty: 只在汇总表为空时回填（首次部署自动回填）
+        lock_timeout: 等待回填锁的时间（秒），超时说明其他进程正在回填
+
+    Returns:
+        int: 写入的汇总行数，未执行回填时返回 None
+    """
+    from app.models.statistics import TranslateStatistics
+
+    with _backfill_lock(lock_timeout) as acquired:
+        if not acquired:
+            logger.info("其他进程正在回填统计数据，跳过本次回填")
+            return None
+        # 获得锁后再检查：等锁期间其他进程可能已完成回填
+        if only_if_empty and TranslateStatistics.query.first() is not None:
+            return None
+        return _backfill_all(batch_size)
+
+
+def _backfill_all(batch_size):
+    """扫描全部任务并整体替换汇总表（调用方持有回填锁）"""
+    from app.extensions import db
+    from app.models.translate import Translate
+    from app.models.tenant_customer import TenantCustomer
+    from app.models.statistics import TranslateStatistics
+
+    tenant_col = func.coalesce(TenantCustomer.tenant_id, 0)
+    counters_by_key = defaultdict(_empty_counters)
+    last_id = 0
+
+    while True:
+        rows = db.session.query(
+            Translate.id,
+            tenant_col,
+            Translate.status,
+            Translate.created_at,
+            Translate.input_tokens,
+            Translate.output_tokens,
+            Translate.total_tokens,
+            Translate.origin_filesize
+        ).outerjoin(
+            TenantCustomer, Translate.customer_id == TenantCustomer.customer_id
+        ).filter(
+            Translate.deleted_flag == 'N',
+            Translate.id > last_id
+        ).order_by(Translate.id.asc()).limit(batch_size).all()
+
+        if not rows:
+            break
+
+        for translate_id, tenant_id, status, created_at, input_tokens, output_tokens, total_tokens, origin_filesize in rows:
+            last_id = max(last_id, translate_id)
+            if not created_at:
+                continue
+            _accumulate(counters_by_key[(tenant_id, get_bucket_start(created_at))], status, 1,
+                        input_tokens, output_tokens, total_tokens, origin_filesize)
+
+        logger.info(f"统计回填进度: 已扫描到任务ID {last_id}")
+
+    try:
+        TranslateStatistics.query.delete(synchronize_session=False)
+        _replace_buckets({bucket for _, bucket in counters_by_key.keys()}, counters_by_key)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    refresh_tenant_storage()
+    logger.info(f"统计回填完成，共写入 {len(counters_by_key)} 行")
+    return len(counters_by_key)
+
+
+# ==================== 看板读取 ====================
+
+def _statistics_query(tenant_id=None):
+    from app.models.statistics import TranslateStatistics
+
+    query = TranslateStatistics.query
+    if tenant_id is not None:
+        query = query.filter(TranslateStatistics.tenant_id == tenant_id)
+    return query
+
+
+def get_task_totals(tenant_id=None, start=None):
+    """
+    汇总任务计数
+
+    Args:
+        tenant_id: 租户ID，None表示全部租户
+        start: 只统计该时间之后创建的任务（按小时对齐）
+
+    Returns:
+        dict: 各计数字段的总和
+    """
+    from app.models.statistics import TranslateStatistics
+
+    query = _statistics_query(tenant_id)
+    if start is not None:
+        query = query.filter(TranslateStatistics.bucket_start >= get_bucket_start(start))
+
+    row = query.with_entities(
+        *[func.coalesce(func.sum(getattr(TranslateStatistics, field)), 0) for field in _COUNTER_FIELDS]
+    ).one()
+    return {field: int(value or 0) for field, value in zip(_COUNTER_FIELDS, row)}
+
+
+def get_daily_task_counts(start_date, end_date, tenant_id=None):
+    """
+    按天汇总任务数
+
+    Returns:
+        dict: {date: count}
+    """
+    from app.models.statistics import TranslateStatistics
+
+    rows = _statistics_query(tenant_id).filter(
+        TranslateStatistics.stat_date >= start_date,
+        TranslateStatistics.stat_date <= end_date
+    ).with_entities(
+        TranslateStatistics.stat_date,
+        func.sum(TranslateStatistics.total_count)
+    ).group_by(TranslateStatistics.stat_date).all()
+    return {stat_date: int(count or 0) for stat_date, count in rows}
+
+
+def get_storage_totals(tenant_id=None):
+    """
+    读取存储快照
+
+    Returns:
+        dict: {'used_storage', 'total_storage', 'customer_count'}
+    """
+    from app.models.statistics import TenantStatistics
+
+    query = TenantStatistics.query
+    if tenant_id is not None:
+        query = query.filter(TenantStatistics.tenant_id == tenant_id)
+    used_storage, total_storage, customer_count = query.with_entities(
+        func.coalesce(func.sum(TenantStatistics.used_storage), 0),
+        func.coalesce(func.sum(TenantStatistics.total_storage), 0),
+        func.coalesce(func.sum(TenantStatistics.customer_count), 0)
+    ).one()
+    return {
+        'used_storage': int(used_storage or 0),
+        'total_storage': int(total_storage or 0),
+        'customer_count': int(customer_count or 0)
+    }
+
+
+# ==================== 后台汇总线程 ====================
+
+class StatisticsRollupScheduler:
+    """统计汇总调度器（API进程和独立worker各一个，负责刷新本进程标记的小时）"""
+
+    def __init__(self, app: Flask = None, interval_seconds: int = 15, storage_interval_seconds: int = 60):
+        """
+        Args:
+            app: Flask应用实例
+            interval_seconds: 汇总标记小时的间隔（秒）
+            storage_interval_seconds: 汇总存储快照的间隔（秒）
+        """
+        self.app = app
+        self.interval = interval_seconds
+        self.storage_interval = storage_interval_seconds
+        self.running = False
+        self.thread = None
+        self._lock = threading.Lock()
+        self._last_storage_refresh = 0
+        self._backfill_checked = False
+
+    def start(self):
+        """启动汇总线程"""
+        with self._lock:
+            if self.running:
+                logger.warning("统计汇总调度器已在运行")
+                return
+
+            if not self.app:
+                logger.error("Flask应用未初始化，无法启动统计汇总调度器")
+                return
+
+            self.running = True
+            self.thread = threading.Thread(target=self._rollup_loop, daemon=True)
+            self.thread.start()
+            logger.info(f"统计汇总调度器已启动: 汇总间隔={self.interval}秒, 存储快照间隔={self.storage_interval}秒")
+
+    def stop(self):
+        """停止汇总线程"""
+        with self._lock:
+            if not self.running:
+                return
+
+            self.running = False
+            if self.thread:
+                self.thread.join(timeout=5)
+            logger.info("统计汇总调度器已停止")
+
+    def _rollup_loop(self):
+        while self.running:
+            try:
+                time.sleep(self.interval)
+                if not self.running:
+                    break
+                self._execute_rollup()
+            except Exception as e:
+                logger.error(f"统计汇总调度器循环异常: {str(e)}", exc_info=True)
+                time.sleep(60)
+
+    def _execute_rollup(self):
+        from app.extensions import db
+        from app.models.statistics import TranslateStatistics
+
+        with self.app.app_context():
+            try:
+                # 汇总表为空（首次部署）时自动回填历史数据
+                if not self._backfill_checked:
+                    self._backfill_checked = True
+                    if TranslateStatistics.query.first() is None:
+                        logger.info("统计汇总表为空，开始回填历史数据")
+                        backfill_statistics(only_if_empty=True, lock_timeout=0)
+                flush_dirty_statistics()
+                if time.time() - self._last_storage_refresh >= self.storage_interval:
+                    refresh_tenant_storage()
+                    self._last_storage_refresh = time.time()
+            finally:
+                db.session.remove()
+
+
+_rollup_scheduler = None
+
+
+def init_statistics_rollup(app: Flask, interval_seconds: int = 15, storage_interval_seconds: int = 60):
+    """
+    初始化并启动统计汇总调度器
+
+    Args:
+        app: Flask应用实例
+        interval_seconds: 汇总标记小时的间隔（秒）
+        storage_interval_seconds: 汇总存储快照的间隔（秒）
+    """
+    global _rollup_scheduler
+
+    if _rollup_scheduler is not None:
+        logger.warning("统计汇总调度器已初始化，跳过重复初始化")
+        return _rollup_scheduler
+
+    _rollup_scheduler = StatisticsRollupScheduler(
+        app=app,
+        interval_seconds=interval_seconds,
+        storage_interval_seconds=storage_interval_seconds
+    )
+    _rollup_scheduler.start()
+
+    return _rollup_scheduler
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""
+翻译任务成本模型
+根据上传时探测的文档元数据（页数、段落数、文件大小、格式）估算任务的资源成本：
+- memory_mb: 峰值内存(MB)
+- cpu: 占用的CPU核数
+- tokens: 调用大模型的 token 数（输入+输出）
+- wall_seconds: 执行耗时(秒)
+
+成本 = 格式基础成本 + 单位成本 × 单位数（PDF按页，其他格式按段落）。
+单位成本会根据实际运行结果自动校准：任务结束时在耗时日志（logs/translate_timing.log）
+中记录一行 step=任务资源，调度进程定期读取最近的记录重新拟合（与默认值按样本数加权）。
+"""
+import logging
+import os
+import pathlib
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+TIMING_LOG_FILE = pathlib.Path(__file__).resolve().parent.parent / "logs" / "translate_timing.log"
+OBSERVATION_STEP = "任务资源"  # 耗时日志中任务资源记录的 step 名称
+CALIBRATION_INTERVAL_SECONDS = 600  # 重新校准的间隔（秒）
+CALIBRATION_MAX_LINES = 5000  # 校准时最多读取的日志行数（从文件末尾读取）
+CALIBRATION_PRIOR_WEIGHT = 5  # 默认值相当于多少条观测（样本越多越接近实测值）
+
+# 各格式的默认成本：(基础成本, 单位成本)，单位为 unit 字段
+_DEFAULT_COEFFICIENTS = {
+    'pdf': {'unit': 'page', 'memory_mb': (300, 12), 'cpu': (1.0, 0.0), 'tokens': (0, 1500), 'wall_seconds': (20, 8)},
+    'docx': {'unit': 'segment', 'memory_mb': (150, 0.2), 'cpu': (0.5, 0.0), 'tokens': (0, 120), 'wall_seconds': (10, 0.5)},
+    'pptx': {'unit': 'segment', 'memory_mb': (150, 0.2), 'cpu': (0.5, 0.0), 'tokens': (0, 80), 'wall_seconds': (10, 0.4)},
+    'xlsx': {'unit': 'segment', 'memory_mb': (200, 0.05), 'cpu': (0.5, 0.0), 'tokens': (0, 40), 'wall_seconds': (10, 0.2)},
+    'text': {'unit': 'segment', 'memory_mb': (80, 0.05), 'cpu': (0.3, 0.0), 'tokens': (0, 100), 'wall_seconds': (5, 0.4)},
+}
+_FORMAT_ALIASES = {'doc': 'docx', 'xls': 'xlsx', 'txt': 'text', 'md': 'text', 'csv': 'text'}
+# 缺少页数/段落数时按文件大小估算单位数（字节/单位）
+_BYTES_PER_UNIT = {'pdf': 60 * 1024, 'docx': 300, 'pptx': 2000, 'xlsx': 100, 'text': 200}
+METRICS = ('memory_mb', 'cpu', 'tokens', 'wall_seconds')
+
+
+class TaskCost:
+    """任务资源成本"""
+
+    def __init__(self, memory_mb=0.0, cpu=0.0, tokens=0.0, wall_seconds=0.0):
+        self.memory_mb = memory_mb
+        self.cpu = cpu
+        self.tokens = tokens
+        self.wall_seconds = wall_seconds
+
+    def __add__(self, other):
+        return TaskCost(*(getattr(self, m) + getattr(other, m) for m in METRICS))
+
+    def to_dict(self):
+        return {
+            'memory_mb': round(self.memory_mb, 1),
+            'cpu': round(self.cpu, 2),
+            'tokens': int(self.tokens),
+            'wall_seconds': round(self.wall_seconds, 1),
+        }
+
+
+def normalize_format(file_path):
+    """文件路径 → 成本模型中的格式名"""
+    ext = os.path.splitext(file_path or '')[1].lower().lstrip('.')
+    ext = _FORMAT_ALIASES.get(ext, ext)
+    return ext if ext in _DEFAULT_COEFFICIENTS else 'text'
+
+
+def task_units(fmt, page_count=None, segment_count=None, file_size=None):
+    """任务的单位数（PDF为页数，其他为段落数），缺少元数据时按文件大小估算"""
+    if fmt == 'pdf' and page_count:
+        return float(page_count)
+    if fmt != 'pdf' and segment_count:
+        return float(segment_count)
+    if file_size:
+        return max(1.0, float(file_size) / _BYTES_PER_UNIT[fmt])
+    return 1.0
+
+
+class CostModel:
+    """成本模型（进程内单例，调度进程定期从耗时日志校准）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._coefficients = {fmt: dict(values) for fmt, values in _DEFAULT_COEFFICIENTS.items()}
+        self._samples = {fmt: 0 for fmt in _DEFAULT_COEFFICIENTS}
+        self._last_calibration = 0.0
+
+    def estimate(self, file_path, page_count=None, segment_count=None, file_size=None, estimated_tokens=None):
+        """
+        估算任务成本
+
+        Args:
+            file_path: 原文件路径（用于判断格式）
+            page_count / segment_count / file_size / estimated_tokens: 上传时探测的元数据
+
+        Returns:
+            TaskCost
+        """
+        self.maybe_calibrate()
+        fmt = normalize_format(file_path)
+        units = task_units(fmt, page_count, segment_count, file_size)
+        with self._lock:
+            coefficients = self._coefficients[fmt]
+        values = {}
+        for metric in METRICS:
+            base, per_unit = coefficients[metric]
+            values[metric] = base + per_unit * units
+        if estimated_tokens:
+            # 探测得到的原文token数更准确：译文与原文相当，再加上提示词开销
+            values['tokens'] = max(values['tokens'], estimated_tokens * 2.5)
+        return TaskCost(**values)
+
+    def estimate_task(self, task):
+        """按 Translate 记录估算成本"""
+        return self.estimate(
+            task.origin_filepath,
+            page_count=getattr(task, 'page_count', None),
+            segment_count=getattr(task, 'segment_count', None),
+            file_size=getattr(task, 'origin_filesize', None) or getattr(task, 'size', None),
+            estimated_tokens=getattr(task, 'estimated_tokens', None),
+        )
+
+    def coefficients(self):
+        """当前单位成本（用于状态展示）"""
+        with self._lock:
+            return {
+                fmt: {
+                    'unit': values['unit'],
+                    'samples': self._samples[fmt],
+                    **{metric: [round(values[metric][0], 3), round(values[metric][1], 4)] for metric in METRICS},
+                }
+                for fmt, values in self._coefficients.items()
+            }
+
+    # ==================== 校准 ====================
+
+    def maybe_calibrate(self):
+        """距上次校准超过 CALIBRATION_INTERVAL_SECONDS 时重新校准"""
+        if time.time() - self._last_calibration < CALIBRATION_INTERVAL_SECONDS:
+            return
+        self._last_calibration = time.time()
+        try:
+            self.calibrate(_read_observations())
+        except Exception as e:
+            logger.warning(f"任务成本模型校准失败: {e}")
+
+    def calibrate(self, observations):
+        """
+        根据实际运行记录重新计算单位成本
+
+        Args:
+            observations: [{'format', 'units', 'memory_mb', 'cpu', 'tokens', 'wall_seconds'}]，
+                          缺少的指标为 None
+        """
+        grouped = {}
+        for item in observations:
+            grouped.setdefault(item['format'], []).append(item)
+
+        updated = {}
+        for fmt, items in grouped.items():
+            if fmt not in _DEFAULT_COEFFICIENTS:
+                continue
+            defaults = _DEFAULT_COEFFICIENTS[fmt]
+            coefficients = dict(defaults)
+            for metric in METRICS:
+                samples = [item for item in items if item.get(metric) is not None and item.get('units')]
+                if not samples:
+                    continue
+                base, default_per_unit = defaults[metric]
+                # 与默认值按样本数加权，样本少时不过度相信个别记录
+                weight = len(samples) / (len(samples) + CALIBRATION_PRIOR_WEIGHT)
+                if not default_per_unit:
+                    # 与规模无关的指标（如CPU核数）只校准基础成本
+                    observed_base = sum(item[metric] for item in samples) / len(samples)
+                    coefficients[metric] = (base * (1 - weight) + observed_base * weight, 0.0)
+                    continue
+                total_units = sum(item['units'] for item in samples)
+                observed_per_unit = max(0.0, sum(item[metric] - base for item in samples) / total_units)
+                coefficients[metric] = (base, default_per_unit * (1 - weight) + observed_per_unit * weight)
+            updated[fmt] = (coefficients, len(items))
+
+        with self._lock:
+            for fmt, (coefficients, count) in updated.items():
+                self._coefficients[fmt] = coefficients
+                self._samples[fmt] = count
+        if updated:
+            summary = ', '.join(f"{fmt}={count}" for fmt, (_, count) in updated.items())
+            logger.info(f"任务成本模型已校准（样本数）: {summary}")
+
+
+def _tail_lines(path, max_lines):
+    """读取文件末尾最多 max_lines 行"""
+    if not path.exists():
+        return []
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        block = 64 * 1024
+        data = b''
+        while size > 0 and data.count(b'\n') <= max_lines:
+            read_size = min(block, size)
+            size -= read_size
+            f.seek(size)
+            data = f.read(read_size) + data
+    return data.decode('utf-8', errors='ignore').splitlines()[-max_lines:]
+
+
+def _read_observations():
+    """从耗时日志中读取任务资源记录"""
+    observations = []
+    for line in _tail_lines(TIMING_LOG_FILE, CALIBRATION_MAX_LINES):
+        if f"step={OBSERVATION_STEP}" not in line:
+            continue
+        fields = {}
+        for part in line.split(' | '):
+            if '=' in part:
+                key, value = part.split('=', 1)
+                fields[key.strip().split(' ')[-1]] = value.strip()
+        if fields.get('status') != 'done':
+            continue
+
+        def _float(name):
+            try:
+                return float(fields[name]) if fields.get(name) not in (None, '', 'None') else None
+            except ValueError:
+                return None
+
+        observations.append({
+            'format': fields.get('format'),
+            'units': _float('units'),
+            'memory_mb': _float('memory_mb'),
+            'cpu': _float('cpu'),
+            'tokens': _float('tokens'),
+            'wall_seconds': _float('duration_s'),
+        })
+    return observations
+
+
+def record_observation(task, duration, status, peak_memory_mb=None, cpu_seconds=None):
+    """
+    任务结束时在耗时日志中记录实际资源消耗（用于成本模型校准）
+
+    Args:
+        task: Translate 记录（需包含元数据和 total_tokens）
+        duration: 执行耗时（秒）
+        status: done / failed
+        peak_memory_mb: 峰值内存(MB)，独占进程时为进程峰值，共享进程时为按任务归因的峰值（utils/task_memory.py）
+        cpu_seconds: CPU时间（秒），同上
+    """
+    from app.translate.to_translate import _log_timing
+
+    fmt = normalize_format(task.origin_filepath)
+    units = task_units(fmt, getattr(task, 'page_count', None), getattr(task, 'segment_count', None),
+                       getattr(task, 'origin_filesize', None) or getattr(task, 'size', None))
+    extra = {
+        'status': status,
+        'format': fmt,
+        'units': f"{units:.1f}",
+        'tokens': task.total_tokens or 0,
+    }
+    if peak_memory_mb is not None:
+        extra['memory_mb'] = f"{peak_memory_mb:.1f}"
+    if cpu_seconds is not None and duration > 0:
+        extra['cpu'] = f"{cpu_seconds / duration:.2f}"
+    _log_timing(OBSERVATION_STEP, duration, translate_id=task.id, extra=extra)
+
+
+cost_model = CostModel()
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+翻译任务租约
+多个节点（容器）共享同一个MySQL时，通过租约协调谁在执行哪个任务：
+- 领取：调度进程用 SELECT ... FOR UPDATE SKIP LOCKED 领取 queued 任务，
+  同时写入 lease_owner（节点:进程号）和 lease_expires_at
+- 续约：执行任务的进程每 HEARTBEAT_SECONDS 秒为本进程运行中的任务续约；
+  续约时发现租约已被其他节点回收，则取消本地任务，避免重复执行
+- 回收：任一节点的调度进程定期把租约过期（节点宕机/进程退出）的任务放回队列，
+  重复回收超过 MAX_LEASE_RECLAIMS 次的任务标记为失败（回收次数记在 lease_reclaims，
+  不计入用户可见的 failed_count，节点正常重启不算任务失败）
+- 释放：任务结束后清空 lease_expires_at 和回收次数，不再参与回收
+
+过期时间统一使用数据库的 NOW() 计算，避免各节点时钟不一致。
+每个节点仍只有一个调度进程（文件锁），节点内的并发和内存限制按本节点持有的租约计算。
+"""
+import logging
+import os
+import socket
+import threading
+
+logger = logging.getLogger(__name__)
+
+NODE_ID = os.getenv('NODE_ID') or socket.gethostname()  # 节点标识（容器名/主机名）
+LEASE_SECONDS = 120  # 租约有效期（秒）
+HEARTBEAT_SECONDS = 30  # 续约间隔（秒）
+RECLAIM_INTERVAL_SECONDS = 60  # 调度进程检查过期租约的间隔（秒）
+RECLAIM_BATCH_SIZE = 50  # 单次最多回收的任务数
+MAX_LEASE_RECLAIMS = 3  # 同一任务最多被回收的次数（lease_reclaims达到该值后标记失败）
+
+_heartbeat_thread = None
+_heartbeat_pid = None
+_heartbeat_lock = threading.Lock()
+
+
+def get_worker_id():
+    """当前进程的租约持有者标识（fork后进程号不同，需要每次计算）"""
+    return f"{NODE_ID}:{os.getpid()}"
+
+
+def node_owner_pattern():
+    """匹配本节点所有进程租约的 LIKE 模式"""
+    return f"{NODE_ID}:%"
+
+
+def lease_assignments():
+    """
+    领取任务时 UPDATE 语句中追加的租约字段（SQLAlchemy text 参数形式）
+
+    Returns:
+        tuple: (SQL片段, 参数字典)
+    """
+    return (
+        "lease_owner = :lease_owner, "
+        "lease_expires_at = DATE_ADD(NOW(), INTERVAL :lease_seconds SECOND)",
+        {'lease_owner': get_worker_id(), 'lease_seconds': LEASE_SECONDS}
+    )
+
+
+def renew_leases(task_ids):
+    """
+    为本进程运行中的任务续约
+
+    Args:
+        task_ids: 本进程运行中的任务ID列表
+
+    Returns:
+        list: 租约已不属于本进程的任务ID（已被其他节点回收）
+    """
+    if not task_ids:
+        return []
+    from app.translate.db_simple import execute, get_all
+
+    owner = get_worker_id()
+    placeholders = ','.join(['%s'] * len(task_ids))
+    if not execute(
+        f"update translate set lease_expires_at=DATE_ADD(NOW(), INTERVAL %s SECOND) "
+        f"where id in ({placeholders}) and lease_owner=%s and lease_expires_at is not null",
+        LEASE_SECONDS, *task_ids, owner
+    ):
+        # 数据库暂时不可用时不判定丢失租约，等待下次续约
+        return []
+
+    # 查询失败时 get_all 返回空列表，此时不判定丢失租约
+    rows = get_all(f"select id, lease_owner from translate where id in ({placeholders})", *task_ids)
+    return [row['id'] for row in rows if row['lease_owner'] != owner]
+
+
+def take_over_lease(task_id, from_owner):
+    """子进程接管父进程领取的租约（独立worker在子进程中执行任务，由子进程续约）"""
+    from app.translate.db_simple import execute
+
+    return execute(
+        "update translate set lease_owner=%s where id=%s and lease_owner=%s",
+        get_worker_id(), task_id, from_owner
+    )
+
+
+def release_lease(task_id):
+    """任务结束后释放租约并清零回收次数（保留 lease_owner 便于排查执行节点）"""
+    from app.translate.db_simple import execute
+
+    execute(
+        "update translate set lease_expires_at=NULL, lease_reclaims=0 where id=%s and lease_owner=%s",
+        task_id, get_worker_id()
+    )
+
+
+def reclaim_expired_leases(session):
+    """
+    回收租约过期的任务（在调度进程的应用上下文中调用）
+
+    Args:
+        session: SQLAlchemy 会话
+
+    Returns:
+        tuple: (放回队列的任务ID列表, 标记失败的任务ID列表)
+    """
+    from sqlalchemy import text
+
+    rows = session.execute(text("""
+        SELECT id, lease_reclaims FROM translate
+        WHERE status IN ('process', 'changing')
+          AND deleted_flag = 'N'
+          AND lease_expires_at IS NOT NULL
+          AND lease_expires_at < NOW()
+        LIMIT :limit
+        FOR UPDATE SKIP LOCKED
+    """), {'limit': RECLAIM_BATCH_SIZE}).fetchall()
+
+    requeued, failed = [], []
+    for task_id, reclaims in rows:
+        if (reclaims or 0) + 1 >= MAX_LEASE_RECLAIMS:
+            session.execute(text("""
+                UPDATE translate
+                SET status = 'failed',
+                    failed_reason = '任务执行节点多次失联，已停止重试',
+                    lease_reclaims = lease_reclaims + 1,
+                    lease_expires_at = NULL,
+                    updated_at = NOW()
+                WHERE id = :task_id
+            """), {'task_id': task_id})
+            failed.append(task_id)
+        else:
+            session.execute(text("""
+                UPDATE translate
+                SET status = 'queued',
+                    queued_at = UTC_TIMESTAMP(),
+                    lease_reclaims = lease_reclaims + 1,
+                    lease_owner = NULL,
+                    lease_expires_at = NULL,
+                    updated_at = NOW()
+                WHERE id = :task_id
+            """), {'task_id': task_id})
+            requeued.append(task_id)
+    session.commit()
+
+    if requeued or failed:
+        logger.warning(f"回收过期租约: 重新入队={requeued}, 标记失败={failed}")
+    return requeued, failed
+
+
+def _heartbeat_loop():
+    import time
+    from app.utils.task_manager import get_running_tasks, cancel_task
+
+    while True:
+        time.sleep(HEARTBEAT_SECONDS)
+        try:
+            task_ids = [item['task_id'] for item in get_running_tasks()]
+            for task_id in renew_leases(task_ids):
+                logger.error(f"任务 {task_id} 的租约已被其他节点回收，取消本地执行")
+                cancel_task(task_id)
+        except Exception as e:
+            logger.error(f"任务租约续约失败: {e}")
+
+
+def ensure_heartbeat():
+    """确保当前进程已启动续约线程（启动任务前调用，fork后的子进程会重新启动）"""
+    global _heartbeat_thread, _heartbeat_pid
+    with _heartbeat_lock:
+        if _heartbeat_thread is not None and _heartbeat_pid == os.getpid() and _heartbeat_thread.is_alive():
+            return
+        _heartbeat_thread = threading.Thread(target=_heartbeat_loop, name='task-lease-heartbeat', daemon=True)
+        _heartbeat_pid = os.getpid()
+        _heartbeat_thread.start()
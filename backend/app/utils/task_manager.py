@@ -1,30 +1,144 @@
 # -*- coding: utf-8 -*-
 """
-任务管理器 - 用于追踪和取消正在运行的翻译任务
+任务管理器 - 用于追踪、暂停和取消正在运行的翻译任务
+
+每个任务对应一个 TaskControl：
+- 暂停/恢复基于 threading.Condition，暂停期间翻译线程阻塞等待，不轮询
+- 段落线程池暂停期间不再派发新段落，登记恢复回调，恢复（或取消）时继续派发
+- 取消时唤醒所有等待中的线程，并关闭正在请求中的 HTTP 客户端，中断进行中的翻译请求
 """
+import logging
 import threading
+from contextlib import contextmanager
 from typing import Dict, Optional
 from threading import Event
 
-# 全局任务字典：{task_id: {'cancel_event': Event, 'pause_event': Event}}
-_task_events: Dict[int, Dict[str, Event]] = {}
+logger = logging.getLogger(__name__)
+
+
+class TaskCancelled(Exception):
+    """任务已被取消"""
+
+
+class TaskControl:
+    """单个任务的暂停/取消控制"""
+
+    def __init__(self, task_id: int, cancel_event: Event):
+        self.task_id = task_id
+        self.cancel_event = cancel_event  # 兼容原有的取消事件（trans['cancel_event']）
+        self._condition = threading.Condition()
+        self._paused = False
+        self._clients = set()  # 正在请求中的 HTTP 客户端
+        self._resume_callbacks = []  # 暂停期间登记的恢复回调
+
+    @property
+    def is_paused(self) -> bool:
+        return self._paused
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def pause(self) -> None:
+        with self._condition:
+            self._paused = True
+
+    def resume(self) -> None:
+        with self._condition:
+            self._paused = False
+            callbacks = self._resume_callbacks
+            self._resume_callbacks = []
+            self._condition.notify_all()
+        self._run_callbacks(callbacks)
+
+    def cancel(self) -> None:
+        """取消任务：唤醒暂停中的线程，关闭进行中的请求"""
+        with self._condition:
+            self.cancel_event.set()
+            self._paused = False
+            clients = list(self._clients)
+            self._clients.clear()
+            callbacks = self._resume_callbacks
+            self._resume_callbacks = []
+            self._condition.notify_all()
+        self._run_callbacks(callbacks)
+        for client in clients:
+            try:
+                client.close()
+            except Exception as e:
+                logger.debug(f"关闭任务 {self.task_id} 的请求客户端失败: {e}")
+
+    def call_on_resume(self, callback) -> bool:
+        """
+        任务暂停中时登记恢复回调，恢复或取消时调用一次（检查与登记在同一把锁内，不会错过恢复）
+
+        Returns:
+            bool: False 表示任务未暂停（或已取消），未登记，调用方应直接继续
+        """
+        with self._condition:
+            if not self._paused or self.cancel_event.is_set():
+                return False
+            self._resume_callbacks.append(callback)
+            return True
+
+    def _run_callbacks(self, callbacks) -> None:
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"任务 {self.task_id} 恢复回调执行失败: {e}")
+
+    def wait_if_paused(self) -> bool:
+        """
+        暂停期间阻塞，直到任务恢复或被取消
+
+        Returns:
+            bool: False 表示任务已被取消
+        """
+        with self._condition:
+            while self._paused and not self.cancel_event.is_set():
+                self._condition.wait()
+            return not self.cancel_event.is_set()
+
+    @contextmanager
+    def track(self, client):
+        """
+        在请求期间登记 HTTP 客户端（需有 close 方法，如 OpenAI 客户端），任务取消时关闭以中断请求
+
+        Raises:
+            TaskCancelled: 任务已被取消
+        """
+        with self._condition:
+            if self.cancel_event.is_set():
+                raise TaskCancelled(self.task_id)
+            self._clients.add(client)
+        try:
+            yield client
+        finally:
+            with self._condition:
+                self._clients.discard(client)
+
+
+# 全局任务字典：{task_id: TaskControl}
+_task_controls: Dict[int, TaskControl] = {}
 _task_lock = threading.Lock()
 
 
-def register_task(task_id: int, cancel_event: Event) -> None:
+def register_task(task_id: int, cancel_event: Event) -> TaskControl:
     """
     注册翻译任务
     
     Args:
         task_id: 任务ID
         cancel_event: 用于控制任务取消的Event对象
+
+    Returns:
+        TaskControl: 任务控制对象
     """
     with _task_lock:
-        pause_event = Event()  # 创建暂停事件
-        _task_events[task_id] = {
-            'cancel_event': cancel_event,
-            'pause_event': pause_event
-        }
+        control = TaskControl(task_id, cancel_event)
+        _task_controls[task_id] = control
+        return control
 
 
 def unregister_task(task_id: int) -> None:
@@ -35,13 +149,11 @@ def unregister_task(task_id: int) -> None:
         task_id: 任务ID
     """
     with _task_lock:
-        if task_id in _task_events:
-            task_events = _task_events[task_id]
-            # 清理事件对象
-            if task_events:
-                task_events['cancel_event'].clear()  # 清除取消事件状态
-                task_events['pause_event'].clear()   # 清除暂停事件状态
-            del _task_events[task_id]
+        control = _task_controls.pop(task_id, None)
+    if control:
+        # 唤醒仍在等待的线程，并清除取消事件状态
+        control.resume()
+        control.cancel_event.clear()
 
 
 def cancel_task(task_id: int) -> bool:
@@ -54,12 +166,11 @@ def cancel_task(task_id: int) -> bool:
     Returns:
         bool: 是否成功取消任务
     """
-    with _task_lock:
-        if task_id in _task_events:
-            task_events = _task_events[task_id]
-            task_events['cancel_event'].set()  # 设置取消事件
-            return True
-        return False
+    control = get_task_control(task_id)
+    if control:
+        control.cancel()
+        return True
+    return False
 
 
 def pause_task(task_id: int) -> bool:
@@ -72,12 +183,11 @@ def pause_task(task_id: int) -> bool:
     Returns:
         bool: 是否成功暂停任务
     """
-    with _task_lock:
-        if task_id in _task_events:
-            task_events = _task_events[task_id]
-            task_events['pause_event'].set()  # 设置暂停事件
-            return True
-        return False
+    control = get_task_control(task_id)
+    if control:
+        control.pause()
+        return True
+    return False
 
 
 def resume_task(task_id: int) -> bool:
@@ -90,12 +200,11 @@ def resume_task(task_id: int) -> bool:
     Returns:
         bool: 是否成功恢复任务
     """
-    with _task_lock:
-        if task_id in _task_events:
-            task_events = _task_events[task_id]
-            task_events['pause_event'].clear()  # 清除暂停事件
-            return True
-        return False
+    control = get_task_control(task_id)
+    if control:
+        control.resume()
+        return True
+    return False
 
 
 def is_task_running(task_id: int) -> bool:
@@ -109,39 +218,37 @@ def is_task_running(task_id: int) -> bool:
         bool: 任务是否正在运行
     """
     with _task_lock:
-        return task_id in _task_events
+        return task_id in _task_controls
 
 
-def get_task_event(task_id: int) -> Optional[Event]:
+def get_task_control(task_id: int) -> Optional[TaskControl]:
     """
-    获取任务的取消Event对象
+    获取任务的控制对象
     
     Args:
         task_id: 任务ID
         
     Returns:
-        Event: 任务的取消Event对象，如果任务不存在则返回None
+        TaskControl: 任务控制对象，如果任务不存在则返回None
     """
-    with _task_lock:
-        if task_id in _task_events:
-            return _task_events[task_id]['cancel_event']
+    if task_id is None:
         return None
+    with _task_lock:
+        return _task_controls.get(task_id)
 
 
-def get_task_pause_event(task_id: int) -> Optional[Event]:
+def get_task_event(task_id: int) -> Optional[Event]:
     """
-    获取任务的暂停Event对象
+    获取任务的取消Event对象
     
     Args:
         task_id: 任务ID
         
     Returns:
-        Event: 任务的暂停Event对象，如果任务不存在则返回None
+        Event: 任务的取消Event对象，如果任务不存在则返回None
     """
-    with _task_lock:
-        if task_id in _task_events:
-            return _task_events[task_id]['pause_event']
-        return None
+    control = get_task_control(task_id)
+    return control.cancel_event if control else None
 
 
 def get_running_tasks() -> list:
@@ -152,7 +259,19 @@ def get_running_tasks() -> list:
         list: 正在运行的任务信息列表，每个元素包含 {'task_id': int}
     """
     with _task_lock:
-        return [{'task_id': task_id} for task_id in _task_events.keys()]
+        return [{'task_id': task_id} for task_id in _task_controls.keys()]
+
+
+def get_paused_tasks() -> list:
+    """
+    获取所有已暂停的任务ID列表
+    
+    Returns:
+        list: 已暂停的任务ID
+    """
+    with _task_lock:
+        return [task_id for task_id, control in _task_controls.items() if control.is_paused]
+
 
 def is_any_task_running() -> bool:
     """
@@ -162,5 +281,4 @@ def is_any_task_running() -> bool:
         bool: 是否有任务正在运行
     """
     with _task_lock:
-        return len(_task_events) > 0
-
+        return len(_task_controls) > 0
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""
+翻译任务内存归因
+调度原来只看所有Gunicorn进程的总RSS，不知道内存被哪个任务占用，这里按任务统计：
+- 任务开始时记录进程RSS作为基线，执行过程按阶段（extract 提取 / translate 翻译 / fill 回填 / save 保存）
+  统计每个阶段的耗时、RSS变化和阶段内峰值（mark_phase）
+- 采样线程每 SAMPLE_SECONDS 秒读取进程RSS，把相对基线的增长按比例分摊给本进程运行中的任务
+  （进程内只有一个任务时就是该任务的增长；独立worker的任务子进程只执行一个任务，统计是准确的），
+  当前值和峰值写入 translate.memory_mb / peak_memory_mb，管理端和调度进程从数据库读取
+- 任务结束时写入峰值和各阶段明细（translate.memory_phases，JSON）
+- 设置环境变量 TASK_TRACEMALLOC=true 时开启 tracemalloc，阶段切换时拍快照，
+  把阶段内新增内存最多的代码位置写入耗时日志（开销较大，只在排查问题时开启）
+"""
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+PHASES = ('extract', 'translate', 'fill', 'save')
+SAMPLE_SECONDS = 5  # 采样间隔（秒）
+WRITE_THRESHOLD_MB = 5.0  # 当前内存变化超过多少MB才写库
+TRACEMALLOC_ENABLED = os.getenv('TASK_TRACEMALLOC', 'false').lower() == 'true'
+TRACEMALLOC_TOP = 5  # 每个阶段记录的代码位置数
+
+
+def _rss_mb():
+    """当前进程RSS(MB)，psutil 不可用时为 0"""
+    from app.utils.memory_manager import get_memory_usage
+    return get_memory_usage() / 1024 / 1024
+
+
+class TaskMemory:
+    """单个任务的内存统计"""
+
+    def __init__(self, task_id, baseline_mb):
+        self.task_id = task_id
+        self.baseline_mb = baseline_mb
+        self.current_mb = 0.0
+        self.peak_mb = 0.0
+        self.written_mb = 0.0  # 上次写库的当前值
+        self.phase = None
+        self.phases = {}  # 阶段 -> {'seconds', 'rss_delta_mb', 'peak_mb'}
+        self._phase_started_at = 0.0
+        self._phase_rss_mb = 0.0
+        self._phase_peak_mb = 0.0
+        self._snapshot = None
+
+    def enter(self, phase, rss_mb):
+        """结束当前阶段并进入新阶段"""
+        self.close_phase(rss_mb)
+        self.phase = phase
+        self._phase_started_at = time.time()
+        self._phase_rss_mb = rss_mb
+        self._phase_peak_mb = self.current_mb
+        if TRACEMALLOC_ENABLED and tracemalloc.is_tracing():
+            self._snapshot = tracemalloc.take_snapshot()
+
+    def close_phase(self, rss_mb):
+        if self.phase is None:
+            return
+        item = self.phases.setdefault(self.phase, {'seconds': 0.0, 'rss_delta_mb': 0.0, 'peak_mb': 0.0})
+        item['seconds'] += time.time() - self._phase_started_at
+        item['rss_delta_mb'] += rss_mb - self._phase_rss_mb
+        item['peak_mb'] = max(item['peak_mb'], self._phase_peak_mb)
+        if self._snapshot is not None:
+            self._log_top_allocations(self.phase, self._snapshot)
+            self._snapshot = None
+        self.phase = None
+
+    def sample(self, attributed_mb):
+        self.current_mb = attributed_mb
+        self.peak_mb = max(self.peak_mb, attributed_mb)
+        self._phase_peak_mb = max(self._phase_peak_mb, attributed_mb)
+
+    def phases_dict(self):
+        return {
+            phase: {key: round(value, 1) for key, value in item.items()}
+            for phase, item in self.phases.items()
+        }
+
+    def _log_top_allocations(self, phase, before):
+        """阶段内新增内存最多的代码位置写入耗时日志"""
+        try:
+            from app.translate.to_translate import _log_timing
+            stats = tracemalloc.take_snapshot().compare_to(before, 'lineno')[:TRACEMALLOC_TOP]
+            _log_timing("阶段内存分配", time.time() - self._phase_started_at, translate_id=self.task_id, extra={
+                'phase': phase,
+                'top': '; '.join(f"{stat.traceback[0].filename.rsplit(os.sep, 1)[-1]}:{stat.traceback[0].lineno} "
+                                 f"{stat.size_diff / 1024 / 1024:+.1f}MB" for stat in stats),
+            })
+        except Exception as e:
+            logger.debug(f"记录任务 {self.task_id} 内存分配位置失败: {e}")
+
+
+_tasks = {}
+_lock = threading.Lock()
+_sampler_thread = None
+_sampler_pid = None
+
+
+def _sample():
+    """按RSS增长比例分摊进程内存给运行中的任务"""
+    rss_mb = _rss_mb()
+    with _lock:
+        tasks = list(_tasks.values())
+        if not tasks or rss_mb <= 0:
+            return rss_mb
+        growth = {task.task_id: max(0.0, rss_mb - task.baseline_mb) for task in tasks}
+        growth_sum = sum(growth.values())
+        total_mb = max(0.0, rss_mb - min(task.baseline_mb for task in tasks))
+        for task in tasks:
+            task.sample(total_mb * growth[task.task_id] / growth_sum if growth_sum > 0 else 0.0)
+    return rss_mb
+
+
+def _write_samples():
+    """当前/峰值内存写库（变化较小时跳过）"""
+    with _lock:
+        changed = [task for task in _tasks.values() if abs(task.current_mb - task.written_mb) >= WRITE_THRESHOLD_MB]
+        params = [(round(task.current_mb, 1), round(task.peak_mb, 1), task.task_id) for task in changed]
+        for task in changed:
+            task.written_mb = task.current_mb
+    if params:
+        from app.translate.db import execute_batch
+        execute_batch("update translate set memory_mb=%s, peak_memory_mb=%s where id=%s", params)
+
+
+def _sampler_loop():
+    while True:
+        time.sleep(SAMPLE_SECONDS)
+        try:
+            _sample()
+            _write_samples()
+        except Exception as e:
+            logger.warning(f"任务内存采样失败: {e}")
+
+
+def _ensure_sampler():
+    global _sampler_thread, _sampler_pid
+    if _sampler_thread is not None and _sampler_pid == os.getpid() and _sampler_thread.is_alive():
+        return
+    _sampler_thread = threading.Thread(target=_sampler_loop, name='task-memory-sampler', daemon=True)
+    _sampler_pid = os.getpid()
+    _sampler_thread.start()
+
+
+def start_tracking(task_id):
+    """任务开始执行时调用（进入 extract 阶段）"""
+    if TRACEMALLOC_ENABLED and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    rss_mb = _sample()
+    with _lock:
+        task = TaskMemory(task_id, rss_mb)
+        task.enter(PHASES[0], rss_mb)
+        _tasks[task_id] = task
+        _ensure_sampler()
+
+
+def mark_phase(task_id, phase):
+    """任务进入新的阶段（extract / translate / fill / save）"""
+    if task_id is None:
+        return
+    try:
+        rss_mb = _sample()
+        with _lock:
+            task = _tasks.get(task_id)
+            if task is not None and task.phase != phase:
+                task.enter(phase, rss_mb)
+    except Exception as e:
+        logger.debug(f"记录任务 {task_id} 阶段 {phase} 失败: {e}")
+
+
+def finish_tracking(task_id):
+    """
+    任务结束时调用：写入峰值和各阶段明细
+
+    Returns:
+        dict or None: {'peak_mb', 'phases'}
+    """
+    rss_mb = _sample()
+    with _lock:
+        task = _tasks.pop(task_id, None)
+        if task is None:
+            return None
+        task.close_phase(rss_mb)
+        if not _tasks and TRACEMALLOC_ENABLED and tracemalloc.is_tracing():
+            tracemalloc.stop()
+    phases = task.phases_dict()
+    from app.translate.db import execute
+    execute(
+        "update translate set memory_mb=NULL, peak_memory_mb=%s, memory_phases=%s where id=%s",
+        round(task.peak_mb, 1), json.dumps(phases, ensure_ascii=False), task_id
+    )
+    summary = ', '.join(f"{phase} {item['rss_delta_mb']:+.0f}MB/{item['seconds']:.0f}s" for phase, item in phases.items())
+    logger.info(f"任务 {task_id} 内存峰值 {task.peak_mb:.0f}MB（{summary}）")
+    return {'peak_mb': task.peak_mb, 'phases': phases}
+
+
+def get_local_usage():
+    """
+    本进程运行中任务的内存占用（按当前占用降序）
+
+    Returns:
+        list: [{'task_id', 'phase', 'memory_mb', 'peak_mb'}]
+    """
+    _sample()
+    with _lock:
+        items = [{
+            'task_id': task.task_id,
+            'phase': task.phase,
+            'memory_mb': round(task.current_mb, 1),
+            'peak_mb': round(task.peak_mb, 1),
+        } for task in _tasks.values()]
+    items.sort(key=lambda item: item['memory_mb'], reverse=True)
+    return items
+
+
+def get_task_memory_mb(task_id):
+    """任务当前归因的内存（MB），未跟踪时为 0"""
+    _sample()
+    with _lock:
+        task = _tasks.get(task_id)
+        return task.current_mb if task is not None else 0.0
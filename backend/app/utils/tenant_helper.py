@@ -4,8 +4,7 @@
 """
 from flask import g
 from flask_jwt_extended import get_jwt_identity
-from app.models.tenant_customer import TenantCustomer
-from app.models.tenant_user import TenantUser
+from app.utils.auth_cache import get_cached_tenant_id
 
 
 def get_tenant_id_from_g():
@@ -38,14 +37,7 @@ def ensure_tenant_filter(query, user_id=None, user_type='customer'):
             user_id = get_jwt_identity()
         
         if user_id:
-            if user_type == 'customer':
-                tenant_customer = TenantCustomer.query.filter_by(customer_id=user_id).first()
-                if tenant_customer:
-                    tenant_id = tenant_customer.tenant_id
-            else:
-                tenant_user = TenantUser.query.filter_by(user_id=user_id).first()
-                if tenant_user:
-                    tenant_id = tenant_user.tenant_id
+            tenant_id = get_cached_tenant_id(user_id, user_type)
     
     # 如果找到了租户ID，则添加过滤
     if tenant_id:
@@ -78,21 +70,9 @@ def get_current_tenant_id(user_id=None, user_type='customer'):
     if tenant_id:
         return tenant_id
     
-    # 如果没有，则查询数据库
+    # 如果没有，则查询认证缓存（未命中时回源数据库）
     if user_id is None:
         user_id = get_jwt_identity()
     
-    if not user_id:
-        return None
-    
-    if user_type == 'customer':
-        tenant_customer = TenantCustomer.query.filter_by(customer_id=user_id).first()
-        if tenant_customer:
-            return tenant_customer.tenant_id
-    else:
-        tenant_user = TenantUser.query.filter_by(user_id=user_id).first()
-        if tenant_user:
-            return tenant_user.tenant_id
-    
-    return None
+    return get_cached_tenant_id(user_id, user_type)
 
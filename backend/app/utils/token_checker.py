@@ -48,30 +48,29 @@ def check_token_validity():
         # 获取 token 的 jti (JWT ID)
         token_jti = decoded.get('jti')
         
-        # 检查用户状态和单点登录（支持 customer 和 admin 两种用户类型）
-        from app.models.customer import Customer
-        from app.models.user import User
+        # 检查用户状态和单点登录（支持 customer 和 admin 两种用户类型，走认证缓存）
+        from app.utils.auth_cache import get_auth_entry
         
         # 先尝试作为 customer 查询
-        user = Customer.query.get(user_id)
+        user = get_auth_entry(user_id, 'customer', token_jti)
         user_type = 'customer'
         
         # 如果不是 customer，尝试作为 admin/user 查询
-        if not user:
-            user = User.query.get(user_id)
+        if not user.get('exists'):
+            user = get_auth_entry(user_id, 'admin', token_jti)
             user_type = 'admin'
         
-        if not user:
+        if not user.get('exists'):
             return False, "User not found", 401
         
         # 检查用户状态
-        if hasattr(user, 'status') and user.status == 'disabled':
+        if user.get('status') == 'disabled':
             return False, "User account is disabled", 401
-        if hasattr(user, 'deleted_flag') and user.deleted_flag == 'Y':
+        if user.get('deleted_flag') == 'Y':
             return False, "User account is disabled", 401
         
         # 单点登录检查：验证当前 token 的 jti 是否与数据库中存储的一致
-        if hasattr(user, 'current_token_id') and user.current_token_id and token_jti != user.current_token_id:
+        if user.get('current_token_id') and token_jti != user.get('current_token_id'):
             # 只在token被替换时记录警告日志（重要错误）
             logger.warning(f"Token已被新登录替换: user_id={user_id}, user_type={user_type}")
             return False, "账号已在其他设备登录，请重新登录", 401
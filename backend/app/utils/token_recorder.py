@@ -3,8 +3,17 @@
 Token使用记录工具
 用于记录每次API调用的token使用情况
 支持在子进程环境中运行（不依赖Flask应用上下文）
+
+translate 表上的 input_tokens/output_tokens/total_tokens 采用增量维护：
+每次记录后先累加到进程内的待写入增量，按调用次数或时间间隔批量执行
+UPDATE translate SET input_tokens = input_tokens + %s ...，任务结束时
+aggregate_tokens_for_translate 只需写入剩余增量。
+全量重新汇总保留为离线修复命令：python -m app.script.repair_token_totals
 """
+import atexit
 import logging
+import threading
+import time
 from datetime import datetime
 from app.utils.token_counter import count_tokens_from_api_response
 
@@ -22,6 +31,103 @@ except ImportError:
         pass
 
 
+TOKEN_FLUSH_CALLS = 50  # 累计多少次调用后写入translate表
+TOKEN_FLUSH_SECONDS = 5  # 距离上次写入超过多少秒后写入translate表
+
+# translate_id -> {'input', 'output', 'total', 'calls', 'since'}
+_pending_tokens = {}
+_pending_lock = threading.Lock()
+
+
+def _accumulate_tokens(translate_id, input_tokens, output_tokens, total_tokens):
+    """
+    累加待写入的token增量
+
+    Returns:
+        bool: 是否已达到写入条件
+    """
+    with _pending_lock:
+        pending = _pending_tokens.get(translate_id)
+        if pending is None:
+            pending = {'input': 0, 'output': 0, 'total': 0, 'calls': 0, 'since': time.time()}
+            _pending_tokens[translate_id] = pending
+        pending['input'] += int(input_tokens or 0)
+        pending['output'] += int(output_tokens or 0)
+        pending['total'] += int(total_tokens or 0)
+        pending['calls'] += 1
+        return pending['calls'] >= TOKEN_FLUSH_CALLS or time.time() - pending['since'] >= TOKEN_FLUSH_SECONDS
+
+
+def _apply_token_delta(translate_id, pending):
+    """将token增量原子地累加到translate表"""
+    if USE_DB_SIMPLE:
+        sql = """
+            UPDATE translate
+            SET input_tokens = COALESCE(input_tokens, 0) + %s,
+                output_tokens = COALESCE(output_tokens, 0) + %s,
+                total_tokens = COALESCE(total_tokens, 0) + %s
+            WHERE id = %s
+        """
+        return execute(sql, pending['input'], pending['output'], pending['total'], translate_id)
+
+    from sqlalchemy import text
+    from app.extensions import db
+    try:
+        db.session.execute(
+            text("""
+                UPDATE translate
+                SET input_tokens = COALESCE(input_tokens, 0) + :input_tokens,
+                    output_tokens = COALESCE(output_tokens, 0) + :output_tokens,
+                    total_tokens = COALESCE(total_tokens, 0) + :total_tokens
+                WHERE id = :translate_id
+            """),
+            {
+                'input_tokens': pending['input'],
+                'output_tokens': pending['output'],
+                'total_tokens': pending['total'],
+                'translate_id': translate_id
+            }
+        )
+        db.session.commit()
+        return True
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"❌ 写入token增量失败: translate_id={translate_id}, 错误: {e}")
+        return False
+
+
+def flush_token_totals(translate_id: int = None):
+    """
+    将待写入的token增量写入translate表
+
+    Args:
+        translate_id: 只写入指定任务的增量，None表示写入全部
+    """
+    with _pending_lock:
+        if translate_id is None:
+            items = list(_pending_tokens.items())
+            _pending_tokens.clear()
+        else:
+            pending = _pending_tokens.pop(translate_id, None)
+            items = [(translate_id, pending)] if pending else []
+
+    for pending_id, pending in items:
+        if not pending['calls']:
+            continue
+        if not _apply_token_delta(pending_id, pending):
+            # 写入失败时放回，等待下次写入，避免丢失增量
+            with _pending_lock:
+                current = _pending_tokens.setdefault(
+                    pending_id, {'input': 0, 'output': 0, 'total': 0, 'calls': 0, 'since': pending['since']}
+                )
+                for key in ('input', 'output', 'total', 'calls'):
+                    current[key] += pending[key]
+
+
+# 进程退出时写入剩余增量（子进程环境中尤其需要）
+atexit.register(flush_token_totals)
+
+
 def record_token_usage(
     translate_id: int,
     customer_id: int,
@@ -121,6 +227,8 @@ def record_token_usage(
             )
             if success:
                 logging.info(f"✅ Token使用记录已保存: translate_id={translate_id}, input={token_info['input_tokens']}, output={token_info['output_tokens']}, total={token_info['total_tokens']}")
+                if _accumulate_tokens(translate_id, token_info['input_tokens'], token_info['output_tokens'], token_info['total_tokens']):
+                    flush_token_totals(translate_id)
             else:
                 logging.error(f"❌ Token使用记录保存失败: translate_id={translate_id}")
         else:
@@ -152,6 +260,8 @@ def record_token_usage(
                 db.session.add(token_usage)
                 db.session.commit()
                 logging.info(f"✅ Token使用记录已保存: translate_id={translate_id}, input={token_info['input_tokens']}, output={token_info['output_tokens']}, total={token_info['total_tokens']}")
+                if _accumulate_tokens(translate_id, token_info['input_tokens'], token_info['output_tokens'], token_info['total_tokens']):
+                    flush_token_totals(translate_id)
             except Exception as orm_error:
                 logging.error(f"❌ 使用ORM保存token使用记录失败: {orm_error}", exc_info=True)
                 if 'db' in locals():
@@ -164,7 +274,22 @@ def record_token_usage(
 
 def aggregate_tokens_for_translate(translate_id: int):
     """
-    汇总某个翻译任务的所有token使用，更新到translate表
+    任务结束时调用：写入该任务剩余的token增量
+    translate表上的token总数已由 record_token_usage 增量维护，这里不再扫描 token_usage 表
+    
+    Args:
+        translate_id: 翻译任务ID
+    """
+    try:
+        flush_token_totals(translate_id)
+        logging.info(f"✅ Token增量已写入: translate_id={translate_id}")
+    except Exception as e:
+        logging.error(f"❌ 写入token增量失败: translate_id={translate_id}, 错误: {e}", exc_info=True)
+
+
+def reaggregate_tokens_for_translate(translate_id: int):
+    """
+    全量重新汇总某个翻译任务的所有token使用，覆盖translate表上的总数（离线修复用）
     支持在子进程环境中运行（不依赖Flask应用上下文）
     
     Args:
@@ -245,3 +370,39 @@ def aggregate_tokens_for_translate(translate_id: int):
             except:
                 pass
 
+
+
+def reaggregate_all_tokens():
+    """
+    全量重新汇总所有翻译任务的token总数（离线修复用，单条 UPDATE ... JOIN 完成）
+    
+    Returns:
+        bool: 是否执行成功
+    """
+    sql = """
+        UPDATE translate t
+        JOIN (
+            SELECT translate_id,
+                   SUM(input_tokens) AS sum_input,
+                   SUM(output_tokens) AS sum_output,
+                   SUM(total_tokens) AS sum_total
+            FROM token_usage
+            GROUP BY translate_id
+        ) u ON t.id = u.translate_id
+        SET t.input_tokens = u.sum_input,
+            t.output_tokens = u.sum_output,
+            t.total_tokens = u.sum_total
+    """
+    if USE_DB_SIMPLE:
+        return execute(sql)
+
+    from sqlalchemy import text
+    from app.extensions import db
+    try:
+        db.session.execute(text(sql))
+        db.session.commit()
+        return True
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"❌ 全量汇总token失败: {e}", exc_info=True)
+        return False
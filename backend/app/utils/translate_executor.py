@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+进程级段落翻译线程池
+各文档翻译器（Excel/CSV/TXT/Markdown/PPT/PDF/大PDF）共用一个有界线程池翻译段落，
+替代原来每段启动一个线程、用 threading.activeCount() 忙等控制并发、再轮询 texts 判断完成的方式：
+- 线程池大小固定（环境变量 TRANSLATE_EXECUTOR_WORKERS），进程内所有任务共享
+- 每个任务有并发配额（默认 DEFAULT_QUOTA，与原来每任务40线程一致），任务最多同时提交配额个段落，
+  段落完成时由完成回调提交下一个，大任务不会占满线程池队列
+- 每个段落对应一个 Future，SegmentBatch.wait() 基于 Condition 等待全部完成，不轮询
+- 任务暂停时停止派发新段落（不占用线程池线程等待），恢复后由恢复回调继续派发
+- 统计每个任务的派发速率（段/秒），可通过 get_stats() 查看
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+MAX_WORKERS = int(os.getenv('TRANSLATE_EXECUTOR_WORKERS', 200))  # 进程内翻译线程总数
+DEFAULT_QUOTA = 40  # 单个任务的并发段落数
+
+
+class SegmentBatch:
+    """一个任务提交的一批段落"""
+
+    def __init__(self, pool, task_id, fn, args_list, quota, on_complete=None, cancel_event=None):
+        self.task_id = task_id
+        self.total = len(args_list)
+        self.quota = max(1, quota)
+        self._pool = pool
+        self._fn = fn
+        self._args_list = args_list
+        self._on_complete = on_complete
+        self._cancel_event = cancel_event
+        self._condition = threading.Condition()
+        self._next = 0
+        self._dispatching = False
+        self.in_flight = 0
+        self.dispatched = 0
+        self.completed = 0
+        self.failed = 0
+        self.started_at = time.time()
+        self.last_dispatch_at = self.started_at
+        self.finished_at = None
+
+    @property
+    def cancelled(self):
+        return self._cancel_event is not None and self._cancel_event.is_set()
+
+    @property
+    def dispatch_rate(self):
+        """派发速率（段/秒）"""
+        elapsed = self.last_dispatch_at - self.started_at
+        return self.dispatched / elapsed if elapsed > 0 else float(self.dispatched)
+
+    def _finished(self):
+        return self.in_flight == 0 and (self._next >= self.total or self.cancelled)
+
+    def _dispatch(self):
+        """在配额内提交段落（同一时间只有一个线程在提交，其他线程直接返回由其继续提交）"""
+        from app.utils.task_manager import get_task_control
+
+        with self._condition:
+            if self._dispatching:
+                return
+            self._dispatching = True
+        control = get_task_control(self.task_id)
+        while True:
+            if control is not None and control.is_paused and not self.cancelled and self._next < self.total:
+                with self._condition:
+                    self._dispatching = False
+                # 暂停期间不再提交，恢复时由回调继续派发；登记前已恢复则重新派发
+                if control.call_on_resume(self._dispatch):
+                    return
+                with self._condition:
+                    if self._dispatching:
+                        return
+                    self._dispatching = True
+                continue
+            with self._condition:
+                if self.cancelled or self._next >= self.total or self.in_flight >= self.quota:
+                    self._dispatching = False
+                    if self._finished():
+                        self._finish()
+                    return
+                args = self._args_list[self._next]
+                self._next += 1
+                self.in_flight += 1
+                self.dispatched += 1
+                self.last_dispatch_at = time.time()
+            try:
+                future = self._pool.submit(self._fn, *args)
+            except RuntimeError as e:  # 线程池已关闭（进程退出中）
+                logger.error(f"任务 {self.task_id} 提交段落失败: {e}")
+                with self._condition:
+                    self.in_flight -= 1
+                    self.failed += 1
+                continue
+            future.add_done_callback(lambda f, args=args: self._done(f, args))
+
+    def _done(self, future, args):
+        """段落完成回调（在线程池线程中执行）"""
+        exc = future.exception()
+        # to_translate.get 在任务取消时调用 exit(0) 结束，不算失败
+        failed = exc is not None and not isinstance(exc, SystemExit)
+        if failed:
+            logger.error(f"任务 {self.task_id} 段落翻译异常: {exc}")
+        with self._condition:
+            self.in_flight -= 1
+            self.completed += 1
+            if failed:
+                self.failed += 1
+        if self._on_complete:
+            try:
+                self._on_complete(args, future)
+            except Exception as e:
+                logger.warning(f"任务 {self.task_id} 段落完成回调失败: {e}")
+        self._dispatch()
+
+    def _finish(self):
+        """全部段落结束（持有 _condition 时调用）"""
+        if self.finished_at is None:
+            self.finished_at = time.time()
+            _executor._release(self)
+        self._condition.notify_all()
+
+    def wait(self, timeout=None):
+        """
+        等待全部段落完成
+
+        Returns:
+            bool: 全部段落都已执行且任务未被取消时为 True
+        """
+        with self._condition:
+            self._condition.wait_for(self._finished, timeout)
+            return self._finished() and self._next >= self.total and not self.cancelled
+
+
+class TranslateExecutor:
+    """进程级段落翻译线程池"""
+
+    def __init__(self, max_workers=MAX_WORKERS):
+        self.max_workers = max_workers
+        self._pool = None
+        self._lock = threading.Lock()
+        self._batches = {}  # task_id -> [SegmentBatch]
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='translate-segment')
+                logger.info(f"段落翻译线程池已创建: {self.max_workers} 个线程")
+            return self._pool
+
+    def submit_batch(self, task_id, fn, args_list, quota=DEFAULT_QUOTA, on_complete=None, cancel_event=None):
+        """
+        提交一批段落
+
+        Args:
+            task_id: 任务ID（用于统计）
+            fn: 段落处理函数
+            args_list: 每个段落的参数元组列表
+            quota: 该批次同时执行的段落数上限
+            on_complete: 段落完成回调 on_complete(args, future)
+            cancel_event: 取消事件，设置后不再提交新的段落
+
+        Returns:
+            SegmentBatch
+        """
+        batch = SegmentBatch(self._get_pool(), task_id, fn, args_list, quota, on_complete, cancel_event)
+        with self._lock:
+            self._batches.setdefault(task_id, []).append(batch)
+        batch._dispatch()
+        return batch
+
+    def _release(self, batch):
+        with self._lock:
+            batches = self._batches.get(batch.task_id)
+            if batches and batch in batches:
+                batches.remove(batch)
+                if not batches:
+                    del self._batches[batch.task_id]
+
+    def get_stats(self):
+        """各任务的段落执行情况"""
+        with self._lock:
+            items = [(task_id, list(batches)) for task_id, batches in self._batches.items()]
+        stats = []
+        for task_id, batches in items:
+            stats.append({
+                'task_id': task_id,
+                'total': sum(batch.total for batch in batches),
+                'in_flight': sum(batch.in_flight for batch in batches),
+                'completed': sum(batch.completed for batch in batches),
+                'failed': sum(batch.failed for batch in batches),
+                'dispatch_rate': round(sum(batch.dispatch_rate for batch in batches), 1),
+            })
+        return {'max_workers': self.max_workers, 'tasks': stats}
+
+
+_executor = TranslateExecutor()
+
+
+def get_executor():
+    """获取进程级段落翻译线程池"""
+    return _executor
+
+
+def get_stats():
+    return _executor.get_stats()
@@ -13,6 +13,7 @@ from typing import Dict
 from datetime import datetime
 from flask import current_app
 from pathlib import Path
+from app.utils.queue_notifier import get_queue_notifier, VIDEO_QUEUE
 
 logger = logging.getLogger(__name__)
 
@@ -25,7 +26,11 @@ class VideoQueueManager:
         self.monitor_thread = None
         self.running = False
         self._app = None  # 缓存应用实例
-        self.check_interval = 10  # 检查间隔（秒）
+        self.check_interval = 10  # 检查间隔（秒，无法跨进程通知时使用）
+        self.idle_poll_seconds = 60  # 兜底轮询间隔（秒，Redis可用时入队/完成会主动唤醒）
+        self.zombie_cleanup_seconds = 600  # 僵尸任务清理间隔（秒）
+        self._last_cleanup_at = time.time()
+        self.notifier = get_queue_notifier(VIDEO_QUEUE)
         self._lock_file = None  # 文件锁
         self._lock_file_handle = None  # 文件锁句柄
         
@@ -63,6 +68,7 @@ class VideoQueueManager:
     def stop_monitor(self):
         """停止队列监控线程"""
         self.running = False
+        self.notifier.notify('stop')
         if self.monitor_thread:
             self.monitor_thread.join(timeout=5)
         self._release_lock()
@@ -122,7 +128,8 @@ class VideoQueueManager:
         while self.running:
             try:
                 self._process_queue()
-                time.sleep(self.check_interval)
+                # 等待入队/完成通知，超时后兜底轮询
+                self.notifier.wait(self.idle_poll_seconds if self.notifier.distributed else self.check_interval)
             except Exception as e:
                 logger.error(f"视频队列监控循环异常: {str(e)}")
                 time.sleep(self.check_interval)
@@ -134,12 +141,9 @@ class VideoQueueManager:
             with app.app_context():
                 from app.extensions import db
                 try:
-                    # 定期清理僵尸任务（每60次循环清理一次，约10分钟）
-                    if not hasattr(self, '_cleanup_counter'):
-                        self._cleanup_counter = 0
-                    self._cleanup_counter += 1
-                    if self._cleanup_counter >= 60:
-                        self._cleanup_counter = 0
+                    # 定期清理僵尸任务（约10分钟一次，按时间计算，与唤醒次数无关）
+                    if time.time() - self._last_cleanup_at >= self.zombie_cleanup_seconds:
+                        self._last_cleanup_at = time.time()
                         self._cleanup_zombie_tasks()
                     
                     # 获取当前正在处理的视频数
@@ -155,7 +159,8 @@ class VideoQueueManager:
                         
                         for video in queued_videos:
                             try:
-                                self._start_video_translation(video)
+                                if self._start_video_translation(video):
+                                    self.notifier.record_started(video.id)
                                 logger.info(f"从队列启动视频翻译: video_id={video.id}, filename={video.filename}")
                             except Exception as e:
                                 logger.error(f"启动视频翻译失败: video_id={video.id}, error={str(e)}")
@@ -405,7 +410,8 @@ class VideoQueueManager:
                     'max_concurrent': self.max_concurrent_videos,
                     'queued_count': queued_count,
                     'can_start_new': current_processing < self.max_concurrent_videos,
-                    'slots_available': max(0, self.max_concurrent_videos - current_processing)
+                    'slots_available': max(0, self.max_concurrent_videos - current_processing),
+                    'queue_wait': self.notifier.get_wait_stats()
                 }
         except Exception as e:
             logger.error(f"获取队列状态失败: {str(e)}")
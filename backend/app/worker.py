@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+"""
+独立翻译worker
+在gunicorn之外调度和执行文件翻译任务，避免大文件翻译与API请求争抢GIL和内存，
+也不会因为gunicorn的 max_requests 回收worker而中断正在执行的任务。
+
+用法（在 backend 目录下）：
+    TRANSLATE_WORKER_MODE=external python -m app.worker
+
+- API进程设置 TRANSLATE_WORKER_MODE=external 后只负责入队，不再启动文件翻译队列管理器
+- worker复用队列管理器的调度逻辑（租约领取、并发/PDF/内存限制、入队唤醒）
+- 每个任务在独立子进程中执行（spawn方式，执行完即退出，内存随进程回收），
+  任务状态由子进程直接写回数据库
+- 子进程（含其派生的进程）内存超过 TRANSLATE_WORKER_MEMORY_MB 时终止并标记任务失败
+- 任务被删除时终止对应子进程
+- 运行统计汇总线程，刷新本进程（领取任务、子进程退出兜底）标记的统计小时
+- 收到 SIGTERM/SIGINT 后停止领取新任务，等待执行中的任务结束，超时后终止并放回队列
+"""
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import time
+
+from app.utils.queue_manager import QueueManager
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+CHILD_CHECK_SECONDS = 5  # 有任务执行时检查子进程状态的间隔（秒）
+DELETED_CHECK_SECONDS = 15  # 检查执行中任务是否被删除的间隔（秒）
+KILL_GRACE_SECONDS = 10  # terminate 后等待退出的时间，超时后 kill
+SHUTDOWN_TIMEOUT_SECONDS = 300  # 停止时等待执行中任务结束的最长时间（秒）
+
+
+def run_task_process(task_id, parent_owner):
+    """任务子进程入口（spawn方式启动，不继承父进程的线程和内存）"""
+    from app import create_app
+    from app.resources.task.translate_service import TranslateEngine
+    from app.utils.statistics_rollup import flush_dirty_statistics
+    from app.utils.task_lease import take_over_lease
+
+    app = create_app(start_background=False)
+    take_over_lease(task_id, parent_owner)
+    with app.app_context():
+        engine = TranslateEngine(task_id)
+        try:
+            engine.run()
+        except Exception as e:
+            logger.error(f"任务 {task_id} 执行失败: {e}", exc_info=True)
+            engine._complete_task(False, failed_reason=f"任务执行失败: {str(e)}")
+        finally:
+            # 统计标记只在本进程内，退出前重算任务所在小时，避免看板丢失状态变化
+            flush_dirty_statistics()
+
+
+class _ChildTask:
+    """执行中的任务子进程"""
+
+    def __init__(self, task_id, process):
+        self.task_id = task_id
+        self.process = process
+        self.started_at = time.time()
+        self.stop_reason = None  # 父进程主动终止的原因
+        self.requeue = False  # 终止后是否放回队列（worker停止时）
+        self.terminated_at = None
+
+
+class TranslateWorker(QueueManager):
+    """独立翻译worker：调度逻辑继承队列管理器，任务改为在子进程中执行"""
+
+    def __init__(self, concurrency=12, memory_limit_mb=4096):
+        super().__init__()
+        self.max_concurrent_tasks = concurrency
+        self.memory_limit_bytes = memory_limit_mb * 1024 * 1024
+        self._children = {}
+        self._mp_context = multiprocessing.get_context('spawn')
+        self._last_deleted_check = 0
+
+    # ==================== 任务子进程 ====================
+
+    def _launch_task(self, task_id):
+        """在子进程中执行已领取的任务"""
+        from app.utils.task_lease import get_worker_id
+
+        process = self._mp_context.Process(
+            target=run_task_process,
+            args=(task_id, get_worker_id()),
+            name=f"translate-task-{task_id}"
+        )
+        process.start()
+        self._children[task_id] = _ChildTask(task_id, process)
+        logger.info(f"任务 {task_id} 已在子进程中启动（pid={process.pid}）")
+        return True
+
+    def _process_tree_rss(self, pid):
+        """子进程及其派生进程的内存占用（字节）"""
+        if not PSUTIL_AVAILABLE:
+            return 0
+        try:
+            proc = psutil.Process(pid)
+            total = proc.memory_info().rss
+            for child in proc.children(recursive=True):
+                try:
+                    total += child.memory_info().rss
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    continue
+            return total
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return 0
+
+    def _stop_child(self, child, reason, requeue=False):
+        """终止任务子进程（连同其派生的进程）"""
+        if child.terminated_at is not None:
+            return
+        child.stop_reason = reason
+        child.requeue = requeue
+        child.terminated_at = time.time()
+        logger.warning(f"终止任务 {child.task_id} 的子进程（pid={child.process.pid}）: {reason}")
+        if PSUTIL_AVAILABLE:
+            try:
+                for proc in psutil.Process(child.process.pid).children(recursive=True):
+                    try:
+                        proc.terminate()
+                    except psutil.NoSuchProcess:
+                        continue
+            except psutil.NoSuchProcess:
+                pass
+        child.process.terminate()
+
+    def _watch_children(self):
+        """检查子进程：回收已退出的进程、终止内存超限的进程"""
+        for task_id, child in list(self._children.items()):
+            if not child.process.is_alive():
+                child.process.join(timeout=0)
+                del self._children[task_id]
+                self._on_child_exit(child)
+                continue
+
+            if child.terminated_at is not None:
+                if time.time() - child.terminated_at > KILL_GRACE_SECONDS:
+                    child.process.kill()
+                continue
+
+            rss = self._process_tree_rss(child.process.pid)
+            if self.memory_limit_bytes and rss > self.memory_limit_bytes:
+                self._stop_child(
+                    child,
+                    f"任务内存超过上限（{rss / 1024 / 1024:.0f}MB > {self.memory_limit_bytes / 1024 / 1024:.0f}MB）"
+                )
+
+        if self._children and time.time() - self._last_deleted_check >= DELETED_CHECK_SECONDS:
+            self._last_deleted_check = time.time()
+            self._stop_deleted_tasks()
+
+    def _stop_deleted_tasks(self):
+        """终止已被用户删除的任务（API进程无法直接取消worker中的任务）"""
+        try:
+            from app.models.translate import Translate
+
+            app = self._get_app()
+            with app.app_context():
+                deleted_ids = [row.id for row in Translate.query.with_entities(Translate.id).filter(
+                    Translate.id.in_(list(self._children.keys())),
+                    Translate.deleted_flag == 'Y'
+                ).all()]
+            for task_id in deleted_ids:
+                child = self._children.get(task_id)
+                if child:
+                    self._stop_child(child, '任务已删除')
+        except Exception as e:
+            logger.error(f"检查已删除任务失败: {e}")
+
+    def _on_child_exit(self, child):
+        """子进程退出后的状态兜底：异常退出或被终止的任务更新为失败（或放回队列）"""
+        from app.extensions import db
+        from app.utils.statistics_rollup import mark_translate_dirty
+        from sqlalchemy import text
+
+        exitcode = child.process.exitcode
+        elapsed = time.time() - child.started_at
+        logger.info(f"任务 {child.task_id} 子进程已退出（exitcode={exitcode}，耗时 {elapsed:.1f}s）")
+
+        try:
+            app = self._get_app()
+            with app.app_context():
+                if child.requeue:
+                    db.session.execute(text("""
+                        UPDATE translate
+                        SET status = 'queued', queued_at = UTC_TIMESTAMP(), lease_owner = NULL, lease_expires_at = NULL,
+                            updated_at = NOW()
+                        WHERE id = :task_id AND status IN ('process', 'changing')
+                    """), {'task_id': child.task_id})
+                elif exitcode != 0 or child.stop_reason:
+                    reason = child.stop_reason or f"任务进程异常退出（exitcode={exitcode}）"
+                    db.session.execute(text("""
+                        UPDATE translate
+                        SET status = 'failed', failed_reason = :reason, end_at = :end_at,
+                            lease_expires_at = NULL, updated_at = NOW()
+                        WHERE id = :task_id AND status IN ('process', 'changing')
+                    """), {
+                        'task_id': child.task_id,
+                        'reason': reason,
+                        'end_at': self._now(app)
+                    })
+                # 子进程正常退出时已释放租约，这里确保异常退出的任务不会被误回收
+                db.session.execute(text(
+                    "UPDATE translate SET lease_expires_at = NULL WHERE id = :task_id AND status NOT IN ('process', 'changing')"
+                ), {'task_id': child.task_id})
+                db.session.commit()
+            mark_translate_dirty(child.task_id)
+            if child.requeue:
+                self.notifier.record_enqueued(child.task_id)
+        except Exception as e:
+            logger.error(f"更新子进程退出状态失败: task_id={child.task_id}, {e}")
+        self.notifier.notify('finished')
+
+    @staticmethod
+    def _now(app):
+        from datetime import datetime
+        import pytz
+        return datetime.now(pytz.timezone(app.config.get('TIMEZONE', 'Asia/Shanghai')))
+
+    def _get_memory_usage_gb(self) -> float:
+        """worker进程及全部任务子进程的内存占用(GB)"""
+        total = self._process_tree_rss(os.getpid())
+        return total / (1024 ** 3)
+
+    # ==================== 主循环 ====================
+
+    def _handle_signal(self, signum, frame):
+        logger.info(f"收到信号 {signum}，停止领取新任务")
+        self.running = False
+        self.notifier.notify('stop')
+
+    def run(self):
+        """运行worker主循环（阻塞）"""
+        if not self._acquire_lock():
+            logger.error("本节点已有文件翻译队列管理器在运行（检查API进程是否设置了 TRANSLATE_WORKER_MODE=external）")
+            return 1
+
+        signal.signal(signal.SIGTERM, self._handle_signal)
+        signal.signal(signal.SIGINT, self._handle_signal)
+
+        self.running = True
+        logger.info(f"翻译worker已启动（pid={os.getpid()}，并发={self.max_concurrent_tasks}，"
+                    f"单任务内存上限={self.memory_limit_bytes / 1024 / 1024:.0f}MB）")
+        try:
+            while self.running:
+                try:
+                    self._watch_children()
+                    started_count, running_tasks, has_more = self._process_queue()
+                    if has_more:
+                        continue
+                    timeout = CHILD_CHECK_SECONDS if self._children else self._poll_interval(running_tasks)
+                    self.notifier.wait(timeout)
+                except Exception as e:
+                    logger.error(f"翻译worker循环异常: {e}", exc_info=True)
+                    time.sleep(CHILD_CHECK_SECONDS)
+        finally:
+            self._shutdown()
+            self._release_lock()
+        return 0
+
+    def _shutdown(self):
+        """等待执行中的任务结束，超时后终止并放回队列"""
+        deadline = time.time() + SHUTDOWN_TIMEOUT_SECONDS
+        if self._children:
+            logger.info(f"等待 {len(self._children)} 个执行中的任务结束（最多 {SHUTDOWN_TIMEOUT_SECONDS}s）")
+        while self._children:
+            if time.time() >= deadline:
+                for child in self._children.values():
+                    self._stop_child(child, 'worker停止', requeue=True)
+            self._watch_children()
+            time.sleep(1)
+        logger.info("翻译worker已停止")
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s [%(process)d] %(levelname)s %(name)s: %(message)s'
+    )
+    from app import create_app
+    from app.utils.statistics_rollup import init_statistics_rollup
+
+    app = create_app(start_background=False)
+    # worker领取任务、处理子进程退出时标记的统计小时由本进程的汇总线程刷新
+    init_statistics_rollup(app)
+    worker = TranslateWorker(
+        concurrency=app.config.get('TRANSLATE_WORKER_CONCURRENCY', 12),
+        memory_limit_mb=app.config.get('TRANSLATE_WORKER_MEMORY_MB', 4096)
+    )
+    worker.set_app(app)
+    return worker.run()
+
+
+if __name__ == '__main__':
+    sys.exit(main())